@@ -86,6 +86,11 @@ app.conf.update(
             'schedule': crontab(minute='*/15'),  # Every 15 minutes
             'options': {'queue': 'sentiment', 'priority': 7},  # Explicitly route to sentiment queue
         },
+        'index-news-articles': {
+            'task': 'apps.sentiment.tasks.index_news_articles',
+            'schedule': crontab(minute='5-59/15'),  # 5 minutes after each news collection
+            'options': {'queue': 'sentiment', 'priority': 5},  # Explicitly route to sentiment queue
+        },
         'collect-social-media-data': {
             'task': 'apps.sentiment.tasks.collect_social_media_data',
             'schedule': crontab(minute='*/20'),  # Every 20 minutes
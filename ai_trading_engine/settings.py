@@ -76,6 +76,13 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Market updates are coalesced per symbol and sent as one batched frame per
+# group every WEBSOCKET_BROADCAST_INTERVAL seconds
+WEBSOCKET_COALESCE_UPDATES = True
+WEBSOCKET_BROADCAST_INTERVAL = 0.5
+WEBSOCKET_MAX_FRAME_AGE = 2.0  # Seconds before a queued frame is stale for slow clients
+WEBSOCKET_REPLAY_BUFFER_SIZE = 100  # Updates per symbol kept for snapshots and resume_from_seq
+
 # Redis Configuration for Channels and Caching
 REDIS_HOST = '127.0.0.1'
 REDIS_PORT = 6379
@@ -89,6 +96,87 @@ CACHES = {
     }
 }
 
+# Cache shared by all worker processes (live prices, reports); without Redis
+# the processes of one host share this SQLite file
+SHARED_CACHE_BACKEND = 'auto'
+SHARED_CACHE_PATH = BASE_DIR / 'shared_cache.sqlite3'
+# Entries kept in the SQLite/local shared cache; expired ones are purged on set
+SHARED_CACHE_MAX_ENTRIES = 10000
+
+# Seconds a cached subscription entitlement lives (saves invalidate it earlier)
+SUBSCRIPTION_ENTITLEMENT_TTL = 3600
+
+# Seconds news page statistics stay cached (a new article invalidates them)
+NEWS_ANALYSIS_CACHE_TIMEOUT = 300
+
+# Dashboard signal/portfolio aggregates, evicted on signal and position changes
+DASHBOARD_SUMMARY_CACHE_TIMEOUT = 300
+
+# 30-minute strategy levels, cached per symbol and last source bar
+THIRTY_MINUTE_LEVELS_CACHE_TIMEOUT = 3600
+
+# Query budgets: per-request/task query counts are logged as QUERY_BUDGET
+# lines (warning above WARN_QUERIES or a statement repeated DUPLICATE_THRESHOLD
+# times) and the last HISTORY runs of up to MAX_PATHS paths are kept per
+# process; on by default only with DEBUG, as is the X-DB-Queries header.
+# STRICT makes @max_queries raise
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=DEBUG, cast=bool)
+QUERY_BUDGET_RESPONSE_HEADER = DEBUG
+QUERY_BUDGET_WARN_QUERIES = 100
+QUERY_BUDGET_DUPLICATE_THRESHOLD = 5
+QUERY_BUDGET_HISTORY = 50
+QUERY_BUDGET_MAX_PATHS = 500
+QUERY_BUDGET_STRICT = False
+
+# Near-duplicate news: max SimHash bit distance of a syndicated copy, number
+# of fingerprint bands indexed (must exceed the distance) and days searched
+NEWS_SIMHASH_MAX_DISTANCE = 6
+NEWS_SIMHASH_BANDS = 8
+NEWS_DEDUP_WINDOW_DAYS = 3
+
+# News full-text search backend: auto (FTS5 on SQLite, FULLTEXT on MySQL,
+# icontains elsewhere), fts5, fulltext or orm
+NEWS_SEARCH_BACKEND = 'auto'
+
+# Asset correlation engine: bar timeframe, rolling window in bars, history
+# loaded at start, returns a symbol (and a pair of symbols) needs before it
+# is correlated, and seconds between incremental refreshes / full reloads
+CORRELATION_ENGINE_TIMEFRAME = '1h'
+CORRELATION_ENGINE_WINDOW = 168
+CORRELATION_ENGINE_LOOKBACK_DAYS = 30
+CORRELATION_ENGINE_MIN_PERIODS = 30
+CORRELATION_ENGINE_REFRESH = 300
+CORRELATION_ENGINE_RELOAD = 86400
+
+# Signal alert dispatch: alerts per batch, concurrent sends per channel,
+# exponential retry backoff for transient delivery errors and how long a
+# claimed alert stays reserved before another run may take it over
+ALERT_DISPATCH_BATCH_SIZE = 200
+ALERT_CLAIM_TIMEOUT_SECONDS = 600
+ALERT_CHANNEL_CONCURRENCY = {'email': 4, 'telegram': 8, 'webhook': 16}
+ALERT_MAX_ATTEMPTS = 5
+ALERT_RETRY_BASE_SECONDS = 30
+ALERT_RETRY_MAX_SECONDS = 3600
+
+# Live ticks are built into bars of this many seconds, stored under
+# LIVE_BAR_TIMEFRAME once the grace period for late ticks has passed
+LIVE_BAR_INTERVAL_SECONDS = 60
+LIVE_BAR_GRACE_SECONDS = 10
+LIVE_BAR_TIMEFRAME = '1m'
+
+# Bar timeframe of the long-term spot technical analysis
+SPOT_ANALYSIS_TIMEFRAME = '1d'
+
+# In-process async tasks: worker threads, bounded queue length, per-task
+# timeout, optional SQLite file for tasks that overflow the queue or are
+# still pending at exit, and seconds to wait for the queue to drain at exit
+ASYNC_TASK_ENABLED = True
+ASYNC_TASK_WORKERS = 4
+ASYNC_TASK_QUEUE_SIZE = 1000
+ASYNC_TASK_TIMEOUT = 30
+ASYNC_TASK_SPILL_PATH = None
+ASYNC_TASK_SHUTDOWN_TIMEOUT = 10
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -101,8 +189,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'allauth.account.middleware.AccountMiddleware',  # Not required for allauth 0.54.0
     'apps.core.middleware.PerformanceMonitoringMiddleware',
+    'apps.core.middleware.QueryBudgetMiddleware',
     'apps.core.middleware.APIRateLimitMiddleware',
-    # 'apps.subscription.middleware.SubscriptionMiddleware',
+    'apps.subscription.middleware.SubscriptionMiddleware',
     # 'apps.subscription.middleware.SubscriptionRedirectMiddleware',
 ]
 
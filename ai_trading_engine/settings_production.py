@@ -17,6 +17,10 @@ from .settings import *
 # Override DEBUG for production
 DEBUG = False
 
+# Query budget recording is opt-in and never advertised in production
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=False, cast=bool)
+QUERY_BUDGET_RESPONSE_HEADER = False
+
 # Production secret key (should be set via environment variable)
 SECRET_KEY = config('PRODUCTION_SECRET_KEY', default=SECRET_KEY)
 
@@ -92,6 +96,12 @@ CACHES = {
     }
 }
 
+# Rate limiting shares counters and blacklist across workers through Redis
+RATE_LIMIT_BACKEND = 'redis'
+
+# Live prices and reports are fetched once and shared by all workers
+SHARED_CACHE_BACKEND = 'redis'
+
 # Channel layers with Redis for production
 CHANNEL_LAYERS = {
     'default': {
@@ -265,6 +275,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.core.middleware.PerformanceMonitoringMiddleware',
+    'apps.core.middleware.QueryBudgetMiddleware',
+    'apps.subscription.middleware.SubscriptionMiddleware',
 ]
 
 # CORS settings for production
@@ -1,13 +1,20 @@
 import numpy as np
 import pandas as pd
 from decimal import Decimal
-from django.db.models import Sum, Avg, Count, Q
+from django.conf import settings
+from django.db.models import Sum, Avg, Count, Max, Q
+from django.db.models.functions import TruncHour
 from django.utils import timezone
 from datetime import datetime, timedelta
 import math
+import json
+import hashlib
 import logging
 import random
 
+logger = logging.getLogger(__name__)
+
+
 class PortfolioAnalytics:
     """Advanced portfolio analytics and risk management"""
     
@@ -278,7 +285,6 @@ class BacktestingService:
     def _generate_synthetic_data(self, start_date, end_date):
         """Generate synthetic market data for testing when real data unavailable"""
         import random
-        from datetime import timedelta
         
         # Generate daily data points
         current_date = start_date
@@ -1226,7 +1232,6 @@ class StrategyOptimizer:
                              param_ranges, window_size=252, step_size=63):
         """Perform walk-forward analysis to test strategy robustness"""
         try:
-            from datetime import timedelta
             
             walk_forward_results = []
             current_start = start_date
@@ -1393,7 +1398,6 @@ class StrategyOptimizer:
                           param_ranges, validation_split=0.3):
         """Detect overfitting using train/validation split"""
         try:
-            from datetime import timedelta
             
             # Calculate split point
             total_days = (end_date - start_date).days
@@ -2701,5 +2705,312 @@ class PositionSizingService:
         else:
             return 'High Risk'
 
+class PositionPriceUpdateService:
+    """
+    Batched mark-to-market of open positions.
+    
+    Open positions are loaded with their symbols in one query, prices of the
+    distinct symbols are resolved in one call, unrealized PnL and exit
+    conditions are computed on NumPy arrays and current prices are written
+    back with one bulk_update.
+    """
+    
+    PRICE_PRECISION = Decimal('0.000001')
+    
+    @staticmethod
+    def resolve_prices(symbols):
+        """Live prices of symbols, falling back to the latest stored close"""
+        from django.db.models import OuterRef, Subquery
+        from apps.data.models import MarketData
+        from apps.data.real_price_service import get_live_prices
+        from apps.trading.models import Symbol
+        
+        symbols = set(symbols)
+        prices = {}
+        try:
+            live_prices = get_live_prices()
+            for symbol in symbols:
+                price = (live_prices.get(symbol) or {}).get('price')
+                if price:
+                    prices[symbol] = float(price)
+        except Exception as e:
+            logger.error(f"Error fetching live prices for mark-to-market: {e}")
+        
+        missing = symbols - prices.keys()
+        if missing:
+            latest_close = MarketData.objects.filter(
+                symbol=OuterRef('pk')
+            ).order_by('-timestamp').values('close_price')[:1]
+            rows = Symbol.objects.filter(symbol__in=missing).annotate(
+                last_close=Subquery(latest_close)
+            ).values_list('symbol', 'last_close')
+            for symbol, close in rows:
+                if close:
+                    prices[symbol] = float(close)
+        return prices
+    
+    @staticmethod
+    def evaluate(positions, prices):
+        """
+        Vectorized PnL and exit checks of positions at prices.
+        
+        Returns a dict of arrays aligned with positions: price (NaN when the
+        symbol has no price), unrealized_pnl, pnl_percentage, take_profit_hit
+        and stop_loss_hit.
+        """
+        count = len(positions)
+        
+        def column(values):
+            return np.fromiter((np.nan if v is None else float(v) for v in values), dtype=np.float64, count=count)
+        
+        price = column(prices.get(p.symbol.symbol) for p in positions)
+        entry = column(p.entry_price for p in positions)
+        quantity = column(p.quantity for p in positions)
+        take_profit = column(p.take_profit for p in positions)
+        stop_loss = column(p.stop_loss for p in positions)
+        side = np.where(np.array([p.position_type == 'LONG' for p in positions], dtype=bool), 1.0, -1.0)
+        
+        has_price = ~np.isnan(price)
+        move = side * (price - entry)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl_percentage = np.where(entry > 0, move / entry * 100.0, 0.0)
+        
+        with np.errstate(invalid='ignore'):
+            # Comparisons against NaN levels are False, so unset levels never trigger
+            take_profit_hit = has_price & (side * (price - take_profit) >= 0)
+            stop_loss_hit = has_price & (side * (price - stop_loss) <= 0)
+        
+        return {
+            'price': price,
+            'unrealized_pnl': np.where(has_price, move * quantity, 0.0),
+            'pnl_percentage': np.where(has_price, pnl_percentage, 0.0),
+            'take_profit_hit': take_profit_hit,
+            'stop_loss_hit': stop_loss_hit,
+        }
+    
+    @classmethod
+    def mark_to_market(cls, positions=None, prices=None):
+        """
+        Update current prices of open positions (all of them by default).
+        
+        Returns the evaluate() arrays plus the positions, the number updated,
+        symbols without a price and the total unrealized PnL.
+        """
+        from apps.trading.models import Position
+        
+        if positions is None:
+            positions = Position.objects.filter(is_open=True)
+        if hasattr(positions, 'select_related'):
+            positions = positions.select_related('symbol')
+        positions = list(positions)
+        
+        if prices is None:
+            prices = cls.resolve_prices(p.symbol.symbol for p in positions)
+        evaluation = cls.evaluate(positions, prices)
+        
+        updated = []
+        missing = set()
+        for position, price in zip(positions, evaluation['price']):
+            if np.isnan(price):
+                missing.add(position.symbol.symbol)
+            else:
+                position.current_price = Decimal(str(price)).quantize(cls.PRICE_PRECISION)
+                updated.append(position)
+        if updated:
+            Position.objects.bulk_update(updated, ['current_price'], batch_size=500)
+            cls._invalidate_dashboards(position.portfolio_id for position in updated)
+        
+        evaluation.update(
+            positions=positions,
+            updated=len(updated),
+            missing_prices=sorted(missing),
+            total_unrealized_pnl=float(evaluation['unrealized_pnl'].sum()),
+        )
+        return evaluation
+    
+    @classmethod
+    def close_positions(cls, closures):
+        """Close (position, exit_price, reason) tuples, recording one closing trade each"""
+        from django.db import transaction
+        from apps.trading.models import Position, Trade
+        
+        if not closures:
+            return 0
+        closed_at = timezone.now()
+        trades = []
+        for position, exit_price, reason in closures:
+            position.is_open = False
+            position.current_price = Decimal(str(exit_price)).quantize(cls.PRICE_PRECISION)
+            position.closed_at = closed_at
+            trades.append(Trade(
+                portfolio_id=position.portfolio_id,
+                symbol_id=position.symbol_id,
+                trade_type='SELL' if position.position_type == 'LONG' else 'BUY',
+                quantity=position.quantity,
+                price=position.current_price,
+                notes=f"Position closed: {reason}"
+            ))
+        
+        with transaction.atomic():
+            Trade.objects.bulk_create(trades)
+            Position.objects.bulk_update([c[0] for c in closures], ['is_open', 'current_price', 'closed_at'])
+        cls._invalidate_dashboards(c[0].portfolio_id for c in closures)
+        return len(closures)
+    
+    @staticmethod
+    def _invalidate_dashboards(portfolio_ids):
+        """bulk_update sends no post_save, evict the cached dashboard summaries directly"""
+        from apps.dashboard.services import DashboardSummaryService
+        
+        for portfolio_id in set(portfolio_ids):
+            DashboardSummaryService.invalidate_portfolio(portfolio_id)
+    
+    @classmethod
+    def update_all_position_prices(cls):
+        """Mark every open position to market, True on success"""
+        try:
+            result = cls.mark_to_market()
+            logger.info(f"Updated prices of {result['updated']} positions, "
+                        f"unrealized PnL {result['total_unrealized_pnl']:.2f}")
+            if result['missing_prices']:
+                logger.warning(f"No price for {', '.join(result['missing_prices'])}")
+            return True
+        except Exception as e:
+            logger.error(f"Error updating position prices: {e}")
+            return False
+    
+    @classmethod
+    def update_position_price(cls, symbol, price=None):
+        """Mark the open positions of one symbol to price (resolved when None)"""
+        try:
+            from apps.trading.models import Position
+            
+            prices = None if price is None else {symbol: float(price)}
+            result = cls.mark_to_market(Position.objects.filter(is_open=True, symbol__symbol=symbol), prices)
+            return symbol not in result['missing_prices']
+        except Exception as e:
+            logger.error(f"Error updating position prices for {symbol}: {e}")
+            return False
+
+
+class NewsStatisticsService:
+    """
+    Aggregates of the news_analysis page.
+
+    Sentiment counts, average sentiment and the hourly distribution come from
+    one TruncHour grouped query, coin and symbol mention counts from one
+    grouped CryptoMention query. The result is cached in the shared cache
+    under the filters and the latest article id, so a repeat load with no new
+    articles costs one Max(id) query.
+    """
+    
+    CACHE_TIMEOUT = 300
+    
+    def __init__(self, cache_timeout=None):
+        self.cache_timeout = cache_timeout or getattr(settings, 'NEWS_ANALYSIS_CACHE_TIMEOUT', self.CACHE_TIMEOUT)
+    
+    @staticmethod
+    def filter_articles(start_date, symbol='', sentiment='', source=''):
+        """Articles published since start_date matching the page filters (no joins that duplicate rows)"""
+        from apps.sentiment.models import NewsArticle, CryptoMention
+        
+        articles = NewsArticle.objects.filter(published_at__gte=start_date)
+        if symbol:
+            articles = articles.filter(
+                id__in=CryptoMention.objects.filter(asset__symbol=symbol).values('news_article_id')
+            )
+        if sentiment:
+            articles = articles.filter(sentiment_label=sentiment.upper())
+        if source:
+            articles = articles.filter(source__name__icontains=source)
+        return articles
+    
+    def get_statistics(self, start_date, now=None, symbol='', sentiment='', source='', date_range=''):
+        """Cached statistics of the filtered articles"""
+        from apps.sentiment.models import NewsArticle
+        from apps.core.shared_cache import get_shared_cache
+        
+        now = now or timezone.now()
+        latest_id = NewsArticle.objects.aggregate(latest=Max('id'))['latest']
+        filters = json.dumps([date_range or start_date.isoformat(), symbol, sentiment, source])
+        key = f"news_analysis_stats:{hashlib.md5(filters.encode()).hexdigest()}:{latest_id}"
+        
+        articles = self.filter_articles(start_date, symbol, sentiment, source)
+        return get_shared_cache().get_or_refresh(
+            key, lambda: self.build_statistics(articles, now), self.cache_timeout
+        )
+    
+    def build_statistics(self, articles, now):
+        """Compute the statistics without caching (three grouped queries)"""
+        from apps.sentiment.models import CryptoMention, NewsSource
+        
+        hours = articles.order_by().annotate(hour=TruncHour('published_at')).values('hour').annotate(
+            total=Count('id'),
+            positive=Count('id', filter=Q(sentiment_label='POSITIVE')),
+            negative=Count('id', filter=Q(sentiment_label='NEGATIVE')),
+            neutral=Count('id', filter=Q(sentiment_label='NEUTRAL')),
+            sentiment_sum=Sum('sentiment_score'),
+            sentiment_count=Count('sentiment_score')
+        )
+        
+        # Hour 0 is the current clock hour, 23 the oldest of the last day
+        current_hour = timezone.localtime(now).replace(minute=0, second=0, microsecond=0)
+        totals = {'total': 0, 'positive': 0, 'negative': 0, 'neutral': 0, 'sentiment_sum': 0.0, 'sentiment_count': 0}
+        hourly_news = {hour: 0 for hour in range(24)}
+        for row in hours:
+            for field in totals:
+                totals[field] += row[field] or 0
+            age = int((current_hour - row['hour']).total_seconds() // 3600)
+            if 0 <= age < 24:
+                hourly_news[age] += row['total']
+        
+        total = totals['total']
+        statistics = {
+            'total_articles': total,
+            'positive_articles': totals['positive'],
+            'negative_articles': totals['negative'],
+            'neutral_articles': totals['neutral'],
+            'sentiment_percentage': {
+                label: (totals[label] / total * 100) if total > 0 else 0
+                for label in ('positive', 'negative', 'neutral')
+            },
+            'avg_sentiment': totals['sentiment_sum'] / totals['sentiment_count'] if totals['sentiment_count'] else 0.0,
+            'hourly_news': hourly_news,
+        }
+        
+        news = Q(mention_type='news')
+        mentions = CryptoMention.objects.filter(news_article__in=articles.values('id')).values(
+            'asset_id', 'asset__symbol', 'asset__name', 'asset__is_active', 'asset__is_crypto_symbol'
+        ).annotate(
+            mention_count=Count('id'),
+            count=Count('id', filter=news),
+            avg_sentiment=Avg('sentiment_score', filter=news),
+            positive_count=Count('id', filter=news & Q(sentiment_label='POSITIVE')),
+            negative_count=Count('id', filter=news & Q(sentiment_label='NEGATIVE')),
+            max_impact=Sum('impact_weight', filter=news)
+        ).order_by()
+        mentions = list(mentions)
+        
+        statistics['top_coins'] = [
+            {field: row[field] for field in
+             ('asset__symbol', 'asset__name', 'count', 'avg_sentiment', 'positive_count', 'negative_count', 'max_impact')}
+            for row in sorted(mentions, key=lambda row: -row['count']) if row['count']
+        ][:15]
+        statistics['active_symbols'] = [
+            {'id': row['asset_id'], 'symbol': row['asset__symbol'], 'name': row['asset__name'],
+             'mention_count': row['mention_count']}
+            for row in sorted(mentions, key=lambda row: (-row['mention_count'], row['asset__symbol']))
+            if row['asset__is_active'] and row['asset__is_crypto_symbol']
+        ][:50]
+        
+        statistics['news_sources'] = list(NewsSource.objects.filter(
+            newsarticle__in=articles.values('id')
+        ).annotate(
+            article_count=Count('newsarticle'),
+            avg_sentiment=Avg('newsarticle__sentiment_score'),
+            avg_impact=Avg('newsarticle__impact_score')
+        ).order_by('-article_count')[:15])
+        return statistics
+
 
 # ... existing code ...
@@ -0,0 +1,71 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.core.shared_cache import LocalSharedCacheBackend, set_shared_cache
+from apps.sentiment.models import CryptoMention, NewsArticle, NewsSource
+from apps.trading.models import Symbol
+from .services import NewsStatisticsService
+
+
+class NewsStatisticsServiceTestCase(TestCase):
+    def setUp(self):
+        set_shared_cache(LocalSharedCacheBackend())
+        self.addCleanup(set_shared_cache, None)
+        self.now = timezone.now()
+        self.source = NewsSource.objects.create(name='CoinDesk', url='https://coindesk.com')
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO', is_crypto_symbol=True)
+
+        for hours_ago, label, score, assets in [
+            (0.1, 'POSITIVE', 0.8, [self.btc, self.eth]),
+            (0.2, 'POSITIVE', 0.4, [self.btc]),
+            (2.5, 'NEGATIVE', -0.6, [self.eth]),
+            (5.5, 'NEUTRAL', None, []),
+            (40, 'POSITIVE', 0.9, [self.btc]),
+        ]:
+            article = NewsArticle.objects.create(
+                source=self.source, title='News', content='', url='https://coindesk.com/a',
+                published_at=self.now - timedelta(hours=hours_ago), sentiment_label=label, sentiment_score=score
+            )
+            for asset in assets:
+                CryptoMention.objects.create(
+                    asset=asset, news_article=article, mention_type='news',
+                    sentiment_score=score or 0.0, sentiment_label=label
+                )
+
+    def statistics(self, **filters):
+        return NewsStatisticsService().get_statistics(self.now - timedelta(hours=24), self.now, **filters)
+
+    def test_statistics_in_grouped_queries(self):
+        """Test counts, hourly trend and mentions come from a handful of grouped queries"""
+        with self.assertNumQueries(4):
+            stats = self.statistics(date_range='24h')
+
+        self.assertEqual(stats['total_articles'], 4)
+        self.assertEqual((stats['positive_articles'], stats['negative_articles'], stats['neutral_articles']), (2, 1, 1))
+        self.assertAlmostEqual(stats['sentiment_percentage']['positive'], 50.0)
+        self.assertAlmostEqual(stats['avg_sentiment'], 0.2)
+        self.assertEqual(sum(stats['hourly_news'].values()), 4)
+        self.assertEqual(len(stats['hourly_news']), 24)
+        self.assertEqual([(c['asset__symbol'], c['count']) for c in stats['top_coins']], [('BTC', 2), ('ETH', 2)])
+        self.assertEqual([s['symbol'] for s in stats['active_symbols']], ['BTC', 'ETH'])
+        self.assertEqual([(s.name, s.article_count) for s in stats['news_sources']], [('CoinDesk', 4)])
+
+    def test_symbol_filter_does_not_duplicate_articles(self):
+        """Test the symbol filter counts each article once"""
+        stats = self.statistics(symbol='ETH', date_range='24h')
+        self.assertEqual(stats['total_articles'], 2)
+        self.assertEqual(stats['positive_articles'], 1)
+
+    def test_cached_until_new_article(self):
+        """Test a repeat load costs one freshness query until an article is added"""
+        self.statistics(date_range='24h')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.statistics(date_range='24h')['total_articles'], 4)
+
+        NewsArticle.objects.create(
+            source=self.source, title='Fresh', content='', url='https://coindesk.com/b',
+            published_at=self.now, sentiment_label='NEGATIVE', sentiment_score=-1.0
+        )
+        self.assertEqual(self.statistics(date_range='24h')['total_articles'], 5)
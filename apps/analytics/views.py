@@ -2,14 +2,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Sum, Avg, Count, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
 
 from .models import AnalyticsPortfolio, AnalyticsPosition, AnalyticsTrade, PerformanceMetrics, BacktestResult, MarketData, Alert
-from .services import PortfolioAnalytics, TechnicalIndicators, BacktestEngine, RiskManager, MarketAnalyzer, MarketSentimentService
+from .services import PortfolioAnalytics, TechnicalIndicators, BacktestEngine, RiskManager, MarketAnalyzer, MarketSentimentService, NewsStatisticsService
 
 @login_required
 def backtesting_view(request):
@@ -142,14 +141,15 @@ def market_sentiment_view(request):
 def news_analysis(request):
     """News analysis page for crypto news and sentiment - Showcases current cryptocurrency news"""
     try:
-        from apps.sentiment.models import NewsArticle, CryptoMention, NewsSource
-        from apps.trading.models import Symbol
+        from apps.sentiment.models import CryptoMention
+        from apps.sentiment.search import search_news
         
         # Get filter parameters
         symbol_filter = request.GET.get('symbol', '')
         sentiment_filter = request.GET.get('sentiment', '')
         date_filter = request.GET.get('date_range', '24h')  # 24h, 7d, 30d
         source_filter = request.GET.get('source', '')
+        search_query = request.GET.get('q', '').strip()
         
         # Calculate date range - Focus on recent news (default to last 24 hours for current news)
         now = timezone.now()
@@ -165,47 +165,24 @@ def news_analysis(request):
         # Get current crypto news articles (ordered by time for calendar view)
         # Sort by published_at ascending (oldest first) to match calendar style
         # Within same time, show higher impact first
-        news_articles = NewsArticle.objects.filter(
-            published_at__gte=start_date
+        news_articles = NewsStatisticsService.filter_articles(
+            start_date, symbol_filter, sentiment_filter, source_filter
         ).select_related('source').prefetch_related(
             'cryptomention_set__asset'
         ).order_by('published_at', '-impact_score')  # Chronological order (oldest to newest)
         
-        # Apply filters
-        if symbol_filter:
-            news_articles = news_articles.filter(
-                cryptomention__asset__symbol=symbol_filter
-            ).distinct()
-        
-        if sentiment_filter:
-            news_articles = news_articles.filter(sentiment_label=sentiment_filter.upper())
-        
-        if source_filter:
-            news_articles = news_articles.filter(source__name__icontains=source_filter)
-        
         # Get crypto mentions for articles (for statistics and analysis)
         crypto_mentions = CryptoMention.objects.filter(
-            news_article__in=news_articles,
+            news_article__in=news_articles.values('id'),
             mention_type='news'
         ).select_related('asset', 'news_article')
         
-        # Get comprehensive statistics
-        total_articles = news_articles.count()
-        positive_articles = news_articles.filter(sentiment_label='POSITIVE').count()
-        negative_articles = news_articles.filter(sentiment_label='NEGATIVE').count()
-        neutral_articles = news_articles.filter(sentiment_label='NEUTRAL').count()
-        
-        # Calculate sentiment percentage
-        sentiment_percentage = {
-            'positive': (positive_articles / total_articles * 100) if total_articles > 0 else 0,
-            'negative': (negative_articles / total_articles * 100) if total_articles > 0 else 0,
-            'neutral': (neutral_articles / total_articles * 100) if total_articles > 0 else 0,
-        }
-        
-        # Get overall average sentiment
-        avg_sentiment = news_articles.aggregate(
-            avg_sentiment=Avg('sentiment_score')
-        )['avg_sentiment'] or 0.0
+        # Counts, sentiment, hourly trend, coins, sources and symbols in a few
+        # grouped queries, cached until a new article arrives
+        statistics = NewsStatisticsService().get_statistics(
+            start_date, now, symbol_filter, sentiment_filter, source_filter, date_filter
+        )
+        avg_sentiment = statistics['avg_sentiment']
         
         # Calculate sentiment bar width (normalize -1 to 1 range to 0 to 100%)
         # Convert -1 to 1 range to 0 to 100% for progress bar
@@ -215,15 +192,6 @@ def news_analysis(request):
         elif sentiment_bar_width > 100:
             sentiment_bar_width = 100
         
-        # Get top mentioned coins with detailed stats
-        top_coins = crypto_mentions.values('asset__symbol', 'asset__name').annotate(
-            count=Count('id'),
-            avg_sentiment=Avg('sentiment_score'),
-            positive_count=Count('id', filter=Q(sentiment_label='POSITIVE')),
-            negative_count=Count('id', filter=Q(sentiment_label='NEGATIVE')),
-            max_impact=Sum('impact_weight')
-        ).order_by('-count')[:15]
-        
         # Get trending news (high impact, recent)
         trending_news = news_articles.filter(
             impact_score__gt=0.5
@@ -236,39 +204,13 @@ def news_analysis(request):
         positive_news = news_articles.filter(sentiment_label='POSITIVE').order_by('-impact_score', '-published_at')[:10]
         negative_news = news_articles.filter(sentiment_label='NEGATIVE').order_by('-impact_score', '-published_at')[:10]
         
-        # Get news sources with statistics
-        news_sources = NewsSource.objects.filter(
-            newsarticle__in=news_articles
-        ).annotate(
-            article_count=Count('newsarticle'),
-            avg_sentiment=Avg('newsarticle__sentiment_score'),
-            avg_impact=Avg('newsarticle__impact_score')
-        ).distinct().order_by('-article_count')[:15]
-        
-        # Get active crypto symbols for filter (most mentioned first)
-        active_symbols = Symbol.objects.filter(
-            is_active=True,
-            is_crypto_symbol=True,
-            cryptomention__news_article__in=news_articles
-        ).annotate(
-            mention_count=Count('cryptomention')
-        ).distinct().order_by('-mention_count', 'symbol')[:50]
-        
         # Get recent news timeline (last 24 hours by default)
         recent_news_timeline = news_articles.filter(
             published_at__gte=now - timedelta(hours=24)
         ).order_by('-published_at')[:20]
         
-        # Calculate news trends (hourly distribution for last 24h)
-        hourly_news = {}
-        for hour in range(24):
-            hour_start = now - timedelta(hours=hour+1)
-            hour_end = now - timedelta(hours=hour)
-            count = news_articles.filter(
-                published_at__gte=hour_start,
-                published_at__lt=hour_end
-            ).count()
-            hourly_news[hour] = count
+        # Ranked full-text matches with highlighted snippets
+        search_results = search_news(search_query, symbol_filter or None, start_date, limit=50) if search_query else []
         
         context = {
             # Main news data - Show more articles for calendar view
@@ -280,25 +222,27 @@ def news_analysis(request):
             'recent_news_timeline': recent_news_timeline,
             
             # Statistics
-            'total_articles': total_articles,
-            'positive_articles': positive_articles,
-            'negative_articles': negative_articles,
-            'neutral_articles': neutral_articles,
-            'sentiment_percentage': sentiment_percentage,
+            'total_articles': statistics['total_articles'],
+            'positive_articles': statistics['positive_articles'],
+            'negative_articles': statistics['negative_articles'],
+            'neutral_articles': statistics['neutral_articles'],
+            'sentiment_percentage': statistics['sentiment_percentage'],
             'avg_sentiment': avg_sentiment,
             
             # Analysis data
-            'top_coins': top_coins,
-            'news_sources': news_sources,
-            'hourly_news': hourly_news,
+            'top_coins': statistics['top_coins'],
+            'news_sources': statistics['news_sources'],
+            'hourly_news': statistics['hourly_news'],
             'crypto_mentions': crypto_mentions,
             
             # Filters
-            'active_symbols': active_symbols,
+            'active_symbols': statistics['active_symbols'],
             'symbol_filter': symbol_filter,
             'sentiment_filter': sentiment_filter,
             'date_filter': date_filter,
             'source_filter': source_filter,
+            'search_query': search_query,
+            'search_results': search_results,
             
             # Metadata
             'date_range_start': start_date,
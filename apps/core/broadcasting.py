@@ -0,0 +1,306 @@
+"""
+Coalesced WebSocket Broadcast Pipeline for AI Trading Engine
+
+High-frequency market updates are not sent to the channel layer one by one.
+Instead they are collected per symbol (latest value wins) and flushed every
+WEBSOCKET_BROADCAST_INTERVAL seconds as one batched frame per group. Each
+frame is serialized once and consumers forward the pre-serialized text to
+every subscriber as-is.
+
+Every update in a frame carries a per-symbol sequence number and the epoch of
+the pipeline that numbered it. MarketStateBuffer keeps the last updates of
+each symbol so a subscriber gets a snapshot right away and a reconnecting
+client can replay what it missed (or is told to resync).
+"""
+
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import defaultdict, deque
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_MESSAGE_TYPE = 'market_batch'
+
+
+class BroadcastStats:
+    """Thread-safe throughput counters for the broadcast pipeline and consumers"""
+
+    def __init__(self, window=60):
+        self.window = window
+        self._lock = threading.Lock()
+        self._history = deque()
+        self.updates_submitted = 0
+        self.updates_coalesced = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_delivered = 0
+        self.bytes_delivered = 0
+        self.frames_dropped = 0
+
+    def _record(self, frames, size):
+        now = time.time()
+        self._history.append((now, frames, size))
+        while self._history and self._history[0][0] < now - self.window:
+            self._history.popleft()
+
+    def record_submit(self, coalesced):
+        with self._lock:
+            self.updates_submitted += 1
+            if coalesced:
+                self.updates_coalesced += 1
+
+    def record_flush(self, frames, size):
+        with self._lock:
+            self.frames_sent += frames
+            self.bytes_sent += size
+            self._record(frames, size)
+
+    def record_delivery(self, size):
+        with self._lock:
+            self.frames_delivered += 1
+            self.bytes_delivered += size
+
+    def record_drop(self):
+        with self._lock:
+            self.frames_dropped += 1
+
+    def get_stats(self):
+        """Get totals plus messages/sec and bytes/sec over the rolling window"""
+        with self._lock:
+            now = time.time()
+            recent = [entry for entry in self._history if entry[0] >= now - self.window]
+            span = max(now - recent[0][0], 1.0) if recent else self.window
+            return {
+                'updates_submitted': self.updates_submitted,
+                'updates_coalesced': self.updates_coalesced,
+                'frames_sent': self.frames_sent,
+                'bytes_sent': self.bytes_sent,
+                'frames_delivered': self.frames_delivered,
+                'bytes_delivered': self.bytes_delivered,
+                'frames_dropped': self.frames_dropped,
+                'messages_per_sec': round(sum(entry[1] for entry in recent) / span, 2),
+                'bytes_per_sec': round(sum(entry[2] for entry in recent) / span, 2),
+            }
+
+
+broadcast_stats = BroadcastStats()
+
+
+class MarketStateBuffer:
+    """
+    Ring buffer of the last `size` sequenced updates per symbol.
+
+    Updates are recorded once per process: by the pipeline that numbers them
+    or, when the publisher runs elsewhere, by the first consumer that sees
+    the frame. Updates from a new epoch (publisher restart) reset the
+    symbol's buffer.
+    """
+
+    def __init__(self, size=None):
+        self.size = size or getattr(settings, 'WEBSOCKET_REPLAY_BUFFER_SIZE', 100)
+        self._lock = threading.Lock()
+        self._symbols = {}
+        self._last_frame = None
+
+    def record(self, update):
+        """Add one update, False when it is not newer than the buffered ones"""
+        symbol, seq, epoch = update.get('symbol'), update.get('seq'), update.get('epoch')
+        if symbol is None or seq is None:
+            return False
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None or state['epoch'] != epoch:
+                state = self._symbols[symbol] = {'epoch': epoch, 'updates': deque(maxlen=self.size)}
+            elif state['updates'] and seq <= state['updates'][-1]['seq']:
+                return False
+            state['updates'].append(update)
+            return True
+
+    def claim_frame(self, epoch, seq):
+        """True for the first caller with a frame newer than the last claimed one"""
+        with self._lock:
+            last = self._last_frame
+            if last is not None and last[0] == epoch and seq <= last[1]:
+                return False
+            self._last_frame = (epoch, seq)
+            return True
+
+    def snapshot(self, symbol):
+        """Latest update of each type of symbol, with the symbol's last sequence number"""
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None or not state['updates']:
+                return {'symbol': symbol, 'seq': None, 'epoch': None, 'updates': []}
+            latest = {}
+            for update in state['updates']:
+                latest[update.get('type')] = update
+            return {
+                'symbol': symbol,
+                'seq': state['updates'][-1]['seq'],
+                'epoch': state['epoch'],
+                'updates': sorted(latest.values(), key=lambda update: update['seq']),
+            }
+
+    def since(self, symbol, seq, epoch=None):
+        """
+        Updates of symbol after seq, or None when they cannot be replayed.
+
+        A replay needs the same epoch (when the client sent one) and every
+        update after seq still in the buffer.
+        """
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None or not state['updates']:
+                return None
+            if epoch is not None and epoch != state['epoch']:
+                return None
+            updates = state['updates']
+            if seq > updates[-1]['seq'] or seq < updates[0]['seq'] - 1:
+                return None
+            return [update for update in updates if update['seq'] > seq]
+
+    def clear(self):
+        with self._lock:
+            self._symbols.clear()
+            self._last_frame = None
+
+
+market_state = MarketStateBuffer()
+
+
+class BroadcastPipeline:
+    """
+    Latest-wins coalescing buffer flushed as batched frames per group.
+
+    submit() only records the update in memory, so it is cheap to call for
+    every tick from any thread. A background thread flushes every `interval`
+    seconds; an interval of 0 disables it and leaves flushing to the caller.
+    """
+
+    def __init__(self, channel_layer, interval=None, stats=None, state=None):
+        self.channel_layer = channel_layer
+        if interval is None:
+            interval = getattr(settings, 'WEBSOCKET_BROADCAST_INTERVAL', 0.5)
+        self.interval = interval
+        self.stats = stats or broadcast_stats
+        self.state = state or market_state
+        self.epoch = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._seq = 0
+        self._symbol_seq = {}
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def submit(self, key, message, groups):
+        """Queue message for groups, replacing any pending message with the same key"""
+        with self._lock:
+            coalesced = key in self._pending
+            self._pending[key] = (message, tuple(groups))
+        self.stats.record_submit(coalesced)
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self.interval <= 0 or (self._flusher and self._flusher.is_alive()):
+            return
+        with self._lock:
+            if self._flusher and self._flusher.is_alive():
+                return
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name='broadcast-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing broadcast pipeline: {e}")
+
+    def stop(self):
+        """Stop the background flusher after sending what is pending"""
+        self._stop.set()
+        self.flush()
+
+    def build_frames(self):
+        """Drain pending updates into one serialized frame per group"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return []
+            self._seq += 1
+            seq = self._seq
+            numbered = []
+            for message, groups in pending.values():
+                symbol = message.get('symbol')
+                self._symbol_seq[symbol] = self._symbol_seq.get(symbol, 0) + 1
+                numbered.append((dict(message, seq=self._symbol_seq[symbol], epoch=self.epoch), groups))
+
+        self.state.claim_frame(self.epoch, seq)
+        group_updates = defaultdict(list)
+        for message, groups in numbered:
+            self.state.record(message)
+            for group in groups:
+                group_updates[group].append(message)
+
+        timestamp = timezone.now().isoformat()
+        sent_at = time.time()
+        frames = []
+        for group, updates in group_updates.items():
+            text = json.dumps({
+                'type': BATCH_MESSAGE_TYPE,
+                'seq': seq,
+                'epoch': self.epoch,
+                'timestamp': timestamp,
+                'updates': updates,
+            }, default=str)
+            frames.append((group, {
+                'type': BATCH_MESSAGE_TYPE, 'text': text, 'sent_at': sent_at,
+                'group': group, 'epoch': self.epoch, 'seq': seq
+            }))
+        return frames
+
+    async def aflush(self):
+        """Send pending updates from async code, returns number of frames sent"""
+        frames = self.build_frames()
+        for group, frame in frames:
+            await self.channel_layer.group_send(group, frame)
+        if frames:
+            self.stats.record_flush(len(frames), sum(len(frame['text']) for _, frame in frames))
+        return len(frames)
+
+    def flush(self):
+        """Send pending updates from sync code, returns number of frames sent"""
+        if not self._pending:
+            return 0
+        return async_to_sync(self.aflush)()
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_broadcast_pipeline(channel_layer):
+    """Return the process-wide pipeline shared by all broadcaster instances"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = BroadcastPipeline(channel_layer)
+    return _pipeline
+
+
+def get_market_state():
+    """Return the process-wide buffer of sequenced market updates"""
+    return market_state
+
+
+def get_broadcast_stats():
+    """Get throughput statistics of this process"""
+    return broadcast_stats.get_stats()
@@ -5,6 +5,10 @@ from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from django.utils import timezone
 import asyncio
+import time
+from django.conf import settings
+
+from .broadcasting import broadcast_stats, market_state
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +16,13 @@ logger = logging.getLogger(__name__)
 class MarketDataConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer for real-time market data"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Frames older than this are dropped for slow clients, their latest
+        # values are merged into the next frame that is fresh enough to send
+        self.max_frame_age = getattr(settings, 'WEBSOCKET_MAX_FRAME_AGE', 2.0)
+        self.stale_updates = {}
+    
     async def connect(self):
         """Handle WebSocket connection"""
         self.user = self.scope["user"]
@@ -63,6 +74,7 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                     'symbol': symbol,
                     'message': f'Subscribed to {symbol} updates'
                 }))
+                await self.send_symbol_state(symbol, data.get('resume_from_seq'), data.get('epoch'))
             
             elif message_type == 'unsubscribe_symbol':
                 # Unsubscribe from specific symbol updates
@@ -89,6 +101,36 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                 'message': 'Internal server error'
             }))
     
+    async def send_symbol_state(self, symbol, resume_from_seq=None, epoch=None):
+        """
+        Bring a new subscriber up to date.
+        
+        With resume_from_seq the updates missed since then are replayed; when
+        they are no longer buffered (or the epoch changed) the client gets
+        resync_required plus a fresh snapshot instead.
+        """
+        if resume_from_seq is not None:
+            try:
+                updates = market_state.since(symbol, int(resume_from_seq), epoch)
+            except (TypeError, ValueError):
+                updates = None
+            if updates is not None:
+                await self.send(text_data=json.dumps({
+                    'type': 'market_replay',
+                    'symbol': symbol,
+                    'from_seq': int(resume_from_seq),
+                    'updates': updates
+                }, default=str))
+                return
+            await self.send(text_data=json.dumps({
+                'type': 'resync_required',
+                'symbol': symbol,
+                'message': f'Updates after {resume_from_seq} are no longer available'
+            }))
+        
+        snapshot = market_state.snapshot(symbol)
+        await self.send(text_data=json.dumps(dict(snapshot, type='market_snapshot'), default=str))
+    
     async def market_update(self, event):
         """Send market data updates to WebSocket"""
         await self.send(text_data=json.dumps({
@@ -100,6 +142,33 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
             'timestamp': event['timestamp']
         }))
     
+    async def market_batch(self, event):
+        """Forward a pre-serialized batch of market updates to WebSocket"""
+        text = event['text']
+        
+        # Publisher in another process: the first consumer here buffers the frame
+        if event.get('group') == 'market_data' and market_state.claim_frame(event.get('epoch'), event.get('seq', 0)):
+            for update in json.loads(text)['updates']:
+                market_state.record(update)
+        
+        if time.time() - event['sent_at'] > self.max_frame_age:
+            # Client is lagging behind: skip the stale tick, keep latest values
+            for update in json.loads(text)['updates']:
+                self.stale_updates[(update['type'], update['symbol'])] = update
+            broadcast_stats.record_drop()
+            return
+        
+        if self.stale_updates:
+            frame = json.loads(text)
+            for update in frame['updates']:
+                self.stale_updates[(update['type'], update['symbol'])] = update
+            frame['updates'] = list(self.stale_updates.values())
+            self.stale_updates = {}
+            text = json.dumps(frame)
+        
+        await self.send(text_data=text)
+        broadcast_stats.record_delivery(len(text))
+    
     async def price_alert(self, event):
         """Send price alerts to WebSocket"""
         await self.send(text_data=json.dumps({
@@ -206,6 +275,13 @@ class TradingSignalsConsumer(AsyncWebsocketConsumer):
             'timestamp': event['timestamp']
         }))
     
+    async def signal_batch(self, event):
+        """Send the signals of one persisted batch to WebSocket"""
+        await self.send(text_data=json.dumps({
+            'type': 'signal_batch',
+            'signals': event['signals']
+        }))
+    
     async def signal_update(self, event):
         """Send signal updates to WebSocket"""
         await self.send(text_data=json.dumps({
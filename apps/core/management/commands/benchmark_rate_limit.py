@@ -0,0 +1,91 @@
+"""
+Management command to benchmark the rate limiting overhead per request
+
+Sends N synthetic API requests from a pool of client IPs through
+APIRateLimitMiddleware.process_request with a limit high enough that none is
+denied, and reports the mean, median and p99 time spent per request. The
+local backend is used unless --backend redis is given, so the default run
+needs no external services.
+"""
+
+import json
+import time
+import statistics
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from apps.core.middleware import APIRateLimitMiddleware
+from apps.core.rate_limiting import LocalRateLimitBackend, _django_redis_backend
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the per-request overhead of API rate limiting'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Number of requests to send')
+        parser.add_argument('--ips', type=int, default=1000, help='Number of distinct client IPs')
+        parser.add_argument('--backend', choices=['local', 'redis'], default='local',
+                            help='Rate limit backend to benchmark')
+        parser.add_argument('--budget-ms', type=float, default=1.0,
+                            help='Per-request overhead budget the mean is compared against')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['ips'] < 1:
+            raise CommandError('--requests and --ips must be at least 1')
+
+        if options['backend'] == 'redis':
+            backend = _django_redis_backend()
+            if backend is None:
+                raise CommandError('The default cache is not a django-redis cache')
+        else:
+            backend = LocalRateLimitBackend()
+
+        middleware = APIRateLimitMiddleware(lambda request: None)
+        middleware.backend = backend
+        middleware.rate_limits = dict(middleware.rate_limits, api={'requests': 10 ** 9, 'window': 3600})
+
+        factory = RequestFactory()
+        requests = []
+        for i in range(options['requests']):
+            ip = i % options['ips']
+            request = factory.get('/api/signals/', REMOTE_ADDR=f'10.{ip // 65536 % 256}.{ip // 256 % 256}.{ip % 256}')
+            request.user = AnonymousUser()
+            requests.append(request)
+
+        timings = []
+        denied = 0
+        for request in requests:
+            start_time = time.perf_counter()
+            response = middleware.process_request(request)
+            timings.append(time.perf_counter() - start_time)
+            if response is not None:
+                denied += 1
+
+        timings.sort()
+        report = {
+            'backend': options['backend'],
+            'requests': len(requests),
+            'ips': min(options['ips'], len(requests)),
+            'denied': denied,
+            'mean_ms': round(statistics.fmean(timings) * 1000, 4),
+            'p50_ms': round(timings[len(timings) // 2] * 1000, 4),
+            'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 4),
+            'budget_ms': options['budget_ms'],
+        }
+        report['within_budget'] = report['mean_ms'] < options['budget_ms']
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"Rate limiting overhead ({report['backend']} backend, "
+                          f"{report['requests']} requests from {report['ips']} IPs)")
+        self.stdout.write(f"  mean {report['mean_ms']:.4f} ms, p50 {report['p50_ms']:.4f} ms, "
+                          f"p99 {report['p99_ms']:.4f} ms")
+        if report['within_budget']:
+            self.stdout.write(self.style.SUCCESS(f"Within the {report['budget_ms']} ms budget"))
+        else:
+            self.stdout.write(self.style.WARNING(f"Over the {report['budget_ms']} ms budget"))
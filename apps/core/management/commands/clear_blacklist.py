@@ -6,6 +6,8 @@ from django.core.management.base import BaseCommand
 from django.core.cache import cache
 import logging
 
+from apps.core.rate_limiting import get_rate_limit_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,22 +30,26 @@ class Command(BaseCommand):
             if specific_ip:
                 # Clear specific IP
                 cache.delete(f'blacklisted_ip_{specific_ip}')
+                get_rate_limit_backend().clear(ip=specific_ip)
                 self.stdout.write(
                     self.style.SUCCESS(f'Cleared blacklist for IP: {specific_ip}')
                 )
             else:
+                # Clear shared blacklist and sliding-window state
+                get_rate_limit_backend().clear()
+                
                 # Clear all blacklisted IPs and rate limit cache
                 cleared_count = 0
                 
                 # Clear all blacklisted IP cache entries
-                for key in cache._cache.keys():
+                for key in list(getattr(cache, '_cache', {}).keys()):
                     if key.startswith('blacklisted_ip_'):
                         cache.delete(key)
                         cleared_count += 1
                 
                 # Clear all rate limit cache entries
                 rate_limit_count = 0
-                for key in cache._cache.keys():
+                for key in list(getattr(cache, '_cache', {}).keys()):
                     if key.startswith('rate_limit:'):
                         cache.delete(key)
                         rate_limit_count += 1
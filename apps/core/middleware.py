@@ -9,16 +9,17 @@ import time
 import json
 import hashlib
 import logging
-from collections import defaultdict, deque
 from django.http import HttpResponse, JsonResponse
 from django.conf import settings
-from django.core.cache import cache
 from django.utils.deprecation import MiddlewareMixin
 from django.middleware.csrf import get_token
 from django.utils import timezone
 from django.contrib.auth.models import AnonymousUser
 import ipaddress
 
+from .query_budget import UNRESOLVED_ROUTE, is_enabled, record_queries, report
+from .rate_limiting import get_rate_limit_backend
+
 logger = logging.getLogger(__name__)
 
 
@@ -72,8 +73,9 @@ class APIRateLimitMiddleware(MiddlewareMixin):
             'trading': {'requests': 1000, 'window': 3600}, # 1000 trading requests per hour
         })
         
-        self.ip_blacklist = set()
-        self.suspicious_ips = defaultdict(int)
+        # Blacklist, suspicious-IP and window state are shared across workers
+        # through the backend (Redis when available, in-process otherwise)
+        self.backend = get_rate_limit_backend()
     
     def get_client_ip(self, request):
         """Extract client IP address from request"""
@@ -90,23 +92,17 @@ class APIRateLimitMiddleware(MiddlewareMixin):
         # Never blacklist localhost/development IPs
         if ip in ['127.0.0.1', '::1', 'localhost']:
             return False
-        return ip in self.ip_blacklist
+        return self.backend.is_blacklisted(ip)
     
     def add_suspicious_activity(self, ip, reason):
         """Track suspicious activity from IP"""
         # Never track suspicious activity for localhost/development IPs
         if ip in ['127.0.0.1', '::1', 'localhost']:
             return
-            
-        self.suspicious_ips[ip] += 1
         
-        # Auto-blacklist after 5 suspicious activities
-        if self.suspicious_ips[ip] >= 5:
-            self.ip_blacklist.add(ip)
+        # Auto-blacklist after 5 suspicious activities (shared across workers)
+        if self.backend.record_suspicious(ip, reason):
             logger.warning(f"IP {ip} auto-blacklisted due to suspicious activity: {reason}")
-            
-            # Store in cache for persistence
-            cache.set(f'blacklisted_ip_{ip}', True, 86400)  # 24 hours
     
     def get_rate_limit_key(self, request, limit_type='default'):
         """Generate cache key for rate limiting"""
@@ -132,10 +128,6 @@ class APIRateLimitMiddleware(MiddlewareMixin):
         if ip in ['127.0.0.1', '::1', 'localhost']:
             return True, None
         
-        # Check blacklist first
-        if self.is_ip_blacklisted(ip):
-            return False, "IP address is blacklisted"
-        
         # Get rate limit configuration
         limit_config = self.rate_limits.get(limit_type, self.rate_limits['default'])
         max_requests = limit_config['requests']
@@ -144,18 +136,23 @@ class APIRateLimitMiddleware(MiddlewareMixin):
         # Generate cache key
         cache_key = self.get_rate_limit_key(request, limit_type)
         
-        # Get current request count
-        current_requests = cache.get(cache_key, 0)
+        # Blacklist check, window count and increment happen atomically
+        allowed, blacklisted, _ = self.backend.hit(cache_key, ip, max_requests, window, limit_type)
         
-        if current_requests >= max_requests:
+        if blacklisted:
+            return False, "IP address is blacklisted"
+        
+        if not allowed:
             # Rate limit exceeded
             self.add_suspicious_activity(ip, f"Rate limit exceeded for {limit_type}")
             return False, f"Rate limit exceeded. Maximum {max_requests} requests per {window} seconds"
         
-        # Increment request count
-        cache.set(cache_key, current_requests + 1, window)
         return True, None
     
+    def get_rate_limit_stats(self):
+        """Get allowed/denied/blacklisted counters per limit type"""
+        return self.backend.get_counters()
+    
     def determine_limit_type(self, request):
         """Determine the appropriate rate limit type for the request"""
         path = request.path.lower()
@@ -329,6 +326,32 @@ class PerformanceMonitoringMiddleware(MiddlewareMixin):
         return response
 
 
+class QueryBudgetMiddleware:
+    """
+    Middleware recording query count, DB time and repeated SQL of each request
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = is_enabled()
+        self.send_header = getattr(settings, 'QUERY_BUDGET_RESPONSE_HEADER', settings.DEBUG)
+    
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        
+        # Group by URL pattern, not by concrete path (ids, slugs, 404 scans)
+        match = getattr(request, 'resolver_match', None)
+        route = f"/{match.route}" if match and match.route else UNRESOLVED_ROUTE
+        report('request', f"{request.method} {route}", recorder)
+        if self.send_header:
+            response['X-DB-Queries'] = str(recorder.count)
+        return response
+
+
 class IPWhitelistMiddleware(MiddlewareMixin):
     """
     Middleware for IP whitelisting (optional security feature)
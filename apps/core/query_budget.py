@@ -0,0 +1,247 @@
+"""
+Query Budget Instrumentation for AI Trading Engine
+
+Hidden N+1 queries dominate many hot paths (alert processing, news
+collection, signal APIs) without ever showing up as errors. This module
+counts them with connection.execute_wrapper:
+- record_queries(): context manager collecting query count, DB time and
+  duplicate SQL fingerprints of a code path
+- Every request (QueryBudgetMiddleware) and Celery task run (task_prerun /
+  task_postrun) is recorded, logged as a QUERY_BUDGET line and added to a
+  per-process rolling table (get_query_stats()); off unless DEBUG or
+  QUERY_BUDGET_ENABLED
+- max_queries(): budget decorator that warns, or fails under
+  QUERY_BUDGET_STRICT (tests), when a code path exceeds its budget
+"""
+
+import re
+import time
+import hashlib
+import logging
+import threading
+import functools
+from collections import Counter, OrderedDict, deque
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+performance_logger = logging.getLogger('performance')
+
+# Name of requests that matched no URL pattern (scans, 404s)
+UNRESOLVED_ROUTE = '<unresolved>'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by max_queries in strict mode when a code path exceeds its budget"""
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals and IN lists collapsed, so N+1 repeats share one fingerprint"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper counting queries, DB time and repeated fingerprints"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, min_count: int = 2, limit: int = 5) -> List[Dict[str, Any]]:
+        """Most repeated fingerprints seen at least min_count times"""
+        return [
+            {'sql': sql[:200], 'hash': hashlib.md5(sql.encode()).hexdigest()[:12], 'count': count}
+            for sql, count in self.fingerprints.most_common(limit) if count >= min_count
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'queries': self.count,
+            'db_time_ms': round(self.duration * 1000, 3),
+            'duplicates': self.duplicates(),
+        }
+
+
+@contextmanager
+def record_queries():
+    """Record the queries of every database connection of this thread"""
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def report(kind: str, name: str, recorder: QueryRecorder) -> Dict[str, Any]:
+    """Log one recorded run and add it to the rolling table"""
+    summary = recorder.summary()
+    duplicate_threshold = getattr(settings, 'QUERY_BUDGET_DUPLICATE_THRESHOLD', 5)
+    repeated = max((duplicate['count'] for duplicate in summary['duplicates']), default=0)
+    message = (
+        f"QUERY_BUDGET|Kind:{kind}|Name:{name}|Queries:{summary['queries']}|"
+        f"DBTime:{summary['db_time_ms']:.1f}ms|MaxRepeat:{repeated}"
+    )
+    if summary['queries'] > getattr(settings, 'QUERY_BUDGET_WARN_QUERIES', 100) or repeated >= duplicate_threshold:
+        top = summary['duplicates'][0] if summary['duplicates'] else None
+        performance_logger.warning(message + (f"|Repeated:{top['hash']}:{top['sql']}" if top else ''))
+    else:
+        performance_logger.debug(message)
+    _add_to_stats(kind, name, summary)
+    return summary
+
+
+def is_enabled() -> bool:
+    return getattr(settings, 'QUERY_BUDGET_ENABLED', settings.DEBUG)
+
+
+class QueryStatsTable:
+    """
+    Last runs per (kind, name) of this process.
+
+    In-memory so recording never adds I/O to a request; at most max_paths
+    paths are kept, the least recently recorded is dropped first.
+    """
+
+    def __init__(self, history: int = 50, max_paths: int = 500):
+        self.history = history
+        self.max_paths = max_paths
+        self._lock = threading.Lock()
+        self._runs = OrderedDict()
+
+    def add(self, kind: str, name: str, summary: Dict[str, Any]):
+        with self._lock:
+            runs = self._runs.pop((kind, name), None)
+            if runs is None:
+                runs = deque(maxlen=self.history)
+            runs.append((summary['queries'], summary['db_time_ms'], len(summary['duplicates'])))
+            self._runs[(kind, name)] = runs
+            while len(self._runs) > self.max_paths:
+                self._runs.popitem(last=False)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Summary per path, most queries per run first"""
+        with self._lock:
+            items = [(key, list(runs)) for key, runs in self._runs.items()]
+        rows = []
+        for (kind, name), runs in items:
+            queries = [run[0] for run in runs]
+            rows.append({
+                'kind': kind,
+                'name': name,
+                'runs': len(runs),
+                'avg_queries': round(sum(queries) / len(queries), 1),
+                'max_queries': max(queries),
+                'avg_db_time_ms': round(sum(run[1] for run in runs) / len(runs), 3),
+                'runs_with_duplicates': sum(1 for run in runs if run[2]),
+            })
+        return sorted(rows, key=lambda row: row['avg_queries'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_query_stats_table() -> QueryStatsTable:
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = QueryStatsTable(
+                    history=getattr(settings, 'QUERY_BUDGET_HISTORY', 50),
+                    max_paths=getattr(settings, 'QUERY_BUDGET_MAX_PATHS', 500)
+                )
+    return _stats
+
+
+def _add_to_stats(kind: str, name: str, summary: Dict[str, Any]):
+    try:
+        get_query_stats_table().add(kind, name, summary)
+    except Exception as e:
+        logger.error(f"Error updating query budget stats: {e}")
+
+
+def get_query_stats() -> List[Dict[str, Any]]:
+    """Rolling table of requests and tasks recorded by this process"""
+    return get_query_stats_table().rows()
+
+
+def clear_query_stats():
+    get_query_stats_table().clear()
+
+
+def max_queries(budget: int, strict: Optional[bool] = None):
+    """
+    Query budget of the decorated function: a warning when it is exceeded,
+    QueryBudgetExceeded in strict mode (QUERY_BUDGET_STRICT, e.g. in tests).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with record_queries() as recorder:
+                result = func(*args, **kwargs)
+            if recorder.count > budget:
+                message = (
+                    f"{func.__module__}.{func.__qualname__} ran {recorder.count} queries "
+                    f"(budget {budget}), most repeated: {recorder.duplicates(limit=1)}"
+                )
+                if strict if strict is not None else getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                    raise QueryBudgetExceeded(message)
+                performance_logger.warning(f"QUERY_BUDGET_EXCEEDED|{message}")
+            return result
+        return wrapper
+    return decorator
+
+
+# Celery task runs, recorded between task_prerun and task_postrun (same thread)
+_task_recorders = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    if not is_enabled():
+        return
+    stack = ExitStack()
+    recorder = stack.enter_context(record_queries())
+    _task_recorders[task_id] = (stack, recorder)
+
+
+def _task_postrun(task_id=None, task=None, **kwargs):
+    entry = _task_recorders.pop(task_id, None)
+    if entry is None:
+        return
+    stack, recorder = entry
+    stack.close()
+    report('task', getattr(task, 'name', str(task)), recorder)
+
+
+try:
+    from celery.signals import task_postrun, task_prerun
+
+    task_prerun.connect(_task_prerun, dispatch_uid='query_budget_task_prerun')
+    task_postrun.connect(_task_postrun, dispatch_uid='query_budget_task_postrun')
+except ImportError:
+    logger.warning("Celery not available - task query budgets disabled")
@@ -0,0 +1,313 @@
+"""
+Rate Limiting Backends for AI Trading Engine
+
+This module provides the storage layer used by APIRateLimitMiddleware:
+- RedisRateLimitBackend: atomic sliding-window checks in a single Lua call,
+  with blacklist and suspicious-IP state shared by every worker
+- LocalRateLimitBackend: thread-safe in-process fallback for LocMem setups
+
+Both backends implement a sliding-window counter: the request count of the
+previous window is weighted by how much of it still overlaps the sliding
+window and added to the count of the current window.
+"""
+
+import time
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache, caches
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_TTL = 86400  # 24 hours
+SUSPICIOUS_TTL = 3600  # Suspicious activity is forgotten after 1 hour
+SUSPICIOUS_THRESHOLD = 5  # Auto-blacklist after 5 suspicious activities
+
+# KEYS: current window, previous window, blacklist flag, stats hash
+# ARGV: limit, window seconds, elapsed fraction of current window, limit type
+SLIDING_WINDOW_SCRIPT = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    redis.call('HINCRBY', KEYS[4], ARGV[4] .. ':blacklisted', 1)
+    return {-1, 0}
+end
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local weight = 1 - tonumber(ARGV[3])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local estimated = math.floor(previous * weight) + current
+if estimated >= limit then
+    redis.call('HINCRBY', KEYS[4], ARGV[4] .. ':denied', 1)
+    return {0, estimated}
+end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], window * 2)
+end
+redis.call('HINCRBY', KEYS[4], ARGV[4] .. ':allowed', 1)
+return {1, estimated + 1}
+"""
+
+# KEYS: suspicious counter, blacklist flag
+# ARGV: threshold, suspicious ttl, blacklist ttl
+SUSPICIOUS_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+if count >= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[2], 1, 'EX', tonumber(ARGV[3]))
+    return 1
+end
+return 0
+"""
+
+
+def _window_position(window, now=None):
+    """Return (window id, elapsed fraction) of the fixed window containing now"""
+    now = time.time() if now is None else now
+    window_id = int(now // window)
+    elapsed = (now - window_id * window) / window
+    return window_id, elapsed
+
+
+class RateLimitBackend:
+    """
+    Base class for rate limiting backends
+    """
+
+    def hit(self, key, ip, limit, window, limit_type):
+        """
+        Register one request against key.
+
+        Returns (allowed, blacklisted, count) where count is the estimated
+        number of requests in the sliding window.
+        """
+        raise NotImplementedError
+
+    def record_suspicious(self, ip, reason):
+        """Track suspicious activity, returns True if the IP got blacklisted"""
+        raise NotImplementedError
+
+    def is_blacklisted(self, ip):
+        """Check if IP is blacklisted"""
+        raise NotImplementedError
+
+    def get_counters(self):
+        """Return allowed/denied/blacklisted counters per limit type"""
+        raise NotImplementedError
+
+    def clear(self, ip=None):
+        """Clear blacklist and rate limit state, optionally for one IP only"""
+        raise NotImplementedError
+
+    @staticmethod
+    def _empty_counters():
+        return defaultdict(lambda: {'allowed': 0, 'denied': 0, 'blacklisted': 0})
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """
+    In-process sliding-window backend used when no Redis cache is configured.
+
+    Window counters live in a lock-protected dict, the blacklist is kept in
+    the Django cache so clear_blacklist and other code paths can see it.
+    Every sweep_every hits, windows that no longer count towards a limit and
+    expired suspicious-activity counts are dropped.
+    """
+
+    sweep_every = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._suspicious = {}
+        self._counters = self._empty_counters()
+        self._hits = 0
+
+    def hit(self, key, ip, limit, window, limit_type):
+        if self.is_blacklisted(ip):
+            with self._lock:
+                self._counters[limit_type]['blacklisted'] += 1
+            return False, True, 0
+
+        window_id, elapsed = _window_position(window)
+        with self._lock:
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                self._sweep((window_id + elapsed) * window)
+
+            state = self._windows.get(key)
+            if state is None or state[0] < window_id - 1:
+                previous, current = 0, 0
+            elif state[0] == window_id - 1:
+                previous, current = state[2], 0
+            else:
+                previous, current = state[1], state[2]
+
+            estimated = int(previous * (1 - elapsed)) + current
+            if estimated >= limit:
+                self._windows[key] = (window_id, previous, current, window)
+                self._counters[limit_type]['denied'] += 1
+                return False, False, estimated
+
+            self._windows[key] = (window_id, previous, current + 1, window)
+            self._counters[limit_type]['allowed'] += 1
+            return True, False, estimated + 1
+
+    def _sweep(self, now):
+        """Drop windows older than the previous window and expired suspicious counts (lock held)"""
+        self._windows = {
+            key: state for key, state in self._windows.items()
+            if state[0] >= int(now // state[3]) - 1
+        }
+        self._suspicious = {
+            ip: value for ip, value in self._suspicious.items() if value[1] >= now
+        }
+
+    def record_suspicious(self, ip, reason):
+        now = time.time()
+        with self._lock:
+            count, expires_at = self._suspicious.get(ip, (0, 0))
+            if expires_at < now:
+                count = 0
+            count += 1
+            self._suspicious[ip] = (count, now + SUSPICIOUS_TTL)
+
+        if count >= SUSPICIOUS_THRESHOLD:
+            cache.set(f'blacklisted_ip_{ip}', True, BLACKLIST_TTL)
+            return True
+        return False
+
+    def is_blacklisted(self, ip):
+        return bool(cache.get(f'blacklisted_ip_{ip}'))
+
+    def get_counters(self):
+        with self._lock:
+            return {limit_type: dict(values) for limit_type, values in self._counters.items()}
+
+    def clear(self, ip=None):
+        with self._lock:
+            if ip:
+                self._suspicious.pop(ip, None)
+                self._windows = {
+                    key: value for key, value in self._windows.items()
+                    if f':{ip}' not in key
+                }
+            else:
+                self._suspicious.clear()
+                self._windows.clear()
+        if ip:
+            cache.delete(f'blacklisted_ip_{ip}')
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Redis backend doing the whole check in one round trip.
+
+    The blacklist flag, the window counters and the per-limit-type stats are
+    read and written by a single Lua script, so concurrent workers never race
+    and all of them share the same view of the blacklist.
+    """
+
+    STATS_KEY = 'rate_limit:stats'
+
+    def __init__(self, client, key_func=None):
+        self.client = client
+        self.key_func = key_func or (lambda key: key)
+        self._sliding_window = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._suspicious = client.register_script(SUSPICIOUS_SCRIPT)
+
+    def _blacklist_key(self, ip):
+        return self.key_func(f'blacklisted_ip_{ip}')
+
+    def hit(self, key, ip, limit, window, limit_type):
+        window_id, elapsed = _window_position(window)
+        keys = [
+            self.key_func(f'{key}:{window_id}'),
+            self.key_func(f'{key}:{window_id - 1}'),
+            self._blacklist_key(ip),
+            self.key_func(self.STATS_KEY),
+        ]
+        status, count = self._sliding_window(keys=keys, args=[limit, window, f'{elapsed:.6f}', limit_type])
+        status = int(status)
+        return status == 1, status == -1, int(count)
+
+    def record_suspicious(self, ip, reason):
+        keys = [self.key_func(f'suspicious_ip_{ip}'), self._blacklist_key(ip)]
+        return bool(self._suspicious(keys=keys, args=[SUSPICIOUS_THRESHOLD, SUSPICIOUS_TTL, BLACKLIST_TTL]))
+
+    def is_blacklisted(self, ip):
+        return bool(self.client.exists(self._blacklist_key(ip)))
+
+    def get_counters(self):
+        counters = self._empty_counters()
+        for field, value in self.client.hgetall(self.key_func(self.STATS_KEY)).items():
+            field = field.decode() if isinstance(field, bytes) else field
+            limit_type, _, outcome = field.rpartition(':')
+            counters[limit_type][outcome] = int(value)
+        return {limit_type: dict(values) for limit_type, values in counters.items()}
+
+    def clear(self, ip=None):
+        if ip:
+            self.client.delete(self._blacklist_key(ip), self.key_func(f'suspicious_ip_{ip}'))
+            return
+        for pattern in ('blacklisted_ip_*', 'suspicious_ip_*', 'rate_limit:*'):
+            keys = list(self.client.scan_iter(match=self.key_func(pattern)))
+            if keys:
+                self.client.delete(*keys)
+
+
+def _django_redis_backend():
+    """Build a Redis backend sharing the connection pool of the default cache"""
+    try:
+        from django_redis import get_redis_connection
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return None
+
+    default_cache = caches['default']
+    if not isinstance(default_cache, RedisCache):
+        return None
+
+    client = get_redis_connection('default')
+    # Reuse Django's key mangling so cache.get/cache.delete see the same keys
+    return RedisRateLimitBackend(client, key_func=lambda key: str(default_cache.make_key(key)))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend():
+    """
+    Return the process-wide rate limiting backend.
+
+    RATE_LIMIT_BACKEND selects 'redis', 'local' or 'auto' (default), where
+    auto uses Redis whenever the default cache is a django-redis cache.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            mode = getattr(settings, 'RATE_LIMIT_BACKEND', 'auto')
+            backend = None
+            if mode in ('auto', 'redis'):
+                try:
+                    backend = _django_redis_backend()
+                except Exception as e:
+                    logger.warning(f"Redis rate limit backend unavailable, using local fallback: {e}")
+                if backend is None and mode == 'redis':
+                    logger.warning("RATE_LIMIT_BACKEND is 'redis' but the default cache is not Redis")
+            _backend = backend or LocalRateLimitBackend()
+    return _backend
+
+
+def set_rate_limit_backend(backend):
+    """Replace the process-wide backend (used by tests and management commands)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -599,6 +599,7 @@ import json
 import logging
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from .broadcasting import get_broadcast_pipeline
 from django.utils import timezone
 from django.contrib.auth.models import User
 
@@ -610,6 +611,17 @@ class RealTimeBroadcaster:
     
     def __init__(self):
         self.channel_layer = get_channel_layer()
+        self.coalesce_updates = getattr(settings, 'WEBSOCKET_COALESCE_UPDATES', True)
+        self.pipeline = get_broadcast_pipeline(self.channel_layer)
+    
+    def _coalesce(self, message):
+        """Queue a per-symbol update for the next batched frame (latest wins)"""
+        symbol = message['symbol']
+        self.pipeline.submit(
+            (message['type'], symbol),
+            message,
+            ('market_data', f'market_data_{symbol}')
+        )
     
     def broadcast_market_update(self, symbol, price, change, volume, timestamp=None):
         """Broadcast market data update to all connected clients"""
@@ -625,6 +637,10 @@ class RealTimeBroadcaster:
             'timestamp': timestamp.isoformat()
         }
         
+        if self.coalesce_updates:
+            self._coalesce(message)
+            return
+        
         try:
             async_to_sync(self.channel_layer.group_send)(
                 'market_data',
@@ -710,6 +726,24 @@ class RealTimeBroadcaster:
         except Exception as e:
             logger.error(f"Error broadcasting trading signal for {symbol}: {e}")
     
+    def broadcast_trading_signals(self, signals):
+        """Broadcast a batch of new signals (dicts shaped like new_signal) as one message"""
+        if not signals:
+            return
+        
+        try:
+            # Every signals socket is in the trading_signals group, symbol
+            # filters only add groups on top of it
+            async_to_sync(self.channel_layer.group_send)(
+                'trading_signals',
+                {'type': 'signal_batch', 'signals': signals}
+            )
+            
+            logger.info(f"Broadcasted {len(signals)} trading signals")
+            
+        except Exception as e:
+            logger.error(f"Error broadcasting {len(signals)} trading signals: {e}")
+    
     def broadcast_signal_update(self, signal_id, update_type, new_value, timestamp=None):
         """Broadcast signal update to all connected clients"""
         if timestamp is None:
@@ -838,6 +872,10 @@ class MarketDataBroadcaster(RealTimeBroadcaster):
             'timestamp': timestamp.isoformat()
         }
         
+        if self.coalesce_updates:
+            self._coalesce(crypto_data)
+            return
+        
         try:
             async_to_sync(self.channel_layer.group_send)(
                 'market_data',
@@ -873,6 +911,10 @@ class MarketDataBroadcaster(RealTimeBroadcaster):
             'timestamp': timestamp.isoformat()
         }
         
+        if self.coalesce_updates:
+            self._coalesce(stock_data)
+            return
+        
         try:
             async_to_sync(self.channel_layer.group_send)(
                 'market_data',
@@ -0,0 +1,435 @@
+"""
+Shared Cache Tier for AI Trading Engine
+
+The default LocMemCache is private to one process, so every gunicorn worker
+and Celery process fetches live prices and recomputes reports on its own.
+This module provides a cache shared by all processes on a host or cluster:
+- RedisSharedCacheBackend: values and refresh locks live in Redis
+- SQLiteSharedCacheBackend: a local SQLite file shared by processes on one host
+- LocalSharedCacheBackend: in-process fallback (single process only)
+
+get_or_refresh() adds single-flight refreshing: when a key is missing only
+the process holding the refresh lock calls the producer, all others wait
+for the value it stores.
+"""
+
+import os
+import time
+import uuid
+import pickle
+import sqlite3
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# KEYS: lock key
+# ARGV: token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SharedCacheBackend:
+    """
+    Base class for shared cache backends
+    """
+
+    poll_interval = 0.05
+    max_poll_interval = 0.5
+    # Expired entries are purged every purge_every sets; above max_entries
+    # the entries closest to expiry are dropped as well
+    purge_every = 100
+    max_entries = 10000
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Values of the keys that are present, in one round trip where the backend allows"""
+        values = {}
+        for key in keys:
+            value = self.get(key, MISSING)
+            if value is not MISSING:
+                values[key] = value
+        return values
+
+    def set(self, key, value, timeout):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def acquire_lock(self, name, timeout):
+        """Try to take the lock, returns a release token or None"""
+        raise NotImplementedError
+
+    def release_lock(self, name, token):
+        """Release the lock if it is still held with token"""
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def purge(self):
+        """Delete expired entries and cap the entry count, returns the number deleted"""
+        return 0
+
+    def _count_set(self):
+        """Count a set and purge once every purge_every sets"""
+        self._sets = getattr(self, '_sets', 0) + 1
+        if self._sets % self.purge_every == 0:
+            try:
+                self.purge()
+            except Exception as e:
+                logger.error(f"Error purging shared cache: {e}")
+
+    def get_or_refresh(self, key, producer, timeout, lock_timeout=30, wait_timeout=None):
+        """
+        Return the cached value of key, calling producer at most once per expiry.
+
+        Concurrent callers that find the key missing wait until the lock holder
+        stores the value. If it does not show up within wait_timeout (defaults
+        to lock_timeout) the caller computes the value itself. None results are
+        returned but not cached.
+        """
+        value = self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        lock_name = f'{key}:refresh'
+        deadline = time.monotonic() + (lock_timeout if wait_timeout is None else wait_timeout)
+        interval = self.poll_interval
+        while True:
+            token = self.acquire_lock(lock_name, lock_timeout)
+            if token is not None:
+                try:
+                    # Another process may have refreshed between our get and the lock
+                    value = self.get(key, MISSING)
+                    if value is MISSING:
+                        value = producer()
+                        if value is not None:
+                            self.set(key, value, timeout)
+                    return value
+                finally:
+                    self.release_lock(lock_name, token)
+
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+            value = self.get(key, MISSING)
+            if value is not MISSING:
+                return value
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for refresh of {key}, computing locally")
+                return producer()
+
+
+class LocalSharedCacheBackend(SharedCacheBackend):
+    """
+    In-process backend used when neither Redis nor a cache file is configured.
+
+    Only threads of one process share values and locks.
+    """
+
+    def __init__(self, max_entries=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._values = {}
+        self._locks = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._values[key]
+                return default
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._values[key] = (value, time.time() + timeout)
+        self._count_set()
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def acquire_lock(self, name, timeout):
+        now = time.time()
+        with self._lock:
+            held = self._locks.get(name)
+            if held is not None and held[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[name] = (token, now + timeout)
+            return token
+
+    def release_lock(self, name, token):
+        with self._lock:
+            held = self._locks.get(name)
+            if held is not None and held[0] == token:
+                del self._locks[name]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._locks.clear()
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._values.items() if expires_at <= now]
+            if len(self._values) - len(expired) > self.max_entries:
+                alive = sorted(
+                    (expires_at, key) for key, (_, expires_at) in self._values.items() if expires_at > now
+                )
+                expired += [key for _, key in alive[:len(alive) - self.max_entries]]
+            for key in expired:
+                del self._values[key]
+            for name in [name for name, (_, expires_at) in self._locks.items() if expires_at <= now]:
+                del self._locks[name]
+        return len(expired)
+
+
+class SQLiteSharedCacheBackend(SharedCacheBackend):
+    """
+    Backend storing pickled values in a SQLite file.
+
+    Every process opening the same path shares values and locks, which makes
+    it a drop-in for single-host deployments and tests. Locks are rows that
+    are inserted with INSERT OR IGNORE, expired locks are stolen. Expired
+    rows are purged from the file periodically by set().
+    """
+
+    def __init__(self, path, max_entries=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS shared_cache '
+                '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS shared_cache_locks '
+                '(name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS shared_cache_expires_at ON shared_cache (expires_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        row = self._connect().execute(
+            'SELECT value FROM shared_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        if row is None:
+            return default
+        return pickle.loads(row[0])
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT key, value FROM shared_cache WHERE key IN ({', '.join('?' * len(keys))}) AND expires_at > ?",
+            (*keys, time.time())
+        ).fetchall()
+        return {key: pickle.loads(value) for key, value in rows}
+
+    def set(self, key, value, timeout):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), time.time() + timeout)
+        )
+        self._count_set()
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM shared_cache WHERE key = ?', (key,))
+
+    def acquire_lock(self, name, timeout):
+        token = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM shared_cache_locks WHERE name = ? AND expires_at <= ?', (name, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO shared_cache_locks (name, token, expires_at) VALUES (?, ?, ?)',
+                (name, token, now + timeout)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return token if cursor.rowcount == 1 else None
+
+    def release_lock(self, name, token):
+        self._connect().execute('DELETE FROM shared_cache_locks WHERE name = ? AND token = ?', (name, token))
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute('DELETE FROM shared_cache')
+        conn.execute('DELETE FROM shared_cache_locks')
+
+    def purge(self):
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            deleted = conn.execute('DELETE FROM shared_cache WHERE expires_at <= ?', (now,)).rowcount
+            # Over the cap: drop the rows that would expire first
+            deleted += conn.execute(
+                'DELETE FROM shared_cache WHERE key IN '
+                '(SELECT key FROM shared_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+            conn.execute('DELETE FROM shared_cache_locks WHERE expires_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return deleted
+
+
+class RedisSharedCacheBackend(SharedCacheBackend):
+    """
+    Redis backend shared by every worker talking to the same server.
+
+    Locks are SET NX PX keys holding a random token; they are released with a
+    compare-and-delete script so a worker never frees a lock it lost to expiry.
+    """
+
+    def __init__(self, client, key_func=None):
+        self.client = client
+        self.key_func = key_func or (lambda key: f'shared_cache:{key}')
+        self._release = client.register_script(RELEASE_LOCK_SCRIPT)
+
+    def get(self, key, default=None):
+        raw = self.client.get(self.key_func(key))
+        if raw is None:
+            return default
+        return pickle.loads(raw)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self.client.mget([self.key_func(key) for key in keys])
+        return {key: pickle.loads(raw) for key, raw in zip(keys, raws) if raw is not None}
+
+    def set(self, key, value, timeout):
+        self.client.set(self.key_func(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=int(timeout * 1000))
+
+    def delete(self, key):
+        self.client.delete(self.key_func(key))
+
+    def acquire_lock(self, name, timeout):
+        token = uuid.uuid4().hex
+        if self.client.set(self.key_func(f'lock:{name}'), token, nx=True, px=int(timeout * 1000)):
+            return token
+        return None
+
+    def release_lock(self, name, token):
+        self._release(keys=[self.key_func(f'lock:{name}')], args=[token])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.key_func('*')))
+        if keys:
+            self.client.delete(*keys)
+
+
+def _django_redis_backend():
+    """Build a Redis backend sharing the connection pool of the default cache"""
+    try:
+        from django_redis import get_redis_connection
+        from django_redis.cache import RedisCache
+    except ImportError:
+        return None
+
+    default_cache = caches['default']
+    if not isinstance(default_cache, RedisCache):
+        return None
+
+    client = get_redis_connection('default')
+    return RedisSharedCacheBackend(client, key_func=lambda key: str(default_cache.make_key(f'shared_cache:{key}')))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """
+    Return the process-wide shared cache backend.
+
+    SHARED_CACHE_BACKEND selects 'redis', 'sqlite', 'local' or 'auto'
+    (default). Auto uses Redis whenever the default cache is a django-redis
+    cache and the SQLite file at SHARED_CACHE_PATH otherwise.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    with _backend_lock:
+        if _backend is None:
+            mode = getattr(settings, 'SHARED_CACHE_BACKEND', 'auto')
+            backend = None
+            if mode in ('auto', 'redis'):
+                try:
+                    backend = _django_redis_backend()
+                except Exception as e:
+                    logger.warning(f"Redis shared cache unavailable: {e}")
+                if backend is None and mode == 'redis':
+                    logger.warning("SHARED_CACHE_BACKEND is 'redis' but the default cache is not Redis")
+            if backend is None and mode in ('auto', 'sqlite'):
+                path = getattr(settings, 'SHARED_CACHE_PATH', None)
+                if path:
+                    try:
+                        backend = SQLiteSharedCacheBackend(
+                            path, max_entries=getattr(settings, 'SHARED_CACHE_MAX_ENTRIES', None)
+                        )
+                    except Exception as e:
+                        logger.warning(f"SQLite shared cache at {path} unavailable: {e}")
+            _backend = backend or LocalSharedCacheBackend(
+                max_entries=getattr(settings, 'SHARED_CACHE_MAX_ENTRIES', None)
+            )
+    return _backend
+
+
+def set_shared_cache(backend):
+    """Replace the process-wide backend (used by tests and management commands)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _reset_shared_cache(setting, **kwargs):
+    """Drop the process-wide backend when a SHARED_CACHE_* setting is overridden"""
+    if setting.startswith('SHARED_CACHE_'):
+        set_shared_cache(None)
+
+
+setting_changed.connect(_reset_shared_cache)
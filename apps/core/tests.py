@@ -1,3 +1,657 @@
-from django.test import TestCase
+import io
+import json
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import JsonResponse
 
-# Create your tests here.
+from .broadcasting import BroadcastPipeline, BroadcastStats, MarketStateBuffer
+from .consumers import MarketDataConsumer
+from .middleware import APIRateLimitMiddleware, QueryBudgetMiddleware
+from .query_budget import (
+    QueryBudgetExceeded, QueryStatsTable, _task_postrun, _task_prerun, clear_query_stats, fingerprint,
+    get_query_stats, max_queries, record_queries
+)
+from .rate_limiting import (
+    LocalRateLimitBackend, RedisRateLimitBackend, set_rate_limit_backend, SUSPICIOUS_THRESHOLD, _window_position
+)
+from .shared_cache import (
+    LocalSharedCacheBackend, SQLiteSharedCacheBackend, RedisSharedCacheBackend
+)
+from .views import performance_metrics
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+def hit_at(backend, now, key='rate_limit:api:10.0.0.1:1', limit=10, window=60):
+    """backend.hit() as if the clock read now"""
+    with mock.patch('apps.core.rate_limiting._window_position',
+                    side_effect=lambda window, now_=None: _window_position(window, now)):
+        return backend.hit(key, '10.0.0.1', limit, window, 'api')[0]
+
+
+def refresh_concurrently(make_worker, workers=8):
+    """Call get_or_refresh on an empty key from several threads at once"""
+    calls = []
+
+    def producer():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'BTC': 50000}
+
+    results = []
+    barrier = threading.Barrier(workers)
+
+    def worker():
+        barrier.wait()
+        results.append(make_worker().get_or_refresh('live_prices', producer, 60))
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return calls, results
+
+
+class LocalRateLimitBackendTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = LocalRateLimitBackend()
+
+    def test_limit_is_enforced(self):
+        """Test requests beyond the limit are denied"""
+        results = [self.backend.hit('rate_limit:api:10.0.0.1:1', '10.0.0.1', 5, 60, 'api')[0] for _ in range(8)]
+        self.assertEqual(results, [True] * 5 + [False] * 3)
+
+        counters = self.backend.get_counters()
+        self.assertEqual(counters['api']['allowed'], 5)
+        self.assertEqual(counters['api']['denied'], 3)
+
+    def test_previous_window_is_weighted(self):
+        """Test requests of the previous window count by their overlap with the sliding window"""
+        self.assertEqual([hit_at(self.backend, 600.0) for _ in range(11)], [True] * 10 + [False])
+        # Half way through the next window half of the previous requests still count
+        self.assertEqual([hit_at(self.backend, 690.0) for _ in range(6)], [True] * 5 + [False])
+        # Near its end the previous window has almost no weight left
+        self.assertEqual([hit_at(self.backend, 719.4) for _ in range(6)], [True] * 5 + [False])
+
+    def test_old_windows_are_forgotten(self):
+        """Test a window two or more windows back no longer counts"""
+        self.assertEqual([hit_at(self.backend, 600.0) for _ in range(11)], [True] * 10 + [False])
+        self.assertEqual([hit_at(self.backend, 720.0) for _ in range(11)], [True] * 10 + [False])
+
+    def test_keys_are_independent(self):
+        """Test each key gets its own window"""
+        for _ in range(3):
+            self.backend.hit('rate_limit:login:10.0.0.1', '10.0.0.1', 3, 300, 'login')
+        allowed, _, _ = self.backend.hit('rate_limit:login:10.0.0.2', '10.0.0.2', 3, 300, 'login')
+        self.assertTrue(allowed)
+
+    def test_stale_windows_are_swept(self):
+        """Test keys of IPs that stopped sending requests do not pile up"""
+        self.backend.sweep_every = 50
+        for i in range(40):
+            hit_at(self.backend, 600.0, key=f'rate_limit:api:10.0.{i}.1:1')
+        # The previous window still counts and is kept
+        for i in range(9):
+            hit_at(self.backend, 690.0, key=f'rate_limit:api:10.1.{i}.1:1')
+        self.assertEqual(len(self.backend._windows), 49)
+
+        # Two windows later the 50th hit sweeps the first 40 keys
+        hit_at(self.backend, 720.0, key='rate_limit:api:10.2.0.1:1')
+        self.assertEqual(len(self.backend._windows), 10)
+
+    def test_suspicious_activity_blacklists_ip(self):
+        """Test repeated suspicious activity blacklists the IP"""
+        for _ in range(SUSPICIOUS_THRESHOLD - 1):
+            self.assertFalse(self.backend.record_suspicious('10.0.0.9', 'test'))
+        self.assertTrue(self.backend.record_suspicious('10.0.0.9', 'test'))
+        self.assertTrue(self.backend.is_blacklisted('10.0.0.9'))
+
+        allowed, blacklisted, _ = self.backend.hit('rate_limit:api:10.0.0.9:1', '10.0.0.9', 100, 60, 'api')
+        self.assertFalse(allowed)
+        self.assertTrue(blacklisted)
+
+        self.backend.clear(ip='10.0.0.9')
+        self.assertFalse(self.backend.is_blacklisted('10.0.0.9'))
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class RedisRateLimitBackendTestCase(TestCase):
+    def setUp(self):
+        self.backend = RedisRateLimitBackend(fakeredis.FakeRedis())
+
+    def test_limit_is_enforced(self):
+        """Test requests beyond the limit are denied"""
+        results = [self.backend.hit('rate_limit:api:10.0.0.1:1', '10.0.0.1', 5, 60, 'api')[0] for _ in range(8)]
+        self.assertEqual(results, [True] * 5 + [False] * 3)
+
+        counters = self.backend.get_counters()
+        self.assertEqual(counters['api']['allowed'], 5)
+        self.assertEqual(counters['api']['denied'], 3)
+
+    def test_previous_window_is_weighted(self):
+        """Test requests of the previous window count by their overlap with the sliding window"""
+        self.assertEqual([hit_at(self.backend, 600.0) for _ in range(11)], [True] * 10 + [False])
+        self.assertEqual([hit_at(self.backend, 690.0) for _ in range(6)], [True] * 5 + [False])
+        self.assertEqual([hit_at(self.backend, 719.4) for _ in range(6)], [True] * 5 + [False])
+
+    def test_old_windows_are_forgotten(self):
+        """Test a window two or more windows back no longer counts"""
+        self.assertEqual([hit_at(self.backend, 600.0) for _ in range(11)], [True] * 10 + [False])
+        self.assertEqual([hit_at(self.backend, 720.0) for _ in range(11)], [True] * 10 + [False])
+
+    def test_suspicious_activity_blacklists_ip(self):
+        """Test repeated suspicious activity blacklists the IP"""
+        for _ in range(SUSPICIOUS_THRESHOLD - 1):
+            self.assertFalse(self.backend.record_suspicious('10.0.0.9', 'test'))
+        self.assertTrue(self.backend.record_suspicious('10.0.0.9', 'test'))
+
+        allowed, blacklisted, _ = self.backend.hit('rate_limit:api:10.0.0.9:1', '10.0.0.9', 100, 60, 'api')
+        self.assertFalse(allowed)
+        self.assertTrue(blacklisted)
+
+        self.backend.clear(ip='10.0.0.9')
+        self.assertFalse(self.backend.is_blacklisted('10.0.0.9'))
+
+    def test_blacklist_shared_between_workers(self):
+        """Test two backends on the same Redis see the same blacklist"""
+        server = fakeredis.FakeServer()
+        worker_a = RedisRateLimitBackend(fakeredis.FakeRedis(server=server))
+        worker_b = RedisRateLimitBackend(fakeredis.FakeRedis(server=server))
+
+        for _ in range(SUSPICIOUS_THRESHOLD):
+            worker_a.record_suspicious('10.0.0.7', 'test')
+        self.assertTrue(worker_b.is_blacklisted('10.0.0.7'))
+
+
+class APIRateLimitMiddlewareTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = LocalRateLimitBackend()
+        set_rate_limit_backend(self.backend)
+        self.factory = RequestFactory()
+        self.middleware = APIRateLimitMiddleware(lambda request: None)
+        self.middleware.rate_limits = {
+            'default': {'requests': 100, 'window': 3600},
+            'api': {'requests': 3, 'window': 3600},
+        }
+
+    def tearDown(self):
+        set_rate_limit_backend(None)
+
+    def make_request(self, path='/api/signals/', ip='10.1.1.1'):
+        request = self.factory.get(path, REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return request
+
+    def test_returns_429_when_limit_exceeded(self):
+        """Test the middleware returns 429 once the limit is hit"""
+        for _ in range(3):
+            self.assertIsNone(self.middleware.process_request(self.make_request()))
+        response = self.middleware.process_request(self.make_request())
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(self.middleware.get_rate_limit_stats()['api']['denied'], 1)
+
+    def test_localhost_is_never_limited(self):
+        """Test development IPs skip rate limiting"""
+        for _ in range(10):
+            self.assertIsNone(self.middleware.process_request(self.make_request(ip='127.0.0.1')))
+
+    def test_overhead_benchmark_command(self):
+        """Test the overhead benchmark sends every request through the middleware and reports timings"""
+        out = io.StringIO()
+        call_command('benchmark_rate_limit', requests=300, ips=50, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual((report['requests'], report['ips'], report['denied']), (300, 50, 0))
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+        self.assertIn('within_budget', report)
+
+
+class LocalSharedCacheBackendTestCase(TestCase):
+    def setUp(self):
+        self.backend = LocalSharedCacheBackend()
+
+    def test_values_expire(self):
+        """Test values are returned until their timeout passes"""
+        self.backend.set('prices', {'BTC': 1}, 0.2)
+        self.assertEqual(self.backend.get('prices'), {'BTC': 1})
+        time.sleep(0.3)
+        self.assertIsNone(self.backend.get('prices'))
+        self.assertEqual(self.backend.get('prices', {}), {})
+
+    def test_lock_is_exclusive(self):
+        """Test a held lock can only be released with its token"""
+        token = self.backend.acquire_lock('refresh', 30)
+        self.assertIsNotNone(token)
+        self.assertIsNone(self.backend.acquire_lock('refresh', 30))
+
+        self.backend.release_lock('refresh', 'not-the-token')
+        self.assertIsNone(self.backend.acquire_lock('refresh', 30))
+
+        self.backend.release_lock('refresh', token)
+        self.assertIsNotNone(self.backend.acquire_lock('refresh', 30))
+
+    def test_expired_lock_is_taken_over(self):
+        """Test a lock whose holder died expires"""
+        self.assertIsNotNone(self.backend.acquire_lock('refresh', 0.1))
+        time.sleep(0.2)
+        self.assertIsNotNone(self.backend.acquire_lock('refresh', 30))
+
+    def test_single_flight_refresh(self):
+        """Test concurrent callers of an expired key run the producer once"""
+        calls, results = refresh_concurrently(lambda: self.backend)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'BTC': 50000}] * 8)
+
+    def test_none_results_are_not_cached(self):
+        """Test a failed refresh is retried by the next caller"""
+        self.assertIsNone(self.backend.get_or_refresh('prices', lambda: None, 60))
+        self.assertEqual(self.backend.get_or_refresh('prices', lambda: {'ETH': 1}, 60), {'ETH': 1})
+
+    def test_expired_entries_are_purged_on_set(self):
+        """Test rotating keys do not pile up once they expired"""
+        self.backend.purge_every = 10
+        for i in range(5):
+            self.backend.set(f'old:{i}', i, 0.05)
+        time.sleep(0.1)
+        for i in range(5):
+            self.backend.set(f'new:{i}', i, 60)
+
+        self.assertEqual(len(self.backend._values), 5)
+        self.assertEqual(self.backend.get_many(['new:0', 'old:0']), {'new:0': 0})
+
+    def test_entry_count_is_capped(self):
+        """Test the entries closest to expiry are dropped above max_entries"""
+        self.backend.max_entries = 3
+        for i in range(5):
+            self.backend.set(f'key:{i}', i, 60 + i)
+        self.assertEqual(self.backend.purge(), 2)
+        self.assertEqual(self.backend.get_many([f'key:{i}' for i in range(5)]), {'key:2': 2, 'key:3': 3, 'key:4': 4})
+
+
+class SQLiteSharedCacheBackendTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'shared_cache.sqlite3')
+        self.backend = SQLiteSharedCacheBackend(self.path)
+
+    def entry_count(self):
+        return self.backend._connect().execute('SELECT COUNT(*) FROM shared_cache').fetchone()[0]
+
+    def test_values_expire(self):
+        """Test values are returned until their timeout passes"""
+        self.backend.set('prices', {'BTC': 1}, 0.2)
+        self.assertEqual(self.backend.get('prices'), {'BTC': 1})
+        time.sleep(0.3)
+        self.assertIsNone(self.backend.get('prices'))
+
+    def test_values_shared_between_workers(self):
+        """Test two backends on the same file see each other's values"""
+        SQLiteSharedCacheBackend(self.path).set('report', {'signals': 3}, 60)
+        self.assertEqual(self.backend.get('report'), {'signals': 3})
+
+    def test_lock_is_exclusive(self):
+        """Test a lock held by one worker cannot be taken or released by another"""
+        token = self.backend.acquire_lock('refresh', 30)
+        self.assertIsNotNone(token)
+        other = SQLiteSharedCacheBackend(self.path)
+        self.assertIsNone(other.acquire_lock('refresh', 30))
+
+        other.release_lock('refresh', 'not-the-token')
+        self.assertIsNone(other.acquire_lock('refresh', 30))
+
+        self.backend.release_lock('refresh', token)
+        self.assertIsNotNone(other.acquire_lock('refresh', 30))
+
+    def test_expired_lock_is_taken_over(self):
+        """Test a lock whose holder died expires"""
+        self.assertIsNotNone(self.backend.acquire_lock('refresh', 0.1))
+        time.sleep(0.2)
+        self.assertIsNotNone(SQLiteSharedCacheBackend(self.path).acquire_lock('refresh', 30))
+
+    def test_single_flight_refresh(self):
+        """Test concurrent workers refreshing an expired key run the producer once"""
+        calls, results = refresh_concurrently(lambda: SQLiteSharedCacheBackend(self.path))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'BTC': 50000}] * 8)
+
+    def test_none_results_are_not_cached(self):
+        """Test a failed refresh is retried by the next caller"""
+        self.assertIsNone(self.backend.get_or_refresh('prices', lambda: None, 60))
+        self.assertEqual(self.backend.get_or_refresh('prices', lambda: {'ETH': 1}, 60), {'ETH': 1})
+
+    def test_expired_entries_are_purged_on_set(self):
+        """Test rotating keys do not pile up once they expired"""
+        self.backend.purge_every = 10
+        for i in range(5):
+            self.backend.set(f'old:{i}', i, 0.05)
+        time.sleep(0.1)
+        for i in range(5):
+            self.backend.set(f'new:{i}', i, 60)
+
+        self.assertEqual(self.entry_count(), 5)
+        self.assertEqual(self.backend.get_many(['new:0', 'old:0']), {'new:0': 0})
+
+    def test_entry_count_is_capped(self):
+        """Test the entries closest to expiry are dropped above max_entries"""
+        self.backend.max_entries = 3
+        for i in range(5):
+            self.backend.set(f'key:{i}', i, 60 + i)
+        self.assertEqual(self.backend.purge(), 2)
+        self.assertEqual(self.entry_count(), 3)
+        self.assertEqual(self.backend.get_many([f'key:{i}' for i in range(5)]), {'key:2': 2, 'key:3': 3, 'key:4': 4})
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class RedisSharedCacheBackendTestCase(TestCase):
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        self.backend = RedisSharedCacheBackend(fakeredis.FakeRedis(server=self.server))
+
+    def test_values_expire(self):
+        """Test values are returned until their timeout passes"""
+        self.backend.set('prices', {'BTC': 1}, 0.2)
+        self.assertEqual(self.backend.get('prices'), {'BTC': 1})
+        time.sleep(0.3)
+        self.assertIsNone(self.backend.get('prices'))
+
+    def test_lock_is_exclusive(self):
+        """Test a held lock can only be released with its token"""
+        token = self.backend.acquire_lock('refresh', 30)
+        self.assertIsNotNone(token)
+        self.assertIsNone(self.backend.acquire_lock('refresh', 30))
+
+        self.backend.release_lock('refresh', 'not-the-token')
+        self.assertIsNone(self.backend.acquire_lock('refresh', 30))
+
+        self.backend.release_lock('refresh', token)
+        self.assertIsNotNone(self.backend.acquire_lock('refresh', 30))
+
+    def test_single_flight_refresh(self):
+        """Test concurrent workers refreshing an expired key run the producer once"""
+        calls, results = refresh_concurrently(
+            lambda: RedisSharedCacheBackend(fakeredis.FakeRedis(server=self.server))
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'BTC': 50000}] * 8)
+
+    def test_none_results_are_not_cached(self):
+        """Test a failed refresh is retried by the next caller"""
+        self.assertIsNone(self.backend.get_or_refresh('prices', lambda: None, 60))
+        self.assertEqual(self.backend.get_or_refresh('prices', lambda: {'ETH': 1}, 60), {'ETH': 1})
+
+
+class BroadcastPipelineTestCase(TestCase):
+    def setUp(self):
+        self.channel_layer = InMemoryChannelLayer(capacity=10000)
+        self.stats = BroadcastStats()
+        self.pipeline = BroadcastPipeline(self.channel_layer, interval=0, stats=self.stats)
+
+    def submit_tick(self, symbol, price):
+        message = {'type': 'market_update', 'symbol': symbol, 'price': price}
+        self.pipeline.submit(('market_update', symbol), message, ('market_data', f'market_data_{symbol}'))
+
+    def test_latest_update_wins(self):
+        """Test repeated updates for a symbol are coalesced into the latest one"""
+        channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)('market_data_BTC', channel)
+
+        for price in (100, 101, 102):
+            self.submit_tick('BTC', price)
+        self.assertEqual(self.pipeline.flush(), 2)
+
+        frame = async_to_sync(self.channel_layer.receive)(channel)
+        updates = json.loads(frame['text'])['updates']
+        self.assertEqual([update['price'] for update in updates], [102])
+        self.assertEqual(self.stats.get_stats()['updates_coalesced'], 2)
+
+    def test_load_one_frame_per_group_per_tick(self):
+        """Load test: 200 symbols ticking 10 times yield one frame per group"""
+        subscribers = [async_to_sync(self.channel_layer.new_channel)() for _ in range(50)]
+        for channel in subscribers:
+            async_to_sync(self.channel_layer.group_add)('market_data', channel)
+
+        for tick in range(10):
+            for i in range(200):
+                self.submit_tick(f'SYM{i}', tick)
+        frames_sent = self.pipeline.flush()
+
+        # One frame for the shared group plus one per symbol group
+        self.assertEqual(frames_sent, 201)
+        frames = [async_to_sync(self.channel_layer.receive)(channel) for channel in subscribers]
+        self.assertEqual(len({frame['text'] for frame in frames}), 1)
+        self.assertEqual(len(json.loads(frames[0]['text'])['updates']), 200)
+
+        stats = self.stats.get_stats()
+        self.assertEqual(stats['updates_submitted'], 2000)
+        self.assertEqual(stats['frames_sent'], 201)
+        self.assertGreater(stats['bytes_per_sec'], 0)
+
+
+class MarketDataConsumerBackpressureTestCase(TestCase):
+    def setUp(self):
+        self.consumer = MarketDataConsumer()
+        self.sent = []
+
+        async def send(text_data=None, bytes_data=None, close=False):
+            self.sent.append(text_data)
+
+        self.consumer.send = send
+
+    def make_frame(self, seq, price, age=0.0):
+        text = json.dumps({'type': 'market_batch', 'seq': seq, 'updates': [
+            {'type': 'market_update', 'symbol': 'BTC', 'price': price},
+            {'type': 'market_update', 'symbol': f'SYM{seq}', 'price': price},
+        ]})
+        return {'type': 'market_batch', 'text': text, 'sent_at': time.time() - age}
+
+    def test_fresh_frame_forwarded_verbatim(self):
+        """Test the pre-serialized frame is sent without re-encoding"""
+        frame = self.make_frame(1, 100)
+        async_to_sync(self.consumer.market_batch)(frame)
+        self.assertEqual(self.sent, [frame['text']])
+
+    def test_stale_frames_dropped_and_merged(self):
+        """Test stale ticks are dropped for slow clients without losing symbols"""
+        async_to_sync(self.consumer.market_batch)(self.make_frame(1, 100, age=10))
+        async_to_sync(self.consumer.market_batch)(self.make_frame(2, 101, age=10))
+        self.assertEqual(self.sent, [])
+
+        async_to_sync(self.consumer.market_batch)(self.make_frame(3, 102))
+        updates = {update['symbol']: update['price'] for update in json.loads(self.sent[0])['updates']}
+        self.assertEqual(updates, {'BTC': 102, 'SYM1': 100, 'SYM2': 101, 'SYM3': 102})
+
+
+class MarketDataConsumerResumeTestCase(TestCase):
+    def setUp(self):
+        self.state = MarketStateBuffer(size=3)
+        self.pipeline = BroadcastPipeline(InMemoryChannelLayer(), interval=0, stats=BroadcastStats(), state=self.state)
+        patcher = mock.patch('apps.core.consumers.market_state', self.state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.consumer = MarketDataConsumer()
+        self.consumer.channel_layer = InMemoryChannelLayer()
+        self.consumer.channel_name = 'test-channel'
+        self.sent = []
+
+        async def send(text_data=None, bytes_data=None, close=False):
+            self.sent.append(json.loads(text_data))
+
+        self.consumer.send = send
+
+    def tick(self, price, symbol='BTC', message_type='market_update'):
+        message = {'type': message_type, 'symbol': symbol, 'price': price}
+        self.pipeline.submit((message_type, symbol), message, ('market_data', f'market_data_{symbol}'))
+        return self.pipeline.flush()
+
+    def subscribe(self, **params):
+        self.sent = []
+        async_to_sync(self.consumer.receive)(json.dumps(dict(params, type='subscribe_symbol', symbol='BTC')))
+        return [message['type'] for message in self.sent], self.sent[-1]
+
+    def test_snapshot_on_subscribe(self):
+        """Test a new subscriber gets the latest update of each type at once"""
+        for price in (100, 101):
+            self.tick(price)
+        self.tick(5, message_type='crypto_update')
+
+        types, snapshot = self.subscribe()
+        self.assertEqual(types, ['subscription_confirmed', 'market_snapshot'])
+        self.assertEqual(snapshot['seq'], 3)
+        self.assertEqual(snapshot['epoch'], self.pipeline.epoch)
+        self.assertEqual([(u['type'], u['price'], u['seq']) for u in snapshot['updates']],
+                         [('market_update', 101, 2), ('crypto_update', 5, 3)])
+
+    def test_resume_replays_missed_updates(self):
+        """Test resume_from_seq replays the buffered deltas in order"""
+        for price in (100, 101, 102, 103):
+            self.tick(price)
+
+        types, replay = self.subscribe(resume_from_seq=2, epoch=self.pipeline.epoch)
+        self.assertEqual(types, ['subscription_confirmed', 'market_replay'])
+        self.assertEqual([(u['seq'], u['price']) for u in replay['updates']], [(3, 102), (4, 103)])
+
+        types, replay = self.subscribe(resume_from_seq=4)
+        self.assertEqual(replay['updates'], [])
+
+    def test_resync_when_gap_exceeds_buffer(self):
+        """Test a gap larger than the buffer or a new epoch asks for a resync"""
+        for price in range(100, 106):
+            self.tick(price)
+
+        types, snapshot = self.subscribe(resume_from_seq=1)
+        self.assertEqual(types, ['subscription_confirmed', 'resync_required', 'market_snapshot'])
+        self.assertEqual(snapshot['seq'], 6)
+
+        types, _ = self.subscribe(resume_from_seq=6, epoch='previous-run')
+        self.assertIn('resync_required', types)
+
+    def test_remote_frames_buffered_once(self):
+        """Test frames from another process are buffered by the first consumer only"""
+        remote = BroadcastPipeline(InMemoryChannelLayer(), interval=0, stats=BroadcastStats(),
+                                   state=MarketStateBuffer())
+        remote.submit(('market_update', 'BTC'), {'type': 'market_update', 'symbol': 'BTC', 'price': 1},
+                      ('market_data',))
+        (group, frame), = remote.build_frames()
+
+        with mock.patch.object(self.state, 'record', wraps=self.state.record) as record:
+            async_to_sync(self.consumer.market_batch)(frame)
+            async_to_sync(self.consumer.market_batch)(frame)
+        self.assertEqual(record.call_count, 1)
+        self.assertEqual(self.state.snapshot('BTC')['epoch'], remote.epoch)
+
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RESPONSE_HEADER=True)
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        clear_query_stats()
+        self.addCleanup(clear_query_stats)
+        self.users = [User.objects.create(username=f'user{i}') for i in range(6)]
+
+    def load_users_one_by_one(self):
+        return [User.objects.get(id=user.id).username for user in self.users]
+
+    def users_view(self, request):
+        # What URL resolution leaves on the request for a matched pattern
+        request.resolver_match = mock.Mock(route='api/users/<int:pk>/')
+        return JsonResponse({'users': self.load_users_one_by_one()})
+
+    def test_fingerprint_collapses_literals(self):
+        """Test statements differing only in literals share a fingerprint"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT *  FROM t WHERE id = 22 AND name = 'b''c'")
+        )
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'), 'SELECT * FROM t WHERE id IN (...)')
+
+    def test_records_repeated_queries(self):
+        """Test an N+1 loop shows up as one fingerprint repeated per row"""
+        with record_queries() as recorder:
+            self.load_users_one_by_one()
+        self.assertEqual(recorder.count, 6)
+        self.assertGreater(recorder.duration, 0)
+        self.assertEqual(recorder.duplicates()[0]['count'], 6)
+
+    def test_middleware_records_requests(self):
+        """Test requests are counted, logged and added to the rolling table by URL pattern"""
+        middleware = QueryBudgetMiddleware(self.users_view)
+        with self.assertLogs('performance', 'WARNING') as logs:
+            response = middleware(RequestFactory().get('/api/users/1/'))
+        self.assertEqual(response['X-DB-Queries'], '6')
+        self.assertIn('QUERY_BUDGET|Kind:request|Name:GET /api/users/<int:pk>/|Queries:6', logs.output[0])
+
+        middleware(RequestFactory().get('/api/users/2/'))
+        stats = get_query_stats()
+        self.assertEqual((stats[0]['name'], stats[0]['runs'], stats[0]['max_queries']),
+                         ('GET /api/users/<int:pk>/', 2, 6))
+
+    def test_unresolved_paths_share_one_row(self):
+        """Test requests matching no URL pattern do not grow the table per path"""
+        middleware = QueryBudgetMiddleware(lambda request: JsonResponse({}, status=404))
+        for i in range(20):
+            middleware(RequestFactory().get(f'/wp-admin/{i}.php'))
+        self.assertEqual([(row['name'], row['runs']) for row in get_query_stats()], [('GET <unresolved>', 20)])
+
+    def test_stats_table_is_bounded(self):
+        """Test the rolling table keeps the most recent paths and runs only"""
+        table = QueryStatsTable(history=3, max_paths=2)
+        for name in ('a', 'b', 'a', 'c'):
+            for _ in range(4):
+                table.add('request', name, {'queries': 1, 'db_time_ms': 0.1, 'duplicates': []})
+        self.assertEqual(sorted((row['name'], row['runs']) for row in table.rows()), [('a', 3), ('c', 3)])
+
+    @override_settings(QUERY_BUDGET_ENABLED=False, QUERY_BUDGET_RESPONSE_HEADER=False)
+    def test_disabled(self):
+        """Test nothing is recorded and no header is sent when query budgets are off"""
+        response = QueryBudgetMiddleware(self.users_view)(RequestFactory().get('/api/users/1/'))
+        self.assertNotIn('X-DB-Queries', response)
+        self.assertEqual(get_query_stats(), [])
+
+    def test_performance_metrics_include_query_budgets(self):
+        """Test the performance metrics endpoint exposes the rolling query table"""
+        QueryBudgetMiddleware(self.users_view)(RequestFactory().get('/api/users/1/'))
+        with mock.patch('psutil.cpu_percent', return_value=5.0):
+            response = performance_metrics(RequestFactory().get('/api/performance/'))
+
+        self.assertEqual(response.status_code, 200)
+        rows = json.loads(response.content)['query_budgets']
+        self.assertEqual([(row['name'], row['max_queries']) for row in rows], [('GET /api/users/<int:pk>/', 6)])
+
+    def test_task_runs_are_recorded(self):
+        """Test queries between task_prerun and task_postrun are attributed to the task"""
+        task = mock.Mock()
+        task.name = 'apps.signals.tasks.process_pending_alerts'
+        _task_prerun(task_id='abc', task=task)
+        self.load_users_one_by_one()
+        _task_postrun(task_id='abc', task=task)
+        User.objects.count()
+        self.assertEqual([(row['kind'], row['name'], row['max_queries']) for row in get_query_stats()],
+                         [('task', task.name, 6)])
+
+    def test_max_queries(self):
+        """Test max_queries warns over budget and raises in strict mode"""
+        with self.assertLogs('performance', 'WARNING') as logs:
+            self.assertEqual(len(max_queries(2)(self.load_users_one_by_one)()), 6)
+        self.assertIn('ran 6 queries (budget 2)', logs.output[0])
+
+        with override_settings(QUERY_BUDGET_STRICT=True):
+            self.assertEqual(len(max_queries(6)(self.load_users_one_by_one)()), 6)
+            with self.assertRaises(QueryBudgetExceeded):
+                max_queries(5)(self.load_users_one_by_one)()
@@ -11,6 +11,9 @@ import logging
 import json
 
 from .services import market_broadcaster, signals_broadcaster, notification_broadcaster
+from .rate_limiting import get_rate_limit_backend
+from .query_budget import get_query_stats
+from .broadcasting import get_broadcast_stats
 
 # Monitoring and Alerting Views for Phase 7B.3
 from .services import (
@@ -213,7 +216,8 @@ class WebSocketStatusView(View):
                     'market_data': '/ws/market-data/',
                     'trading_signals': '/ws/trading-signals/',
                     'notifications': '/ws/notifications/'
-                }
+                },
+                'broadcast_stats': get_broadcast_stats()
             })
             
         except Exception as e:
@@ -531,6 +535,8 @@ def performance_metrics(request):
         response_data = {
             'performance_metrics': performance_data,
             'current_metrics': current_metrics,
+            'rate_limits': get_rate_limit_backend().get_counters(),
+            'query_budgets': get_query_stats(),
             'summary': app_monitoring_service._get_performance_summary()
         }
         
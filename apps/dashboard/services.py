@@ -0,0 +1,134 @@
+"""
+Dashboard summary service
+
+Signal counts, averages and distribution come from one aggregate and one
+grouped query, open position counts and unrealized PnL from one aggregate
+per portfolio. Both are kept in the shared cache and evicted by
+post_save/post_delete of the rows they summarize (and by the
+signal persistence pipeline's signals_persisted for bulk inserts), so a
+dashboard load normally reads only the cache and never writes to the
+database.
+"""
+
+import logging
+from decimal import Decimal
+from typing import Any, Dict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, Count, DecimalField, F, Q, Sum, When
+from django.db.models.signals import post_delete, post_save
+
+from apps.core.shared_cache import get_shared_cache
+from apps.signals.models import SignalType, TradingSignal
+from apps.signals.signal_persistence import signals_persisted
+from apps.trading.models import Position
+
+logger = logging.getLogger(__name__)
+
+SIGNAL_SUMMARY_KEY = 'dashboard_summary:signals'
+
+
+def _portfolio_key(portfolio_id) -> str:
+    return f'dashboard_summary:portfolio:{portfolio_id}'
+
+
+# Same rule as Position.unrealized_pnl: no PnL without a current price
+UNREALIZED_PNL = Sum(
+    Case(
+        When(position_type='LONG', then=(F('current_price') - F('entry_price')) * F('quantity')),
+        default=(F('entry_price') - F('current_price')) * F('quantity'),
+        output_field=DecimalField(max_digits=30, decimal_places=12)
+    ),
+    filter=Q(current_price__isnull=False) & ~Q(current_price=0)
+)
+
+
+class DashboardSummaryService:
+    """Cached aggregates of the dashboard, signals and API stats views"""
+
+    CACHE_TIMEOUT = 300
+
+    def __init__(self, cache_timeout=None):
+        self.cache_timeout = cache_timeout or getattr(settings, 'DASHBOARD_SUMMARY_CACHE_TIMEOUT', self.CACHE_TIMEOUT)
+
+    def get_signal_summary(self) -> Dict[str, Any]:
+        return get_shared_cache().get_or_refresh(SIGNAL_SUMMARY_KEY, self.build_signal_summary, self.cache_timeout)
+
+    def get_portfolio_summary(self, portfolio) -> Dict[str, Any]:
+        if portfolio is None:
+            return {'open_positions': 0, 'unrealized_pnl': Decimal('0')}
+        return get_shared_cache().get_or_refresh(
+            _portfolio_key(portfolio.id), lambda: self.build_portfolio_summary(portfolio.id), self.cache_timeout
+        )
+
+    @staticmethod
+    def build_signal_summary() -> Dict[str, Any]:
+        """Signal statistics without caching (three queries)"""
+        valid = Q(is_valid=True)
+        stats = TradingSignal.objects.aggregate(
+            total_signals=Count('id'),
+            active_signals=Count('id', filter=valid),
+            executed_signals=Count('id', filter=Q(is_executed=True)),
+            winning_signals=Count('id', filter=Q(is_executed=True, profit_loss__gt=0)),
+            avg_quality=Avg('quality_score', filter=valid),
+            avg_confidence=Avg('confidence_score', filter=valid),
+        )
+        stats['win_rate'] = (
+            round(stats['winning_signals'] / stats['executed_signals'] * 100) if stats['executed_signals'] else None
+        )
+        stats['signal_distribution'] = dict(
+            TradingSignal.objects.filter(valid).order_by().values('signal_type__name').annotate(
+                count=Count('id')
+            ).values_list('signal_type__name', 'count')
+        )
+        try:
+            stats['active_signal_types'] = SignalType.objects.filter(is_active=True).count()
+        except Exception as e:
+            logger.error(f"Error counting active signal types: {e}")
+            stats['active_signal_types'] = 0
+        return stats
+
+    @staticmethod
+    def build_portfolio_summary(portfolio_id) -> Dict[str, Any]:
+        """Open position count and unrealized PnL of a portfolio without caching (one query)"""
+        stats = Position.objects.filter(portfolio_id=portfolio_id, is_open=True).aggregate(
+            open_positions=Count('id'), unrealized_pnl=UNREALIZED_PNL
+        )
+        stats['unrealized_pnl'] = (stats['unrealized_pnl'] or Decimal('0')).quantize(Decimal('0.000001'))
+        return stats
+
+    @staticmethod
+    def invalidate_signals():
+        get_shared_cache().delete(SIGNAL_SUMMARY_KEY)
+
+    @staticmethod
+    def invalidate_portfolio(portfolio_id):
+        get_shared_cache().delete(_portfolio_key(portfolio_id))
+
+
+def _evict(invalidate):
+    # Evict now for this transaction's own reads and again after commit, so a
+    # concurrent request cannot keep a summary built from the old rows
+    try:
+        invalidate()
+        transaction.on_commit(invalidate)
+    except Exception as e:
+        logger.error(f"Error invalidating dashboard summary: {e}")
+
+
+def _signals_changed(sender, **kwargs):
+    _evict(DashboardSummaryService.invalidate_signals)
+
+
+def _position_changed(sender, instance, **kwargs):
+    portfolio_id = instance.portfolio_id
+    _evict(lambda: DashboardSummaryService.invalidate_portfolio(portfolio_id))
+
+
+post_save.connect(_signals_changed, sender=TradingSignal, dispatch_uid='dashboard_summary_signal_save')
+post_delete.connect(_signals_changed, sender=TradingSignal, dispatch_uid='dashboard_summary_signal_delete')
+post_save.connect(_signals_changed, sender=SignalType, dispatch_uid='dashboard_summary_signal_type_save')
+post_delete.connect(_signals_changed, sender=SignalType, dispatch_uid='dashboard_summary_signal_type_delete')
+signals_persisted.connect(_signals_changed, sender=TradingSignal, dispatch_uid='dashboard_summary_signals_persisted')
+post_save.connect(_position_changed, sender=Position, dispatch_uid='dashboard_summary_position_save')
+post_delete.connect(_position_changed, sender=Position, dispatch_uid='dashboard_summary_position_delete')
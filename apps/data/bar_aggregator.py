@@ -0,0 +1,226 @@
+"""
+Tick-to-bar aggregation for LiveDataService
+
+Polled ticks are folded into OHLCV bars in memory (TickBarBuilder) and a bar
+is written only once its interval plus a grace period has passed, so the
+MarketData table gets one proper row per symbol and minute instead of one
+flat row per poll. Ticks arriving within the grace period still update their
+bar; ticks for a bar that was already written are dropped. BarStore writes
+bars in one bulk upsert and reloads the last stored bars after a restart.
+resample_bars() folds stored bars into a coarser timeframe (30m from 15m or
+5m bars) for readers that need a timeframe nobody ingests.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from django.db import connection
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from apps.data.models import MarketData
+from apps.data.watermarks import update_watermarks
+from apps.trading.models import Symbol
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def bucket_start(timestamp: datetime, interval: int) -> datetime:
+    """Start of the `interval` seconds bucket containing timestamp"""
+    seconds = int((timestamp - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % interval)
+
+
+@dataclass
+class Bar:
+    """OHLCV of one symbol over [start, start + interval)"""
+    symbol: str
+    start: datetime
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    volume: Decimal = Decimal('0')
+    ticks: int = 0
+    first_tick: Optional[datetime] = None
+    last_tick: Optional[datetime] = None
+
+    def add(self, price: Decimal, timestamp: datetime, volume: Decimal):
+        # Out-of-order ticks only move open/close when they are earlier/later
+        if self.first_tick is None or timestamp < self.first_tick:
+            self.first_tick = timestamp
+            self.open = price
+        if self.last_tick is None or timestamp >= self.last_tick:
+            self.last_tick = timestamp
+            self.close = price
+        self.high = max(self.high, price)
+        self.low = min(self.low, price)
+        self.volume += volume
+        self.ticks += 1
+
+
+class TickBarBuilder:
+    """
+    Streaming OHLCV bars of `interval` seconds per symbol.
+
+    A bar stays open until `grace` seconds after its interval ends, so ticks
+    that arrive a little late still land in it. pop_closed() hands out the
+    bars past that point; after that their bucket is closed and later ticks
+    for it are counted as late and dropped.
+    """
+
+    def __init__(self, interval: int = 60, grace: int = 10):
+        self.interval = interval
+        self.grace = grace
+        self._open: Dict[str, Dict[datetime, Bar]] = {}
+        self._closed_through: Dict[str, datetime] = {}
+        self.stats = {'ticks': 0, 'late_ticks': 0, 'bars_closed': 0}
+
+    def bucket(self, timestamp: datetime) -> datetime:
+        """Start of the interval containing timestamp"""
+        return bucket_start(timestamp, self.interval)
+
+    def add_tick(self, symbol: str, price: Decimal, timestamp: datetime, volume: Decimal = Decimal('0')) -> bool:
+        """Fold one tick into its bar, False when the bar was already closed"""
+        start = self.bucket(timestamp)
+        closed_through = self._closed_through.get(symbol)
+        if closed_through is not None and start <= closed_through:
+            self.stats['late_ticks'] += 1
+            return False
+
+        bars = self._open.setdefault(symbol, {})
+        bar = bars.get(start)
+        if bar is None:
+            bar = bars[start] = Bar(symbol, start, price, price, price, price)
+        bar.add(price, timestamp, volume)
+        self.stats['ticks'] += 1
+        return True
+
+    def resume(self, bar: Bar, now: datetime):
+        """
+        Continue from a stored bar after a restart.
+
+        A bar whose grace period has not passed is reopened so new ticks
+        extend it, otherwise only its bucket is marked closed.
+        """
+        if bar.start + timedelta(seconds=self.interval + self.grace) > now:
+            if bar.first_tick is None:
+                # Keep the stored open, later ticks only extend the bar
+                bar.first_tick = bar.last_tick = bar.start
+            self._open.setdefault(bar.symbol, {})[bar.start] = bar
+            previous = bar.start - timedelta(seconds=self.interval)
+        else:
+            previous = bar.start
+        current = self._closed_through.get(bar.symbol)
+        if current is None or previous > current:
+            self._closed_through[bar.symbol] = previous
+
+    def pop_closed(self, now: datetime) -> List[Bar]:
+        """Remove and return the bars whose interval and grace period have passed"""
+        cutoff = now - timedelta(seconds=self.interval + self.grace)
+        closed = []
+        for symbol, bars in self._open.items():
+            for start in sorted(start for start in bars if start <= cutoff):
+                closed.append(bars.pop(start))
+                self._closed_through[symbol] = max(start, self._closed_through.get(symbol, start))
+        self.stats['bars_closed'] += len(closed)
+        return closed
+
+    def open_bars(self) -> List[Bar]:
+        """Bars still accepting ticks, without closing them"""
+        return [bar for bars in self._open.values() for bar in bars.values()]
+
+
+def resample_bars(bars: Iterable[Bar], interval: int) -> List[Bar]:
+    """
+    Fold finer bars of one symbol into bars of `interval` seconds, oldest first.
+
+    The newest bucket may be partial (still forming), as may buckets with
+    gaps in the source bars; last_tick is the start of the newest source bar
+    folded in.
+    """
+    resampled: Dict[datetime, Bar] = {}
+    for bar in sorted(bars, key=lambda bar: bar.start):
+        start = bucket_start(bar.start, interval)
+        target = resampled.get(start)
+        if target is None:
+            resampled[start] = Bar(
+                bar.symbol, start, bar.open, bar.high, bar.low, bar.close, bar.volume, bar.ticks,
+                first_tick=bar.start, last_tick=bar.start
+            )
+        else:
+            target.high = max(target.high, bar.high)
+            target.low = min(target.low, bar.low)
+            target.close = bar.close
+            target.volume += bar.volume
+            target.ticks += bar.ticks
+            target.last_tick = bar.start
+    return list(resampled.values())
+
+
+class BarStore:
+    """MarketData persistence of built bars"""
+
+    def __init__(self, timeframe: str = '1m'):
+        self.timeframe = timeframe
+        self._symbol_ids: Dict[str, int] = {}
+
+    def symbol_ids(self, names: Iterable[str]) -> Dict[str, int]:
+        """Symbol ids by name, creating missing symbols; cached across calls"""
+        missing = [name for name in set(names) if name not in self._symbol_ids]
+        if missing:
+            self._symbol_ids.update(Symbol.objects.filter(symbol__in=missing).values_list('symbol', 'id'))
+            for name in missing:
+                if name not in self._symbol_ids:
+                    symbol, _ = Symbol.objects.get_or_create(symbol=name, defaults={
+                        'name': name, 'symbol_type': 'CRYPTO', 'exchange': 'Binance/CoinGecko', 'is_active': True
+                    })
+                    self._symbol_ids[name] = symbol.id
+        return self._symbol_ids
+
+    def save(self, bars: List[Bar]) -> int:
+        """
+        Upsert bars in one query.
+
+        Reopened and reflushed bars replace their stored row instead of
+        conflicting on (symbol, timestamp, timeframe). The symbols' freshness
+        watermarks are refreshed afterwards.
+        """
+        if not bars:
+            return 0
+        symbol_ids = self.symbol_ids(bar.symbol for bar in bars)
+        rows = [
+            MarketData(
+                symbol_id=symbol_ids[bar.symbol], timestamp=bar.start, timeframe=self.timeframe,
+                open_price=bar.open, high_price=bar.high, low_price=bar.low, close_price=bar.close,
+                volume=bar.volume
+            )
+            for bar in bars
+        ]
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields = ['symbol', 'timestamp', 'timeframe'] \
+            if connection.features.supports_update_conflicts_with_target else None
+        MarketData.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=['open_price', 'high_price', 'low_price', 'close_price', 'volume']
+        )
+        update_watermarks({row.symbol_id for row in rows}, self.timeframe)
+        return len(rows)
+
+    def last_bars(self, names: Iterable[str]) -> List[Bar]:
+        """Latest stored bar of each symbol, in one query"""
+        rows = MarketData.objects.filter(
+            symbol__symbol__in=list(names), timeframe=self.timeframe
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('symbol_id')], order_by=F('timestamp').desc())
+        ).filter(row_number=1).values_list(
+            'symbol__symbol', 'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+        )
+        return [
+            Bar(symbol, timestamp, open_price, high, low, close, volume)
+            for symbol, timestamp, open_price, high, low, close, volume in rows
+        ]
@@ -0,0 +1,349 @@
+"""
+Rolling correlation engine for SectorAnalysisService
+
+Close prices of all symbols are loaded with one query and pivoted into a
+wide frame (one column per symbol, one row per bar). Returns are not
+aligned across symbols: the full correlation matrix is computed pairwise
+over the bars both symbols have, so a recently listed symbol does not cut
+the history of all the others, and symbols with fewer than
+CORRELATION_ENGINE_MIN_PERIODS returns are left out. A rolling window of
+the latest returns is kept as running sums so a new bar updates the matrix
+in O(symbols^2) without rescanning history.
+"""
+
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.utils import timezone
+
+from .models import MarketData
+
+logger = logging.getLogger(__name__)
+
+# Minutes per bar of the stored timeframes
+BAR_MINUTES = {'1m': 1, '5m': 5, '15m': 15, '1h': 60, '4h': 240, '1d': 1440}
+
+
+def load_close_frame(symbols: Optional[Iterable[str]] = None, timeframe: str = '1h',
+                     start=None, end=None) -> pd.DataFrame:
+    """Closes of symbols as a wide frame indexed by timestamp with one column per symbol"""
+    queryset = MarketData.objects.filter(timeframe=timeframe, symbol__is_active=True)
+    if symbols is not None:
+        queryset = queryset.filter(symbol__symbol__in=list(symbols))
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end is not None:
+        queryset = queryset.filter(timestamp__lte=end)
+
+    rows = list(queryset.values_list('timestamp', 'symbol__symbol', 'close_price'))
+    if not rows:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame(rows, columns=['timestamp', 'symbol', 'close'])
+    frame['close'] = frame['close'].astype(np.float64)
+    return frame.pivot_table(index='timestamp', columns='symbol', values='close', aggfunc='last').sort_index()
+
+
+def default_min_periods() -> int:
+    return getattr(settings, 'CORRELATION_ENGINE_MIN_PERIODS', 30)
+
+
+def window_min_periods(days: float, timeframe: str = '1h') -> int:
+    """
+    min_periods for a window of days of timeframe bars: the configured
+    minimum, or half the bars of a window too short to hold that many
+    """
+    bars = int(days * 1440 // BAR_MINUTES.get(timeframe, 60))
+    return max(2, min(default_min_periods(), bars // 2))
+
+
+def bar_returns(closes: pd.DataFrame, min_periods: Optional[int] = None) -> pd.DataFrame:
+    """
+    Bar returns of the columns with at least min_periods returns.
+
+    Gaps inside a series are forward filled (no trade means no return);
+    bars before a symbol's first close stay NaN instead of being dropped
+    for every column.
+    """
+    if closes.empty:
+        return pd.DataFrame()
+    min_periods = default_min_periods() if min_periods is None else min_periods
+    returns = closes.ffill().pct_change().iloc[1:].replace([np.inf, -np.inf], np.nan)
+    return returns.loc[:, returns.notna().sum() >= min_periods]
+
+
+def correlation_matrix(returns: pd.DataFrame, min_periods: Optional[int] = None) -> np.ndarray:
+    """
+    Pairwise correlation of the columns over the bars both have; pairs with
+    fewer than min_periods shared bars and flat columns get 0 instead of NaN
+    """
+    min_periods = default_min_periods() if min_periods is None else min_periods
+    matrix = np.nan_to_num(returns.corr(min_periods=min_periods).to_numpy(), nan=0.0)
+    np.fill_diagonal(matrix, 1.0)
+    return matrix
+
+
+def overlap_counts(returns: pd.DataFrame) -> np.ndarray:
+    """Number of bars each pair of columns has in common"""
+    present = returns.notna().to_numpy(dtype=np.int64)
+    return present.T @ present
+
+
+class RollingCorrelation:
+    """
+    Correlation of the last `window` return rows, updated one row at a time.
+
+    Keeps the rows in a ring buffer plus their column sums and cross-product
+    matrix; the sums are rebuilt from the buffer once per window to stop
+    floating point drift.
+    """
+
+    def __init__(self, size: int, window: int):
+        self.window = window
+        self._rows = np.zeros((window, size))
+        self._sum = np.zeros(size)
+        self._cross = np.zeros((size, size))
+        self._count = 0
+        self._position = 0
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def seed(self, returns: np.ndarray):
+        """Reset the window to the last `window` rows of returns"""
+        self._rows[:] = 0.0
+        self._count = 0
+        self._position = 0
+        for row in returns[-self.window:]:
+            self._rows[self._position] = row
+            self._position = (self._position + 1) % self.window
+            self._count += 1
+        self._rebuild()
+
+    def update(self, row: np.ndarray):
+        """Add one return row, evicting the oldest once the window is full"""
+        if self._count == self.window:
+            old = self._rows[self._position]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._rows[self._position] = row
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._position = (self._position + 1) % self.window
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._rebuild()
+
+    def matrix(self) -> Optional[np.ndarray]:
+        """Current window correlation matrix, None with fewer than 2 rows"""
+        n = self._count
+        if n < 2:
+            return None
+        covariance = (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+        std = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = covariance / np.outer(std, std)
+        matrix = np.clip(np.nan_to_num(matrix, nan=0.0, posinf=0.0, neginf=0.0), -1.0, 1.0)
+        np.fill_diagonal(matrix, 1.0)
+        return matrix
+
+    def _rebuild(self):
+        rows = self._rows if self._count == self.window else self._rows[:self._count]
+        self._sum = rows.sum(axis=0)
+        self._cross = rows.T @ rows
+        self._updates = 0
+
+
+class CorrelationEngine:
+    """
+    Full and rolling correlation matrices over the close series of all symbols.
+
+    fit() builds both matrices from a close frame, update() applies one new
+    bar and refresh() loads the bars stored since the last one seen. Top pairs
+    are read from the cached rolling matrix (the full matrix until the window
+    holds two rows).
+    """
+
+    def __init__(self, window: Optional[int] = None, timeframe: Optional[str] = None,
+                 lookback_days: Optional[int] = None, min_periods: Optional[int] = None):
+        self.window = window or getattr(settings, 'CORRELATION_ENGINE_WINDOW', 168)
+        self.min_periods = min_periods or default_min_periods()
+        self.timeframe = timeframe or getattr(settings, 'CORRELATION_ENGINE_TIMEFRAME', '1h')
+        self.lookback_days = lookback_days or getattr(settings, 'CORRELATION_ENGINE_LOOKBACK_DAYS', 30)
+        self.symbols: List[str] = []
+        self.sample_size = 0
+        self.last_timestamp = None
+        self.loaded_at = None
+        self.refreshed_at = None
+        self._index: Dict[str, int] = {}
+        self._last_close = None
+        self._full = None
+        self._rolling = None
+        self._rolling_matrix = None
+        self._lock = threading.RLock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._full is not None
+
+    def load(self, symbols: Optional[Iterable[str]] = None) -> bool:
+        """Fit on the last lookback_days of stored closes"""
+        start = timezone.now() - timedelta(days=self.lookback_days)
+        closes = load_close_frame(symbols, timeframe=self.timeframe, start=start)
+        loaded = self.fit(closes)
+        # Also stamped on failure so callers do not retry the query on every call
+        self.loaded_at = self.refreshed_at = time.monotonic()
+        return loaded
+
+    def fit(self, closes: pd.DataFrame) -> bool:
+        """
+        Compute the full matrix of closes and seed the rolling window.
+
+        The rolling window treats bars before a symbol's first close as
+        zero returns, like update() does for a missing close.
+        """
+        with self._lock:
+            returns = bar_returns(closes, self.min_periods)
+            if returns.shape[1] < 2:
+                logger.warning(f"Not enough symbols with {self.min_periods} returns for correlations: {returns.shape}")
+                return False
+
+            self.symbols = list(returns.columns)
+            self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+            self.sample_size = len(returns)
+            self._full = correlation_matrix(returns, self.min_periods)
+
+            self._rolling = RollingCorrelation(len(self.symbols), self.window)
+            self._rolling.seed(returns.fillna(0.0).to_numpy())
+            self._rolling_matrix = None
+
+            filled = closes[self.symbols].ffill()
+            self._last_close = filled.iloc[-1].to_numpy(dtype=np.float64)
+            self.last_timestamp = filled.index[-1]
+            self.loaded_at = self.refreshed_at = time.monotonic()
+            return True
+
+    def update(self, timestamp, closes: Dict[str, float]) -> bool:
+        """
+        Apply the closes of one new bar.
+
+        Symbols missing from closes keep their previous close (zero return),
+        unknown symbols are ignored. Bars not newer than the last one are
+        skipped and False is returned.
+        """
+        with self._lock:
+            if not self.is_loaded:
+                return False
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                return False
+
+            current = self._last_close.copy()
+            for symbol, close in closes.items():
+                i = self._index.get(symbol)
+                if i is not None and close:
+                    current[i] = float(close)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                row = np.nan_to_num(current / self._last_close - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+            self._rolling.update(row)
+            self._rolling_matrix = None
+            self._last_close = current
+            self.last_timestamp = timestamp
+            return True
+
+    def refresh(self) -> int:
+        """Apply the bars stored after last_timestamp, returns the number applied"""
+        if not self.is_loaded:
+            return len(self.symbols) if self.load() else 0
+
+        closes = load_close_frame(self.symbols, timeframe=self.timeframe, start=self.last_timestamp)
+        applied = 0
+        for timestamp, row in closes.iterrows():
+            if self.update(timestamp, row.dropna().to_dict()):
+                applied += 1
+        return applied
+
+    def full_matrix(self) -> pd.DataFrame:
+        """Pairwise correlation over the bars seen at fit time"""
+        if self._full is None:
+            return pd.DataFrame()
+        return pd.DataFrame(self._full, index=self.symbols, columns=self.symbols)
+
+    def rolling_matrix(self) -> pd.DataFrame:
+        """Correlation over the last `window` bars"""
+        matrix = self._current_matrix()
+        if matrix is None:
+            return pd.DataFrame()
+        return pd.DataFrame(matrix, index=self.symbols, columns=self.symbols)
+
+    def top_pairs(self, symbol: str, k: int = 5) -> Dict[str, List[Dict]]:
+        """The k most correlated and k most anti-correlated symbols of symbol"""
+        i = self._index.get(symbol)
+        matrix = self._current_matrix()
+        if i is None or matrix is None:
+            return {'correlated': [], 'anti_correlated': []}
+
+        row = np.delete(matrix[i], i)
+        others = [s for j, s in enumerate(self.symbols) if j != i]
+        k = min(k, len(others))
+        order = np.argsort(row, kind='stable')
+        correlated = order[::-1][:k]
+        anti_correlated = order[:k]
+        return {
+            'correlated': [{'symbol': others[j], 'correlation': float(row[j])} for j in correlated if row[j] > 0],
+            'anti_correlated': [{'symbol': others[j], 'correlation': float(row[j])} for j in anti_correlated if row[j] < 0],
+        }
+
+    def _current_matrix(self) -> Optional[np.ndarray]:
+        with self._lock:
+            if self._rolling is None:
+                return self._full
+            if self._rolling_matrix is None:
+                self._rolling_matrix = self._rolling.matrix()
+            return self._rolling_matrix if self._rolling_matrix is not None else self._full
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_correlation_engine() -> CorrelationEngine:
+    """
+    Process-wide engine, refreshed with new bars at most once per
+    CORRELATION_ENGINE_REFRESH seconds and fully reloaded once per
+    lookback-sized interval (CORRELATION_ENGINE_RELOAD).
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = CorrelationEngine()
+        engine = _engine
+
+    refresh_after = getattr(settings, 'CORRELATION_ENGINE_REFRESH', 300)
+    reload_after = getattr(settings, 'CORRELATION_ENGINE_RELOAD', 86400)
+    age = None if engine.loaded_at is None else time.monotonic() - engine.loaded_at
+    try:
+        if age is None or age >= reload_after:
+            engine.load()
+        elif time.monotonic() - engine.refreshed_at >= refresh_after:
+            engine.refresh()
+            engine.refreshed_at = time.monotonic()
+    except Exception as e:
+        logger.error(f"Error refreshing correlation engine: {e}")
+    return engine
+
+
+def set_correlation_engine(engine: Optional[CorrelationEngine]):
+    """Replace the process-wide engine (used by tests)"""
+    global _engine
+    with _engine_lock:
+        _engine = engine
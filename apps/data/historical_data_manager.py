@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from apps.trading.models import Symbol
 from apps.data.models import MarketData, HistoricalDataRange
+from apps.data.watermarks import update_watermarks
 
 
 logger = logging.getLogger(__name__)
@@ -191,6 +192,8 @@ class HistoricalDataManager:
                 )
                 if created:
                     saved += 1
+        if records:
+            update_watermarks([symbol.id], timeframe)
         return saved
 
     def _update_range(self, symbol: Symbol, timeframe: str, start: datetime, end: datetime, total: int) -> None:
@@ -6,12 +6,13 @@ Connects to crypto APIs and provides live price updates
 import asyncio
 import aiohttp
 import logging
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.conf import settings
 from apps.core.services import RealTimeBroadcaster
-from apps.data.models import MarketData, DataSource
-from apps.trading.models import Symbol
+from apps.data.bar_aggregator import BarStore, TickBarBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,15 @@ class LiveDataService:
             'BTC', 'ETH', 'XRP', 'USDT', 'BNB', 'SOL', 'USDC', 
             'STETH', 'DOGE', 'TRX', 'ADA', 'WBTC', 'LINK', 'XLM'
         ]
+        
+        # Ticks are folded into bars and only closed bars are written
+        self.bar_builder = TickBarBuilder(
+            interval=getattr(settings, 'LIVE_BAR_INTERVAL_SECONDS', 60),
+            grace=getattr(settings, 'LIVE_BAR_GRACE_SECONDS', 10)
+        )
+        self.bar_store = BarStore(timeframe=getattr(settings, 'LIVE_BAR_TIMEFRAME', '1m'))
+        # Last 24h volume per symbol, bar volume is the growth between ticks
+        self._last_volume_24h = {}
     
     async def start(self):
         """Start the live data service"""
@@ -46,6 +56,9 @@ class LiveDataService:
         logger.info("Starting live data service...")
         
         try:
+            # Continue the bars stored before the last restart
+            await self.resume_bars()
+            
             # Start live data collection
             await self.collect_live_data()
         except Exception as e:
@@ -54,12 +67,14 @@ class LiveDataService:
         finally:
             if self.session:
                 await self.session.close()
+            await self.flush_bars(include_open=True)
     
     async def stop(self):
         """Stop the live data service"""
         self.is_running = False
         if self.session:
             await self.session.close()
+        await self.flush_bars(include_open=True)
         logger.info("Live data service stopped")
     
     async def collect_live_data(self):
@@ -69,6 +84,7 @@ class LiveDataService:
                 # Fetch data from multiple sources
                 await self.fetch_binance_data()
                 await self.fetch_coingecko_data()
+                await self.flush_bars()
                 
                 # Wait before next update (5 seconds)
                 await asyncio.sleep(5)
@@ -90,6 +106,10 @@ class LiveDataService:
                     for ticker in data:
                         symbol = ticker['symbol']
                         
+                        # Only USD quoted pairs, ETHBTC would feed a BTC price into ETH
+                        if not symbol.endswith('USDT'):
+                            continue
+                        
                         # Filter for supported symbols
                         if any(s in symbol for s in self.live_symbols):
                             # Extract base symbol (remove USDT, BTC, etc.)
@@ -111,7 +131,8 @@ class LiveDataService:
                 'ids': ','.join(coin_ids),
                 'vs_currencies': 'usd',
                 'include_24hr_change': 'true',
-                'include_24hr_vol': 'true'
+                'include_24hr_vol': 'true',
+                'include_last_updated_at': 'true'
             }
             
             async with self.session.get(url, params=params) as response:
@@ -133,6 +154,7 @@ class LiveDataService:
             price = Decimal(ticker['lastPrice'])
             change_24h = Decimal(ticker['priceChangePercent'])
             volume_24h = Decimal(ticker['volume'])
+            timestamp = self.tick_time(ticker.get('closeTime'), 1000)
             
             # Calculate price change
             prev_price = price - (price * change_24h / 100)
@@ -144,11 +166,14 @@ class LiveDataService:
                 price=float(price),
                 change=float(change),
                 volume=float(volume_24h),
-                timestamp=timezone.now()
+                timestamp=timestamp
             )
             
-            # Save to database
-            await self.save_market_data(symbol, price, change, volume_24h)
+            # Binance volume is in base units like the stored klines
+            previous = self._last_volume_24h.get(symbol)
+            self._last_volume_24h[symbol] = volume_24h
+            volume = max(volume_24h - previous, Decimal('0')) if previous is not None else Decimal('0')
+            self.record_tick(symbol, price, timestamp, volume)
             
         except Exception as e:
             logger.error(f"Error processing Binance ticker for {symbol}: {e}")
@@ -163,6 +188,7 @@ class LiveDataService:
             
             # Calculate price change
             change = price * (change_24h / 100)
+            timestamp = self.tick_time(coin_data.get('last_updated_at'))
             
             # Broadcast real-time update
             self.broadcaster.broadcast_market_update(
@@ -170,38 +196,57 @@ class LiveDataService:
                 price=float(price),
                 change=float(change),
                 volume=float(volume_24h),
-                timestamp=timezone.now()
+                timestamp=timestamp
             )
             
-            # Save to database
-            await self.save_market_data(symbol, price, change, volume_24h)
+            # Price only, CoinGecko volume is in USD
+            if price > 0:
+                self.record_tick(symbol, price, timestamp)
             
         except Exception as e:
             logger.error(f"Error processing CoinGecko data for {symbol}: {e}")
     
-    async def save_market_data(self, symbol, price, change, volume):
-        """Save market data to database"""
+    def record_tick(self, symbol, price, timestamp, volume=Decimal('0')):
+        """Fold a tick into the symbol's open bar"""
+        if not self.bar_builder.add_tick(symbol, price, timestamp, volume):
+            logger.debug(f"Dropped late tick for {symbol} at {timestamp}")
+    
+    async def flush_bars(self, include_open=False):
+        """Write closed bars (and the open ones on shutdown) in one query"""
         try:
-            # Get or create symbol
-            symbol_obj, created = await self.get_symbol(symbol)
+            bars = self.bar_builder.pop_closed(timezone.now())
+            if include_open:
+                bars += self.bar_builder.open_bars()
+            if bars:
+                saved = await sync_to_async(self.bar_store.save)(bars)
+                logger.debug(f"Saved {saved} live bars")
+            return len(bars)
+            
+        except Exception as e:
+            logger.error(f"Error saving live bars: {e}")
+            return 0
+    
+    async def resume_bars(self):
+        """Reopen or close off the last stored bar of every live symbol"""
+        try:
+            bars = await sync_to_async(self.bar_store.last_bars)(self.live_symbols)
+            now = timezone.now()
+            for bar in bars:
+                self.bar_builder.resume(bar, now)
+            logger.info(f"Resumed live bars for {len(bars)} symbols")
             
-            if symbol_obj:
-                # Create market data record
-                market_data = MarketData(
-                    symbol=symbol_obj,
-                    timestamp=timezone.now(),
-                    open_price=price,
-                    high_price=price,
-                    low_price=price,
-                    close_price=price,
-                    volume=volume
-                )
-                market_data.save()
-                
-                logger.debug(f"Saved market data for {symbol}: ${price}")
-                
         except Exception as e:
-            logger.error(f"Error saving market data for {symbol}: {e}")
+            logger.error(f"Error resuming live bars: {e}")
+    
+    @staticmethod
+    def tick_time(value, scale=1):
+        """Exchange timestamp of a tick (epoch seconds * scale), now when missing"""
+        try:
+            if value:
+                return datetime.fromtimestamp(float(value) / scale, tz=dt_timezone.utc)
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return timezone.now()
     
     @staticmethod
     def extract_base_symbol(symbol):
@@ -255,26 +300,6 @@ class LiveDataService:
         }
         
         return id_to_symbol.get(coin_id, coin_id.upper())
-    
-    @staticmethod
-    async def get_symbol(symbol_name):
-        """Get or create symbol object"""
-        try:
-            symbol_obj = Symbol.objects.get(symbol=symbol_name)
-            return symbol_obj, False
-        except Symbol.DoesNotExist:
-            # Create new symbol
-            symbol_obj = Symbol.objects.create(
-                symbol=symbol_name,
-                name=symbol_name,
-                symbol_type='CRYPTO',
-                exchange='Binance/CoinGecko',
-                is_active=True
-            )
-            return symbol_obj, True
-        except Exception as e:
-            logger.error(f"Error getting symbol {symbol_name}: {e}")
-            return None, False
 
 
 # Global instance
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:51
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def backfill_watermarks(apps, schema_editor):
+    MarketData = apps.get_model('data', 'MarketData')
+    SymbolDataWatermark = apps.get_model('data', 'SymbolDataWatermark')
+    latest = MarketData.objects.order_by().values('symbol_id', 'timeframe').annotate(last=models.Max('timestamp'))
+    watermarks = []
+    for row in latest:
+        count = MarketData.objects.filter(
+            symbol_id=row['symbol_id'], timeframe=row['timeframe'],
+            timestamp__gt=row['last'] - timedelta(hours=24), timestamp__lte=row['last']
+        ).count()
+        watermarks.append(SymbolDataWatermark(
+            symbol_id=row['symbol_id'], timeframe=row['timeframe'], last_timestamp=row['last'], bar_count_24h=count
+        ))
+    SymbolDataWatermark.objects.bulk_create(watermarks, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data', '0006_dataquality_historicaldatarange_and_more'),
+        ('trading', '0006_symbol_circulating_supply_symbol_total_supply'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SymbolDataWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeframe', models.CharField(max_length=10)),
+                ('last_timestamp', models.DateTimeField()),
+                ('bar_count_24h', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='trading.symbol')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timeframe', 'last_timestamp'], name='data_symbol_timefra_fbdbde_idx')],
+                'unique_together': {('symbol', 'timeframe')},
+            },
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+    ]
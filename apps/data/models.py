@@ -67,6 +67,24 @@ class HistoricalDataRange(models.Model):
         return f"{self.symbol.symbol} {self.timeframe} {self.earliest_date.date()}→{self.latest_date.date()}"
 
 
+class SymbolDataWatermark(models.Model):
+    """Latest stored bar per symbol/timeframe, maintained by ingestion for freshness checks."""
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
+    timeframe = models.CharField(max_length=10)
+    last_timestamp = models.DateTimeField()
+    bar_count_24h = models.IntegerField(default=0)  # bars in the 24h ending at last_timestamp
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['symbol', 'timeframe']
+        indexes = [
+            models.Index(fields=['timeframe', 'last_timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.symbol.symbol} {self.timeframe} @ {self.last_timestamp}"
+
+
 class DataQuality(models.Model):
     """Quality metrics for stored historical data windows."""
     symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE)
@@ -6,7 +6,7 @@ import requests
 import logging
 from decimal import Decimal
 from django.utils import timezone
-from django.core.cache import cache
+from apps.core.shared_cache import get_shared_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +18,7 @@ class RealPriceService:
         self.binance_api = "https://api.binance.com/api/v3"
         self.coingecko_api = "https://api.coingecko.com/api/v3"
         self.cache_timeout = 300  # Cache prices for 5 minutes instead of 30 seconds
+        self.refresh_lock_timeout = 30  # Both APIs time out well within this
         
         # Supported symbols for live data - 200+ popular cryptocurrencies
         self.live_symbols = [
@@ -86,44 +87,48 @@ class RealPriceService:
             'XRP', 'XTZ', 'XVG', 'YFI', 'YGG', 'ZEC', 'ZEN', 'ZIL', 'ZRX', '1INCH'
         ]
     
+    @property
+    def shared_cache(self):
+        return get_shared_cache()
+    
     def get_live_prices(self):
         """Get live cryptocurrency prices from multiple sources"""
         try:
-            # Try to get from cache first
-            cached_prices = cache.get('live_crypto_prices')
-            if cached_prices:
-                logger.debug("Returning cached prices")
-                return cached_prices
-            
-            # Fetch from Binance API
-            binance_prices = self._fetch_binance_prices()
-            
-            # Fetch from CoinGecko API
-            coingecko_prices = self._fetch_coingecko_prices()
-            
-            # Merge prices (Binance takes priority for USDT pairs)
-            live_prices = {}
-            
-            # Add Binance prices
-            for symbol, data in binance_prices.items():
-                if symbol in self.live_symbols:
-                    live_prices[symbol] = data
-            
-            # Add CoinGecko prices for missing symbols
-            for symbol, data in coingecko_prices.items():
-                if symbol in self.live_symbols and symbol not in live_prices:
-                    live_prices[symbol] = data
-            
-            # Cache the results
-            cache.set('live_crypto_prices', live_prices, self.cache_timeout)
-            
-            logger.info(f"Fetched live prices for {len(live_prices)} symbols")
-            return live_prices
+            # Only one process fetches when the shared entry expires
+            live_prices = self.shared_cache.get_or_refresh(
+                'live_crypto_prices', self._fetch_live_prices, self.cache_timeout,
+                lock_timeout=self.refresh_lock_timeout
+            )
+            return live_prices or {}
             
         except Exception as e:
             logger.error(f"Error fetching live prices: {e}")
             # Return cached prices if available, otherwise empty dict
-            return cache.get('live_crypto_prices', {})
+            return self.shared_cache.get('live_crypto_prices', {})
+    
+    def _fetch_live_prices(self):
+        """Fetch and merge prices from Binance and CoinGecko, None if both failed"""
+        # Fetch from Binance API
+        binance_prices = self._fetch_binance_prices()
+        
+        # Fetch from CoinGecko API
+        coingecko_prices = self._fetch_coingecko_prices()
+        
+        # Merge prices (Binance takes priority for USDT pairs)
+        live_prices = {}
+        
+        # Add Binance prices
+        for symbol, data in binance_prices.items():
+            if symbol in self.live_symbols:
+                live_prices[symbol] = data
+        
+        # Add CoinGecko prices for missing symbols
+        for symbol, data in coingecko_prices.items():
+            if symbol in self.live_symbols and symbol not in live_prices:
+                live_prices[symbol] = data
+        
+        logger.info(f"Fetched live prices for {len(live_prices)} symbols")
+        return live_prices or None
     
     def _fetch_binance_prices(self):
         """Fetch prices from Binance API"""
@@ -213,7 +218,7 @@ class RealPriceService:
     
     def refresh_prices(self):
         """Force refresh of prices (clear cache)"""
-        cache.delete('live_crypto_prices')
+        self.shared_cache.delete('live_crypto_prices')
         return self.get_live_prices()
     
     @staticmethod
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import List, Dict, Optional
 import logging
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 from pycoingecko import CoinGeckoAPI
@@ -20,6 +21,10 @@ from .models import (
     DataSyncLog, EconomicIndicator, MacroSentiment, EconomicEvent,
     Sector, SectorPerformance, SectorRotation, SectorCorrelation
 )
+from .watermarks import update_watermarks
+from .correlation_engine import (
+    bar_returns, correlation_matrix, get_correlation_engine, load_close_frame, overlap_counts, window_min_periods
+)
 from apps.trading.models import Symbol
 
 logger = logging.getLogger(__name__)
@@ -143,6 +148,7 @@ class CryptoDataIngestionService:
                         market_data.close_price = price
                         market_data.save()
             
+            update_watermarks([symbol.id], '1h')
             return True
         except Exception as e:
             logger.error(f"Error syncing market data for {symbol.symbol}: {e}")
@@ -953,28 +959,59 @@ class SectorAnalysisService:
     def calculate_sector_correlations(self, timeframe: str = '1M') -> List[SectorCorrelation]:
         """Calculate correlations between sectors"""
         try:
-            correlations = []
-            sectors = list(Sector.objects.filter(is_active=True))
+            # Map timeframe to days
+            timeframe_days = {
+                '1D': 1, '1W': 7, '1M': 30, '3M': 90, '6M': 180, '1Y': 365
+            }.get(timeframe, 30)
             
-            for i, sector_a in enumerate(sectors):
-                for sector_b in sectors[i+1:]:
-                    correlation = self._calculate_pairwise_correlation(
-                        sector_a, sector_b, timeframe
-                    )
-                    
-                    if correlation is not None:
-                        correlation_obj = SectorCorrelation.objects.create(
-                            sector_a=sector_a,
-                            sector_b=sector_b,
-                            timeframe=timeframe,
-                            correlation_coefficient=correlation['coefficient'],
-                            p_value=correlation['p_value'],
-                            sample_size=correlation['sample_size'],
-                            calculated_at=timezone.now()
-                        )
-                        
-                        correlations.append(correlation_obj)
+            sectors = {sector.id: sector for sector in Sector.objects.filter(is_active=True)}
+            sector_of = dict(
+                Symbol.objects.filter(sector_id__in=list(sectors), is_active=True).values_list('symbol', 'sector_id')
+            )
+            if not sector_of:
+                return []
+            
+            # One query for every member symbol, sector return = mean of member returns
+            bar_timeframe = getattr(settings, 'CORRELATION_ENGINE_TIMEFRAME', '1h')
+            closes = load_close_frame(
+                sector_of,
+                timeframe=bar_timeframe,
+                start=timezone.now() - timedelta(days=timeframe_days)
+            )
+            # Short windows (1D of 1h bars) cannot hold CORRELATION_ENGINE_MIN_PERIODS bars
+            min_periods = window_min_periods(timeframe_days, bar_timeframe)
+            returns = bar_returns(closes, min_periods)
+            if returns.empty:
+                return []
+            # Mean of the members that have a return at that bar
+            sector_returns = returns.T.groupby(returns.columns.map(sector_of)).mean().T
+            if sector_returns.shape[1] < 2:
+                return []
+            
+            matrix = correlation_matrix(sector_returns, min_periods)
+            overlaps = overlap_counts(sector_returns)
+            sector_ids = list(sector_returns.columns)
+            calculated_at = timezone.now()
             
+            correlations = []
+            for i, sector_a_id in enumerate(sector_ids):
+                for j in range(i + 1, len(sector_ids)):
+                    sample_size = int(overlaps[i, j])
+                    if sample_size < min_periods:
+                        continue
+                    coefficient = float(matrix[i, j])
+                    correlations.append(SectorCorrelation(
+                        sector_a=sectors[sector_a_id],
+                        sector_b=sectors[sector_ids[j]],
+                        timeframe=timeframe,
+                        correlation_coefficient=coefficient,
+                        # Simple p-value approximation, scipy.stats would give a proper test
+                        p_value=0.05 if abs(coefficient) > 0.5 else 0.1,
+                        sample_size=sample_size,
+                        calculated_at=calculated_at
+                    ))
+            
+            correlations = SectorCorrelation.objects.bulk_create(correlations)
             logger.info(f"Calculated {len(correlations)} sector correlations")
             return correlations
             
@@ -982,6 +1019,14 @@ class SectorAnalysisService:
             logger.error(f"Error calculating sector correlations: {e}")
             return []
     
+    def get_asset_correlations(self, symbol: str, k: int = 5) -> Dict[str, List[Dict]]:
+        """Top-k correlated and anti-correlated symbols from the cached rolling matrix"""
+        try:
+            return get_correlation_engine().top_pairs(symbol, k)
+        except Exception as e:
+            logger.error(f"Error getting asset correlations for {symbol}: {e}")
+            return {'correlated': [], 'anti_correlated': []}
+    
     def get_sector_momentum_signals(self, sector: Sector) -> Dict:
         """Generate momentum-based signals for a sector"""
         try:
@@ -1254,58 +1299,6 @@ class SectorAnalysisService:
             logger.error(f"Error classifying rotation type: {e}")
             return None
     
-    def _calculate_pairwise_correlation(self, sector_a: Sector, sector_b: Sector, timeframe: str) -> Optional[Dict]:
-        """Calculate correlation between two sectors"""
-        try:
-            # Map timeframe to days
-            timeframe_days = {
-                '1D': 1, '1W': 7, '1M': 30, '3M': 90, '6M': 180, '1Y': 365
-            }.get(timeframe, 30)
-            
-            # Get performance data for both sectors
-            perf_a = SectorPerformance.objects.filter(
-                sector=sector_a,
-                timestamp__gte=timezone.now() - timedelta(days=timeframe_days)
-            ).order_by('timestamp')
-            
-            perf_b = SectorPerformance.objects.filter(
-                sector=sector_b,
-                timestamp__gte=timezone.now() - timedelta(days=timeframe_days)
-            ).order_by('timestamp')
-            
-            if perf_a.count() < 5 or perf_b.count() < 5:
-                return None
-            
-            # Extract returns for correlation calculation
-            returns_a = [perf.daily_return for perf in perf_a]
-            returns_b = [perf.daily_return for perf in perf_b]
-            
-            # Ensure same length
-            min_len = min(len(returns_a), len(returns_b))
-            returns_a = returns_a[:min_len]
-            returns_b = returns_b[:min_len]
-            
-            if min_len < 5:
-                return None
-            
-            # Calculate Pearson correlation
-            correlation_matrix = np.corrcoef(returns_a, returns_b)
-            correlation_coeff = correlation_matrix[0, 1]
-            
-            # Simple p-value approximation (for demonstration)
-            # In production, you'd use scipy.stats for proper statistical tests
-            p_value = 0.05 if abs(correlation_coeff) > 0.5 else 0.1
-            
-            return {
-                'coefficient': float(correlation_coeff) if not np.isnan(correlation_coeff) else 0.0,
-                'p_value': p_value,
-                'sample_size': min_len
-            }
-            
-        except Exception as e:
-            logger.error(f"Error calculating correlation between {sector_a.display_name} and {sector_b.display_name}: {e}")
-            return None
-    
     def _get_current_market_regime(self) -> str:
         """Determine current market regime for context"""
         try:
@@ -3,9 +3,10 @@ from django.utils import timezone
 from datetime import timedelta
 import logging
 
-from .models import DataSyncLog, Symbol, MarketData, TechnicalIndicator
+from .models import DataSyncLog, Symbol, TechnicalIndicator
 from .historical_data_manager import HistoricalDataManager
 from .services import CryptoDataIngestionService, TechnicalAnalysisService
+from .watermarks import get_freshness_summary
 
 logger = logging.getLogger(__name__)
 
@@ -267,9 +268,9 @@ def health_check_task():
     """Celery task to perform system health check"""
     try:
         # Check data freshness
-        latest_data = MarketData.objects.order_by('-timestamp').first()
-        if latest_data:
-            data_age = timezone.now() - latest_data.timestamp
+        latest_timestamp = get_freshness_summary()['latest_timestamp']
+        if latest_timestamp:
+            data_age = timezone.now() - latest_timestamp
             if data_age > timedelta(hours=1):
                 logger.warning(f"Market data is {data_age} old")
         
@@ -1,7 +1,21 @@
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+import numpy as np
 from django.test import TestCase
 from django.utils import timezone
 from decimal import Decimal
-from .models import DataSource, MarketData, TechnicalIndicator, DataFeed, DataSyncLog
+from .models import (
+    DataSource, MarketData, TechnicalIndicator, DataFeed, DataSyncLog, Sector, SectorCorrelation, SymbolDataWatermark
+)
+from asgiref.sync import async_to_sync
+from .bar_aggregator import TickBarBuilder
+from .correlation_engine import CorrelationEngine, RollingCorrelation, load_close_frame
+from .live_data_service import LiveDataService
+from .real_price_service import RealPriceService
+from .services import SectorAnalysisService
+from .watermarks import get_freshness_summary, update_watermarks
+from apps.core.shared_cache import LocalSharedCacheBackend, set_shared_cache
 from apps.trading.models import Symbol
 
 
@@ -125,3 +139,286 @@ class DataIntegrationTestCase(TestCase):
         
         recent_indicators = TechnicalIndicator.objects.filter(symbol=symbol).order_by('-timestamp')
         self.assertEqual(recent_indicators.count(), 1)
+
+
+class RealPriceServiceSharedCacheTestCase(TestCase):
+    def setUp(self):
+        set_shared_cache(LocalSharedCacheBackend())
+        self.service = RealPriceService()
+
+    def tearDown(self):
+        set_shared_cache(None)
+
+    def test_concurrent_callers_fetch_once(self):
+        """Test only one caller hits the APIs when the cached prices expired"""
+        binance = {'BTC': {'price': 50000.0, 'source': 'Binance'}}
+        with mock.patch.object(RealPriceService, '_fetch_binance_prices', return_value=binance) as fetch_binance, \
+                mock.patch.object(RealPriceService, '_fetch_coingecko_prices', return_value={}):
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(RealPriceService().get_live_prices()))
+                for _ in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(fetch_binance.call_count, 1)
+        self.assertEqual(results, [binance] * 6)
+
+    def test_failed_fetch_is_not_cached(self):
+        """Test an empty API response is retried on the next call"""
+        with mock.patch.object(RealPriceService, '_fetch_binance_prices', return_value={}), \
+                mock.patch.object(RealPriceService, '_fetch_coingecko_prices', return_value={}):
+            self.assertEqual(self.service.get_live_prices(), {})
+
+        binance = {'ETH': {'price': 3000.0, 'source': 'Binance'}}
+        with mock.patch.object(RealPriceService, '_fetch_binance_prices', return_value=binance), \
+                mock.patch.object(RealPriceService, '_fetch_coingecko_prices', return_value={}):
+            self.assertEqual(self.service.get_live_prices(), binance)
+
+
+class CorrelationEngineTestCase(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        base = rng.normal(0, 0.01, 60)
+        self.returns = {
+            'BTC': base,
+            'ETH': base * 1.5 + rng.normal(0, 0.002, 60),
+            'INV': -base + rng.normal(0, 0.002, 60),
+            'SOL': rng.normal(0, 0.01, 60),
+        }
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=61)
+        self.layer1, _ = Sector.objects.get_or_create(name='CRYPTO_LAYER1', defaults={'display_name': 'Layer 1'})
+        self.defi, _ = Sector.objects.get_or_create(name='CRYPTO_DEFI', defaults={'display_name': 'DeFi'})
+
+        rows = []
+        for name, returns in self.returns.items():
+            sector = self.defi if name == 'INV' else self.layer1
+            symbol = Symbol.objects.create(symbol=name, name=name, symbol_type='CRYPTO', sector=sector)
+            closes = 100 * np.cumprod(np.concatenate([[1.0], 1 + returns]))
+            for i, close in enumerate(closes):
+                rows.append(MarketData(
+                    symbol=symbol, timestamp=self.start + timedelta(hours=i), timeframe='1h',
+                    open_price=Decimal(f'{close:.6f}'), high_price=Decimal(f'{close:.6f}'),
+                    low_price=Decimal(f'{close:.6f}'), close_price=Decimal(f'{close:.6f}'), volume=Decimal('1')
+                ))
+        MarketData.objects.bulk_create(rows)
+
+    def test_close_frame_is_one_query(self):
+        """Test closes of all symbols load with one query into a wide frame"""
+        with self.assertNumQueries(1):
+            closes = load_close_frame()
+        self.assertEqual(sorted(closes.columns), ['BTC', 'ETH', 'INV', 'SOL'])
+        self.assertEqual(len(closes), 61)
+
+    def test_full_matrix_matches_corrcoef(self):
+        """Test the full matrix equals np.corrcoef of the stored returns"""
+        engine = CorrelationEngine(window=20)
+        self.assertTrue(engine.fit(load_close_frame()))
+
+        expected = np.corrcoef(np.array([self.returns[s] for s in engine.symbols]))
+        np.testing.assert_allclose(engine.full_matrix().to_numpy(), expected, atol=1e-5)
+        self.assertEqual(engine.sample_size, 60)
+
+    def test_rolling_updates_match_recomputation(self):
+        """Test bars applied one at a time give the correlation of the last window"""
+        closes = load_close_frame()
+        engine = CorrelationEngine(window=20)
+        engine.fit(closes.iloc[:40])
+        for timestamp, row in closes.iloc[40:].iterrows():
+            self.assertTrue(engine.update(timestamp, row.to_dict()))
+
+        expected = np.corrcoef(closes.pct_change().iloc[-20:].to_numpy(), rowvar=False)
+        np.testing.assert_allclose(engine.rolling_matrix().to_numpy(), expected, atol=1e-9)
+        self.assertFalse(engine.update(closes.index[-1], {'BTC': 1.0}))
+
+    def test_young_symbols_do_not_truncate_history(self):
+        """Test a recently listed symbol neither shortens the other pairs nor enters below min_periods"""
+        closes = load_close_frame()
+        closes['NEW'] = np.nan
+        closes.iloc[-10:, closes.columns.get_loc('NEW')] = np.linspace(1, 2, 10)
+        closes['MID'] = np.nan
+        closes.iloc[-41:, closes.columns.get_loc('MID')] = closes['BTC'].iloc[-41:] * 2
+
+        engine = CorrelationEngine(window=20)
+        self.assertTrue(engine.fit(closes))
+        self.assertNotIn('NEW', engine.symbols)
+
+        full = engine.full_matrix()
+        self.assertAlmostEqual(full.loc['BTC', 'ETH'], np.corrcoef(self.returns['BTC'], self.returns['ETH'])[0, 1], places=5)
+        # MID is BTC scaled over its 40 returns
+        self.assertAlmostEqual(full.loc['BTC', 'MID'], 1.0, places=5)
+
+    def test_refresh_applies_new_bars(self):
+        """Test refresh loads only bars after the last one seen"""
+        engine = CorrelationEngine(window=20, lookback_days=30)
+        engine.fit(load_close_frame(end=self.start + timedelta(hours=40)))
+        self.assertEqual(engine.refresh(), 20)
+        self.assertEqual(engine.refresh(), 0)
+
+    def test_top_pairs(self):
+        """Test top-k pairs are split into correlated and anti-correlated symbols"""
+        engine = CorrelationEngine(window=60)
+        engine.fit(load_close_frame())
+
+        pairs = engine.top_pairs('BTC', k=1)
+        self.assertEqual([p['symbol'] for p in pairs['correlated']], ['ETH'])
+        self.assertEqual([p['symbol'] for p in pairs['anti_correlated']], ['INV'])
+        self.assertEqual(engine.top_pairs('UNKNOWN'), {'correlated': [], 'anti_correlated': []})
+
+    def test_sector_correlations(self):
+        """Test sector correlations come from the mean returns of member symbols"""
+        correlations = SectorAnalysisService().calculate_sector_correlations('1W')
+
+        self.assertEqual(len(correlations), 1)
+        self.assertLess(correlations[0].correlation_coefficient, 0)
+        self.assertEqual(correlations[0].sample_size, 60)
+        self.assertEqual(SectorCorrelation.objects.count(), 1)
+
+    def test_one_day_sector_correlations(self):
+        """Test a 1D window of 1h bars still yields correlations below CORRELATION_ENGINE_MIN_PERIODS bars"""
+        correlations = SectorAnalysisService().calculate_sector_correlations('1D')
+
+        self.assertEqual(len(correlations), 1)
+        self.assertEqual(correlations[0].timeframe, '1D')
+        self.assertLess(correlations[0].correlation_coefficient, 0)
+        self.assertGreaterEqual(correlations[0].sample_size, 20)
+        self.assertLess(correlations[0].sample_size, 30)
+
+
+class RollingCorrelationTestCase(TestCase):
+    def test_drift_free_after_many_updates(self):
+        """Test running sums stay equal to a recomputation over the window"""
+        rng = np.random.default_rng(1)
+        rows = rng.normal(0, 1, (500, 3))
+        rolling = RollingCorrelation(3, window=25)
+        rolling.seed(rows[:10])
+        for row in rows[10:]:
+            rolling.update(row)
+
+        np.testing.assert_allclose(rolling.matrix(), np.corrcoef(rows[-25:], rowvar=False), atol=1e-9)
+        self.assertEqual(len(rolling), 25)
+
+
+class TickBarBuilderTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2024, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+        self.builder = TickBarBuilder(interval=60, grace=10)
+
+    def at(self, seconds):
+        return self.start + timedelta(seconds=seconds)
+
+    def test_ticks_fold_into_bars(self):
+        """Test ticks build OHLCV bars, ordered by tick time"""
+        for seconds, price, volume in [(5, 100, 1), (20, 104, 2), (2, 99, 0), (50, 101, 3), (40, 97, 0), (65, 102, 1)]:
+            self.builder.add_tick('BTC', Decimal(price), self.at(seconds), Decimal(volume))
+
+        self.assertEqual(self.builder.pop_closed(self.at(65)), [])
+        bar, = self.builder.pop_closed(self.at(70))
+        self.assertEqual(bar.start, self.start)
+        self.assertEqual((bar.open, bar.high, bar.low, bar.close), (99, 104, 97, 101))
+        self.assertEqual((bar.volume, bar.ticks), (6, 5))
+        self.assertEqual([b.start for b in self.builder.open_bars()], [self.at(60)])
+
+    def test_late_ticks(self):
+        """Test late ticks land in open bars and are dropped for closed ones"""
+        self.builder.add_tick('BTC', Decimal(100), self.at(10))
+        self.assertTrue(self.builder.add_tick('BTC', Decimal(90), self.at(59)))
+        self.builder.pop_closed(self.at(75))
+
+        self.assertFalse(self.builder.add_tick('BTC', Decimal(80), self.at(30)))
+        self.assertTrue(self.builder.add_tick('ETH', Decimal(80), self.at(30)))
+        self.assertEqual(self.builder.stats['late_ticks'], 1)
+
+
+class LiveDataBarsTestCase(TestCase):
+    def setUp(self):
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        self.now = timezone.now().replace(second=0, microsecond=0)
+        self.service = LiveDataService()
+
+    def test_flush_writes_closed_bars_in_one_query(self):
+        """Test closed bars are upserted with one insert per flush plus the watermark refresh"""
+        old = self.now - timedelta(minutes=5)
+        self.service.record_tick('BTC', Decimal('100'), old)
+        self.service.record_tick('BTC', Decimal('105'), old + timedelta(seconds=1))
+        self.service.record_tick('ETH', Decimal('10'), old)
+        self.service.record_tick('BTC', Decimal('110'), self.now)
+
+        self.service.bar_store.symbol_ids(['BTC', 'ETH'])
+        with self.assertNumQueries(4):
+            self.assertEqual(async_to_sync(self.service.flush_bars)(), 2)
+
+        bars = MarketData.objects.filter(timeframe='1m').order_by('symbol__symbol')
+        self.assertEqual([(bar.symbol.symbol, bar.open_price, bar.close_price) for bar in bars],
+                         [('BTC', 100, 105), ('ETH', 10, 10)])
+        self.assertTrue(Symbol.objects.filter(symbol='ETH').exists())
+
+    def test_restart_resumes_last_bar(self):
+        """Test a restart extends the stored open bar and drops older ticks"""
+        self.service.record_tick('BTC', Decimal('100'), self.now)
+        self.service.record_tick('BTC', Decimal('95'), self.now + timedelta(seconds=1))
+        async_to_sync(self.service.flush_bars)(include_open=True)
+
+        restarted = LiveDataService()
+        async_to_sync(restarted.resume_bars)()
+        restarted.record_tick('BTC', Decimal('120'), self.now + timedelta(seconds=2))
+        restarted.record_tick('BTC', Decimal('1'), self.now - timedelta(minutes=2))
+        async_to_sync(restarted.flush_bars)(include_open=True)
+
+        bar = MarketData.objects.get(symbol=self.btc, timeframe='1m')
+        self.assertEqual((bar.open_price, bar.high_price, bar.low_price, bar.close_price), (100, 120, 95, 120))
+        self.assertEqual(restarted.bar_builder.stats['late_ticks'], 1)
+
+
+class SymbolDataWatermarkTestCase(TestCase):
+    def setUp(self):
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def add_bars(self, symbol, hours):
+        MarketData.objects.bulk_create([
+            MarketData(symbol=symbol, timestamp=self.now - timedelta(hours=h), timeframe='1h', open_price=1,
+                       high_price=1, low_price=1, close_price=1, volume=1)
+            for h in hours
+        ])
+
+    def test_update_tracks_last_bar_and_day_count(self):
+        """Test watermarks follow the latest bar and count the day before it"""
+        self.add_bars(self.btc, range(2, 40))
+        self.add_bars(self.eth, [30, 31])
+        with self.assertNumQueries(3):
+            self.assertEqual(update_watermarks([self.btc.id, self.eth.id], '1h'), 2)
+
+        btc = SymbolDataWatermark.objects.get(symbol=self.btc, timeframe='1h')
+        self.assertEqual((btc.last_timestamp, btc.bar_count_24h), (self.now - timedelta(hours=2), 24))
+        eth = SymbolDataWatermark.objects.get(symbol=self.eth)
+        self.assertEqual((eth.last_timestamp, eth.bar_count_24h), (self.now - timedelta(hours=30), 2))
+
+        self.add_bars(self.btc, [0, 1])
+        update_watermarks([self.btc.id], '1h')
+        btc.refresh_from_db()
+        self.assertEqual((btc.last_timestamp, btc.bar_count_24h), (self.now, 24))
+
+    def test_symbol_without_bars_gets_no_watermark(self):
+        """Test a symbol with no bars in the timeframe is not reported fresh"""
+        self.add_bars(self.btc, [3])
+        self.assertEqual(update_watermarks([self.btc.id, self.eth.id], '1h'), 1)
+        self.assertFalse(SymbolDataWatermark.objects.filter(symbol=self.eth).exists())
+        self.assertEqual(update_watermarks([self.eth.id], '1h'), 0)
+        self.assertEqual(get_freshness_summary()['active_symbols'], 1)
+
+    def test_freshness_summary_is_one_query(self):
+        """Test the health summary reads only the watermark table"""
+        self.add_bars(self.btc, [1])
+        self.add_bars(self.eth, [30])
+        update_watermarks([self.btc.id, self.eth.id], '1h')
+
+        with self.assertNumQueries(1):
+            summary = get_freshness_summary()
+        self.assertEqual(summary, {
+            'latest_timestamp': self.now - timedelta(hours=1), 'latest_symbol': 'BTC', 'active_symbols': 1
+        })
@@ -0,0 +1,87 @@
+"""
+Per-symbol data freshness watermarks
+
+Ingestion calls update_watermarks() after writing MarketData rows, which
+refreshes SymbolDataWatermark (last bar timestamp and bars in the 24h before
+it) for the written symbols in three set-based queries; symbols without bars
+in the timeframe get no watermark. Health and freshness
+checks then read that small table instead of scanning MarketData.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+from django.db import connection
+from django.db.models import Count, DateTimeField, ExpressionWrapper, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.data.models import MarketData, SymbolDataWatermark
+
+logger = logging.getLogger(__name__)
+
+WINDOW = timedelta(hours=24)
+
+
+def update_watermarks(symbol_ids: Iterable[int], timeframe: str) -> int:
+    """Refresh the watermarks of symbol_ids from MarketData, returns the number of rows updated"""
+    symbol_ids = sorted(set(symbol_ids))
+    if not symbol_ids:
+        return 0
+    try:
+        bars = MarketData.objects.filter(symbol_id__in=symbol_ids, timeframe=timeframe)
+        latest = bars.order_by().values('symbol_id').annotate(latest=Max('timestamp')).values_list('symbol_id', 'latest')
+
+        # Rows only from the bars' Max, so symbols without bars get no watermark
+        now = timezone.now()
+        watermarks = [
+            SymbolDataWatermark(symbol_id=symbol_id, timeframe=timeframe, last_timestamp=last_timestamp, updated_at=now)
+            for symbol_id, last_timestamp in latest
+        ]
+        if not watermarks:
+            return 0
+        # MySQL upserts on any unique key and rejects an explicit target
+        unique_fields = ['symbol', 'timeframe'] if connection.features.supports_update_conflicts_with_target else None
+        SymbolDataWatermark.objects.bulk_create(
+            watermarks, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=['last_timestamp', 'updated_at']
+        )
+
+        window_start = ExpressionWrapper(OuterRef('last_timestamp') - WINDOW, output_field=DateTimeField())
+        recent = MarketData.objects.filter(
+            symbol_id=OuterRef('symbol_id'), timeframe=timeframe,
+            timestamp__gt=window_start, timestamp__lte=OuterRef('last_timestamp')
+        ).order_by().values('symbol_id').annotate(bars=Count('id')).values('bars')
+        SymbolDataWatermark.objects.filter(
+            symbol_id__in=[watermark.symbol_id for watermark in watermarks], timeframe=timeframe
+        ).update(bar_count_24h=Coalesce(Subquery(recent), 0))
+        return len(watermarks)
+    except Exception as e:
+        logger.error(f"Error updating {timeframe} data watermarks: {e}")
+        return 0
+
+
+def get_watermark(symbol, timeframe: str = '1h') -> Optional[SymbolDataWatermark]:
+    return SymbolDataWatermark.objects.filter(symbol=symbol, timeframe=timeframe).first()
+
+
+def get_freshness_summary(timeframe: str = '1h', active_within: timedelta = WINDOW) -> Dict[str, Any]:
+    """
+    Latest bar over all timeframes and the active crypto symbols with a
+    `timeframe` bar within active_within, from one read of the watermarks.
+    """
+    now = timezone.now()
+    rows = SymbolDataWatermark.objects.values_list(
+        'symbol__symbol', 'symbol__is_active', 'symbol__is_crypto_symbol', 'timeframe', 'last_timestamp'
+    )
+    latest_timestamp, latest_symbol, active_symbols = None, None, 0
+    for symbol, is_active, is_crypto, row_timeframe, last_timestamp in rows:
+        if latest_timestamp is None or last_timestamp > latest_timestamp:
+            latest_timestamp, latest_symbol = last_timestamp, symbol
+        if row_timeframe == timeframe and is_active and is_crypto and last_timestamp >= now - active_within:
+            active_symbols += 1
+    return {
+        'latest_timestamp': latest_timestamp,
+        'latest_symbol': latest_symbol,
+        'active_symbols': active_symbols,
+    }
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.db.models import Count, Avg
 from apps.sentiment.models import (
     SocialMediaSource, NewsSource, SocialMediaPost, NewsArticle,
-    CryptoMention, SentimentAggregate, Influencer, SentimentModel
+    CryptoMention, SentimentAggregate, Influencer, SentimentModel, NewsCluster
 )
 
 
@@ -58,15 +58,25 @@ class NewsArticleAdmin(admin.ModelAdmin):
         'title', 'source', 'sentiment_label', 'confidence_score',
         'published_at', 'processed_at'
     ]
-    list_filter = ['sentiment_label', 'published_at', 'source']
+    list_filter = ['sentiment_label', 'is_duplicate', 'published_at', 'source']
     search_fields = ['title', 'content']
-    readonly_fields = ['processed_at']
+    readonly_fields = ['processed_at', 'simhash', 'cluster']
     date_hierarchy = 'published_at'
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('source')
 
 
+@admin.register(NewsCluster)
+class NewsClusterAdmin(admin.ModelAdmin):
+    list_display = ['representative', 'article_count', 'source_count', 'first_seen_at', 'last_seen_at']
+    readonly_fields = ['created_at']
+    date_hierarchy = 'last_seen_at'
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('representative')
+
+
 @admin.register(CryptoMention)
 class CryptoMentionAdmin(admin.ModelAdmin):
     list_display = [
@@ -5,3 +5,7 @@ class SentimentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.sentiment'
     verbose_name = 'Sentiment Analysis'
+
+    def ready(self):
+        # Keeps the news full-text index in sync with NewsArticle saves
+        from . import search  # noqa: F401
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='is_duplicate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='NewsCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_count', models.IntegerField(default=1)),
+                ('source_count', models.IntegerField(default=1)),
+                ('first_seen_at', models.DateTimeField()),
+                ('last_seen_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('representative', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='represented_clusters', to='sentiment.newsarticle')),
+            ],
+            options={
+                'verbose_name': 'News Cluster',
+                'verbose_name_plural': 'News Clusters',
+            },
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='articles', to='sentiment.newscluster'),
+        ),
+        migrations.CreateModel(
+            name='NewsFingerprintBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('value', models.IntegerField()),
+                ('published_at', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_bands', to='sentiment.newsarticle')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='newscluster',
+            index=models.Index(fields=['last_seen_at'], name='sentiment_n_last_se_663afa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newsfingerprintband',
+            index=models.Index(fields=['band', 'value', 'published_at'], name='sentiment_n_band_745e57_idx'),
+        ),
+    ]
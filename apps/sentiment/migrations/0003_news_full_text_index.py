@@ -0,0 +1,39 @@
+from django.db import migrations
+
+FTS_TABLE = 'sentiment_newsarticle_fts'
+FULLTEXT_INDEX = 'sentiment_newsarticle_fulltext'
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, content) SELECT id, title, content FROM sentiment_newsarticle"
+        )
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON sentiment_newsarticle (title, content)"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'mysql':
+        schema_editor.execute(f"DROP INDEX {FULLTEXT_INDEX} ON sentiment_newsarticle")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sentiment', '0002_news_near_duplicate_clusters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -66,6 +66,28 @@ class SocialMediaPost(models.Model):
         return f"{self.platform}: {self.author} - {self.content[:50]}..."
 
 
+class NewsCluster(models.Model):
+    """Near-duplicate copies of one news story"""
+    representative = models.ForeignKey(
+        'NewsArticle', on_delete=models.SET_NULL, null=True, blank=True, related_name='represented_clusters'
+    )
+    article_count = models.IntegerField(default=1)  # Reach: copies of the story
+    source_count = models.IntegerField(default=1)
+    first_seen_at = models.DateTimeField()
+    last_seen_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'News Cluster'
+        verbose_name_plural = 'News Clusters'
+        indexes = [
+            models.Index(fields=['last_seen_at']),
+        ]
+
+    def __str__(self):
+        return f"Cluster {self.pk}: {self.article_count} articles from {self.source_count} sources"
+
+
 class NewsArticle(models.Model):
     """Stores news articles for sentiment analysis"""
     source = models.ForeignKey(NewsSource, on_delete=models.CASCADE)
@@ -78,6 +100,9 @@ class NewsArticle(models.Model):
     sentiment_label = models.CharField(max_length=20, blank=True)
     confidence_score = models.FloatField(default=0.0)
     impact_score = models.FloatField(default=0.0)  # Impact on crypto markets
+    simhash = models.BigIntegerField(null=True, blank=True)  # Signed 64-bit SimHash of title + description
+    cluster = models.ForeignKey(NewsCluster, on_delete=models.SET_NULL, null=True, blank=True, related_name='articles')
+    is_duplicate = models.BooleanField(default=False)  # Later copy of a clustered story
     processed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -92,6 +117,19 @@ class NewsArticle(models.Model):
         return f"{self.source.name}: {self.title[:50]}..."
 
 
+class NewsFingerprintBand(models.Model):
+    """One band of an article's SimHash, for near-duplicate candidate lookup"""
+    article = models.ForeignKey(NewsArticle, on_delete=models.CASCADE, related_name='fingerprint_bands')
+    band = models.PositiveSmallIntegerField()
+    value = models.IntegerField()
+    published_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['band', 'value', 'published_at']),
+        ]
+
+
 class CryptoMention(models.Model):
     """Tracks mentions of crypto assets in social media and news"""
     asset = models.ForeignKey(Symbol, on_delete=models.CASCADE)
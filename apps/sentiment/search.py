@@ -0,0 +1,310 @@
+"""
+Full-text search over news articles
+
+NewsArticle title/content search without icontains scans:
+- SQLiteFTSBackend: an FTS5 table keyed by article id, ranked by bm25
+- MySQLFullTextBackend: a FULLTEXT index on (title, content), ranked by MATCH
+- ORMSearchBackend: icontains fallback for other databases
+
+The FTS5 table is kept in sync on the write path: post_save/post_delete
+receivers index single articles and the index_news_articles task indexes
+rows written without save() (bulk_create, raw loads), so searches never
+write. search_news() returns ranked hits with HTML-escaped snippets whose
+matches are wrapped in <mark>.
+"""
+
+import re
+import abc
+import html
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models.signals import post_delete, post_save
+
+from .models import CryptoMention, NewsArticle
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'sentiment_newsarticle_fts'
+FULLTEXT_INDEX = 'sentiment_newsarticle_fulltext'
+
+# Private-use markers around matches, replaced by <mark> after escaping
+_START, _END = '\ue000', '\ue001'
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def query_terms(query: str) -> List[str]:
+    """Lowercased word terms of a user query, operators and quotes dropped"""
+    return [term.lower() for term in _TERM.findall(query or '')][:16]
+
+
+def render_snippet(text: str) -> str:
+    return html.escape(text).replace(_START, '<mark>').replace(_END, '</mark>')
+
+
+def make_snippet(text: str, terms: List[str], width: int = 160) -> str:
+    """Window of text around the first matched term with matches marked"""
+    text = text or ''
+    if not terms:
+        return render_snippet(text[:width])
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    window = text[start:start + width]
+    marked = pattern.sub(lambda m: f'{_START}{m.group(0)}{_END}', window)
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + render_snippet(marked) + suffix
+
+
+class SearchBackend(abc.ABC):
+    """Ranked article search, hits are (article id, rank, title snippet, content snippet)"""
+
+    def ensure_index(self):
+        pass
+
+    def index_articles(self, articles):
+        pass
+
+    def index_new(self) -> int:
+        """Index articles that were written without save(), returns how many"""
+        return 0
+
+    def remove_articles(self, article_ids):
+        pass
+
+    def rebuild(self) -> int:
+        return 0
+
+    @abc.abstractmethod
+    def search_ids(self, terms: List[str], article_ids_sql: str, params: list, limit: int) -> List[tuple]:
+        """Hits of articles in article_ids_sql matching every term, best first"""
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 virtual table with rowid = NewsArticle.id"""
+
+    def __init__(self):
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def ensure_index(self):
+        if self._ready:
+            return
+        with self._lock:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    f"title, content, tokenize='unicode61 remove_diacritics 2')"
+                )
+            self._ready = True
+
+    def index_new(self) -> int:
+        """Index articles with an id above the highest indexed one"""
+        table = NewsArticle._meta.db_table
+
+        def insert():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, content) "
+                    f"SELECT id, title, content FROM {table} "
+                    f"WHERE id > (SELECT COALESCE(MAX(rowid), 0) FROM {FTS_TABLE})"
+                )
+                return cursor.rowcount
+        return self._with_index(insert)
+
+    def _with_index(self, fn):
+        """Run fn against the table, recreating it once if it went missing"""
+        self.ensure_index()
+        try:
+            return fn()
+        except DatabaseError:
+            # Dropped or rolled back under us (flush, test transactions)
+            self._ready = False
+            self.ensure_index()
+            return fn()
+
+    def index_articles(self, articles):
+        rows = [(article.id, article.title, article.content) for article in articles]
+
+        def write():
+            with connection.cursor() as cursor:
+                cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+                cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)", rows)
+        self._with_index(write)
+
+    def remove_articles(self, article_ids):
+        def delete():
+            with connection.cursor() as cursor:
+                cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(i,) for i in article_ids])
+        self._with_index(delete)
+
+    def rebuild(self) -> int:
+        def clear():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        self._with_index(clear)
+        return self.index_new()
+
+    def search_ids(self, terms, article_ids_sql, params, limit):
+        # Quoted terms are matched literally, the last one also as a prefix
+        match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+        def select():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid, -bm25({FTS_TABLE}, 2.0, 1.0), "
+                    f"highlight({FTS_TABLE}, 0, %s, %s), "
+                    f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+                    f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({article_ids_sql}) "
+                    f"ORDER BY bm25({FTS_TABLE}, 2.0, 1.0) LIMIT %s",
+                    [_START, _END, _START, _END, match, *params, limit]
+                )
+                return cursor.fetchall()
+        return [(row[0], row[1], render_snippet(row[2]), render_snippet(row[3])) for row in self._with_index(select)]
+
+
+class MySQLFullTextBackend(SearchBackend):
+    """FULLTEXT index on the article table, maintained by MySQL itself"""
+
+    def search_ids(self, terms, article_ids_sql, params, limit):
+        table = NewsArticle._meta.db_table
+        # Boolean mode: +term* requires every term (as prefix), like the other
+        # backends; natural language mode would match any of them
+        against = ' '.join(f'+{term}*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) AS score, title, content "
+                f"FROM {table} WHERE MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) "
+                f"AND id IN ({article_ids_sql}) ORDER BY score DESC LIMIT %s",
+                [against, against, *params, limit]
+            )
+            return [
+                (row[0], float(row[1]), make_snippet(row[2], terms, width=500), make_snippet(row[3], terms))
+                for row in cursor.fetchall()
+            ]
+
+
+class ORMSearchBackend(SearchBackend):
+    """Substring matching ranked by matched terms (databases without a text index)"""
+
+    def search_ids(self, terms, article_ids_sql, params, limit):
+        from django.db.models import Q
+        condition = Q()
+        for term in terms:
+            condition |= Q(title__icontains=term) | Q(content__icontains=term)
+        articles = NewsArticle.objects.filter(condition).extra(
+            where=[f"{NewsArticle._meta.db_table}.id IN ({article_ids_sql})"], params=params
+        ).values_list('id', 'title', 'content')[:limit * 5]
+
+        hits = []
+        for article_id, title, content in articles:
+            text = f"{title} {content}".lower()
+            score = sum(2 * title.lower().count(term) + content.lower().count(term) for term in terms)
+            if all(term in text for term in terms):
+                hits.append((article_id, float(score), make_snippet(title, terms, width=500), make_snippet(content, terms)))
+        hits.sort(key=lambda hit: -hit[1])
+        return hits[:limit]
+
+
+def _filtered_ids_sql(symbol: Optional[str], since) -> tuple:
+    """SQL selecting the ids of articles matching symbol/since, with its params"""
+    articles = NewsArticle.objects.all()
+    if since is not None:
+        articles = articles.filter(published_at__gte=since)
+    if symbol:
+        articles = articles.filter(
+            id__in=CryptoMention.objects.filter(asset__symbol=symbol.upper()).values('news_article_id')
+        )
+    sql, params = articles.order_by().values('id').query.sql_with_params()
+    return sql, list(params)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend() -> SearchBackend:
+    """Backend for the default database (NEWS_SEARCH_BACKEND overrides: fts5, fulltext, orm)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            choice = getattr(settings, 'NEWS_SEARCH_BACKEND', 'auto')
+            if choice == 'auto':
+                choice = {'sqlite': 'fts5', 'mysql': 'fulltext'}.get(connection.vendor, 'orm')
+            _backend = {
+                'fts5': SQLiteFTSBackend, 'fulltext': MySQLFullTextBackend
+            }.get(choice, ORMSearchBackend)()
+        return _backend
+
+
+def set_search_backend(backend: Optional[SearchBackend]):
+    """Replace the process-wide backend (used by tests)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def search_news(query: str, symbol: Optional[str] = None, since=None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Ranked articles matching every term of query.
+
+    Each hit has the article fields plus `rank` (higher is better) and
+    `title_highlighted` / `snippet` HTML with matches in <mark>.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    try:
+        ids_sql, params = _filtered_ids_sql(symbol, since)
+        hits = get_search_backend().search_ids(terms, ids_sql, params, limit)
+    except Exception as e:
+        logger.error(f"Error searching news for {query!r}: {e}")
+        return []
+
+    articles = NewsArticle.objects.select_related('source').in_bulk([hit[0] for hit in hits])
+    results = []
+    for article_id, rank, title_highlighted, snippet in hits:
+        article = articles.get(article_id)
+        if article is None:
+            continue
+        results.append({
+            'id': article.id,
+            'title': article.title,
+            'title_highlighted': title_highlighted,
+            'snippet': snippet,
+            'url': article.url,
+            'source': article.source.name,
+            'published_at': article.published_at,
+            'sentiment_label': article.sentiment_label,
+            'sentiment_score': article.sentiment_score,
+            'is_duplicate': article.is_duplicate,
+            'rank': round(rank, 4),
+        })
+    return results
+
+
+def _article_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    backend = get_search_backend()
+    if isinstance(backend, SQLiteFTSBackend):
+        try:
+            backend.index_articles([instance])
+        except Exception as e:
+            logger.error(f"Error indexing news article {instance.pk}: {e}")
+
+
+def _article_deleted(sender, instance, **kwargs):
+    backend = get_search_backend()
+    if isinstance(backend, SQLiteFTSBackend):
+        try:
+            backend.remove_articles([instance.pk])
+        except Exception as e:
+            logger.error(f"Error removing news article {instance.pk} from the index: {e}")
+
+
+post_save.connect(_article_saved, sender=NewsArticle, dispatch_uid='news_search_article_save')
+post_delete.connect(_article_deleted, sender=NewsArticle, dispatch_uid='news_search_article_delete')
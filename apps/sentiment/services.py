@@ -5,11 +5,14 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Avg, Count
+from django.db import transaction
+from django.db.models import F, Q, Avg, Count
 from apps.sentiment.models import (
     SocialMediaSource, NewsSource, SocialMediaPost, NewsArticle,
-    CryptoMention, SentimentAggregate, Influencer, SentimentModel
+    CryptoMention, SentimentAggregate, Influencer, SentimentModel,
+    NewsCluster, NewsFingerprintBand
 )
+from apps.sentiment.simhash import bands, hamming_distance, text_fingerprint, to_signed, to_unsigned
 from apps.trading.models import Symbol
 
 logger = logging.getLogger(__name__)
@@ -375,6 +378,87 @@ class SentimentAnalysisService:
         return mentions
 
 
+class NewsDeduplicationService:
+    """
+    Near-duplicate news detection with SimHash fingerprints.
+
+    Candidates come from one NewsFingerprintBand lookup within the recent
+    window; the nearest one within max_distance bits is the duplicate. A
+    duplicate joins (or starts) the cluster of the original story, which
+    counts its copies and sources as the story's reach.
+    """
+    
+    def __init__(self, max_distance: Optional[int] = None, window_days: Optional[int] = None,
+                 band_count: Optional[int] = None):
+        self.max_distance = max_distance if max_distance is not None else getattr(settings, 'NEWS_SIMHASH_MAX_DISTANCE', 6)
+        self.window_days = window_days or getattr(settings, 'NEWS_DEDUP_WINDOW_DAYS', 3)
+        # Any two fingerprints within band_count - 1 bits share a band
+        self.band_count = band_count or max(getattr(settings, 'NEWS_SIMHASH_BANDS', 8), self.max_distance + 1)
+    
+    def fingerprint(self, title: str, description: str = '') -> int:
+        return text_fingerprint(title, description)
+    
+    def find_duplicate(self, fingerprint: int, published_at=None) -> Optional[NewsArticle]:
+        """Nearest stored article within max_distance bits, None when there is none"""
+        if not fingerprint:
+            return None
+        published_at = published_at or timezone.now()
+        band_filter = Q()
+        for band, value in bands(fingerprint, self.band_count):
+            band_filter |= Q(band=band, value=value)
+        
+        candidates = NewsFingerprintBand.objects.filter(
+            band_filter,
+            published_at__gte=published_at - timedelta(days=self.window_days)
+        ).values_list('article_id', 'article__simhash').distinct()
+        
+        best = None
+        for article_id, value in candidates:
+            distance = hamming_distance(fingerprint, to_unsigned(value))
+            if distance <= self.max_distance and (best is None or (distance, article_id) < best):
+                best = (distance, article_id)
+        if best is None:
+            return None
+        return NewsArticle.objects.select_related('cluster').get(id=best[1])
+    
+    def index_article(self, article: NewsArticle, fingerprint: int):
+        """Store the fingerprint and its bands of a new original article"""
+        article.simhash = to_signed(fingerprint)
+        article.save(update_fields=['simhash'])
+        if fingerprint:
+            NewsFingerprintBand.objects.bulk_create([
+                NewsFingerprintBand(article=article, band=band, value=value, published_at=article.published_at)
+                for band, value in bands(fingerprint, self.band_count)
+            ])
+    
+    @transaction.atomic
+    def add_duplicate(self, article: NewsArticle, original: NewsArticle, fingerprint: int) -> NewsCluster:
+        """Attach a copy to the cluster of original, creating the cluster on the first copy"""
+        cluster = original.cluster
+        if cluster is None:
+            cluster = NewsCluster.objects.create(
+                representative=original, article_count=1, source_count=1,
+                first_seen_at=original.published_at, last_seen_at=original.published_at
+            )
+            original.cluster = cluster
+            original.save(update_fields=['cluster'])
+        
+        article.simhash = to_signed(fingerprint)
+        article.cluster = cluster
+        article.is_duplicate = True
+        article.save(update_fields=['simhash', 'cluster', 'is_duplicate'])
+        
+        NewsCluster.objects.filter(id=cluster.id).update(
+            article_count=F('article_count') + 1,
+            source_count=NewsArticle.objects.filter(cluster=cluster).values('cluster').annotate(
+                sources=Count('source', distinct=True)
+            ).values('sources')[:1],
+            last_seen_at=max(cluster.last_seen_at, article.published_at)
+        )
+        cluster.refresh_from_db()
+        return cluster
+
+
 class SentimentAggregationService:
     """Service for aggregating sentiment scores"""
     
@@ -400,12 +484,12 @@ class SentimentAggregationService:
             created_at__gte=start_time
         )
         
-        # Get news mentions
+        # Get news mentions, syndicated copies of a story count once
         news_mentions = CryptoMention.objects.filter(
             asset=asset,
             mention_type='news',
             created_at__gte=start_time
-        )
+        ).exclude(news_article__is_duplicate=True)
         
         # Calculate social sentiment
         if social_mentions.exists():
@@ -0,0 +1,73 @@
+"""
+SimHash fingerprints for near-duplicate news detection
+
+A 64-bit SimHash is built from character shingles of the normalized title
+and description, so syndicated copies of a story with small edits land
+within a few bits of each other while unrelated stories differ in about 32.
+The fingerprint is split into bands: two fingerprints within `bands - 1`
+bits of each other share at least one identical band, so a band lookup finds
+every candidate without comparing against all stored articles.
+"""
+
+import re
+import hashlib
+from typing import Iterable, List, Tuple
+
+FINGERPRINT_BITS = 64
+DEFAULT_BANDS = 8
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def shingles(text: str, size: int = 4) -> List[str]:
+    """Overlapping character n-grams of the lowercased words joined by single spaces"""
+    normalized = ' '.join(_TOKEN.findall((text or '').lower()))
+    if len(normalized) <= size:
+        return [normalized] if normalized else []
+    return [normalized[i:i + size] for i in range(len(normalized) - size + 1)]
+
+
+def simhash(features: Iterable[str]) -> int:
+    """Unsigned 64-bit SimHash of features, 0 when there are none"""
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def text_fingerprint(title: str, description: str = '') -> int:
+    return simhash(shingles(f"{title} {description}"))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & (2 ** FINGERPRINT_BITS - 1)).count('1')
+
+
+def bands(fingerprint: int, count: int = DEFAULT_BANDS) -> List[Tuple[int, int]]:
+    """
+    (band number, band value) pairs of an unsigned fingerprint.
+
+    The bands cover all 64 bits: when count does not divide 64 the first
+    64 % count bands are one bit wider.
+    """
+    if not 1 <= count <= FINGERPRINT_BITS:
+        raise ValueError(f'Band count must be between 1 and {FINGERPRINT_BITS}, got {count}')
+    width, wider = divmod(FINGERPRINT_BITS, count)
+    result = []
+    offset = 0
+    for band in range(count):
+        band_width = width + 1 if band < wider else width
+        result.append((band, fingerprint >> offset & ((1 << band_width) - 1)))
+        offset += band_width
+    return result
+
+
+def to_signed(fingerprint: int) -> int:
+    """Unsigned 64-bit value as stored in a signed BigIntegerField"""
+    return fingerprint - 2 ** 64 if fingerprint >= 2 ** 63 else fingerprint
+
+
+def to_unsigned(value: int) -> int:
+    return value + 2 ** 64 if value < 0 else value
@@ -10,8 +10,10 @@ from apps.sentiment.models import (
 )
 from apps.sentiment.services import (
     TwitterService, RedditService, NewsAPIService,
-    SentimentAnalysisService, SentimentAggregationService
+    SentimentAnalysisService, SentimentAggregationService, NewsDeduplicationService
 )
+from apps.sentiment.search import get_search_backend
+from apps.core.query_budget import max_queries
 from apps.trading.models import Symbol
 
 logger = logging.getLogger(__name__)
@@ -197,21 +199,65 @@ def collect_reddit_data():
 
 
 @shared_task
+@max_queries(1500)  # ~13 queries per article, NewsAPI pages hold 100
 def collect_news_data():
     """Collect news data for crypto mentions"""
     logger.info("Collecting news data...")
     
     news_service = NewsAPIService()
     sentiment_service = SentimentAnalysisService()
+    dedup_service = NewsDeduplicationService()
     
     try:
         # Get crypto news from the last 24 hours
         from_date = (timezone.now() - timedelta(days=1)).strftime('%Y-%m-%d')
         articles = news_service.get_crypto_news(from_date=from_date)
         
+        # Exact duplicates: one query for the whole batch
+        known_urls = set(NewsArticle.objects.filter(
+            url__in=[article_data['url'] for article_data in articles]
+        ).values_list('url', flat=True))
+        
+        # Create crypto mentions - use active crypto symbols from database
+        active_crypto_assets = {
+            asset.symbol: asset for asset in Symbol.objects.filter(is_active=True, is_crypto_symbol=True)
+        }
+        crypto_symbols = list(active_crypto_assets)
+        
+        # If no active symbols, fall back to common ones
+        if not crypto_symbols:
+            crypto_symbols = ['BTC', 'ETH', 'ADA', 'DOT', 'LINK', 'UNI', 'AAVE']
+        
+        duplicates = 0
         for article_data in articles:
             # Check if article already exists
-            if NewsArticle.objects.filter(url=article_data['url']).exists():
+            if article_data['url'] in known_urls:
+                continue
+            known_urls.add(article_data['url'])
+            
+            published_at = datetime.fromisoformat(article_data['publishedAt'].replace('Z', '+00:00'))
+            source = NewsSource.objects.get_or_create(
+                name=article_data.get('source', {}).get('name', 'Unknown'),
+                url=article_data.get('source', {}).get('url', '')
+            )[0]
+            
+            # Near duplicates (syndicated copies) reuse the original's sentiment
+            # and add no mentions, they only count towards the story's reach
+            fingerprint = dedup_service.fingerprint(article_data['title'], article_data.get('description', ''))
+            original = dedup_service.find_duplicate(fingerprint, published_at)
+            if original is not None:
+                article = NewsArticle.objects.create(
+                    source=source,
+                    title=article_data['title'],
+                    content=article_data.get('description', ''),
+                    url=article_data['url'],
+                    published_at=published_at,
+                    sentiment_score=original.sentiment_score,
+                    sentiment_label=original.sentiment_label,
+                    confidence_score=original.confidence_score
+                )
+                dedup_service.add_duplicate(article, original, fingerprint)
+                duplicates += 1
                 continue
             
             # Analyze sentiment
@@ -220,45 +266,37 @@ def collect_news_data():
             
             # Create news article
             article = NewsArticle.objects.create(
-                source=NewsSource.objects.get_or_create(
-                    name=article_data.get('source', {}).get('name', 'Unknown'),
-                    url=article_data.get('source', {}).get('url', '')
-                )[0],
+                source=source,
                 title=article_data['title'],
                 content=article_data.get('description', ''),
                 url=article_data['url'],
-                published_at=datetime.fromisoformat(article_data['publishedAt'].replace('Z', '+00:00')),
+                published_at=published_at,
                 sentiment_score=sentiment_result['sentiment_score'],
                 sentiment_label=sentiment_result['sentiment_label'],
                 confidence_score=sentiment_result['confidence_score']
             )
-            
-            # Create crypto mentions - use active crypto symbols from database
-            active_crypto_assets = Symbol.objects.filter(
-                is_active=True,
-                is_crypto_symbol=True
-            )
-            crypto_symbols = [asset.symbol for asset in active_crypto_assets]
-            
-            # If no active symbols, fall back to common ones
-            if not crypto_symbols:
-                crypto_symbols = ['BTC', 'ETH', 'ADA', 'DOT', 'LINK', 'UNI', 'AAVE']
+            dedup_service.index_article(article, fingerprint)
             
             mentions = sentiment_service.analyze_crypto_mentions(content, crypto_symbols)
             
             for mention in mentions:
-                try:
-                    asset = Symbol.objects.get(symbol=mention['symbol'])
-                    CryptoMention.objects.create(
-                        asset=asset,
-                        news_article=article,
-                        mention_type='news',
-                        sentiment_score=mention['sentiment_score'],
-                        sentiment_label=mention['sentiment_label'],
-                        confidence_score=mention['confidence_score']
-                    )
-                except Symbol.DoesNotExist:
-                    continue
+                asset = active_crypto_assets.get(mention['symbol'])
+                if asset is None:
+                    try:
+                        asset = Symbol.objects.get(symbol=mention['symbol'])
+                    except Symbol.DoesNotExist:
+                        continue
+                CryptoMention.objects.create(
+                    asset=asset,
+                    news_article=article,
+                    mention_type='news',
+                    sentiment_score=mention['sentiment_score'],
+                    sentiment_label=mention['sentiment_label'],
+                    confidence_score=mention['confidence_score']
+                )
+        
+        if duplicates:
+            logger.info(f"Clustered {duplicates} near-duplicate news articles")
                     
     except Exception as e:
         logger.error(f"Error collecting news data: {e}")
@@ -266,6 +304,19 @@ def collect_news_data():
     logger.info("News data collection completed")
 
 
+@shared_task
+def index_news_articles():
+    """Add articles written without save() (bulk_create, raw loads) to the search index"""
+    try:
+        indexed = get_search_backend().index_new()
+        if indexed:
+            logger.info(f"Indexed {indexed} news articles for search")
+        return indexed
+    except Exception as e:
+        logger.error(f"Error indexing news articles: {e}")
+        return 0
+
+
 @shared_task
 def process_social_media_sentiment():
     """Process sentiment for collected social media data"""
@@ -296,6 +347,7 @@ def process_social_media_sentiment():
 
 
 @shared_task
+@max_queries(1500)  # 12-20 queries per active symbol
 def aggregate_sentiment_scores():
     """Aggregate sentiment scores for all crypto assets"""
     logger.info("Aggregating sentiment scores...")
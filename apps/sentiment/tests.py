@@ -0,0 +1,270 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.core.query_budget import QueryBudgetExceeded
+from apps.trading.models import Symbol
+from .models import CryptoMention, NewsArticle, NewsCluster, NewsFingerprintBand, NewsSource, SentimentAggregate
+from .search import (
+    MySQLFullTextBackend, ORMSearchBackend, SearchBackend, SQLiteFTSBackend, search_news, set_search_backend
+)
+from .services import NewsDeduplicationService, SentimentAggregationService
+from .simhash import bands, hamming_distance, text_fingerprint
+from .tasks import aggregate_sentiment_scores, collect_news_data, index_news_articles
+
+STORY = (
+    "Bitcoin (BTC) surges past $70,000 as ETF inflows hit record",
+    "Bitcoin rallied above $70,000 on Tuesday as spot ETF inflows reached a record high, with analysts "
+    "pointing to strong institutional demand and shrinking exchange balances ahead of the halving."
+)
+OTHER_STORY = (
+    "Ethereum slides as regulators delay decision",
+    "Ether fell 5% after the SEC postponed its ruling on several spot Ethereum ETF applications, "
+    "extending uncertainty for the second largest cryptocurrency."
+)
+
+
+def news_item(title, description, url, source):
+    return {
+        'title': title, 'description': description, 'url': url,
+        'publishedAt': timezone.now().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'source': {'name': source, 'url': f'https://{source.lower()}.com'},
+    }
+
+
+class SimHashTestCase(TestCase):
+    def test_near_duplicates_are_close(self):
+        """Test syndicated edits stay within a few bits and other stories do not"""
+        original = text_fingerprint(*STORY)
+        self.assertLessEqual(hamming_distance(original, text_fingerprint(STORY[0] + '!', STORY[1] + ' Reuters')), 6)
+        self.assertGreater(hamming_distance(original, text_fingerprint(*OTHER_STORY)), 16)
+
+    def test_bands_cover_every_bit(self):
+        """Test bands partition all 64 bits, also for counts that do not divide 64"""
+        fingerprint = text_fingerprint(*STORY)
+        for count in (1, 7, 8, 10, 64):
+            rebuilt, offset = 0, 0
+            for band, value in bands(fingerprint, count):
+                rebuilt |= value << offset
+                offset += 64 // count + (1 if band < 64 % count else 0)
+            self.assertEqual((offset, rebuilt), (64, fingerprint))
+        with self.assertRaises(ValueError):
+            bands(fingerprint, 65)
+
+
+class NewsDeduplicationTestCase(TestCase):
+    def setUp(self):
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.items = [
+            news_item(*STORY, 'https://a.com/1', 'CoinDesk'),
+            news_item(STORY[0].upper(), STORY[1] + ' Reuters', 'https://b.com/1', 'Reuters'),
+            news_item(STORY[0], STORY[1], 'https://c.com/1', 'Yahoo'),
+            news_item(*OTHER_STORY, 'https://a.com/2', 'CoinDesk'),
+            news_item(*STORY, 'https://a.com/1', 'CoinDesk'),
+        ]
+
+    def collect(self):
+        with mock.patch('apps.sentiment.tasks.NewsAPIService.get_crypto_news', return_value=self.items):
+            collect_news_data()
+
+    def test_syndicated_copies_are_clustered(self):
+        """Test copies join one cluster that records their reach"""
+        self.collect()
+
+        self.assertEqual(NewsArticle.objects.count(), 4)
+        cluster = NewsCluster.objects.get()
+        self.assertEqual((cluster.article_count, cluster.source_count), (3, 3))
+        self.assertEqual(cluster.representative.url, 'https://a.com/1')
+        self.assertEqual(NewsArticle.objects.filter(is_duplicate=True).count(), 2)
+        # Only originals are indexed and produce mentions
+        self.assertEqual(NewsFingerprintBand.objects.values('article').distinct().count(), 2)
+        self.assertEqual(CryptoMention.objects.filter(asset=self.btc).count(), 1)
+
+    def test_aggregation_counts_story_once(self):
+        """Test mentions of duplicate articles are left out of the aggregate"""
+        self.collect()
+        duplicate = NewsArticle.objects.filter(is_duplicate=True).first()
+        CryptoMention.objects.create(asset=self.btc, news_article=duplicate, mention_type='news',
+                                     sentiment_score=0.5, sentiment_label='bullish')
+
+        aggregate = SentimentAggregationService().aggregate_sentiment(self.btc, '1d')
+        self.assertEqual(aggregate['total_mentions'], 1)
+
+    def test_max_distance_not_dividing_64(self):
+        """Test max_distance=9 (10 bands of 7 or 6 bits) finds every copy within 9 bits"""
+        self.collect()
+        service = NewsDeduplicationService(max_distance=9)
+        self.assertEqual(service.band_count, 10)
+        original = NewsArticle.objects.get(url='https://a.com/1')
+        fingerprint = service.fingerprint(*STORY)
+        NewsFingerprintBand.objects.all().delete()
+        service.index_article(original, fingerprint)
+
+        # One flipped bit in each of nine bands, including the top bits
+        copy = fingerprint
+        for bit in (0, 7, 14, 21, 28, 34, 46, 52, 63):
+            copy ^= 1 << bit
+        self.assertEqual(hamming_distance(fingerprint, copy), 9)
+        self.assertEqual(service.find_duplicate(copy).url, 'https://a.com/1')
+        self.assertIsNone(service.find_duplicate(copy ^ 1 << 40))
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_query_budget(self):
+        """Test a collection run stays within its query budget and 130 new articles exceed it"""
+        self.collect()
+        self.items = [
+            news_item(f'Bitcoin update {i}', f'BTC market report number {i} ' * 3, f'https://d.com/{i}', f'Source{i}')
+            for i in range(130)
+        ]
+        with self.assertRaises(QueryBudgetExceeded):
+            self.collect()
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_aggregation_query_budget(self):
+        """Test aggregating stays within its query budget until about a hundred active symbols"""
+        self.collect()
+        aggregate_sentiment_scores()
+        self.assertEqual(SentimentAggregate.objects.filter(asset=self.btc).count(), 4)
+
+        Symbol.objects.bulk_create([
+            Symbol(symbol=f'ALT{i}', name=f'Alt {i}', symbol_type='CRYPTO', is_crypto_symbol=True)
+            for i in range(150)
+        ])
+        with self.assertRaises(QueryBudgetExceeded):
+            aggregate_sentiment_scores()
+
+    def test_find_duplicate_respects_window(self):
+        """Test candidates older than the dedup window are ignored"""
+        self.collect()
+        service = NewsDeduplicationService()
+        fingerprint = service.fingerprint(*STORY)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(service.find_duplicate(fingerprint).url, 'https://a.com/1')
+        self.assertIsNone(service.find_duplicate(fingerprint, timezone.now() + timedelta(days=30)))
+
+
+class NewsSearchTestCase(TestCase):
+    backend_class = SQLiteFTSBackend
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        set_search_backend(self.backend_class())
+        self.addCleanup(set_search_backend, None)
+        self.now = timezone.now()
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        source = NewsSource.objects.create(name='CoinDesk', url='https://coindesk.com')
+        self.etf = NewsArticle.objects.create(
+            source=source, title=STORY[0], content=STORY[1], url='https://a.com/1', published_at=self.now
+        )
+        self.other = NewsArticle.objects.create(
+            source=source, title=OTHER_STORY[0], content=OTHER_STORY[1], url='https://a.com/2',
+            published_at=self.now - timedelta(days=2)
+        )
+        self.mention = NewsArticle.objects.create(
+            source=source, title='Miners sell <b>coins</b>', content='Some miners sold BTC while the ETF debate went on.',
+            url='https://a.com/3', published_at=self.now
+        )
+        CryptoMention.objects.create(
+            asset=self.btc, news_article=self.etf, mention_type='news', sentiment_score=0.5, sentiment_label='POSITIVE'
+        )
+
+    def test_ranked_with_highlighted_snippets(self):
+        """Test title matches rank first and snippets mark matches with escaped text"""
+        results = search_news('etf')
+        self.assertEqual([r['id'] for r in results][0], self.etf.id)
+        self.assertEqual({r['id'] for r in results}, {self.etf.id, self.other.id, self.mention.id})
+        self.assertIn('<mark>ETF</mark>', results[0]['title_highlighted'])
+        self.assertIn('<mark>', results[0]['snippet'])
+
+        self.assertEqual(search_news('sell ETF')[0]['title_highlighted'], 'Miners <mark>sell</mark> &lt;b&gt;coins&lt;/b&gt;')
+        self.assertEqual(search_news('"; DROP TABLE'), [])
+
+    def test_symbol_and_since_filters(self):
+        """Test symbol and since narrow the matches"""
+        self.assertEqual([r['id'] for r in search_news('etf', symbol='btc')], [self.etf.id])
+        since = self.now - timedelta(days=1)
+        self.assertEqual({r['id'] for r in search_news('etf', since=since)}, {self.etf.id, self.mention.id})
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test edited, deleted and bulk created articles are reflected in results"""
+        self.other.title = 'Solana outage halts block production'
+        self.other.content = ''
+        self.other.save()
+        self.assertEqual([r['id'] for r in search_news('solana')], [self.other.id])
+
+        self.other.delete()
+        self.assertEqual(search_news('solana'), [])
+
+        NewsArticle.objects.bulk_create([NewsArticle(
+            source=self.etf.source, title='Solana validators upgrade', content='', url='https://a.com/4',
+            published_at=self.now
+        )])
+        index_news_articles()
+        self.assertEqual(len(search_news('solana')), 1)
+
+    def test_search_does_not_write(self):
+        """Test searching only reads, indexing happens on the write path"""
+        with CaptureQueriesContext(connection) as queries:
+            search_news('etf')
+        writes = [q['sql'] for q in queries if q['sql'].split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+
+    def test_search_endpoint(self):
+        """Test the API requires a login and a query and returns ranked results"""
+        url = '/sentiment/api/news/search/'
+        self.assertIn(self.client.get(url, {'q': 'etf'}).status_code, (401, 403))
+
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 400)
+        response = self.client.get(url, {'q': 'etf', 'symbol': 'BTC', 'hours': '24'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.etf.id])
+
+    def test_search_endpoint_rejects_bad_since_and_hours(self):
+        """Test invalid since and out-of-range hours get their own 400 instead of a 500"""
+        url = '/sentiment/api/news/search/'
+        self.client.force_login(User.objects.create_user('reader', password='x'))
+        for since in ('yesterday', '2024-02-30T00:00:00'):
+            response = self.client.get(url, {'q': 'etf', 'since': since})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('since', response.json()['error'])
+        for hours in ('inf', '-inf', 'nan', '0', '-5', '1e9', 'abc'):
+            response = self.client.get(url, {'q': 'etf', 'hours': hours})
+            self.assertEqual(response.status_code, 400, hours)
+            self.assertIn('hours', response.json()['error'])
+        self.assertEqual(self.client.get(url, {'q': 'etf', 'since': '2000-01-01T00:00:00Z'}).status_code, 200)
+
+
+class ORMNewsSearchTestCase(NewsSearchTestCase):
+    """Test the same behaviour on the fallback backend"""
+    backend_class = ORMSearchBackend
+
+
+class MySQLFullTextBackendTestCase(TestCase):
+    def test_every_term_is_required(self):
+        """Test the FULLTEXT query runs in boolean mode with required prefix terms"""
+        with mock.patch('apps.sentiment.search.connection') as db:
+            cursor = db.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = []
+            MySQLFullTextBackend().search_ids(['sell', 'etf'], 'SELECT 1', [], 10)
+
+        sql, params = cursor.execute.call_args[0]
+        self.assertEqual(sql.count('IN BOOLEAN MODE'), 2)
+        self.assertNotIn('NATURAL LANGUAGE', sql)
+        self.assertEqual(params[:2], ['+sell* +etf*', '+sell* +etf*'])
+
+    def test_backends_must_implement_search(self):
+        """Test a backend without search_ids cannot be instantiated"""
+        with self.assertRaises(TypeError):
+            SearchBackend()
@@ -13,6 +13,7 @@ urlpatterns = [
     path('api/influencers/', views.get_influencer_data, name='influencer_data'),
     path('api/trends/<str:asset_symbol>/', views.get_sentiment_trends, name='sentiment_trends'),
     path('api/health/', views.get_sentiment_health, name='sentiment_health'),
+    path('api/news/search/', views.NewsSearchAPIView.as_view(), name='news_search'),
     
     # Manual triggers
     path('api/trigger/collect/', views.trigger_sentiment_collection, name='trigger_collection'),
@@ -5,6 +5,9 @@ from django.shortcuts import render
 from django.db.models import Q, Avg, Count
 from django.utils import timezone
 from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+from rest_framework.response import Response
+from rest_framework.views import APIView
 import json
 import logging
 
@@ -13,10 +16,14 @@ from apps.sentiment.models import (
     Influencer
 )
 from apps.sentiment.services import SentimentAggregationService
+from apps.sentiment.search import search_news
 from apps.trading.models import Symbol
 
 logger = logging.getLogger(__name__)
 
+# Widest look-back accepted by the news search API (10 years)
+MAX_SEARCH_HOURS = 24 * 365 * 10
+
 
 def sentiment_dashboard(request):
     """Sentiment analysis dashboard view"""
@@ -322,3 +329,42 @@ def get_sentiment_health(request):
             ).count(),
         }
     })
+
+
+class NewsSearchAPIView(APIView):
+    """
+    Ranked full-text news search.
+
+    GET q (required), symbol, since (ISO datetime) or hours, limit (max 100)
+    """
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=400)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=400)
+
+        since = None
+        if request.query_params.get('since'):
+            try:
+                since = parse_datetime(request.query_params['since'])
+            except ValueError:
+                pass
+            if since is None:
+                return Response({'error': 'since must be an ISO datetime'}, status=400)
+        elif request.query_params.get('hours'):
+            try:
+                hours = float(request.query_params['hours'])
+            except ValueError:
+                hours = None
+            # Comparisons are false for NaN, so non-finite values fail here too
+            if hours is None or not 0 < hours <= MAX_SEARCH_HOURS:
+                return Response({'error': f'hours must be a number between 0 and {MAX_SEARCH_HOURS}'}, status=400)
+            since = timezone.now() - timedelta(hours=hours)
+
+        results = search_news(query, request.query_params.get('symbol') or None, since, limit)
+        return Response({'query': query, 'count': len(results), 'results': results})
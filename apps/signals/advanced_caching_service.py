@@ -17,6 +17,7 @@ from django.core.cache.utils import make_template_fragment_key
 from django.db.models import QuerySet
 from django.conf import settings
 
+from apps.core.shared_cache import get_shared_cache
 from apps.trading.models import Symbol
 from apps.data.models import MarketData, TechnicalIndicator
 from apps.signals.models import TradingSignal
@@ -31,7 +32,7 @@ class AdvancedCachingService:
     def __init__(self):
         self.cache_layers = {
             'L1': {'timeout': 300, 'description': 'In-memory cache (5 minutes)'},
-            'L2': {'timeout': 1800, 'description': 'Redis cache (30 minutes)'},
+            'L2': {'timeout': 1800, 'description': 'Shared cross-process cache (30 minutes)'},
             'L3': {'timeout': 3600, 'description': 'Database cache (1 hour)'}
         }
         self.cache_stats = {
@@ -54,7 +55,7 @@ class AdvancedCachingService:
                 logger.debug(f"L1 cache hit for {cache_key}")
                 return l1_data
             
-            # Try L2 cache (Redis)
+            # Try L2 cache (shared)
             l2_data = self._get_from_l2_cache(cache_key)
             if l2_data is not None:
                 self.cache_stats['hits'] += 1
@@ -116,10 +117,9 @@ class AdvancedCachingService:
             return None
     
     def _get_from_l2_cache(self, cache_key: str) -> Optional[Any]:
-        """Get data from L2 cache (Redis)"""
+        """Get data from L2 cache (shared by all worker processes)"""
         try:
-            # Use Django's cache framework for L2
-            return cache.get(f"l2_{cache_key}")
+            return get_shared_cache().get(f"l2_{cache_key}")
         except Exception as e:
             logger.error(f"Error getting from L2 cache: {e}")
             return None
@@ -154,9 +154,9 @@ class AdvancedCachingService:
             return False
     
     def _set_l2_cache(self, cache_key: str, data: Any, timeout: int = 1800) -> bool:
-        """Set data in L2 cache (Redis)"""
+        """Set data in L2 cache (shared by all worker processes)"""
         try:
-            cache.set(f"l2_{cache_key}", data, timeout)
+            get_shared_cache().set(f"l2_{cache_key}", data, timeout)
             return True
         except Exception as e:
             logger.error(f"Error setting L2 cache: {e}")
@@ -382,7 +382,7 @@ class AdvancedCachingService:
         """Clear L2 cache"""
         try:
             if pattern:
-                cache.delete_many([f"l2_{pattern}"])
+                get_shared_cache().delete(f"l2_{pattern}")
                 return 1
             else:
                 return 0
@@ -491,6 +491,12 @@ def cache_result(timeout: int = 300, layer: str = 'L2', key_prefix: str = ''):
                 logger.debug(f"Cache hit for {func.__name__}")
                 return cached_result
             
+            if layer == 'L2':
+                # Single-flight: one process computes, the others wait for its result
+                return get_shared_cache().get_or_refresh(
+                    f"l2_{cache_key}", lambda: func(*args, **kwargs), timeout
+                )
+            
             # Execute function and cache result
             result = func(*args, **kwargs)
             caching_service.set_cached_data(cache_key, result, layer, timeout)
@@ -1,11 +1,16 @@
 """
 Advanced Technical Indicators Service
 Implements LuxAlgo indicators and Smart Money Concepts (SMC) for enhanced signal generation
+
+All indicators work on NumPy arrays of one bar fetch. calculate_all() loads
+the bars of a (symbol, timeframe) once and computes every indicator from
+them; the calculate_* methods remain for callers that need a single one.
 """
 
 import logging
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 from django.utils import timezone
@@ -13,455 +18,357 @@ from django.db.models import Q
 
 from apps.data.models import TechnicalIndicator, MarketData
 from apps.trading.models import Symbol
+from apps.signals.smc_detection import SMCDetector, BULLISH, BEARISH, pivot_flags
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TIMEFRAME = '1h'
+
+
+@dataclass
+class AdvancedIndicatorResult:
+    """Every advanced indicator of one symbol/timeframe, computed from a single bar fetch"""
+    symbol: str
+    timeframe: str
+    bars: int = 0
+    fair_value_gap: Optional[Dict] = None
+    liquidity_swings: Optional[Dict] = None
+    nadaraya_watson_envelope: Optional[Dict] = None
+    pivot_points: Optional[Dict] = None
+    rsi_divergence: Optional[Dict] = None
+    stochastic_rsi: Optional[Dict] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
 
 class AdvancedIndicatorsService:
     """Service for calculating advanced technical indicators including LuxAlgo indicators"""
-    
+
     def __init__(self):
         self.name = "AdvancedIndicatorsService"
-        
-    def calculate_fair_value_gap(self, symbol: Symbol, lookback: int = 50) -> Optional[Dict]:
+
+        # Bars each indicator looks at (matches the calculate_* defaults)
+        self.fvg_lookback = 50
+        self.swing_lookback = 100
+        self.nw_period = 20
+        self.nw_bandwidth = 0.1
+        self.rsi_period = 14
+        self.divergence_lookback = 50
+        self.stoch_period = 14
+
+    def get_bars(self, symbol: Symbol, timeframe: str = DEFAULT_TIMEFRAME, limit: int = 100) -> Dict[str, np.ndarray]:
+        """Fetch the latest `limit` bars in chronological order as NumPy arrays"""
+        rows = list(
+            MarketData.objects.filter(symbol=symbol, timeframe=timeframe)
+            .order_by('-timestamp')
+            .values_list('timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume')[:limit]
+        )
+        rows.reverse()
+        return self.bars_from_rows(rows)
+
+    @staticmethod
+    def bars_from_rows(rows: List[Tuple]) -> Dict[str, np.ndarray]:
+        """Build bar arrays from (timestamp, open, high, low, close, volume) rows"""
+        columns = list(zip(*rows)) if rows else [()] * 6
+        bars = {'timestamp': np.array(columns[0], dtype=object)}
+        for name, values in zip(('open', 'high', 'low', 'close', 'volume'), columns[1:]):
+            bars[name] = np.array(values, dtype=np.float64)
+        return bars
+
+    @staticmethod
+    def _tail(bars: Dict[str, np.ndarray], count: int) -> Dict[str, np.ndarray]:
+        return {name: values[-count:] for name, values in bars.items()}
+
+    def calculate_all(self, symbol: Symbol, timeframe: str = DEFAULT_TIMEFRAME) -> AdvancedIndicatorResult:
+        """Calculate every advanced indicator for a symbol from one bar fetch"""
+        limit = max(self.fvg_lookback, self.swing_lookback, self.nw_period * 2,
+                    self.divergence_lookback, self.rsi_period + self.stoch_period + 10)
+        bars = self.get_bars(symbol, timeframe, limit)
+        return self.compute_all(bars, symbol.symbol, timeframe)
+
+    def compute_all(self, bars: Dict[str, np.ndarray], symbol_name: str,
+                    timeframe: str = DEFAULT_TIMEFRAME) -> AdvancedIndicatorResult:
+        """Calculate every advanced indicator from already loaded bars"""
+        result = AdvancedIndicatorResult(symbol=symbol_name, timeframe=timeframe, bars=len(bars['close']))
+        calculations = {
+            'fair_value_gap': lambda: self._fair_value_gap(self._tail(bars, self.fvg_lookback)),
+            'liquidity_swings': lambda: self._liquidity_swings(self._tail(bars, self.swing_lookback)),
+            'nadaraya_watson_envelope': lambda: self._nadaraya_watson_envelope(
+                self._tail(bars, self.nw_period * 2), self.nw_period, self.nw_bandwidth),
+            'pivot_points': lambda: self._pivot_points(self._tail(bars, 2), 1),
+            'rsi_divergence': lambda: self._rsi_divergence(
+                self._tail(bars, self.divergence_lookback), self.rsi_period),
+            'stochastic_rsi': lambda: self._stochastic_rsi(
+                self._tail(bars, self.rsi_period + self.stoch_period + 10), self.rsi_period, self.stoch_period),
+        }
+        for name, calculate in calculations.items():
+            try:
+                setattr(result, name, calculate())
+            except Exception as e:
+                logger.error(f"Error calculating {name} for {symbol_name}: {e}")
+        return result
+
+    def calculate_fair_value_gap(self, symbol: Symbol, lookback: int = 50,
+                                 timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate Fair Value Gap (FVG) indicator
         FVG occurs when there's a gap between candles without price action
         """
         try:
-            # Get market data
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:lookback]
-            
-            if len(market_data) < 3:
-                return None
-                
-            # Convert to pandas DataFrame
-            df = pd.DataFrame([{
-                'timestamp': data.timestamp,
-                'open': float(data.open_price),
-                'high': float(data.high_price),
-                'low': float(data.low_price),
-                'close': float(data.close_price),
-                'volume': float(data.volume)
-            } for data in market_data])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            fvg_data = []
-            
-            for i in range(1, len(df) - 1):
-                prev_candle = df.iloc[i-1]
-                current_candle = df.iloc[i]
-                next_candle = df.iloc[i+1]
-                
-                # Bullish FVG: Previous candle high < Next candle low
-                if prev_candle['high'] < next_candle['low']:
-                    fvg_data.append({
-                        'type': 'BULLISH',
-                        'start': prev_candle['high'],
-                        'end': next_candle['low'],
-                        'strength': (next_candle['low'] - prev_candle['high']) / prev_candle['close'],
-                        'timestamp': current_candle['timestamp']
-                    })
-                
-                # Bearish FVG: Previous candle low > Next candle high
-                elif prev_candle['low'] > next_candle['high']:
-                    fvg_data.append({
-                        'type': 'BEARISH',
-                        'start': next_candle['high'],
-                        'end': prev_candle['low'],
-                        'strength': (prev_candle['low'] - next_candle['high']) / prev_candle['close'],
-                        'timestamp': current_candle['timestamp']
-                    })
-            
-            return {
-                'fvg_data': fvg_data,
-                'latest_fvg': fvg_data[-1] if fvg_data else None,
-                'fvg_count': len(fvg_data)
-            }
-            
+            return self._fair_value_gap(self.get_bars(symbol, timeframe, lookback))
         except Exception as e:
             logger.error(f"Error calculating FVG for {symbol.symbol}: {e}")
             return None
-    
-    def calculate_liquidity_swings(self, symbol: Symbol, lookback: int = 100) -> Optional[Dict]:
+
+    def calculate_liquidity_swings(self, symbol: Symbol, lookback: int = 100,
+                                   timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate Liquidity Swings indicator
         Identifies areas where liquidity is likely to be found
         """
         try:
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:lookback]
-            
-            if len(market_data) < 20:
-                return None
-                
-            df = pd.DataFrame([{
-                'timestamp': data.timestamp,
-                'open': float(data.open_price),
-                'high': float(data.high_price),
-                'low': float(data.low_price),
-                'close': float(data.close_price),
-                'volume': float(data.volume)
-            } for data in market_data])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            # Calculate swing highs and lows
-            swing_highs = []
-            swing_lows = []
-            
-            for i in range(5, len(df) - 5):
-                current_high = df.iloc[i]['high']
-                current_low = df.iloc[i]['low']
-                
-                # Check for swing high
-                if all(current_high > df.iloc[i-j]['high'] for j in range(1, 6)) and \
-                   all(current_high > df.iloc[i+j]['high'] for j in range(1, 6)):
-                    swing_highs.append({
-                        'price': current_high,
-                        'timestamp': df.iloc[i]['timestamp'],
-                        'strength': self._calculate_swing_strength(df, i, 'high')
-                    })
-                
-                # Check for swing low
-                if all(current_low < df.iloc[i-j]['low'] for j in range(1, 6)) and \
-                   all(current_low < df.iloc[i+j]['low'] for j in range(1, 6)):
-                    swing_lows.append({
-                        'price': current_low,
-                        'timestamp': df.iloc[i]['timestamp'],
-                        'strength': self._calculate_swing_strength(df, i, 'low')
-                    })
-            
-            return {
-                'swing_highs': swing_highs,
-                'swing_lows': swing_lows,
-                'latest_swing_high': swing_highs[-1] if swing_highs else None,
-                'latest_swing_low': swing_lows[-1] if swing_lows else None
-            }
-            
+            return self._liquidity_swings(self.get_bars(symbol, timeframe, lookback))
         except Exception as e:
             logger.error(f"Error calculating Liquidity Swings for {symbol.symbol}: {e}")
             return None
-    
-    def calculate_nadaraya_watson_envelope(self, symbol: Symbol, period: int = 20, bandwidth: float = 0.1) -> Optional[Dict]:
+
+    def calculate_nadaraya_watson_envelope(self, symbol: Symbol, period: int = 20, bandwidth: float = 0.1,
+                                           timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate Nadaraya-Watson Envelope indicator
         Creates dynamic support and resistance levels
         """
         try:
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:period * 2]
-            
-            if len(market_data) < period:
-                return None
-                
-            df = pd.DataFrame([{
-                'timestamp': data.timestamp,
-                'close': float(data.close_price)
-            } for data in market_data])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            # Calculate Nadaraya-Watson regression
-            x = np.arange(len(df))
-            y = df['close'].values
-            
-            # Calculate weights using Gaussian kernel
-            weights = np.exp(-0.5 * ((x - len(x) + 1) / (bandwidth * len(x))) ** 2)
-            
-            # Calculate weighted regression
-            weighted_sum = np.sum(weights * y)
-            weight_sum = np.sum(weights)
-            
-            if weight_sum == 0:
-                return None
-                
-            nw_value = weighted_sum / weight_sum
-            
-            # Calculate envelope bands
-            price_std = np.std(y)
-            upper_band = nw_value + (2 * price_std)
-            lower_band = nw_value - (2 * price_std)
-            
-            return {
-                'nw_value': nw_value,
-                'upper_band': upper_band,
-                'lower_band': lower_band,
-                'current_price': float(df.iloc[-1]['close']),
-                'timestamp': df.iloc[-1]['timestamp']
-            }
-            
+            return self._nadaraya_watson_envelope(self.get_bars(symbol, timeframe, period * 2), period, bandwidth)
         except Exception as e:
             logger.error(f"Error calculating Nadaraya-Watson Envelope for {symbol.symbol}: {e}")
             return None
-    
-    def calculate_pivot_points(self, symbol: Symbol, period: int = 1) -> Optional[Dict]:
+
+    def calculate_pivot_points(self, symbol: Symbol, period: int = 1,
+                               timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate Standard Pivot Points
         """
         try:
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:period + 1]
-            
-            if len(market_data) < period + 1:
-                return None
-                
-            # Get previous day's OHLC
-            prev_data = market_data[1]  # Previous day
-            high = float(prev_data.high_price)
-            low = float(prev_data.low_price)
-            close = float(prev_data.close_price)
-            
-            # Calculate pivot point
-            pivot = (high + low + close) / 3
-            
-            # Calculate resistance and support levels
-            r1 = 2 * pivot - low
-            r2 = pivot + (high - low)
-            r3 = high + 2 * (pivot - low)
-            
-            s1 = 2 * pivot - high
-            s2 = pivot - (high - low)
-            s3 = low - 2 * (high - pivot)
-            
-            return {
-                'pivot': pivot,
-                'r1': r1, 'r2': r2, 'r3': r3,
-                's1': s1, 's2': s2, 's3': s3,
-                'timestamp': market_data[0].timestamp
-            }
-            
+            return self._pivot_points(self.get_bars(symbol, timeframe, period + 1), period)
         except Exception as e:
             logger.error(f"Error calculating Pivot Points for {symbol.symbol}: {e}")
             return None
-    
-    def calculate_rsi_divergence(self, symbol: Symbol, period: int = 14, lookback: int = 50) -> Optional[Dict]:
+
+    def calculate_rsi_divergence(self, symbol: Symbol, period: int = 14, lookback: int = 50,
+                                 timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate RSI Divergence indicator
         Identifies divergences between price and RSI
         """
         try:
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:lookback]
-            
-            if len(market_data) < period + 10:
-                return None
-                
-            df = pd.DataFrame([{
-                'timestamp': data.timestamp,
-                'close': float(data.close_price)
-            } for data in market_data])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            # Calculate RSI
-            rsi_values = self._calculate_rsi_values(df['close'].values, period)
-            df['rsi'] = rsi_values
-            
-            # Find divergences
-            divergences = []
-            
-            for i in range(period + 5, len(df) - 5):
-                # Look for price and RSI peaks/troughs
-                price_peak = self._is_peak(df['close'].values, i, 5)
-                rsi_peak = self._is_peak(df['rsi'].values, i, 5)
-                
-                price_trough = self._is_trough(df['close'].values, i, 5)
-                rsi_trough = self._is_trough(df['rsi'].values, i, 5)
-                
-                # Bullish divergence: Price makes lower low, RSI makes higher low
-                if price_trough and rsi_trough:
-                    prev_trough_idx = self._find_previous_trough(df['close'].values, i)
-                    if prev_trough_idx is not None:
-                        if (df.iloc[i]['close'] < df.iloc[prev_trough_idx]['close'] and 
-                            df.iloc[i]['rsi'] > df.iloc[prev_trough_idx]['rsi']):
-                            divergences.append({
-                                'type': 'BULLISH_DIVERGENCE',
-                                'timestamp': df.iloc[i]['timestamp'],
-                                'strength': abs(df.iloc[i]['rsi'] - df.iloc[prev_trough_idx]['rsi'])
-                            })
-                
-                # Bearish divergence: Price makes higher high, RSI makes lower high
-                if price_peak and rsi_peak:
-                    prev_peak_idx = self._find_previous_peak(df['close'].values, i)
-                    if prev_peak_idx is not None:
-                        if (df.iloc[i]['close'] > df.iloc[prev_peak_idx]['close'] and 
-                            df.iloc[i]['rsi'] < df.iloc[prev_peak_idx]['rsi']):
-                            divergences.append({
-                                'type': 'BEARISH_DIVERGENCE',
-                                'timestamp': df.iloc[i]['timestamp'],
-                                'strength': abs(df.iloc[i]['rsi'] - df.iloc[prev_peak_idx]['rsi'])
-                            })
-            
-            return {
-                'divergences': divergences,
-                'latest_divergence': divergences[-1] if divergences else None,
-                'divergence_count': len(divergences)
-            }
-            
+            return self._rsi_divergence(self.get_bars(symbol, timeframe, lookback), period)
         except Exception as e:
             logger.error(f"Error calculating RSI Divergence for {symbol.symbol}: {e}")
             return None
-    
-    def calculate_stochastic_rsi(self, symbol: Symbol, rsi_period: int = 14, stoch_period: int = 14) -> Optional[Dict]:
+
+    def calculate_stochastic_rsi(self, symbol: Symbol, rsi_period: int = 14, stoch_period: int = 14,
+                                 timeframe: str = DEFAULT_TIMEFRAME) -> Optional[Dict]:
         """
         Calculate Stochastic RSI indicator
         """
         try:
-            market_data = MarketData.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:rsi_period + stoch_period + 10]
-            
-            if len(market_data) < rsi_period + stoch_period:
-                return None
-                
-            df = pd.DataFrame([{
-                'timestamp': data.timestamp,
-                'close': float(data.close_price)
-            } for data in market_data])
-            
-            df = df.sort_values('timestamp').reset_index(drop=True)
-            
-            # Calculate RSI
-            rsi_values = self._calculate_rsi_values(df['close'].values, rsi_period)
-            df['rsi'] = rsi_values
-            
-            # Calculate Stochastic RSI
-            stoch_rsi_values = []
-            for i in range(rsi_period + stoch_period - 1, len(df)):
-                rsi_window = df['rsi'].iloc[i-stoch_period+1:i+1]
-                rsi_min = rsi_window.min()
-                rsi_max = rsi_window.max()
-                
-                if rsi_max - rsi_min == 0:
-                    stoch_rsi = 50
-                else:
-                    stoch_rsi = ((df.iloc[i]['rsi'] - rsi_min) / (rsi_max - rsi_min)) * 100
-                
-                stoch_rsi_values.append(stoch_rsi)
-            
-            # Pad with None values for alignment
-            stoch_rsi_values = [None] * (rsi_period + stoch_period - 1) + stoch_rsi_values
-            df['stoch_rsi'] = stoch_rsi_values
-            
-            latest_stoch_rsi = stoch_rsi_values[-1] if stoch_rsi_values else None
-            
-            return {
-                'stoch_rsi': latest_stoch_rsi,
-                'timestamp': df.iloc[-1]['timestamp'],
-                'overbought': latest_stoch_rsi > 80 if latest_stoch_rsi else False,
-                'oversold': latest_stoch_rsi < 20 if latest_stoch_rsi else False
-            }
-            
+            bars = self.get_bars(symbol, timeframe, rsi_period + stoch_period + 10)
+            return self._stochastic_rsi(bars, rsi_period, stoch_period)
         except Exception as e:
             logger.error(f"Error calculating Stochastic RSI for {symbol.symbol}: {e}")
             return None
-    
-    def _calculate_swing_strength(self, df: pd.DataFrame, idx: int, swing_type: str) -> float:
-        """Calculate the strength of a swing point"""
-        try:
-            if swing_type == 'high':
-                current_value = df.iloc[idx]['high']
-                # Compare with surrounding values
-                surrounding_values = []
-                for i in range(max(0, idx-5), min(len(df), idx+6)):
-                    if i != idx:
-                        surrounding_values.append(df.iloc[i]['high'])
-                
-                if surrounding_values:
-                    avg_surrounding = np.mean(surrounding_values)
-                    return (current_value - avg_surrounding) / avg_surrounding
-            else:  # low
-                current_value = df.iloc[idx]['low']
-                surrounding_values = []
-                for i in range(max(0, idx-5), min(len(df), idx+6)):
-                    if i != idx:
-                        surrounding_values.append(df.iloc[i]['low'])
-                
-                if surrounding_values:
-                    avg_surrounding = np.mean(surrounding_values)
-                    return (avg_surrounding - current_value) / avg_surrounding
-            
-            return 0.0
-        except:
-            return 0.0
-    
-    def _calculate_rsi_values(self, prices: np.ndarray, period: int) -> List[float]:
-        """Calculate RSI values"""
-        try:
-            deltas = np.diff(prices)
-            gains = np.where(deltas > 0, deltas, 0)
-            losses = np.where(deltas < 0, -deltas, 0)
-            
-            avg_gains = []
-            avg_losses = []
-            
-            for i in range(len(prices)):
-                if i < period:
-                    avg_gains.append(None)
-                    avg_losses.append(None)
-                else:
-                    avg_gain = np.mean(gains[i-period:i])
-                    avg_loss = np.mean(losses[i-period:i])
-                    avg_gains.append(avg_gain)
-                    avg_losses.append(avg_loss)
-            
-            rsi_values = []
-            for i in range(len(prices)):
-                if avg_gains[i] is None or avg_losses[i] is None:
-                    rsi_values.append(None)
-                else:
-                    if avg_losses[i] == 0:
-                        rsi = 100
-                    else:
-                        rs = avg_gains[i] / avg_losses[i]
-                        rsi = 100 - (100 / (1 + rs))
-                    rsi_values.append(rsi)
-            
-            return rsi_values
-        except:
-            return [None] * len(prices)
-    
-    def _is_peak(self, values: np.ndarray, idx: int, window: int) -> bool:
-        """Check if value at index is a peak"""
-        if idx < window or idx >= len(values) - window:
-            return False
-        
-        current = values[idx]
-        for i in range(idx - window, idx + window + 1):
-            if i != idx and values[i] >= current:
-                return False
-        return True
-    
-    def _is_trough(self, values: np.ndarray, idx: int, window: int) -> bool:
-        """Check if value at index is a trough"""
-        if idx < window or idx >= len(values) - window:
-            return False
-        
-        current = values[idx]
-        for i in range(idx - window, idx + window + 1):
-            if i != idx and values[i] <= current:
-                return False
-        return True
-    
-    def _find_previous_peak(self, values: np.ndarray, current_idx: int) -> Optional[int]:
-        """Find the previous peak before current index"""
-        for i in range(current_idx - 1, 0, -1):
-            if self._is_peak(values, i, 3):
-                return i
-        return None
-    
-    def _find_previous_trough(self, values: np.ndarray, current_idx: int) -> Optional[int]:
-        """Find the previous trough before current index"""
-        for i in range(current_idx - 1, 0, -1):
-            if self._is_trough(values, i, 3):
-                return i
-        return None
 
+    def _fair_value_gap(self, bars: Dict[str, np.ndarray]) -> Optional[Dict]:
+        """Three-candle gaps: high of candle i-1 below low of candle i+1 (bullish) or the reverse"""
+        if len(bars['close']) < 3:
+            return None
+
+        detector = SMCDetector(bars['open'], bars['high'], bars['low'], bars['close'])
+        gaps = detector.fair_value_gaps(span=2)
+        # Gaps are reported at the middle candle, strength relative to the first candle's close
+        strengths = (gaps['top'] - gaps['bottom']) / bars['close'][gaps['index'] - 2]
+
+        fvg_data = [{
+            'type': 'BULLISH' if gap['direction'] == BULLISH else 'BEARISH',
+            'start': float(gap['bottom']),
+            'end': float(gap['top']),
+            'strength': float(strength),
+            'timestamp': bars['timestamp'][gap['index'] - 1]
+        } for gap, strength in zip(gaps, strengths)]
+
+        return {
+            'fvg_data': fvg_data,
+            'latest_fvg': fvg_data[-1] if fvg_data else None,
+            'fvg_count': len(fvg_data)
+        }
+
+    def _liquidity_swings(self, bars: Dict[str, np.ndarray], window: int = 5) -> Optional[Dict]:
+        """Swing highs/lows over +/- window candles with strength against the surrounding average"""
+        if len(bars['close']) < 20:
+            return None
+
+        detector = SMCDetector(bars['open'], bars['high'], bars['low'], bars['close'])
+        swings = detector.swings(window=window, strict=True)
+
+        swing_highs = []
+        swing_lows = []
+        for direction, prices, output in ((BULLISH, bars['high'], swing_highs), (BEARISH, bars['low'], swing_lows)):
+            idx = swings['index'][swings['direction'] == direction]
+            # Average of the 2 * window surrounding candles, the swing itself excluded
+            window_sums = np.convolve(prices, np.ones(2 * window + 1), mode='valid')
+            surrounding = (window_sums[idx - window] - prices[idx]) / (2 * window)
+            strength = (prices[idx] - surrounding) / surrounding * direction
+            output.extend({
+                'price': float(prices[i]),
+                'timestamp': bars['timestamp'][i],
+                'strength': float(value)
+            } for i, value in zip(idx, strength))
+
+        return {
+            'swing_highs': swing_highs,
+            'swing_lows': swing_lows,
+            'latest_swing_high': swing_highs[-1] if swing_highs else None,
+            'latest_swing_low': swing_lows[-1] if swing_lows else None
+        }
+
+    def _nadaraya_watson_envelope(self, bars: Dict[str, np.ndarray], period: int, bandwidth: float) -> Optional[Dict]:
+        """Gaussian kernel regression evaluated at every bar from a single kernel matrix"""
+        y = bars['close']
+        n = len(y)
+        if n < period:
+            return None
+
+        # kernel[i, j] weights bar j for the estimate at bar i, only past bars count
+        x = np.arange(n)
+        kernel = np.exp(-0.5 * ((x[None, :] - x[:, None]) / (bandwidth * n)) ** 2)
+        kernel = np.tril(kernel)
+        weight_sums = kernel.sum(axis=1)
+        if weight_sums[-1] == 0:
+            return None
+        nw_curve = kernel @ y / weight_sums
+        nw_value = float(nw_curve[-1])
+
+        # Calculate envelope bands
+        price_std = float(np.std(y))
+
+        return {
+            'nw_value': nw_value,
+            'upper_band': nw_value + (2 * price_std),
+            'lower_band': nw_value - (2 * price_std),
+            'nw_curve': nw_curve.tolist(),
+            'current_price': float(y[-1]),
+            'timestamp': bars['timestamp'][-1]
+        }
+
+    def _pivot_points(self, bars: Dict[str, np.ndarray], period: int = 1) -> Optional[Dict]:
+        """Standard pivot points from the previous bar"""
+        if len(bars['close']) < period + 1:
+            return None
+
+        # Get previous bar's HLC
+        high = float(bars['high'][-2])
+        low = float(bars['low'][-2])
+        close = float(bars['close'][-2])
+
+        # Calculate pivot point
+        pivot = (high + low + close) / 3
+
+        return {
+            'pivot': pivot,
+            'r1': 2 * pivot - low,
+            'r2': pivot + (high - low),
+            'r3': high + 2 * (pivot - low),
+            's1': 2 * pivot - high,
+            's2': pivot - (high - low),
+            's3': low - 2 * (high - pivot),
+            'timestamp': bars['timestamp'][-1]
+        }
+
+    def _rsi_divergence(self, bars: Dict[str, np.ndarray], period: int = 14, window: int = 5) -> Optional[Dict]:
+        """Divergences between price and RSI peaks/troughs"""
+        close = bars['close']
+        n = len(close)
+        if n < period + 10:
+            return None
+
+        rsi = self.wilder_rsi(close, period)
+        candidates = np.arange(n)
+        candidates = (candidates >= period + window) & (candidates < n - window)
+
+        divergences = []
+        for sign, kind in ((-1, 'BULLISH_DIVERGENCE'), (1, 'BEARISH_DIVERGENCE')):
+            # Peaks of sign * values are price/RSI peaks (sign=1) or troughs (sign=-1)
+            extremes = candidates & pivot_flags(sign * close, window) & pivot_flags(sign * rsi, window)
+
+            # Nearest narrower (+/- 3 candles) price extreme strictly before each bar
+            previous = np.where(pivot_flags(sign * close, 3), np.arange(n), -1)
+            previous = np.maximum.accumulate(np.r_[-1, previous[:-1]])
+
+            idx = np.flatnonzero(extremes & (previous >= 0))
+            prev_idx = previous[idx]
+            with np.errstate(invalid='ignore'):
+                diverging = (sign * close[idx] > sign * close[prev_idx]) & (sign * rsi[idx] < sign * rsi[prev_idx])
+            divergences.extend((i, {
+                'type': kind,
+                'timestamp': bars['timestamp'][i],
+                'strength': float(abs(rsi[i] - rsi[j]))
+            }) for i, j in zip(idx[diverging], prev_idx[diverging]))
+
+        divergences = [divergence for _, divergence in sorted(divergences, key=lambda item: item[0])]
+
+        return {
+            'divergences': divergences,
+            'latest_divergence': divergences[-1] if divergences else None,
+            'divergence_count': len(divergences)
+        }
+
+    def _stochastic_rsi(self, bars: Dict[str, np.ndarray], rsi_period: int = 14,
+                        stoch_period: int = 14) -> Optional[Dict]:
+        """Position of the latest RSI within its range over the last stoch_period bars"""
+        close = bars['close']
+        if len(close) < rsi_period + stoch_period:
+            return None
+
+        rsi = self.wilder_rsi(close, rsi_period)
+        rsi_window = rsi[-stoch_period:]
+        rsi_min = rsi_window.min()
+        rsi_max = rsi_window.max()
+
+        if rsi_max - rsi_min == 0:
+            latest_stoch_rsi = 50
+        else:
+            latest_stoch_rsi = float((rsi[-1] - rsi_min) / (rsi_max - rsi_min) * 100)
+
+        return {
+            'stoch_rsi': latest_stoch_rsi,
+            'timestamp': bars['timestamp'][-1],
+            'overbought': latest_stoch_rsi > 80 if latest_stoch_rsi else False,
+            'oversold': latest_stoch_rsi < 20 if latest_stoch_rsi else False
+        }
+
+    @staticmethod
+    def wilder_rsi(prices: np.ndarray, period: int = 14) -> np.ndarray:
+        """
+        Wilder's RSI, NaN for the first `period` prices.
+        Average gain/loss are seeded with a simple mean and then smoothed with
+        the recursive filter avg = avg + (value - avg) / period.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        rsi = np.full(len(prices), np.nan)
+        if len(prices) <= period:
+            return rsi
+
+        deltas = np.diff(prices)
+
+        def smooth(values):
+            seeded = values[period - 1:].copy()
+            seeded[0] = values[:period].mean()
+            return pd.Series(seeded).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+        avg_gain = smooth(np.clip(deltas, 0, None))
+        avg_loss = smooth(np.clip(-deltas, 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi[period:] = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        return rsi
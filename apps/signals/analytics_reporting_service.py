@@ -14,6 +14,7 @@ from django.utils import timezone
 from django.db.models import Q, Count, Avg, Max, Min, Sum, F
 from django.core.cache import cache
 
+from apps.core.shared_cache import get_shared_cache
 from apps.trading.models import Symbol
 from apps.data.models import MarketData, TechnicalIndicator
 from apps.signals.models import TradingSignal, SignalAlert, SignalPerformance
@@ -66,46 +67,46 @@ class AnalyticsReportingService:
         try:
             logger.info(f"Generating comprehensive report for last {period_hours} hours...")
             
-            # Check cache first
-            cache_key = f"comprehensive_report_{period_hours}h"
-            cached_report = cache.get(cache_key)
-            if cached_report:
-                logger.info("Using cached comprehensive report")
-                return cached_report
-            
-            # Calculate time range
-            end_time = timezone.now()
-            start_time = end_time - timedelta(hours=period_hours)
-            
-            # Generate report sections
-            report = {
-                'report_metadata': {
-                    'generated_at': end_time.isoformat(),
-                    'period_start': start_time.isoformat(),
-                    'period_end': end_time.isoformat(),
-                    'period_hours': period_hours,
-                    'report_type': 'comprehensive'
-                },
-                'executive_summary': self._generate_executive_summary(start_time, end_time),
-                'signal_analytics': self._generate_signal_analytics(start_time, end_time),
-                'performance_metrics': self._generate_performance_metrics(start_time, end_time),
-                'data_quality_analysis': self._generate_data_quality_analysis(start_time, end_time),
-                'system_health_analysis': self._generate_system_health_analysis(start_time, end_time),
-                'trend_analysis': self._generate_trend_analysis(start_time, end_time),
-                'recommendations': self._generate_recommendations(start_time, end_time),
-                'detailed_metrics': self._generate_detailed_metrics(start_time, end_time)
-            }
-            
-            # Cache the report
-            cache.set(cache_key, report, self.report_cache_timeout)
-            
-            logger.info("Comprehensive report generated successfully")
-            return report
+            # Shared between workers, only one of them builds an expired report
+            return get_shared_cache().get_or_refresh(
+                f"comprehensive_report_{period_hours}h",
+                lambda: self._build_comprehensive_report(period_hours),
+                self.report_cache_timeout,
+                lock_timeout=300
+            )
             
         except Exception as e:
             logger.error(f"Error generating comprehensive report: {e}")
             return {'error': str(e)}
     
+    def _build_comprehensive_report(self, period_hours: int) -> Dict[str, Any]:
+        """Build the comprehensive report without caching"""
+        # Calculate time range
+        end_time = timezone.now()
+        start_time = end_time - timedelta(hours=period_hours)
+        
+        # Generate report sections
+        report = {
+            'report_metadata': {
+                'generated_at': end_time.isoformat(),
+                'period_start': start_time.isoformat(),
+                'period_end': end_time.isoformat(),
+                'period_hours': period_hours,
+                'report_type': 'comprehensive'
+            },
+            'executive_summary': self._generate_executive_summary(start_time, end_time),
+            'signal_analytics': self._generate_signal_analytics(start_time, end_time),
+            'performance_metrics': self._generate_performance_metrics(start_time, end_time),
+            'data_quality_analysis': self._generate_data_quality_analysis(start_time, end_time),
+            'system_health_analysis': self._generate_system_health_analysis(start_time, end_time),
+            'trend_analysis': self._generate_trend_analysis(start_time, end_time),
+            'recommendations': self._generate_recommendations(start_time, end_time),
+            'detailed_metrics': self._generate_detailed_metrics(start_time, end_time)
+        }
+        
+        logger.info("Comprehensive report generated successfully")
+        return report
+    
     def _generate_executive_summary(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
         """Generate executive summary"""
         try:
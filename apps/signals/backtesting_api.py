@@ -23,7 +23,9 @@ from apps.trading.models import Symbol
 from apps.signals.models import TradingSignal, SignalType
 from apps.analytics.models import BacktestResult
 from apps.data.models import MarketData
+from apps.signals.price_path import PricePath
 from django.db.models import Min, Max, Avg
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -371,6 +373,7 @@ class BacktestAPIView(View):
                 })
             
             # Simulate signal execution
+            price_path = PricePath.from_dataframe(historical_data)
             executed_signals = []
             for signal in signals:
                 # Convert TradingSignal object to dictionary format
@@ -385,7 +388,7 @@ class BacktestAPIView(View):
                     'risk_reward_ratio': float(signal.risk_reward_ratio)
                 }
                 
-                execution_result = self._simulate_single_signal_execution(signal_dict, historical_data, symbol)
+                execution_result = self._simulate_single_signal_execution(signal_dict, price_path, symbol)
                 if execution_result['is_executed']:
                     executed_signals.append({
                         'signal': signal_dict,
@@ -637,7 +640,7 @@ class BacktestAPIView(View):
                 base_symbol = Symbol.objects.get(symbol=base_symbol_name)
             except Symbol.DoesNotExist:
                 logger.error(f"Symbol {base_symbol_name} not found in database")
-                return {}
+                return PricePath.empty()
             
             # First try to get data from database using base symbol
             market_data = MarketData.objects.filter(
@@ -646,19 +649,13 @@ class BacktestAPIView(View):
                 timestamp__lte=end_date
             ).order_by('timestamp')
             
-            price_data = {}
+            rows = list(market_data.values_list(
+                'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+            ))
             
-            if market_data.exists():
+            if rows:
                 # Use existing database data
-                for data_point in market_data:
-                    timestamp = data_point.timestamp
-                    price_data[timestamp] = {
-                        'open': float(data_point.open_price),
-                        'high': float(data_point.high_price),
-                        'low': float(data_point.low_price),
-                        'close': float(data_point.close_price),
-                        'volume': float(data_point.volume)
-                    }
+                price_data = PricePath.from_rows(rows)
                 logger.info(f"Retrieved {len(price_data)} price data points from database for execution simulation")
             else:
                 # Fetch real historical data from Binance API
@@ -666,24 +663,29 @@ class BacktestAPIView(View):
                 historical_data = get_historical_data(symbol.symbol, start_date, end_date, '1h')
                 
                 if historical_data:
-                    for data_point in historical_data:
-                        timestamp = data_point['timestamp']
-                        price_data[timestamp] = {
-                            'open': data_point['open'],
-                            'high': data_point['high'],
-                            'low': data_point['low'],
-                            'close': data_point['close'],
-                            'volume': data_point['volume']
-                        }
+                    price_data = PricePath.from_records(historical_data)
                     logger.info(f"Retrieved {len(price_data)} real historical price data points for execution simulation")
                 else:
+                    price_data = PricePath.empty()
                     logger.warning(f"No historical data available for {symbol.symbol} in range {start_date} to {end_date}")
             
             return price_data
             
         except Exception as e:
             logger.error(f"Error getting historical price data: {e}")
-            return {}
+            return PricePath.empty()
+    
+    @staticmethod
+    def _as_price_path(historical_data):
+        """Accept a PricePath, a timestamp-indexed DataFrame or a {timestamp: bar} dict"""
+        if isinstance(historical_data, PricePath):
+            return historical_data
+        if isinstance(historical_data, pd.DataFrame):
+            return PricePath.from_dataframe(historical_data)
+        return PricePath.from_rows(
+            (timestamp, bar['open'], bar['high'], bar['low'], bar['close'], bar.get('volume', 0.0))
+            for timestamp, bar in (historical_data or {}).items()
+        )
     
     def _simulate_single_signal_execution(self, signal, historical_data, symbol):
         """Simulate execution of a single signal"""
@@ -730,16 +732,13 @@ class BacktestAPIView(View):
             execution_window = timedelta(days=7)
             end_time = signal_time + execution_window
             
-            # Find price data points within the execution window
-            relevant_price_data = []
-            for timestamp, price_data in historical_data.items():
-                if timestamp >= signal_time and timestamp <= end_time:
-                    relevant_price_data.append((timestamp, price_data))
-            
-            # Sort by timestamp to process chronologically
-            relevant_price_data.sort(key=lambda x: x[0])
+            # Locate the window with searchsorted and find the first target/stop touch
+            price_path = self._as_price_path(historical_data)
+            exit_point = price_path.first_exit(
+                signal_time, end_time, target_price, stop_loss, signal_type in ['BUY', 'STRONG_BUY']
+            )
             
-            if not relevant_price_data:
+            if exit_point is None:
                 # No price data found, mark as not executed
                 return {
                     'is_executed': False,
@@ -750,46 +749,9 @@ class BacktestAPIView(View):
                     'execution_status': 'NO_DATA'
                 }
             
-            # Process price data chronologically to find execution
-            execution_price = None
-            execution_time = None
-            execution_status = 'NOT_EXECUTED'
-            
-            for timestamp, price_data in relevant_price_data:
-                high_price = price_data['high']
-                low_price = price_data['low']
-                
-                if signal_type in ['BUY', 'STRONG_BUY']:
-                    # For buy signals, check if price hit target (above entry) or stop loss (below entry)
-                    if high_price >= target_price:
-                        execution_price = target_price
-                        execution_time = timestamp
-                        execution_status = 'TARGET_HIT'
-                        break
-                    elif low_price <= stop_loss:
-                        execution_price = stop_loss
-                        execution_time = timestamp
-                        execution_status = 'STOP_LOSS_HIT'
-                        break
-                else:  # SELL or STRONG_SELL
-                    # For sell signals, check if price hit target (below entry) or stop loss (above entry)
-                    if low_price <= target_price:
-                        execution_price = target_price
-                        execution_time = timestamp
-                        execution_status = 'TARGET_HIT'
-                        break
-                    elif high_price >= stop_loss:
-                        execution_price = stop_loss
-                        execution_time = timestamp
-                        execution_status = 'STOP_LOSS_HIT'
-                        break
-            
-            # If no target or stop loss was hit, execute at the last available price
-            if execution_price is None and relevant_price_data:
-                last_timestamp, last_price_data = relevant_price_data[-1]
-                execution_price = last_price_data['close']
-                execution_time = last_timestamp
-                execution_status = 'CLOSE_PRICE'
+            # If no target or stop loss was hit, execution is at the last available close
+            exit_index, execution_status, execution_price = exit_point
+            execution_time = price_path.datetimes[exit_index]
             
             # Calculate profit/loss based on whether target or stop loss was hit
             if execution_price is not None:
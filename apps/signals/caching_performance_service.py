@@ -3,9 +3,11 @@ Phase 5.5: Caching and Performance Optimization Service
 Implements caching strategies and performance optimizations
 """
 
+import atexit
 import logging
 import time
 import threading
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from django.core.cache import cache
@@ -23,6 +25,7 @@ from apps.signals.models import (
     ChartImage, ChartPattern, EntryPoint, ChartMLModel, ChartMLPrediction,
     TradingSignal, SignalHistory
 )
+from apps.signals.task_executor import BoundedTaskExecutor, SQLiteTaskSpill, TaskQueueFull
 
 logger = logging.getLogger(__name__)
 
@@ -522,69 +525,24 @@ class AsyncProcessingService:
     
     def __init__(self):
         self.async_config = {
-            'enabled': True,
-            'max_workers': 4,
-            'queue_size': 1000,
-            'timeout': 30,
-            'retry_attempts': 3
+            'enabled': getattr(settings, 'ASYNC_TASK_ENABLED', True),
+            'max_workers': getattr(settings, 'ASYNC_TASK_WORKERS', 4),
+            'queue_size': getattr(settings, 'ASYNC_TASK_QUEUE_SIZE', 1000),
+            'timeout': getattr(settings, 'ASYNC_TASK_TIMEOUT', 30),
         }
         
-        # Task queue
-        self.task_queue = []
-        self.worker_threads = []
-        
-        # Start worker threads
-        if self.async_config['enabled']:
-            self._start_workers()
+        # Workers and queue are shared by every instance of the service
+        self.executor = get_async_executor() if self.async_config['enabled'] else None
     
-    def _start_workers(self):
-        """Start worker threads for async processing"""
-        try:
-            for i in range(self.async_config['max_workers']):
-                worker = threading.Thread(
-                    target=self._worker_loop,
-                    name=f"AsyncWorker-{i}",
-                    daemon=True
-                )
-                worker.start()
-                self.worker_threads.append(worker)
-                
-            logger.info(f"Started {self.async_config['max_workers']} async worker threads")
-            
-        except Exception as e:
-            logger.error(f"Error starting async workers: {e}")
-    
-    def _worker_loop(self):
-        """Worker thread loop"""
-        while True:
-            try:
-                if self.task_queue:
-                    task = self.task_queue.pop(0)
-                    self._process_task(task)
-                else:
-                    time.sleep(0.1)  # Wait for tasks
-                    
-            except Exception as e:
-                logger.error(f"Error in worker loop: {e}")
-                time.sleep(1)
-    
-    def _process_task(self, task: Dict[str, Any]):
+    def _process_task(self, task_type: str, task_data: Dict[str, Any]):
         """Process an async task"""
-        try:
-            task_type = task.get('type')
-            task_data = task.get('data', {})
-            
-            if task_type == 'signal_generation':
-                self._process_signal_generation_task(task_data)
-            elif task_type == 'ml_prediction':
-                self._process_ml_prediction_task(task_data)
-            elif task_type == 'pattern_detection':
-                self._process_pattern_detection_task(task_data)
-            else:
-                logger.warning(f"Unknown task type: {task_type}")
-                
-        except Exception as e:
-            logger.error(f"Error processing task: {e}")
+        if task_type == 'signal_generation':
+            return self._process_signal_generation_task(task_data)
+        elif task_type == 'ml_prediction':
+            return self._process_ml_prediction_task(task_data)
+        elif task_type == 'pattern_detection':
+            return self._process_pattern_detection_task(task_data)
+        raise ValueError(f"Unknown task type: {task_type}")
     
     def _process_signal_generation_task(self, task_data: Dict[str, Any]):
         """Process signal generation task"""
@@ -631,47 +589,92 @@ class AsyncProcessingService:
             logger.error(f"Error processing pattern detection task: {e}")
     
     def queue_task(self, task_type: str, task_data: Dict[str, Any]) -> bool:
-        """Queue an async task"""
+        """
+        Queue an async task without blocking.
+        
+        When the queue is full the task is spilled to ASYNC_TASK_SPILL_PATH if
+        one is configured, otherwise it is rejected and False is returned.
+        """
         try:
-            if not self.async_config['enabled']:
+            if self.executor is None:
                 return False
             
-            if len(self.task_queue) >= self.async_config['queue_size']:
-                logger.warning("Task queue is full")
-                return False
-            
-            task = {
-                'type': task_type,
-                'data': task_data,
-                'queued_at': timezone.now().isoformat(),
-                'retry_count': 0
-            }
-            
-            self.task_queue.append(task)
+            self.executor.submit_named(task_type, task_data)
             logger.debug(f"Queued {task_type} task")
             return True
             
+        except TaskQueueFull:
+            logger.warning("Task queue is full")
+            return False
         except Exception as e:
             logger.error(f"Error queueing task: {e}")
             return False
     
+    def submit_task(self, task_type: str, task_data: Dict[str, Any], timeout: Optional[float] = None,
+                    wait: Optional[float] = None) -> Optional[Future]:
+        """
+        Queue an async task and return its Future.
+        
+        Waits up to `wait` seconds for room in the queue (back-pressure) and
+        raises TaskQueueFull after that. The future fails with TimeoutError
+        when the task does not finish within `timeout` seconds.
+        """
+        if self.executor is None:
+            return None
+        return self.executor.submit_named(task_type, task_data, timeout=timeout, block=True, wait=wait)
+    
     def get_queue_status(self) -> Dict[str, Any]:
         """Get async queue status"""
         try:
-            return {
-                'enabled': self.async_config['enabled'],
-                'queue_size': len(self.task_queue),
+            status = self.executor.status() if self.executor is not None else {
+                'queue_size': 0,
                 'max_queue_size': self.async_config['queue_size'],
-                'worker_count': len(self.worker_threads),
+                'worker_count': 0,
                 'max_workers': self.async_config['max_workers'],
-                'timestamp': timezone.now().isoformat()
             }
+            status.update(
+                enabled=self.async_config['enabled'],
+                timestamp=timezone.now().isoformat()
+            )
+            return status
             
         except Exception as e:
             logger.error(f"Error getting queue status: {e}")
             return {}
 
 
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def _run_async_task(task_type: str, task_data: Dict[str, Any]):
+    return AsyncProcessingService()._process_task(task_type, task_data)
+
+
+def get_async_executor() -> BoundedTaskExecutor:
+    """Process-wide bounded executor behind AsyncProcessingService, drained at exit"""
+    global _async_executor
+    with _async_executor_lock:
+        if _async_executor is None:
+            spill_path = getattr(settings, 'ASYNC_TASK_SPILL_PATH', None)
+            _async_executor = BoundedTaskExecutor(
+                max_workers=getattr(settings, 'ASYNC_TASK_WORKERS', 4),
+                queue_size=getattr(settings, 'ASYNC_TASK_QUEUE_SIZE', 1000),
+                default_timeout=getattr(settings, 'ASYNC_TASK_TIMEOUT', 30),
+                handler=_run_async_task,
+                spill=SQLiteTaskSpill(spill_path) if spill_path else None,
+            )
+            atexit.register(_async_executor.shutdown, timeout=getattr(settings, 'ASYNC_TASK_SHUTDOWN_TIMEOUT', 10))
+        return _async_executor
+
+
+def set_async_executor(executor: Optional[BoundedTaskExecutor]):
+    """Replace the process-wide executor (used by tests)"""
+    global _async_executor
+    with _async_executor_lock:
+        _async_executor = executor
+
+
 
 
 
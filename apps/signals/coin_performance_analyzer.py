@@ -7,85 +7,120 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional
 from decimal import Decimal
+from django.core.paginator import Paginator
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, Q, Sum
 
 from apps.trading.models import Symbol
 from apps.signals.models import TradingSignal
-from apps.data.models import MarketData
 
 logger = logging.getLogger(__name__)
 
+DETAIL_PAGE_SIZE = 50
+
+
 class CoinPerformanceAnalyzer:
     """Analyzes individual signals and calculates profit percentage per coin"""
     
     def __init__(self):
         self.analysis_date = timezone.now()
     
-    def analyze_coin_signals(self, symbol: Symbol, start_date: datetime, end_date: datetime) -> Dict:
-        """Analyze all signals for a specific coin with individual status"""
+    def analyze_coin_signals(self, symbol: Symbol, start_date: datetime, end_date: datetime,
+                             page: Optional[int] = None, page_size: int = DETAIL_PAGE_SIZE) -> Dict:
+        """
+        Analyze all signals for a specific coin.
+        
+        The summary comes from one aggregate query; per-signal rows are only
+        loaded when a detail page is requested.
+        """
         try:
-            # Get all backtesting signals for this symbol
-            signals = TradingSignal.objects.filter(
-                symbol=symbol,
-                metadata__is_backtesting=True,
-                created_at__gte=start_date,
-                created_at__lte=end_date
-            ).select_related('signal_type').order_by('created_at')
-            
-            if not signals.exists():
+            summary = self.summarize_coins([symbol], start_date, end_date).get(symbol.id)
+            if summary is None:
                 return self._empty_coin_analysis(symbol)
             
-            # Analyze each signal individually
-            signal_details = []
-            total_investment = Decimal('0')
-            total_profit_loss = Decimal('0')
+            analysis = self._coin_analysis(symbol, start_date, end_date, summary)
+            if page is not None:
+                analysis.update(self.get_signal_details(symbol, start_date, end_date, page, page_size))
+            return analysis
             
-            for signal in signals:
-                signal_analysis = self._analyze_individual_signal(signal)
-                signal_details.append(signal_analysis)
-                
-                # Calculate total investment and profit/loss
-                if signal.entry_price:
-                    total_investment += signal.entry_price
-                
-                if signal.profit_loss:
-                    total_profit_loss += signal.profit_loss
+        except Exception as e:
+            logger.error(f"Error analyzing coin signals for {symbol.symbol}: {e}")
+            return self._empty_coin_analysis(symbol)
+    
+    def summarize_coins(self, symbols: List[Symbol], start_date: datetime, end_date: datetime) -> Dict[int, Dict]:
+        """Summary counts and totals of every symbol's signals in one grouped query, keyed by symbol id"""
+        executed = Q(is_executed=True)
+        rows = self._backtesting_signals(symbols, start_date, end_date).values('symbol_id').annotate(
+            total_signals=Count('id'),
+            profit_signals=Count('id', filter=executed & Q(profit_loss__gt=0)),
+            loss_signals=Count('id', filter=executed & Q(profit_loss__lte=0)),
+            not_opened_signals=Count('id', filter=Q(is_executed=False)),
+            total_investment=Sum('entry_price'),
+            total_profit_loss=Sum('profit_loss'),
+        ).order_by()
+        
+        summaries = {}
+        for row in rows:
+            total_investment = row['total_investment'] or Decimal('0')
+            total_profit_loss = row['total_profit_loss'] or Decimal('0')
             
             # Calculate total profit percentage
             total_profit_percentage = 0
             if total_investment > 0:
                 total_profit_percentage = (total_profit_loss / total_investment) * 100
             
-            # Count signal statuses
-            profit_count = sum(1 for s in signal_details if s['status'] == 'PROFIT')
-            loss_count = sum(1 for s in signal_details if s['status'] == 'LOSS')
-            not_opened_count = sum(1 for s in signal_details if s['status'] == 'NOT_OPENED')
-            
-            return {
-                'symbol': symbol.symbol,
-                'symbol_name': symbol.name,
-                'analysis_date': self.analysis_date.strftime('%Y-%m-%d %H:%M:%S'),
-                'period': {
-                    'start_date': start_date.strftime('%Y-%m-%d'),
-                    'end_date': end_date.strftime('%Y-%m-%d'),
-                    'days': (end_date - start_date).days
-                },
-                'total_summary': {
-                    'total_signals': len(signal_details),
-                    'profit_signals': profit_count,
-                    'loss_signals': loss_count,
-                    'not_opened_signals': not_opened_count,
-                    'total_investment': float(total_investment),
-                    'total_profit_loss': float(total_profit_loss),
-                    'total_profit_percentage': round(float(total_profit_percentage), 2)
-                },
-                'individual_signals': signal_details
+            summaries[row['symbol_id']] = {
+                'total_signals': row['total_signals'],
+                'profit_signals': row['profit_signals'],
+                'loss_signals': row['loss_signals'],
+                'not_opened_signals': row['not_opened_signals'],
+                'total_investment': float(total_investment),
+                'total_profit_loss': float(total_profit_loss),
+                'total_profit_percentage': round(float(total_profit_percentage), 2)
             }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing coin signals for {symbol.symbol}: {e}")
-            return self._empty_coin_analysis(symbol)
+        return summaries
+    
+    def get_signal_details(self, symbol: Symbol, start_date: datetime, end_date: datetime,
+                           page: int = 1, page_size: int = DETAIL_PAGE_SIZE) -> Dict:
+        """One page of per-signal status rows, oldest first"""
+        signals = self._backtesting_signals([symbol], start_date, end_date).select_related(
+            'signal_type'
+        ).order_by('created_at', 'id')
+        paginator = Paginator(signals, page_size)
+        page_obj = paginator.get_page(page)
+        
+        return {
+            'individual_signals': [self._analyze_individual_signal(signal) for signal in page_obj],
+            'pagination': {
+                'page': page_obj.number,
+                'page_size': page_size,
+                'total_pages': paginator.num_pages,
+                'total_signals': paginator.count,
+                'has_next': page_obj.has_next()
+            }
+        }
+    
+    def _backtesting_signals(self, symbols: List[Symbol], start_date: datetime, end_date: datetime):
+        return TradingSignal.objects.filter(
+            symbol_id__in=[symbol.id for symbol in symbols],
+            metadata__is_backtesting=True,
+            created_at__gte=start_date,
+            created_at__lte=end_date
+        )
+    
+    def _coin_analysis(self, symbol: Symbol, start_date: datetime, end_date: datetime, summary: Dict) -> Dict:
+        return {
+            'symbol': symbol.symbol,
+            'symbol_name': symbol.name,
+            'analysis_date': self.analysis_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'period': {
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'end_date': end_date.strftime('%Y-%m-%d'),
+                'days': (end_date - start_date).days
+            },
+            'total_summary': summary,
+            'individual_signals': []
+        }
     
     def _analyze_individual_signal(self, signal: TradingSignal) -> Dict:
         """Analyze individual signal status"""
@@ -170,11 +205,16 @@ class CoinPerformanceAnalyzer:
     def analyze_multiple_coins(self, symbols: List[Symbol], start_date: datetime, end_date: datetime) -> List[Dict]:
         """Analyze multiple coins and return their performance"""
         try:
-            analyses = []
+            symbols = list(symbols)
+            summaries = self.summarize_coins(symbols, start_date, end_date)
             
+            analyses = []
             for symbol in symbols:
-                analysis = self.analyze_coin_signals(symbol, start_date, end_date)
-                analyses.append(analysis)
+                summary = summaries.get(symbol.id)
+                if summary is None:
+                    analyses.append(self._empty_coin_analysis(symbol))
+                else:
+                    analyses.append(self._coin_analysis(symbol, start_date, end_date, summary))
             
             # Sort by total profit percentage (descending)
             analyses.sort(key=lambda x: x['total_summary']['total_profit_percentage'], reverse=True)
@@ -16,8 +16,9 @@ import talib
 
 from apps.trading.models import Symbol
 from apps.data.models import MarketData, TechnicalIndicator
-from apps.signals.models import TradingSignal, SignalType
+from apps.signals.models import TradingSignal
 from apps.signals.services import SignalGenerationService
+from apps.signals.signal_persistence import SignalPersistencePipeline, get_signal_type
 
 logger = logging.getLogger(__name__)
 
@@ -372,8 +373,8 @@ class ComprehensiveBacktestingService:
                 signal_type_name = 'BUY' if row['positions'] > 0 else 'SELL'
                 
                 # Get or create signal type
-                signal_type, _ = SignalType.objects.get_or_create(
-                    name=signal_type_name,
+                signal_type = get_signal_type(
+                    signal_type_name,
                     defaults={'description': f'{signal_type_name} signal from SMA crossover'}
                 )
                 
@@ -456,8 +457,8 @@ class ComprehensiveBacktestingService:
                 
                 if signal_type_name:
                     # Get or create signal type
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name=signal_type_name,
+                    signal_type = get_signal_type(
+                        signal_type_name,
                         defaults={'description': f'{signal_type_name} signal from RSI'}
                     )
                     
@@ -537,8 +538,8 @@ class ComprehensiveBacktestingService:
                 signal_type_name = 'BUY' if row['macd_crossover'] > 0 else 'SELL'
                 
                 # Get or create signal type
-                signal_type, _ = SignalType.objects.get_or_create(
-                    name=signal_type_name,
+                signal_type = get_signal_type(
+                    signal_type_name,
                     defaults={'description': f'{signal_type_name} signal from MACD crossover'}
                 )
                 
@@ -629,8 +630,8 @@ class ComprehensiveBacktestingService:
                 
                 if signal_type_name:
                     # Get or create signal type
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name=signal_type_name,
+                    signal_type = get_signal_type(
+                        signal_type_name,
                         defaults={'description': f'{signal_type_name} signal from Bollinger Bands'}
                     )
                     
@@ -716,8 +717,8 @@ class ComprehensiveBacktestingService:
                 
                 if signal_type_name:
                     # Get or create signal type
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name=signal_type_name,
+                    signal_type = get_signal_type(
+                        signal_type_name,
                         defaults={'description': f'{signal_type_name} signal from Support/Resistance'}
                     )
                     
@@ -806,8 +807,8 @@ class ComprehensiveBacktestingService:
                     
                     if signal_type_name:
                         # Get or create signal type
-                        signal_type, _ = SignalType.objects.get_or_create(
-                            name=signal_type_name,
+                        signal_type = get_signal_type(
+                            signal_type_name,
                             defaults={'description': f'{signal_type_name} signal from breakout'}
                         )
                         
@@ -891,8 +892,8 @@ class ComprehensiveBacktestingService:
                 if (current_peak['close'] < previous_peak['close'] and 
                     current_peak['RSI'] > previous_peak['RSI']):
                     
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name='BUY',
+                    signal_type = get_signal_type(
+                        'BUY',
                         defaults={'description': 'BUY signal from bullish divergence'}
                     )
                     
@@ -945,8 +946,8 @@ class ComprehensiveBacktestingService:
                 if (current_trough['close'] > previous_trough['close'] and 
                     current_trough['RSI'] < previous_trough['RSI']):
                     
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name='SELL',
+                    signal_type = get_signal_type(
+                        'SELL',
                         defaults={'description': 'SELL signal from bearish divergence'}
                     )
                     
@@ -1037,8 +1038,8 @@ class ComprehensiveBacktestingService:
                                 continue  # Skip neutral patterns
                             
                             # Get or create signal type
-                            signal_type, _ = SignalType.objects.get_or_create(
-                                name=signal_type_name,
+                            signal_type = get_signal_type(
+                                signal_type_name,
                                 defaults={'description': f'{signal_type_name} signal from {pattern_name} pattern'}
                             )
                             
@@ -1138,9 +1139,11 @@ class ComprehensiveBacktestingService:
     def _save_signals_to_database(self, signals: List[TradingSignal]):
         """Save signals to database efficiently."""
         try:
-            # Use bulk_create for efficiency
-            TradingSignal.objects.bulk_create(signals, ignore_conflicts=True)
-            self.logger.info(f"Bulk created {len(signals)} comprehensive signals")
+            # Bulk create in batches, one transaction per batch
+            with SignalPersistencePipeline(create_alerts=False, broadcast=False) as pipeline:
+                for signal in signals:
+                    pipeline.add(signal)
+            self.logger.info(f"Bulk created {len(pipeline.saved)} comprehensive signals")
             
         except Exception as e:
             self.logger.error(f"Error saving signals to database: {e}")
@@ -1219,8 +1222,8 @@ class ComprehensiveBacktestingService:
                 
                 # Validate signal logic
                 if take_profit < entry_price and stop_loss > entry_price:
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name='BUY',
+                    signal_type = get_signal_type(
+                        'BUY',
                         defaults={'description': 'Buy signal from 30-minute timeframe strategy'}
                     )
                     
@@ -1267,8 +1270,8 @@ class ComprehensiveBacktestingService:
                 
                 # Validate signal logic
                 if take_profit > entry_price and stop_loss < entry_price:
-                    signal_type, _ = SignalType.objects.get_or_create(
-                        name='SELL',
+                    signal_type = get_signal_type(
+                        'SELL',
                         defaults={'description': 'Sell signal from 30-minute timeframe strategy'}
                     )
                     
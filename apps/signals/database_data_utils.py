@@ -15,6 +15,7 @@ from django.core.cache import cache
 
 from apps.trading.models import Symbol
 from apps.data.models import MarketData, TechnicalIndicator
+from apps.data.watermarks import get_freshness_summary, get_watermark
 
 logger = logging.getLogger(__name__)
 
@@ -135,12 +136,9 @@ def validate_data_quality(symbol: Symbol, hours_back: int = 24) -> Dict[str, any
     """Validate database data quality for a symbol"""
     try:
         # Check data freshness
-        latest_data = MarketData.objects.filter(
-            symbol=symbol,
-            timeframe='1h'
-        ).order_by('-timestamp').first()
+        watermark = get_watermark(symbol, '1h')
         
-        if not latest_data:
+        if not watermark:
             return {
                 'is_valid': False,
                 'reason': 'No data found',
@@ -149,12 +147,14 @@ def validate_data_quality(symbol: Symbol, hours_back: int = 24) -> Dict[str, any
                 'completeness': 0.0
             }
         
-        data_age = timezone.now() - latest_data.timestamp
+        data_age = timezone.now() - watermark.last_timestamp
         data_age_hours = data_age.total_seconds() / 3600
         
-        # Check data completeness
-        recent_data = get_recent_market_data(symbol, hours_back)
-        data_points = recent_data.count()
+        # Check data completeness, the watermark keeps the count of the day up to its last bar
+        if hours_back == 24:
+            data_points = watermark.bar_count_24h
+        else:
+            data_points = get_recent_market_data(symbol, hours_back).count()
         expected_points = hours_back  # 1 data point per hour
         completeness = data_points / expected_points if expected_points > 0 else 0
         
@@ -371,11 +371,11 @@ def clear_price_cache(symbol: Symbol = None):
 
 
 def get_database_health_status() -> Dict[str, any]:
-    """Get overall database health status for signal generation"""
+    """Get overall database health status for signal generation (one read of the data watermarks)"""
     try:
-        # Check latest data across all symbols
-        latest_data = MarketData.objects.order_by('-timestamp').first()
-        if not latest_data:
+        # Latest bar across all symbols and active symbols with 1h bars in the last day
+        freshness = get_freshness_summary('1h', timedelta(hours=24))
+        if freshness['latest_timestamp'] is None:
             return {
                 'status': 'CRITICAL',
                 'reason': 'No data found in database',
@@ -383,17 +383,9 @@ def get_database_health_status() -> Dict[str, any]:
                 'active_symbols': 0
             }
         
-        data_age = timezone.now() - latest_data.timestamp
+        data_age = timezone.now() - freshness['latest_timestamp']
         data_age_hours = data_age.total_seconds() / 3600
-        
-        # Count active symbols with recent data
-        cutoff_time = timezone.now() - timedelta(hours=24)
-        active_symbols = Symbol.objects.filter(
-            is_active=True,
-            is_crypto_symbol=True,
-            marketdata__timeframe='1h',
-            marketdata__timestamp__gte=cutoff_time
-        ).distinct().count()
+        active_symbols = freshness['active_symbols']
         
         # Determine status
         if data_age_hours <= 1:
@@ -408,7 +400,7 @@ def get_database_health_status() -> Dict[str, any]:
             'reason': f'Latest data is {data_age_hours:.1f} hours old',
             'latest_data_age_hours': data_age_hours,
             'active_symbols': active_symbols,
-            'latest_symbol': latest_data.symbol.symbol if latest_data.symbol else 'Unknown'
+            'latest_symbol': freshness['latest_symbol'] or 'Unknown'
         }
         
     except Exception as e:
@@ -0,0 +1,372 @@
+"""
+Management command to benchmark the signal pipeline hot paths
+
+Seeds an isolated SQLite database (never the configured one) with N symbols
+x M bars of synthetic OHLCV, then times each stage: ingestion upsert,
+indicator computation, signal generation, the StrategyEngine multi-timeframe
+pass, backtesting and signal persistence. Live prices come from the last
+synthetic bar of each symbol instead of Binance/CoinGecko, so runs never
+touch the network. The JSON report holds wall time, query count, DB time
+and peak RSS per stage so runs can be compared across commits.
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import django
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+from django.utils import timezone
+
+from apps.core.shared_cache import LocalSharedCacheBackend, set_shared_cache
+from apps.signals.signal_persistence import signal_lookups
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None when unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+@contextmanager
+def isolated_database(path):
+    """Point the default connection (this and new threads) at a SQLite file, restored afterwards"""
+    original_connection, original_settings = connections['default'], connections.settings['default']
+    db_settings = {**original_settings, 'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)}
+    db_settings['TEST'] = {**db_settings.get('TEST', {}), 'NAME': str(path)}
+    connections.settings['default'] = db_settings
+    connections['default'] = load_backend(db_settings['ENGINE']).DatabaseWrapper(db_settings, 'default')
+    try:
+        yield connections['default']
+    finally:
+        connections['default'].close()
+        connections.settings['default'] = original_settings
+        connections['default'] = original_connection
+
+
+@contextmanager
+def fixture_live_prices(bars):
+    """Serve live prices from the last bar of each symbol instead of the exchange APIs"""
+    from apps.data.real_price_service import RealPriceService
+
+    prices = {
+        symbol: {
+            'price': float(symbol_bars[-1].close),
+            'change_24h': 0.0,
+            'volume_24h': float(sum(bar.volume for bar in symbol_bars[-24:])),
+            'source': 'Benchmark',
+            'last_updated': symbol_bars[-1].start.isoformat(),
+        }
+        for symbol, symbol_bars in bars.items() if symbol_bars
+    }
+    with mock.patch.object(RealPriceService, '_fetch_live_prices', return_value=prices):
+        yield prices
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the signal pipeline stages on a synthetic SQLite dataset'
+
+    STAGES = ['ingest', 'indicators', 'signal_generation', 'strategy_engine', 'backtest', 'persistence']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            type=int,
+            help='Number of synthetic symbols',
+            default=10
+        )
+        parser.add_argument(
+            '--bars',
+            type=int,
+            help='Number of 1h bars per symbol',
+            default=500
+        )
+        parser.add_argument(
+            '--signals-per-symbol',
+            type=int,
+            help='Synthetic signals per symbol for the backtest and persistence stages',
+            default=20
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed of the synthetic prices',
+            default=42
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            help='SQLite file to seed (default: a temporary file removed afterwards)',
+            default=None
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the JSON report to this file instead of stdout',
+            default=None
+        )
+        parser.add_argument(
+            '--stages',
+            type=str,
+            help='Comma-separated stages to run (default: all)',
+            default=','.join(self.STAGES)
+        )
+
+    def handle(self, *args, **options):
+        stages = [stage.strip() for stage in options['stages'].split(',') if stage.strip()]
+        unknown = set(stages) - set(self.STAGES)
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        if options['symbols'] < 1 or options['bars'] < 1:
+            raise CommandError('--symbols and --bars must be positive')
+
+        # Progress goes to stderr when stdout carries the JSON report
+        self.progress = self.stdout if options['output'] else self.stderr
+
+        temp_dir = None
+        path = options['database']
+        if path is None:
+            temp_dir = tempfile.TemporaryDirectory(prefix='benchmark_pipeline_')
+            path = os.path.join(temp_dir.name, 'benchmark.sqlite3')
+        elif os.path.exists(path):
+            raise CommandError(f"Database {path} already exists, pass a new file")
+
+        try:
+            with isolated_database(path):
+                report = self.run_benchmark(path, stages, options)
+        finally:
+            # Drop cache state that refers to the benchmark database
+            set_shared_cache(None)
+            signal_lookups.clear()
+            if temp_dir is not None:
+                temp_dir.cleanup()
+
+        output = json.dumps(report, indent=2, default=str)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output)
+            self.stdout.write(self.style.SUCCESS(f"✓ Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def run_benchmark(self, path, stages, options):
+        # Keep benchmark values out of (and unaffected by) the shared cache
+        set_shared_cache(LocalSharedCacheBackend())
+
+        # Tables straight from the models: faster than replaying migrations
+        migration_modules = getattr(settings, 'MIGRATION_MODULES', {})
+        try:
+            settings.MIGRATION_MODULES = {config.label: None for config in apps.get_app_configs()}
+            call_command('migrate', run_syncdb=True, verbosity=0, interactive=False)
+        finally:
+            settings.MIGRATION_MODULES = migration_modules
+
+        symbols = self.seed_symbols(options['symbols'])
+        bars = self.synthetic_bars(symbols, options['bars'], options['seed'])
+        signals_per_symbol = max(0, options['signals_per_symbol'])
+        self.progress.write(f"Benchmarking {len(symbols)} symbols x {options['bars']} bars in {path}")
+
+        context = {'symbols': symbols, 'bars': bars, 'signals': [], 'signals_per_symbol': signals_per_symbol}
+        results = []
+        with fixture_live_prices(bars):
+            for stage in stages:
+                result = self.run_stage(stage, getattr(self, f'stage_{stage}'), context)
+                results.append(result)
+                status = self.style.SUCCESS('✓') if 'error' not in result else self.style.ERROR('✗')
+                self.progress.write(
+                    f"{status} {stage}: {result['wall_time_s']:.3f}s, {result['queries']} queries, "
+                    f"peak RSS {result['peak_rss_mb']} MB"
+                )
+
+        return {
+            'commit': current_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'symbols': options['symbols'],
+            'bars_per_symbol': options['bars'],
+            'signals_per_symbol': signals_per_symbol,
+            'seed': options['seed'],
+            'stages': results,
+            'total_wall_time_s': round(sum(result['wall_time_s'] for result in results), 4),
+            'total_queries': sum(result['queries'] for result in results),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    @staticmethod
+    def run_stage(name, func, context):
+        from apps.core.query_budget import record_queries
+
+        gc.collect()
+        result = {'stage': name}
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            try:
+                result['items'] = func(context)
+            except Exception as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+        result['wall_time_s'] = round(time.perf_counter() - start, 4)
+        result['queries'] = recorder.count
+        result['db_time_ms'] = round(recorder.duration * 1000, 3)
+        result['max_repeated_sql'] = max(recorder.fingerprints.values(), default=0)
+        result['peak_rss_mb'] = peak_rss_mb()
+        return result
+
+    @staticmethod
+    def seed_symbols(count):
+        from apps.signals.signal_persistence import get_signal_type
+        from apps.trading.models import Symbol
+
+        # Lookups cached for the configured database are meaningless here
+        signal_lookups.clear()
+        for name in ('BUY', 'SELL', 'HOLD', 'STRONG_BUY', 'STRONG_SELL'):
+            get_signal_type(name, {'description': f'{name} signal', 'is_active': True})
+        Symbol.objects.bulk_create([
+            Symbol(symbol=f'SYN{i}USDT', name=f'Synthetic {i}', symbol_type='CRYPTO', exchange='Synthetic',
+                   is_active=True, is_crypto_symbol=True, is_spot_tradable=True)
+            for i in range(count)
+        ])
+        return list(Symbol.objects.order_by('id'))
+
+    @staticmethod
+    def synthetic_bars(symbols, count, seed):
+        """Random-walk 1h bars per symbol ending at the current hour"""
+        from apps.data.bar_aggregator import Bar
+
+        rng = np.random.default_rng(seed)
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        start = end - timedelta(hours=count - 1)
+        bars = {}
+        for symbol in symbols:
+            close = rng.uniform(1, 1000) * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+            open_prices = np.r_[close[0], close[:-1]]
+            high = np.maximum(open_prices, close) * (1 + rng.uniform(0, 0.005, count))
+            low = np.minimum(open_prices, close) * (1 - rng.uniform(0, 0.005, count))
+            volume = rng.uniform(100, 10000, count)
+            bars[symbol.symbol] = [
+                Bar(symbol.symbol, start + timedelta(hours=i), *(Decimal(f'{value:.6f}') for value in row))
+                for i, row in enumerate(zip(open_prices, high, low, close, volume))
+            ]
+        return bars
+
+    @staticmethod
+    def synthetic_signals(context, symbol):
+        """Evenly spaced BUY/SELL setups (+3% target, 2% stop) over the symbol's bars"""
+        bars = context['bars'][symbol.symbol]
+        count = context['signals_per_symbol']
+        step = max(1, len(bars) // count) if count else len(bars) + 1
+        setups = []
+        for i, bar in enumerate(bars[::step][:count]):
+            price = float(bar.close)
+            side = 1 if i % 2 == 0 else -1
+            setups.append({
+                'id': f'{symbol.symbol}-{i}',
+                'signal_type': 'BUY' if side > 0 else 'SELL',
+                'created_at': bar.start.isoformat(),
+                'entry_price': price,
+                'target_price': price * (1 + side * 0.03),
+                'stop_loss': price * (1 - side * 0.02),
+            })
+        return setups
+
+    @staticmethod
+    def stage_ingest(context):
+        from apps.data.bar_aggregator import BarStore
+
+        store = BarStore(timeframe='1h')
+        return sum(store.save(bars) for bars in context['bars'].values())
+
+    @staticmethod
+    def stage_indicators(context):
+        from apps.data.services import TechnicalAnalysisService
+        from apps.signals.advanced_indicators import AdvancedIndicatorsService
+
+        ta_service = TechnicalAnalysisService()
+        advanced = AdvancedIndicatorsService()
+        for symbol in context['symbols']:
+            ta_service.calculate_all_indicators(symbol)
+            advanced.calculate_all(symbol)
+        return len(context['symbols'])
+
+    @staticmethod
+    def stage_signal_generation(context):
+        from apps.signals.services import SignalGenerationService
+
+        service = SignalGenerationService()
+        for symbol in context['symbols']:
+            context['signals'].extend(service.generate_signals_for_symbol(symbol))
+        return len(context['signals'])
+
+    @staticmethod
+    def stage_strategy_engine(context):
+        from apps.signals.strategy_engine import StrategyEngine
+
+        engine = StrategyEngine()
+        return sum(len(engine.evaluate_symbol(symbol)) for symbol in context['symbols'])
+
+    @classmethod
+    def stage_backtest(cls, context):
+        from apps.signals.backtesting_api import BacktestAPIView
+
+        # Execution simulation of the backtest API over the stored bars
+        view = BacktestAPIView()
+        executed = 0
+        for symbol in context['symbols']:
+            bars = context['bars'][symbol.symbol]
+            results = view._simulate_signal_execution(
+                cls.synthetic_signals(context, symbol), symbol, bars[0].start, bars[-1].start + timedelta(hours=1)
+            )
+            executed += sum(1 for result in results if result.get('is_executed'))
+        return executed
+
+    @classmethod
+    def stage_persistence(cls, context):
+        from apps.signals.models import TradingSignal
+        from apps.signals.signal_persistence import SIGNAL_FACTORS, SignalPersistencePipeline, get_signal_type
+
+        with SignalPersistencePipeline(broadcast=False) as pipeline:
+            for signal in context['signals']:
+                if signal.pk is None:
+                    pipeline.add(signal)
+            for symbol in context['symbols']:
+                for setup in cls.synthetic_signals(context, symbol):
+                    pipeline.add(TradingSignal(
+                        symbol=symbol, signal_type=get_signal_type(setup['signal_type']), strength='MODERATE',
+                        confidence_score=0.7, confidence_level='HIGH', entry_price=setup['entry_price'],
+                        target_price=setup['target_price'], stop_loss=setup['stop_loss'],
+                        risk_reward_ratio=1.5, quality_score=0.6
+                    ), {key: 0.5 for key in SIGNAL_FACTORS})
+        return len(pipeline.saved)
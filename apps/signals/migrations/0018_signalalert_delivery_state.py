@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signals', '0017_alter_marketregime_created_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='signalalert',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='signalalert',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='signalalert',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='signalalert',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='signalalert',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='signalalert',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='signalalert',
+            name='alert_type',
+            field=models.CharField(choices=[('SIGNAL_GENERATED', 'Signal Generated'), ('SIGNAL_EXPIRED', 'Signal Expired'), ('SIGNAL_EXECUTED', 'Signal Executed'), ('PERFORMANCE_ALERT', 'Performance Alert'), ('SYSTEM_ALERT', 'System Alert'), ('email', 'Email'), ('telegram', 'Telegram'), ('webhook', 'Webhook')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='signalalert',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='signals_sig_status_e70aa7_idx'),
+        ),
+    ]
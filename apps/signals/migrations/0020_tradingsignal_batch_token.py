@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signals', '0019_signalalert_claim_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tradingsignal',
+            name='batch_token',
+            field=models.UUIDField(blank=True, db_index=True, help_text='Bulk insert that wrote the signal (databases without RETURNING)', null=True),
+        ),
+    ]
@@ -81,8 +81,8 @@ class MLDataCollectionService:
                 self.logger.error("No data collected for any symbols")
                 return pd.DataFrame()
             
-            # Combine all symbol data
-            combined_data = pd.concat(all_data, ignore_index=True)
+            # Combine all symbol data, keeping the timestamp index as a column
+            combined_data = pd.concat([symbol_data.reset_index() for symbol_data in all_data], ignore_index=True)
             
             # Clean and validate data
             combined_data = self._clean_data(combined_data)
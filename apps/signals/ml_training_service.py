@@ -3,6 +3,8 @@ Phase 3 ML Training Service
 Training XGBoost, LightGBM, and LSTM models for trading signals
 """
 
+import os
+import time
 import logging
 import pandas as pd
 import numpy as np
@@ -15,16 +17,23 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, mean_squared_error, mean_absolute_error
 import xgboost as xgb
 import lightgbm as lgb
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, GRU, Dense, Dropout, BatchNormalization
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+try:
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import LSTM, GRU, Dense, Dropout, BatchNormalization
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+    TENSORFLOW_AVAILABLE = True
+except ImportError:
+    TENSORFLOW_AVAILABLE = False
+    logging.warning("TensorFlow not available, LSTM models cannot be trained")
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
 from apps.signals.models import MLModel, MLTrainingSession, MLFeature, MLModelPerformance
 from apps.signals.ml_data_service import MLDataCollectionService
+from apps.signals.walk_forward import build_folds, run_folds
 from apps.trading.models import Symbol
 
 logger = logging.getLogger(__name__)
@@ -320,8 +329,9 @@ class MLTrainingService:
             self.logger.error(f"Error training LSTM model: {e}")
             raise e
     
-    def _prepare_features_labels(self, data: pd.DataFrame, target_variable: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
-        """Prepare features and labels for training"""
+    def _prepare_features_labels(self, data: pd.DataFrame, target_variable: str,
+                                 return_mask: bool = False) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Prepare features and labels for training (plus the kept-row mask if return_mask)"""
         try:
             # Select feature columns (exclude target and metadata)
             exclude_columns = [
@@ -343,14 +353,17 @@ class MLTrainingService:
             X = X[valid_indices]
             y = y[valid_indices]
             
+            if return_mask:
+                return X, y, feature_columns, valid_indices
             return X, y, feature_columns
             
         except Exception as e:
             self.logger.error(f"Error preparing features and labels: {e}")
             raise e
     
-    def _prepare_sequential_data(self, data: pd.DataFrame, target_variable: str, sequence_length: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
-        """Prepare sequential data for LSTM training"""
+    def _prepare_sequential_data(self, data: pd.DataFrame, target_variable: str, sequence_length: int,
+                                 return_mask: bool = False) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Prepare sequential data for LSTM training (plus the kept-sequence mask if return_mask)"""
         try:
             # Sort by timestamp
             data = data.sort_index()
@@ -380,6 +393,8 @@ class MLTrainingService:
             X = X[valid_indices]
             y = y[valid_indices]
             
+            if return_mask:
+                return X, y, feature_columns, valid_indices
             return X, y, feature_columns
             
         except Exception as e:
@@ -404,7 +419,8 @@ class MLTrainingService:
             raise e
     
     def _train_xgboost(self, X_train: np.ndarray, y_train: np.ndarray, 
-                      X_val: np.ndarray, y_val: np.ndarray, target_variable: str) -> Tuple[Any, StandardScaler]:
+                      X_val: np.ndarray, y_val: np.ndarray, target_variable: str,
+                      random_state: int = 42, n_jobs: Optional[int] = None) -> Tuple[Any, StandardScaler]:
         """Train XGBoost model"""
         try:
             # Scale features
@@ -428,7 +444,10 @@ class MLTrainingService:
                 'n_estimators': 100,
                 'subsample': 0.8,
                 'colsample_bytree': 0.8,
-                'random_state': 42
+                'random_state': random_state,
+                'n_jobs': n_jobs,
+                # Constructor argument; fit() no longer accepts it in xgboost >= 2
+                'early_stopping_rounds': 10
             }
             
             if num_class:
@@ -437,7 +456,6 @@ class MLTrainingService:
             model = xgb.XGBClassifier(**params) if objective != 'reg:squarederror' else xgb.XGBRegressor(**params)
             model.fit(X_train_scaled, y_train, 
                      eval_set=[(X_val_scaled, y_val)],
-                     early_stopping_rounds=10,
                      verbose=False)
             
             return model, scaler
@@ -447,7 +465,8 @@ class MLTrainingService:
             raise e
     
     def _train_lightgbm(self, X_train: np.ndarray, y_train: np.ndarray,
-                       X_val: np.ndarray, y_val: np.ndarray, target_variable: str) -> Tuple[Any, StandardScaler]:
+                       X_val: np.ndarray, y_val: np.ndarray, target_variable: str,
+                       random_state: int = 42, n_jobs: Optional[int] = None) -> Tuple[Any, StandardScaler]:
         """Train LightGBM model"""
         try:
             # Scale features
@@ -471,7 +490,8 @@ class MLTrainingService:
                 'n_estimators': 100,
                 'subsample': 0.8,
                 'colsample_bytree': 0.8,
-                'random_state': 42,
+                'random_state': random_state,
+                'n_jobs': n_jobs,
                 'verbose': -1
             }
             
@@ -490,9 +510,14 @@ class MLTrainingService:
             raise e
     
     def _train_lstm(self, X_train: np.ndarray, y_train: np.ndarray,
-                   X_val: np.ndarray, y_val: np.ndarray, target_variable: str) -> Tuple[Any, StandardScaler]:
+                   X_val: np.ndarray, y_val: np.ndarray, target_variable: str,
+                   random_state: int = 42, n_jobs: Optional[int] = None) -> Tuple[Any, StandardScaler]:
         """Train LSTM model"""
         try:
+            if not TENSORFLOW_AVAILABLE:
+                raise ImportError("TensorFlow is required to train LSTM models")
+            tf.keras.utils.set_random_seed(random_state)
+            
             # Scale features
             scaler = StandardScaler()
             X_train_scaled = scaler.fit_transform(X_train.reshape(-1, X_train.shape[-1])).reshape(X_train.shape)
@@ -620,10 +645,18 @@ class MLTrainingService:
                                target_variable: str = 'signal_direction',
                                prediction_horizon_hours: int = 24,
                                training_window_days: int = 180,
-                               validation_window_days: int = 30) -> Dict[str, Any]:
+                               validation_window_days: int = 30,
+                               max_workers: Optional[int] = None,
+                               random_state: int = 42,
+                               sequence_length: int = 60) -> Dict[str, Any]:
         """
         Perform walk-forward validation to prevent overfitting
         
+        Training data and the feature matrix are built once for the whole
+        period; each fold trains on an index range of it. Folds run in
+        parallel processes with per-fold seeds, so the metrics match a serial
+        run (max_workers=1).
+        
         Args:
             symbols: List of symbols to validate
             model_type: Type of model to train
@@ -631,13 +664,19 @@ class MLTrainingService:
             prediction_horizon_hours: Hours ahead to predict
             training_window_days: Days of training data per fold
             validation_window_days: Days of validation data per fold
+            max_workers: Fold worker processes (default ML_WALK_FORWARD_WORKERS)
+            random_state: Base seed, fold n trains with random_state + n
+            sequence_length: Sequence length for LSTM folds
             
         Returns:
-            Dictionary with validation results
+            Dictionary with validation results, including per-fold duration and peak memory
         """
         try:
             self.logger.info(f"Starting walk-forward validation for {model_type}")
             
+            if model_type not in ('XGBOOST', 'LIGHTGBM', 'LSTM'):
+                raise ValueError(f"Unsupported model type: {model_type}")
+            
             end_date = timezone.now()
             start_date = end_date - timedelta(days=365)  # Total period
             
@@ -647,64 +686,47 @@ class MLTrainingService:
                 'model_performance': []
             }
             
-            current_date = start_date + timedelta(days=training_window_days)
-            
-            fold_number = 0
-            while current_date + timedelta(days=validation_window_days) <= end_date:
-                fold_number += 1
-                
-                # Define fold periods
-                fold_training_start = current_date - timedelta(days=training_window_days)
-                fold_training_end = current_date
-                fold_validation_start = current_date
-                fold_validation_end = current_date + timedelta(days=validation_window_days)
-                
-                self.logger.info(f"Fold {fold_number}: Training {fold_training_start.date()} to {fold_training_end.date()}, "
-                               f"Validation {fold_validation_start.date()} to {fold_validation_end.date()}")
-                
-                try:
-                    # Train model on fold
-                    model_name = f"walk_forward_{model_type}_fold_{fold_number}"
-                    
-                    if model_type == 'XGBOOST':
-                        model = self.train_xgboost_model(symbols, model_name, target_variable, 
-                                                       prediction_horizon_hours, training_window_days)
-                    elif model_type == 'LIGHTGBM':
-                        model = self.train_lightgbm_model(symbols, model_name, target_variable,
-                                                        prediction_horizon_hours, training_window_days)
-                    elif model_type == 'LSTM':
-                        model = self.train_lstm_model(symbols, model_name, target_variable,
-                                                    prediction_horizon_hours, training_window_days)
-                    else:
-                        raise ValueError(f"Unsupported model type: {model_type}")
-                    
-                    # Store fold results
-                    fold_result = {
-                        'fold_number': fold_number,
-                        'training_period': f"{fold_training_start.date()} to {fold_training_end.date()}",
-                        'validation_period': f"{fold_validation_start.date()} to {fold_validation_end.date()}",
-                        'model_id': model.id,
-                        'accuracy': model.accuracy,
-                        'f1_score': model.f1_score,
-                        'mse': model.mse,
-                        'mae': model.mae
-                    }
-                    
-                    results['folds'].append(fold_result)
-                    results['model_performance'].append({
-                        'fold': fold_number,
-                        'accuracy': model.accuracy or 0,
-                        'f1_score': model.f1_score or 0,
-                        'mse': model.mse or 0,
-                        'mae': model.mae or 0
-                    })
-                    
-                except Exception as e:
-                    self.logger.error(f"Error in fold {fold_number}: {e}")
+            started = time.perf_counter()
+            training_data = self.data_service.collect_training_data(
+                symbols, start_date, end_date, prediction_horizon_hours
+            )
+            if training_data.empty:
+                raise ValueError("No training data collected")
+            
+            # One feature matrix, ordered by time, shared by every fold
+            data = training_data.sort_values('timestamp', kind='stable').reset_index(drop=True)
+            timestamps = data['timestamp'].to_numpy()
+            if model_type == 'LSTM':
+                X, y, feature_names, valid = self._prepare_sequential_data(
+                    data, target_variable, sequence_length, return_mask=True
+                )
+                timestamps = timestamps[sequence_length:][valid]
+            else:
+                X, y, feature_names, valid = self._prepare_features_labels(data, target_variable, return_mask=True)
+                timestamps = timestamps[valid]
+            X = np.ascontiguousarray(X, dtype=np.float64)
+            feature_seconds = time.perf_counter() - started
+            
+            folds = build_folds(timestamps, start_date, end_date, training_window_days,
+                                validation_window_days, random_state)
+            if max_workers is None:
+                max_workers = getattr(settings, 'ML_WALK_FORWARD_WORKERS', os.cpu_count() or 1)
+            
+            fold_results = run_folds(
+                X, y, folds, 'apps.signals.ml_training_service.train_walk_forward_fold',
+                {'model_type': model_type, 'target_variable': target_variable}, max_workers
+            )
+            for fold_result in fold_results:
+                if 'error' in fold_result:
                     continue
-                
-                # Move to next fold
-                current_date += timedelta(days=validation_window_days)
+                results['folds'].append(fold_result)
+                results['model_performance'].append({
+                    'fold': fold_result['fold_number'],
+                    'accuracy': fold_result['accuracy'] or 0,
+                    'f1_score': fold_result['f1_score'] or 0,
+                    'mse': fold_result['mse'] or 0,
+                    'mae': fold_result['mae'] or 0
+                })
             
             # Calculate overall metrics
             if results['model_performance']:
@@ -721,6 +743,14 @@ class MLTrainingService:
                     'total_folds': len(results['folds'])
                 }
             
+            results['timing'] = {
+                'feature_seconds': round(feature_seconds, 3),
+                'total_seconds': round(time.perf_counter() - started, 3),
+                'workers': max(1, min(max_workers, len(folds))) if folds else 0,
+                'samples': len(X),
+                'features': len(feature_names)
+            }
+            
             self.logger.info(f"Walk-forward validation completed: {len(results['folds'])} folds")
             return results
             
@@ -728,3 +758,20 @@ class MLTrainingService:
             self.logger.error(f"Error in walk-forward validation: {e}")
             raise e
 
+
+def train_walk_forward_fold(X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+                            seed: int, n_jobs: int, model_type: str, target_variable: str) -> Dict[str, float]:
+    """Train one walk-forward fold and return its validation metrics (runs in fold workers)"""
+    service = MLTrainingService()
+    trainer = {
+        'XGBOOST': service._train_xgboost,
+        'LIGHTGBM': service._train_lightgbm,
+        'LSTM': service._train_lstm,
+    }[model_type]
+    model, scaler = trainer(X_train, y_train, X_val, y_val, target_variable, random_state=seed, n_jobs=n_jobs)
+    
+    if X_val.ndim == 3:
+        X_val_scaled = scaler.transform(X_val.reshape(-1, X_val.shape[-1])).reshape(X_val.shape)
+    else:
+        X_val_scaled = scaler.transform(X_val)
+    return service._evaluate_model(model, X_val_scaled, y_val, target_variable)
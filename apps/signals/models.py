@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -193,6 +194,7 @@ class TradingSignal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True)
+    batch_token = models.UUIDField(null=True, blank=True, db_index=True, help_text='Bulk insert that wrote the signal (databases without RETURNING)')
     
     class Meta:
         verbose_name = 'Trading Signal'
@@ -325,6 +327,17 @@ class SignalAlert(models.Model):
         ('SIGNAL_EXECUTED', 'Signal Executed'),
         ('PERFORMANCE_ALERT', 'Performance Alert'),
         ('SYSTEM_ALERT', 'System Alert'),
+        # Delivery channels dispatched by SignalDeliveryService
+        ('email', 'Email'),
+        ('telegram', 'Telegram'),
+        ('webhook', 'Webhook'),
+    ]
+    
+    DELIVERY_STATUSES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
     ]
     
     PRIORITY_LEVELS = [
@@ -342,12 +355,23 @@ class SignalAlert(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Delivery state for channel alerts
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=DELIVERY_STATUSES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error_message = models.TextField(blank=True)
+    # Dispatcher run that claimed the alert; while SENDING, next_attempt_at is the claim's expiry
+    claim_token = models.UUIDField(null=True, blank=True)
+    
     class Meta:
         verbose_name = 'Signal Alert'
         verbose_name_plural = 'Signal Alerts'
         indexes = [
             models.Index(fields=['alert_type', 'created_at']),
             models.Index(fields=['priority', 'is_read']),
+            models.Index(fields=['status', 'next_attempt_at']),
         ]
     
     def __str__(self):
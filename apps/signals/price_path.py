@@ -0,0 +1,120 @@
+"""
+Indexed price path for signal execution simulation
+
+Bars are kept as sorted NumPy arrays. The bars following a signal are
+located with searchsorted and the first target/stop-loss touch is found on
+the running high/low of that window, so simulating a signal costs
+O(log bars + window) instead of a scan over every bar.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TARGET_HIT = 'TARGET_HIT'
+STOP_LOSS_HIT = 'STOP_LOSS_HIT'
+CLOSE_PRICE = 'CLOSE_PRICE'
+
+
+def _to_ns(timestamp) -> int:
+    """Epoch nanoseconds (UTC) of a datetime, pandas Timestamp or ISO string"""
+    return pd.Timestamp(timestamp).value
+
+
+class PricePath:
+    """
+    OHLCV bars of one symbol ordered by timestamp.
+
+    `datetimes` keeps the original timestamp objects so results report the
+    bar time exactly as it was stored.
+    """
+
+    def __init__(self, datetimes: List[datetime], open_prices, high, low, close, volume=None):
+        timestamps = np.array([_to_ns(ts) for ts in datetimes], dtype=np.int64)
+        order = np.argsort(timestamps, kind='stable')
+        self.datetimes = [datetimes[i] for i in order]
+        self.timestamps = timestamps[order]
+        self.open = np.asarray(open_prices, dtype=np.float64)[order]
+        self.high = np.asarray(high, dtype=np.float64)[order]
+        self.low = np.asarray(low, dtype=np.float64)[order]
+        self.close = np.asarray(close, dtype=np.float64)[order]
+        self.volume = (np.asarray(volume, dtype=np.float64)[order]
+                       if volume is not None else np.zeros(len(order)))
+
+    @classmethod
+    def empty(cls) -> 'PricePath':
+        return cls([], [], [], [], [])
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> 'PricePath':
+        """Create from (timestamp, open, high, low, close, volume) tuples"""
+        rows = list(rows)
+        if not rows:
+            return cls.empty()
+        timestamps, open_prices, high, low, close, volume = zip(*rows)
+        return cls(list(timestamps), open_prices, high, low, close, volume)
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'PricePath':
+        """Create from dicts with timestamp/open/high/low/close[/volume] keys"""
+        return cls.from_rows(
+            (record['timestamp'], record['open'], record['high'], record['low'], record['close'],
+             record.get('volume', 0.0))
+            for record in records
+        )
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'PricePath':
+        """Create from a DataFrame indexed by timestamp with open/high/low/close[/volume] columns"""
+        if df.empty:
+            return cls.empty()
+        return cls(
+            list(df.index.to_pydatetime()), df['open'].to_numpy(), df['high'].to_numpy(),
+            df['low'].to_numpy(), df['close'].to_numpy(),
+            df['volume'].to_numpy() if 'volume' in df else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def window(self, start, end) -> Tuple[int, int]:
+        """Index range [i, j) of the bars with start <= timestamp <= end"""
+        i = int(np.searchsorted(self.timestamps, _to_ns(start), side='left'))
+        j = int(np.searchsorted(self.timestamps, _to_ns(end), side='right'))
+        return i, max(i, j)
+
+    def first_exit(self, start, end, target: float, stop_loss: float,
+                   is_buy: bool) -> Optional[Tuple[int, str, float]]:
+        """
+        First exit of a position opened at start and held until end.
+
+        Returns (bar index, status, exit price) where status is TARGET_HIT,
+        STOP_LOSS_HIT or CLOSE_PRICE (last close of the window), or None when
+        there are no bars in the window. When both levels are touched in the
+        same bar the target wins.
+        """
+        i, j = self.window(start, end)
+        if i == j:
+            return None
+
+        high = self.high[i:j]
+        low = self.low[i:j]
+        if is_buy:
+            # Running max of highs / min of lows are monotonic, so searchsorted
+            # finds the first bar reaching the level
+            target_at = np.searchsorted(np.maximum.accumulate(high), target, side='left')
+            stop_at = np.searchsorted(-np.minimum.accumulate(low), -stop_loss, side='left')
+        else:
+            target_at = np.searchsorted(-np.minimum.accumulate(low), -target, side='left')
+            stop_at = np.searchsorted(np.maximum.accumulate(high), stop_loss, side='left')
+
+        size = j - i
+        if target_at < size and target_at <= stop_at:
+            return i + int(target_at), TARGET_HIT, target
+        if stop_at < size:
+            return i + int(stop_at), STOP_LOSS_HIT, stop_loss
+        return j - 1, CLOSE_PRICE, float(self.close[j - 1])
@@ -15,6 +15,7 @@ from django.db.models import Q
 from apps.signals.models import TradingSignal, SignalType, Symbol, BacktestResult
 from apps.data.models import MarketData
 from apps.signals.smc_strategy import SmartMoneyConceptsStrategy
+from apps.signals.smc_detection import SMCDetector
 
 logger = logging.getLogger(__name__)
 
@@ -237,18 +238,14 @@ class ProperStrategyBacktestingService:
         if len(df) < 10:
             return []
         
-        levels = []
-        window = 3
+        # Non-strict +/- 3 bar pivots, ties with neighbours still count as levels
+        detector = SMCDetector.from_dataframe(df)
+        if column == 'high':
+            swings = detector.swing_highs(window=3, strict=False)
+        else:  # low
+            swings = detector.swing_lows(window=3, strict=False)
         
-        for i in range(window, len(df) - window):
-            if column == 'high':
-                if df.iloc[i][column] == df.iloc[i-window:i+window+1][column].max():
-                    levels.append(df.iloc[i][column])
-            else:  # low
-                if df.iloc[i][column] == df.iloc[i-window:i+window+1][column].min():
-                    levels.append(df.iloc[i][column])
-        
-        return levels
+        return swings['price'].tolist()
     
     def _detect_market_structure_signals(self, symbol: Symbol, df: pd.DataFrame, trend: Dict) -> List[TradingSignal]:
         """
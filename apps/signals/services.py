@@ -1,4 +1,5 @@
 import logging
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
@@ -9,16 +10,18 @@ from django.conf import settings
 import time # Added for time.sleep in PerformanceMonitor
 
 from apps.signals.models import (
-    TradingSignal, SignalType, SignalFactor, SignalFactorContribution,
-    MarketRegime, SignalPerformance, SignalAlert
+    TradingSignal, SignalType, MarketRegime, SignalPerformance, SignalAlert
 )
 from apps.trading.models import Symbol
 from apps.data.models import TechnicalIndicator, MarketData
 from apps.data.services import EconomicDataService, SectorAnalysisService
+from apps.data.watermarks import update_watermarks
 from apps.sentiment.models import SentimentAggregate, CryptoMention
 from apps.signals.timeframe_analysis_service import TimeframeAnalysisService
 from apps.signals.strategy_engine import StrategyEngine
 from apps.signals.spot_trading_engine import SpotTradingStrategyEngine
+from apps.signals.advanced_indicators import AdvancedIndicatorsService
+from apps.signals.signal_persistence import SignalPersistencePipeline, get_signal_type
 
 logger = logging.getLogger(__name__)
 
@@ -44,23 +47,93 @@ class SignalGenerationService:
         # Initialize sector analysis service
         self.sector_service = SectorAnalysisService()
         
-    def generate_signals_for_symbol(self, symbol: Symbol) -> List[TradingSignal]:
-        """Generate both futures and spot signals for a specific symbol"""
-        logger.info(f"Generating signals for {symbol.symbol}")
+        # LuxAlgo/SMC indicators computed from one bar fetch per symbol
+        self.advanced_indicators = AdvancedIndicatorsService()
         
-        signals = []
+        # Set while generating a run, see _persistence_run
+        self.pipeline = None
+        
+        # Symbols whose generation failed in the last generate_signals_for_symbols call
+        self.failed_symbols = []
+        
+    @contextmanager
+    def _persistence_run(self):
+        """Queue the signals created inside on one pipeline and persist them once at the end"""
+        if self.pipeline is not None:
+            yield self.pipeline
+            return
+        
+        pipeline = SignalPersistencePipeline()
+        self.pipeline = pipeline
+        try:
+            yield pipeline
+        finally:
+            self.pipeline = None
+        self._flush(pipeline)
+    
+    def _queue_signal(self, signal: TradingSignal, factor_scores: Optional[Dict] = None,
+                      create_alert: bool = True) -> TradingSignal:
+        """Queue the signal on the active run, or persist it right away"""
+        if self.pipeline is not None:
+            return self.pipeline.add(signal, factor_scores, create_alert=create_alert)
+        pipeline = SignalPersistencePipeline()
+        pipeline.add(signal, factor_scores, create_alert=create_alert)
+        self._flush(pipeline)
+        return signal
+    
+    def _flush(self, pipeline: SignalPersistencePipeline):
+        """Write the queued signals, then cache the price metadata of the saved ones"""
+        try:
+            pipeline.flush()
+        except Exception as e:
+            logger.error(f"Failed saving generated signals: {e}")
+            return
+        for signal in pipeline.saved:
+            price_metadata = getattr(signal, 'price_metadata', None)
+            if price_metadata:
+                self._store_price_metadata(signal, price_metadata)
         
-        # Generate futures signals (existing logic)
-        futures_signals = self._generate_futures_signals(symbol)
-        signals.extend(futures_signals)
+    def generate_signals_for_symbols(self, symbols) -> List[TradingSignal]:
+        """Generate signals for many symbols, spot signals from one batched analysis"""
+        symbols = list(symbols)
+        spot_symbols = [symbol for symbol in symbols if symbol.is_crypto_symbol and symbol.is_spot_tradable]
         
-        # Generate spot signals (new logic)
-        spot_signals = self._generate_spot_signals(symbol)
-        signals.extend(spot_signals)
+        spot_by_symbol = {symbol.id: [] for symbol in spot_symbols}
+        try:
+            for spot_signal in self.spot_engine.generate_universe_signals(spot_symbols):
+                spot_by_symbol[spot_signal.symbol.id].append(spot_signal)
+        except Exception as e:
+            logger.error(f"Error generating universe spot signals: {e}")
+        
+        signals = []
+        self.failed_symbols = []
+        with self._persistence_run():
+            for symbol in symbols:
+                try:
+                    signals.extend(self.generate_signals_for_symbol(symbol, spot_by_symbol.get(symbol.id, [])))
+                except Exception as e:
+                    logger.error(f"Error generating signals for {symbol.symbol}: {e}")
+                    self.failed_symbols.append(symbol)
+        return signals
+    
+    def generate_signals_for_symbol(self, symbol: Symbol, spot_signals: Optional[List] = None) -> List[TradingSignal]:
+        """Generate both futures and spot signals for a specific symbol (spot_signals precomputed if given)"""
+        logger.info(f"Generating signals for {symbol.symbol}")
         
-        # Generate multi-timeframe confluence signals
-        multi_timeframe_signals = self._generate_multi_timeframe_signals(symbol)
-        signals.extend(multi_timeframe_signals)
+        signals = []
+        
+        with self._persistence_run():
+            # Generate futures signals (existing logic)
+            futures_signals = self._generate_futures_signals(symbol)
+            signals.extend(futures_signals)
+            
+            # Generate spot signals (new logic)
+            spot_signals = self._generate_spot_signals(symbol, spot_signals)
+            signals.extend(spot_signals)
+            
+            # Generate multi-timeframe confluence signals
+            multi_timeframe_signals = self._generate_multi_timeframe_signals(symbol)
+            signals.extend(multi_timeframe_signals)
         
         logger.info(f"Generated {len(signals)} total signals for {symbol.symbol} ({len(futures_signals)} futures, {len(spot_signals)} spot, {len(multi_timeframe_signals)} multi-timeframe)")
         
@@ -168,38 +241,15 @@ class SignalGenerationService:
         filtered_signals = self._filter_signals_by_quality(signals)
         
         # Return all quality signals (don't select top 5 here - will be done globally)
-        # Persist and broadcast
-        saved_signals = []
+        # Persisted and broadcast with the rest of the run
         for sig in filtered_signals:
-            try:
-                sig.save()
-                saved_signals.append(sig)
-                # Broadcast
-                try:
-                    from apps.core.services import RealTimeBroadcaster
-                    broadcaster = RealTimeBroadcaster()
-                    from asgiref.sync import async_to_sync
-                    async_to_sync(broadcaster.broadcast_trading_signal)(
-                        signal_id=sig.id,
-                        symbol=sig.symbol.symbol,
-                        signal_type=sig.signal_type.name,
-                        strength=sig.strength,
-                        confidence_score=sig.confidence_score,
-                        entry_price=float(sig.entry_price) if sig.entry_price else None,
-                        target_price=float(sig.target_price) if sig.target_price else None,
-                        stop_loss=float(sig.stop_loss) if sig.stop_loss else None,
-                        timestamp=sig.created_at
-                    )
-                except Exception:
-                    pass
-            except Exception as e:
-                logger.error(f"Failed saving signal for {symbol.symbol}: {e}")
+            self._queue_signal(sig, create_alert=False)
 
-        logger.info(f"Generated {len(saved_signals)} engine signals for {symbol.symbol}")
-        return saved_signals
+        logger.info(f"Generated {len(filtered_signals)} engine signals for {symbol.symbol}")
+        return filtered_signals
     
-    def _generate_spot_signals(self, symbol: Symbol) -> List[TradingSignal]:
-        """Generate long-term spot trading signals"""
+    def _generate_spot_signals(self, symbol: Symbol, spot_signals: Optional[List] = None) -> List[TradingSignal]:
+        """Generate long-term spot trading signals (or convert those from generate_universe_signals)"""
         logger.info(f"Generating spot signals for {symbol.symbol}")
         
         signals = []
@@ -211,7 +261,8 @@ class SignalGenerationService:
         
         try:
             # Generate spot trading signals using spot engine
-            spot_signals = self.spot_engine.generate_spot_signals(symbol)
+            if spot_signals is None:
+                spot_signals = self.spot_engine.generate_spot_signals(symbol)
             
             # Convert SpotTradingSignal to TradingSignal for compatibility
             for spot_signal in spot_signals:
@@ -794,10 +845,7 @@ class SignalGenerationService:
         """Create a trading signal with all details"""
         try:
             # Get signal type
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_type_name,
-                defaults={'description': f'{signal_type_name} signal'}
-            )
+            signal_type = get_signal_type(signal_type_name, defaults={'description': f'{signal_type_name} signal'})
             
             # Calculate signal strength
             if confidence_score >= 0.9:
@@ -1015,8 +1063,8 @@ class SignalGenerationService:
             )
             
 
-            # Create signal
-            signal = TradingSignal.objects.create(
+            # Create signal, saved with the run's pipeline
+            signal = TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -1045,18 +1093,18 @@ class SignalGenerationService:
             )
             
 
-            # Store price metadata for tracking
-            self._store_price_metadata(signal, {
+            # Price metadata for tracking, cached once the signal has an id
+            signal.price_metadata = {
                 'entry_price': float(entry_price),
                 'target_price': float(target_price),
                 'stop_loss': float(stop_loss),
                 'market_data_price': float(market_data.get('close_price', 0)),
                 'live_price_used': current_price is not None,
                 'price_timestamp': timezone.now().isoformat()
-            })
+            }
             
-            # Create factor contributions
-            self._create_factor_contributions(signal, {
+            # Factor contributions and the alert are written with the signal
+            self._queue_signal(signal, {
                 'technical': technical_score,
                 'sentiment': sentiment_score,
                 'news': news_score,
@@ -1066,10 +1114,7 @@ class SignalGenerationService:
                 'sector': sector_score
             })
             
-            # Create alert
-            self._create_signal_alert(signal)
-            
-            logger.info(f"Successfully created {signal_type_name} signal for {symbol.symbol} at {entry_price}")
+            logger.info(f"Queued {signal_type_name} signal for {symbol.symbol} at {entry_price}")
             return signal
             
         except Exception as e:
@@ -1167,76 +1212,6 @@ class SignalGenerationService:
             logger.error(f"Error determining optimal timeframe: {e}")
             return '1H'
     
-    def _create_factor_contributions(self, signal: TradingSignal, scores: Dict):
-        """Create factor contribution records"""
-        try:
-            factors = {
-                'technical': SignalFactor.objects.get_or_create(
-                    name='Technical Analysis',
-                    factor_type='TECHNICAL',
-                    defaults={'weight': 0.35, 'description': 'Technical indicators analysis'}
-                )[0],
-                'sentiment': SignalFactor.objects.get_or_create(
-                    name='Sentiment Analysis',
-                    factor_type='SENTIMENT',
-                    defaults={'weight': 0.25, 'description': 'Social media and news sentiment'}
-                )[0],
-                'news': SignalFactor.objects.get_or_create(
-                    name='News Impact',
-                    factor_type='NEWS',
-                    defaults={'weight': 0.15, 'description': 'News event impact analysis'}
-                )[0],
-                'volume': SignalFactor.objects.get_or_create(
-                    name='Volume Analysis',
-                    factor_type='VOLUME',
-                    defaults={'weight': 0.15, 'description': 'Volume pattern analysis'}
-                )[0],
-                'pattern': SignalFactor.objects.get_or_create(
-                    name='Pattern Recognition',
-                    factor_type='PATTERN',
-                    defaults={'weight': 0.10, 'description': 'Chart pattern analysis'}
-                )[0],
-                'economic': SignalFactor.objects.get_or_create(
-                    name='Economic Analysis',
-                    factor_type='ECONOMIC',
-                    defaults={'weight': 0.10, 'description': 'Economic and fundamental analysis'}
-                )[0],
-                'sector': SignalFactor.objects.get_or_create(
-                    name='Sector Analysis',
-                    factor_type='SECTOR',
-                    defaults={'weight': 0.05, 'description': 'Sector momentum and rotation analysis'}
-                )[0]
-            }
-            
-            for factor_name, factor in factors.items():
-                score = scores.get(factor_name, 0.0)
-                contribution = score * factor.weight
-                
-                SignalFactorContribution.objects.create(
-                    signal=signal,
-                    factor=factor,
-                    score=score,
-                    weight=factor.weight,
-                    contribution=contribution,
-                    details={'factor_type': factor.factor_type}
-                )
-                
-        except Exception as e:
-            logger.error(f"Error creating factor contributions for signal {signal.id}: {e}")
-    
-    def _create_signal_alert(self, signal: TradingSignal):
-        """Create alert for new signal"""
-        try:
-            SignalAlert.objects.create(
-                alert_type='SIGNAL_GENERATED',
-                priority='HIGH' if signal.confidence_score >= 0.8 else 'MEDIUM',
-                title=f"New {signal.signal_type.name} Signal for {signal.symbol.symbol}",
-                message=f"Confidence: {signal.confidence_score:.2%}, Quality: {signal.quality_score:.2%}",
-                signal=signal
-            )
-        except Exception as e:
-            logger.error(f"Error creating signal alert: {e}")
-    
     def _filter_signals_by_quality(self, signals: List[TradingSignal]) -> List[TradingSignal]:
         """Filter signals by quality criteria with enhanced quality filtering"""
         if not signals:
@@ -1302,21 +1277,16 @@ class SignalGenerationService:
         signals = []
         
         try:
-            # Get advanced indicators data
-            fvg_data = self.advanced_indicators.calculate_fair_value_gap(symbol)
-            liquidity_swings = self.advanced_indicators.calculate_liquidity_swings(symbol)
-            nw_envelope = self.advanced_indicators.calculate_nadaraya_watson_envelope(symbol)
-            pivot_points = self.advanced_indicators.calculate_pivot_points(symbol)
-            rsi_divergence = self.advanced_indicators.calculate_rsi_divergence(symbol)
-            stoch_rsi = self.advanced_indicators.calculate_stochastic_rsi(symbol)
+            # Get advanced indicators data (single bar fetch for all indicators)
+            indicators = self.advanced_indicators.calculate_all(symbol)
             
             # Generate signals based on indicator combinations
-            signals.extend(self._create_fvg_signals(symbol, fvg_data))
-            signals.extend(self._create_liquidity_swing_signals(symbol, liquidity_swings))
-            signals.extend(self._create_nw_envelope_signals(symbol, nw_envelope))
-            signals.extend(self._create_pivot_point_signals(symbol, pivot_points))
-            signals.extend(self._create_rsi_divergence_signals(symbol, rsi_divergence))
-            signals.extend(self._create_stoch_rsi_signals(symbol, stoch_rsi))
+            signals.extend(self._create_fvg_signals(symbol, indicators.fair_value_gap))
+            signals.extend(self._create_liquidity_swing_signals(symbol, indicators.liquidity_swings))
+            signals.extend(self._create_nw_envelope_signals(symbol, indicators.nadaraya_watson_envelope))
+            signals.extend(self._create_pivot_point_signals(symbol, indicators.pivot_points))
+            signals.extend(self._create_rsi_divergence_signals(symbol, indicators.rsi_divergence))
+            signals.extend(self._create_stoch_rsi_signals(symbol, indicators.stochastic_rsi))
             
         except Exception as e:
             logger.error(f"Error generating advanced indicator signals for {symbol.symbol}: {e}")
@@ -3882,6 +3852,7 @@ class HistoricalSignalService:
                     except Exception as individual_error:
                         self.logger.warning(f"Skipping duplicate data point: {individual_error}")
                 self.logger.info(f"Stored {created_count} real historical data points for {symbol.symbol}")
+            update_watermarks([symbol.id], '1h')
                 
         except Exception as e:
             self.logger.error(f"Error fetching real historical data for {symbol.symbol}: {e}")
@@ -3966,6 +3937,7 @@ class HistoricalSignalService:
                 except Exception as individual_error:
                     self.logger.warning(f"Skipping duplicate data point: {individual_error}")
             self.logger.info(f"Created {created_count} fallback data points for {symbol.symbol}")
+        update_watermarks([symbol.id], '1h')
     
     def _get_historical_price_at_date(self, symbol: Symbol, target_date: datetime) -> Optional[float]:
         """Get the historical price of a symbol at a specific date"""
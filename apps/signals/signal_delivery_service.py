@@ -5,27 +5,59 @@ Delivers signals via API, dashboard, webhooks, and alerts
 
 import logging
 import json
+import random
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Q
 
+from apps.core.query_budget import max_queries
 from apps.signals.models import TradingSignal, SignalAlert
-from apps.signals.subscription_service import SubscriptionService
 from apps.trading.models import Symbol
 
+try:
+    from apps.signals.subscription_service import SubscriptionService
+except ImportError:  # Subscription tier models are not available
+    SubscriptionService = None
+
 logger = logging.getLogger(__name__)
 
+# Alert types that are delivered outside the app
+DELIVERY_CHANNELS = ('email', 'telegram', 'webhook')
+DEFAULT_CHANNEL_CONCURRENCY = {'email': 4, 'telegram': 8, 'webhook': 16}
+ALERT_DELIVERY_FIELDS = ['status', 'attempts', 'next_attempt_at', 'sent_at', 'error_message', 'claim_token']
+
+
+def _is_retryable_status(status_code: int) -> bool:
+    """Timeouts, rate limits and server errors are worth retrying"""
+    return status_code in (408, 425, 429) or status_code >= 500
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """Network and SMTP errors (OSError subclasses) are worth retrying"""
+    return isinstance(error, (requests.RequestException, OSError))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff with up to 10% jitter after the given number of attempts"""
+    base = getattr(settings, 'ALERT_RETRY_BASE_SECONDS', 30)
+    cap = getattr(settings, 'ALERT_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * (1 + random.random() * 0.1))
+
 
 class SignalDeliveryService:
     """Service for delivering signals through various channels"""
     
     def __init__(self):
         self.logger = logger
-        self.subscription_service = SubscriptionService()
+        self.subscription_service = SubscriptionService() if SubscriptionService else None
     
     def deliver_signal(self, signal: TradingSignal, user: Optional[object] = None,
                       delivery_channels: List[str] = None) -> Dict[str, Any]:
@@ -51,7 +83,9 @@ class SignalDeliveryService:
                 'timestamp': timezone.now().isoformat()
             }
             
-            # Check user access if user provided
+            # Check user access if user provided; without the subscription service nobody gets access
+            if user and self.subscription_service is None:
+                return {'error': 'Access denied', 'reason': 'Subscription service unavailable'}
             if user:
                 access_check = self.subscription_service.can_user_access_signal(user, signal)
                 if not access_check['can_access']:
@@ -106,8 +140,8 @@ class SignalDeliveryService:
                 'symbol': signal.symbol.symbol,
                 'signal_type': signal.signal_type.name,
                 'timeframe': signal.timeframe,
-                'price': float(signal.price) if signal.price else None,
-                'strength': signal.strength_score,
+                'price': float(signal.entry_price) if signal.entry_price else None,
+                'strength': signal.strength,
                 'confidence': signal.confidence_score,
                 'is_hybrid': signal.is_hybrid,
                 'created_at': signal.created_at.isoformat(),
@@ -144,7 +178,7 @@ class SignalDeliveryService:
                 'signal_id': signal.id,
                 'symbol': signal.symbol.symbol,
                 'signal_type': signal.signal_type.name,
-                'strength': signal.strength_score,
+                'strength': signal.strength,
                 'confidence': signal.confidence_score,
                 'is_hybrid': signal.is_hybrid,
                 'timestamp': signal.created_at.isoformat()
@@ -181,8 +215,8 @@ class SignalDeliveryService:
                 'symbol': signal.symbol.symbol,
                 'signal_type': signal.signal_type.name,
                 'timeframe': signal.timeframe,
-                'price': float(signal.price) if signal.price else None,
-                'strength': signal.strength_score,
+                'price': float(signal.entry_price) if signal.entry_price else None,
+                'strength': signal.strength,
                 'confidence': signal.confidence_score,
                 'is_hybrid': signal.is_hybrid,
                 'timestamp': signal.created_at.isoformat(),
@@ -210,12 +244,13 @@ class SignalDeliveryService:
                     'webhook_url': webhook_url,
                     'response_status': response.status_code,
                     'error': response.text,
+                    'retryable': _is_retryable_status(response.status_code),
                     'delivery_method': 'webhook'
                 }
                 
         except Exception as e:
             self.logger.error(f"Error delivering via webhook: {e}")
-            return {'error': str(e)}
+            return {'error': str(e), 'retryable': _is_transient_error(e)}
     
     def _deliver_via_email(self, signal: TradingSignal, user: Optional[object] = None) -> Dict[str, Any]:
         """Deliver signal via email"""
@@ -253,7 +288,7 @@ class SignalDeliveryService:
             
         except Exception as e:
             self.logger.error(f"Error delivering via email: {e}")
-            return {'error': str(e)}
+            return {'error': str(e), 'retryable': _is_transient_error(e)}
     
     def _deliver_via_telegram(self, signal: TradingSignal, user: Optional[object] = None) -> Dict[str, Any]:
         """Deliver signal via Telegram"""
@@ -299,12 +334,13 @@ class SignalDeliveryService:
                     'telegram_chat_id': telegram_chat_id,
                     'response_status': response.status_code,
                     'error': response.text,
+                    'retryable': _is_retryable_status(response.status_code),
                     'delivery_method': 'telegram'
                 }
                 
         except Exception as e:
             self.logger.error(f"Error delivering via Telegram: {e}")
-            return {'error': str(e)}
+            return {'error': str(e), 'retryable': _is_transient_error(e)}
     
     def _create_email_body(self, signal: TradingSignal) -> str:
         """Create email body for signal"""
@@ -315,8 +351,8 @@ Trading Signal Alert
 Symbol: {signal.symbol.symbol}
 Signal Type: {signal.signal_type.name}
 Timeframe: {signal.timeframe}
-Price: {signal.price if signal.price else 'N/A'}
-Strength: {signal.strength_score:.2f}
+Price: {signal.entry_price if signal.entry_price else 'N/A'}
+Strength: {signal.strength}
 Confidence: {signal.confidence_score:.2f}
 Timestamp: {signal.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}
 
@@ -358,8 +394,8 @@ AI Trading Engine Team
 📊 <b>Symbol:</b> {signal.symbol.symbol}
 📈 <b>Signal:</b> {signal.signal_type.name}
 ⏰ <b>Timeframe:</b> {signal.timeframe}
-💰 <b>Price:</b> {signal.price if signal.price else 'N/A'}
-💪 <b>Strength:</b> {signal.strength_score:.2f}
+💰 <b>Price:</b> {signal.entry_price if signal.entry_price else 'N/A'}
+💪 <b>Strength:</b> {signal.strength}
 🎯 <b>Confidence:</b> {signal.confidence_score:.2f}
 🕐 <b>Time:</b> {signal.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}
 """
@@ -405,61 +441,157 @@ AI Trading Engine Team
             self.logger.error(f"Error creating signal alert: {e}")
             return None
     
-    def process_pending_alerts(self) -> Dict[str, Any]:
-        """Process all pending signal alerts"""
+    @max_queries(50)
+    def process_pending_alerts(self, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Process all due signal alerts.
+        
+        Alerts are claimed in id-ordered batches (SENDING with this run's
+        claim token, so overlapping runs never send the same alert), loaded
+        with their signal and user, delivered by one thread pool per channel
+        (sized by ALERT_CHANNEL_CONCURRENCY) and saved with one bulk_update
+        per batch. Transient failures are retried with exponential backoff
+        through next_attempt_at; claims of a crashed run expire after
+        ALERT_CLAIM_TIMEOUT_SECONDS.
+        """
         try:
-            pending_alerts = SignalAlert.objects.filter(
-                status='PENDING',
-                created_at__gte=timezone.now() - timedelta(hours=24)
-            )
+            batch_size = batch_size or getattr(settings, 'ALERT_DISPATCH_BATCH_SIZE', 200)
+            claim_token = uuid.uuid4()
             
             results = {
-                'total_alerts': pending_alerts.count(),
+                'total_alerts': 0,
                 'processed': 0,
                 'failed': 0,
+                'retried': 0,
                 'errors': []
             }
             
-            for alert in pending_alerts:
-                try:
-                    # Determine delivery channel based on alert type
-                    if alert.alert_type == 'email':
-                        delivery_result = self._deliver_via_email(alert.signal, alert.user)
-                    elif alert.alert_type == 'telegram':
-                        delivery_result = self._deliver_via_telegram(alert.signal, alert.user)
-                    elif alert.alert_type == 'webhook':
-                        delivery_result = self._deliver_via_webhook(alert.signal, alert.user)
-                    else:
-                        delivery_result = {'error': f'Unknown alert type: {alert.alert_type}'}
-                    
-                    # Update alert status
-                    if delivery_result.get('status') == 'success':
-                        alert.status = 'SENT'
-                        alert.sent_at = timezone.now()
-                        results['processed'] += 1
-                    else:
-                        alert.status = 'FAILED'
-                        alert.error_message = delivery_result.get('error', 'Unknown error')
-                        results['failed'] += 1
-                        results['errors'].append(f"Alert {alert.id}: {delivery_result.get('error')}")
+            executors = {}
+            try:
+                last_id = 0
+                while True:
+                    candidate_ids, batch = self._claim_batch(claim_token, last_id, batch_size)
+                    if not candidate_ids:
+                        break
+                    last_id = candidate_ids[-1]
+                    results['total_alerts'] += len(batch)
                     
-                    alert.save()
+                    futures = [
+                        (alert, self._channel_executor(executors, alert.alert_type).submit(self._dispatch_alert, alert))
+                        for alert in batch
+                    ]
+                    for alert, future in futures:
+                        try:
+                            delivery_result = future.result()
+                        except Exception as e:
+                            delivery_result = {'error': str(e), 'retryable': _is_transient_error(e)}
+                        self._record_delivery(alert, delivery_result, results)
                     
-                except Exception as e:
-                    alert.status = 'FAILED'
-                    alert.error_message = str(e)
-                    alert.save()
+                    SignalAlert.objects.bulk_update(batch, ALERT_DELIVERY_FIELDS)
                     
-                    results['failed'] += 1
-                    results['errors'].append(f"Alert {alert.id}: {str(e)}")
-            
-            self.logger.info(f"Processed {results['processed']} alerts, {results['failed']} failed")
+                    if len(candidate_ids) < batch_size:
+                        break
+            finally:
+                for executor in executors.values():
+                    executor.shutdown(wait=True)
+            
+            self.logger.info(f"Processed {results['processed']} alerts, {results['failed']} failed, "
+                             f"{results['retried']} scheduled for retry")
             return results
             
         except Exception as e:
             self.logger.error(f"Error processing pending alerts: {e}")
             return {'error': str(e)}
     
+    @staticmethod
+    def _due_alerts(now):
+        """Channel alerts of the last day that are due, or whose claim expired"""
+        return SignalAlert.objects.filter(
+            alert_type__in=DELIVERY_CHANNELS,
+            created_at__gte=now - timedelta(hours=24)
+        ).filter(
+            Q(status='PENDING', next_attempt_at__isnull=True) |
+            Q(status__in=['PENDING', 'SENDING'], next_attempt_at__lte=now)
+        )
+    
+    def _claim_batch(self, claim_token, last_id: int, batch_size: int):
+        """
+        Claim the next batch of due alerts after last_id.
+        
+        Returns the candidate ids (for keyset pagination) and the alerts this
+        run claimed. Rows are locked with SKIP LOCKED where supported, and the
+        claiming UPDATE re-checks that they are still due, so of two runs
+        racing for an alert only one gets it.
+        """
+        now = timezone.now()
+        due = self._due_alerts(now)
+        with transaction.atomic():
+            candidates = due.filter(id__gt=last_id).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                candidates = candidates.select_for_update(skip_locked=True)
+            candidate_ids = list(candidates.values_list('id', flat=True)[:batch_size])
+            if not candidate_ids:
+                return [], []
+            claim_expiry = now + timedelta(seconds=getattr(settings, 'ALERT_CLAIM_TIMEOUT_SECONDS', 600))
+            due.filter(id__in=candidate_ids).update(
+                status='SENDING', claim_token=claim_token, next_attempt_at=claim_expiry
+            )
+        batch = list(SignalAlert.objects.filter(
+            id__in=candidate_ids, status='SENDING', claim_token=claim_token
+        ).select_related(
+            'user', 'signal__symbol', 'signal__signal_type'
+        ).order_by('id'))
+        return candidate_ids, batch
+    
+    def _channel_executor(self, executors: Dict[str, ThreadPoolExecutor], channel: str) -> ThreadPoolExecutor:
+        """Thread pool of a channel, created on first use"""
+        executor = executors.get(channel)
+        if executor is None:
+            limits = getattr(settings, 'ALERT_CHANNEL_CONCURRENCY', {})
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, limits.get(channel, DEFAULT_CHANNEL_CONCURRENCY.get(channel, 4))),
+                thread_name_prefix=f'alerts-{channel}'
+            )
+            executors[channel] = executor
+        return executor
+    
+    def _dispatch_alert(self, alert: SignalAlert) -> Dict[str, Any]:
+        """Deliver one alert; runs in a pool thread on prefetched relations only"""
+        if alert.signal is None:
+            return {'error': 'Alert has no signal', 'retryable': False}
+        if alert.alert_type == 'email':
+            return self._deliver_via_email(alert.signal, alert.user)
+        if alert.alert_type == 'telegram':
+            return self._deliver_via_telegram(alert.signal, alert.user)
+        if alert.alert_type == 'webhook':
+            return self._deliver_via_webhook(alert.signal, alert.user)
+        return {'error': f'Unknown alert type: {alert.alert_type}', 'retryable': False}
+    
+    def _record_delivery(self, alert: SignalAlert, delivery_result: Dict[str, Any], results: Dict[str, Any]):
+        """Apply a delivery result to the claimed alert (saved later in bulk)"""
+        alert.attempts += 1
+        alert.claim_token = None
+        if delivery_result.get('status') == 'success':
+            alert.status = 'SENT'
+            alert.sent_at = timezone.now()
+            alert.next_attempt_at = None
+            alert.error_message = ''
+            results['processed'] += 1
+            return
+        
+        error = delivery_result.get('error', 'Unknown error')
+        alert.error_message = str(error)
+        max_attempts = getattr(settings, 'ALERT_MAX_ATTEMPTS', 5)
+        if delivery_result.get('retryable') and alert.attempts < max_attempts:
+            alert.status = 'PENDING'
+            alert.next_attempt_at = timezone.now() + retry_delay(alert.attempts)
+            results['retried'] += 1
+        else:
+            alert.status = 'FAILED'
+            alert.next_attempt_at = None
+            results['failed'] += 1
+            results['errors'].append(f"Alert {alert.id}: {error}")
+    
     def get_delivery_statistics(self, days: int = 7) -> Dict[str, Any]:
         """Get delivery statistics for the specified period"""
         try:
@@ -0,0 +1,240 @@
+"""
+Signal Persistence Pipeline for AI Trading Engine
+
+Signals are accumulated in memory together with their factor scores and
+written with bulk_create, one transaction per batch. SignalType and
+SignalFactor rows are resolved through a process-wide lookup cache, so a
+batch of thousands of signals costs a handful of queries. Alerts are
+inserted in the same transaction and one websocket message per batch is
+broadcast after it commits, together with the signals_persisted signal
+(bulk inserts send no post_save). Databases that cannot return ids from a
+bulk insert (MySQL) get them back through a per-batch token.
+"""
+
+import uuid
+import logging
+import threading
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from apps.signals.models import (
+    TradingSignal, SignalType, SignalFactor, SignalFactorContribution, SignalAlert
+)
+
+logger = logging.getLogger(__name__)
+
+# Sent after a committed batch with signals=[saved TradingSignal, ...]
+signals_persisted = Signal()
+
+# Factor key -> (name, factor_type, defaults) used for factor contributions
+SIGNAL_FACTORS = {
+    'technical': ('Technical Analysis', 'TECHNICAL', {'weight': 0.35, 'description': 'Technical indicators analysis'}),
+    'sentiment': ('Sentiment Analysis', 'SENTIMENT', {'weight': 0.25, 'description': 'Social media and news sentiment'}),
+    'news': ('News Impact', 'NEWS', {'weight': 0.15, 'description': 'News event impact analysis'}),
+    'volume': ('Volume Analysis', 'VOLUME', {'weight': 0.15, 'description': 'Volume pattern analysis'}),
+    'pattern': ('Pattern Recognition', 'PATTERN', {'weight': 0.10, 'description': 'Chart pattern analysis'}),
+    'economic': ('Economic Analysis', 'ECONOMIC', {'weight': 0.10, 'description': 'Economic and fundamental analysis'}),
+    'sector': ('Sector Analysis', 'SECTOR', {'weight': 0.05, 'description': 'Sector momentum and rotation analysis'}),
+}
+
+
+class SignalLookupCache:
+    """
+    Process-wide cache of SignalType and SignalFactor rows.
+
+    Rows are only cached once the transaction that read or created them
+    has committed, so a rolled back get_or_create never leaves a dangling
+    id behind. Saving or deleting a row evicts it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signal_types = {}
+        self._factors = {}
+
+    def _store(self, table, key, instance):
+        def store():
+            with self._lock:
+                table[key] = instance
+        transaction.on_commit(store)
+
+    def signal_type(self, name: str, defaults: Optional[Dict] = None) -> SignalType:
+        """Get or create the SignalType called name"""
+        signal_type = self._signal_types.get(name)
+        if signal_type is None:
+            signal_type, _ = SignalType.objects.get_or_create(name=name, defaults=defaults or {})
+            self._store(self._signal_types, name, signal_type)
+        return signal_type
+
+    def signal_factor(self, name: str, factor_type: str, defaults: Optional[Dict] = None) -> SignalFactor:
+        """Get or create the SignalFactor identified by (name, factor_type)"""
+        key = (name, factor_type)
+        factor = self._factors.get(key)
+        if factor is None:
+            factor, _ = SignalFactor.objects.get_or_create(name=name, factor_type=factor_type, defaults=defaults or {})
+            self._store(self._factors, key, factor)
+        return factor
+
+    def factors(self) -> Dict[str, SignalFactor]:
+        """All factors of SIGNAL_FACTORS keyed by factor key"""
+        return {
+            key: self.signal_factor(name, factor_type, defaults)
+            for key, (name, factor_type, defaults) in SIGNAL_FACTORS.items()
+        }
+
+    def evict(self, sender=None, instance=None, **kwargs):
+        with self._lock:
+            if isinstance(instance, SignalType):
+                self._signal_types.pop(instance.name, None)
+            elif isinstance(instance, SignalFactor):
+                self._factors.pop((instance.name, instance.factor_type), None)
+
+    def clear(self):
+        with self._lock:
+            self._signal_types.clear()
+            self._factors.clear()
+
+
+signal_lookups = SignalLookupCache()
+
+for _model in (SignalType, SignalFactor):
+    post_save.connect(signal_lookups.evict, sender=_model, dispatch_uid=f'signal_lookups_save_{_model.__name__}')
+    post_delete.connect(signal_lookups.evict, sender=_model, dispatch_uid=f'signal_lookups_delete_{_model.__name__}')
+
+
+def get_signal_type(name: str, defaults: Optional[Dict] = None) -> SignalType:
+    """Get or create a SignalType through the process-wide cache"""
+    return signal_lookups.signal_type(name, defaults)
+
+
+class SignalPersistencePipeline:
+    """
+    Accumulates signals and writes them in batches.
+
+    Use as a context manager, or call flush() explicitly; add() flushes
+    automatically every `batch_size` signals. Saved signals are collected
+    in `saved`.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, create_alerts: bool = True, broadcast: bool = True):
+        self.batch_size = batch_size or getattr(settings, 'SIGNAL_PERSISTENCE_BATCH_SIZE', 1000)
+        self.create_alerts = create_alerts
+        self.broadcast = broadcast
+        self.saved = []
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        return False
+
+    def add(self, signal: TradingSignal, factor_scores: Optional[Dict[str, float]] = None,
+            create_alert: Optional[bool] = None) -> TradingSignal:
+        """
+        Queue an unsaved signal, optionally with factor scores keyed like
+        SIGNAL_FACTORS; create_alert overrides the pipeline's create_alerts.
+        """
+        if create_alert is None:
+            create_alert = self.create_alerts
+        self._pending.append((signal, factor_scores, create_alert))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        return signal
+
+    def flush(self) -> List[TradingSignal]:
+        """Write all queued signals in one transaction, returns the saved signals"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        signals = [signal for signal, _, _ in pending]
+        factors = signal_lookups.factors() if any(scores for _, scores, _ in pending) else {}
+
+        with transaction.atomic():
+            self._insert_signals(signals)
+
+            contributions = []
+            for signal, scores, _ in pending:
+                for key, score in (scores or {}).items():
+                    factor = factors.get(key)
+                    if factor is None:
+                        continue
+                    contributions.append(SignalFactorContribution(
+                        signal=signal,
+                        factor=factor,
+                        score=score,
+                        weight=factor.weight,
+                        contribution=score * factor.weight,
+                        details={'factor_type': factor.factor_type}
+                    ))
+            SignalFactorContribution.objects.bulk_create(contributions, batch_size=self.batch_size)
+
+            alerts = [self._build_alert(signal) for signal, _, create_alert in pending if create_alert]
+            SignalAlert.objects.bulk_create(alerts, batch_size=self.batch_size)
+
+            if self.broadcast:
+                transaction.on_commit(lambda: self._broadcast(signals))
+            transaction.on_commit(lambda: signals_persisted.send(sender=TradingSignal, signals=signals))
+
+        self.saved.extend(signals)
+        logger.info(f"Saved {len(signals)} signals with {len(contributions)} factor contributions")
+        return signals
+
+    def _insert_signals(self, signals: List[TradingSignal]):
+        if connection.features.can_return_rows_from_bulk_insert:
+            TradingSignal.objects.bulk_create(signals, batch_size=self.batch_size)
+            return
+
+        # Without RETURNING the ids are read back by the batch token; ids
+        # increase in insert order, so sorting by id matches the list
+        batch_token = uuid.uuid4()
+        for signal in signals:
+            signal.batch_token = batch_token
+        TradingSignal.objects.bulk_create(signals, batch_size=self.batch_size)
+        ids = list(TradingSignal.objects.filter(batch_token=batch_token).order_by('id').values_list('id', flat=True))
+        if len(ids) != len(signals):
+            raise RuntimeError(f"Inserted {len(signals)} signals but found {len(ids)} of batch {batch_token}")
+        for signal, signal_id in zip(signals, ids):
+            signal.pk = signal_id
+            signal._state.adding = False
+            signal._state.db = connection.alias
+
+    @staticmethod
+    def _build_alert(signal: TradingSignal) -> SignalAlert:
+        return SignalAlert(
+            alert_type='SIGNAL_GENERATED',
+            priority='HIGH' if signal.confidence_score >= 0.8 else 'MEDIUM',
+            title=f"New {signal.signal_type.name} Signal for {signal.symbol.symbol}",
+            message=f"Confidence: {signal.confidence_score:.2%}, Quality: {signal.quality_score:.2%}",
+            signal=signal
+        )
+
+    @staticmethod
+    def _broadcast(signals: List[TradingSignal]):
+        try:
+            from apps.core.services import RealTimeBroadcaster
+            broadcaster = RealTimeBroadcaster()
+        except Exception as e:
+            logger.warning(f"Signal broadcast unavailable: {e}")
+            return
+
+        broadcaster.broadcast_trading_signals([
+            {
+                'signal_id': signal.id,
+                'symbol': signal.symbol.symbol,
+                'signal_type': signal.signal_type.name,
+                'strength': signal.strength,
+                'confidence_score': signal.confidence_score,
+                'entry_price': float(signal.entry_price) if signal.entry_price else None,
+                'target_price': float(signal.target_price) if signal.target_price else None,
+                'stop_loss': float(signal.stop_loss) if signal.stop_loss else None,
+                'timestamp': signal.created_at.isoformat() if signal.created_at else None,
+            }
+            for signal in signals
+        ])
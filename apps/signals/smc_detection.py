@@ -0,0 +1,392 @@
+"""
+Vectorized Smart Money Concepts (SMC) Detection Engine
+Shared swing, BOS/CHoCH, FVG, liquidity sweep and order block detection over NumPy OHLC arrays
+
+Used by SmartMoneyConceptsStrategy, SMCPatternRecognitionService and
+ProperStrategyBacktestingService. Every detector works on whole arrays
+(rolling-window extrema and shifted comparisons), returns NumPy structured
+arrays of events and supports appending new bars without rescanning history.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger(__name__)
+
+BULLISH = 1
+BEARISH = -1
+
+# direction: BULLISH for swing highs, BEARISH for swing lows
+SWING_DTYPE = np.dtype([
+    ('index', np.int64), ('price', np.float64), ('direction', np.int8)
+])
+
+# kind: 'BOS' when the break continues the previous break direction, 'CHOCH' when it flips it
+BREAK_DTYPE = np.dtype([
+    ('index', np.int64), ('swing_index', np.int64), ('direction', np.int8),
+    ('kind', 'U5'), ('level', np.float64), ('close', np.float64)
+])
+
+# index is the candle completing the gap; bottom/top bound the unfilled price range
+FVG_DTYPE = np.dtype([
+    ('index', np.int64), ('direction', np.int8),
+    ('bottom', np.float64), ('top', np.float64), ('size', np.float64)
+])
+
+# level is the prior range extreme, extreme is the wick beyond it
+LEVEL_EVENT_DTYPE = np.dtype([
+    ('index', np.int64), ('direction', np.int8),
+    ('level', np.float64), ('extreme', np.float64), ('close', np.float64)
+])
+
+ORDER_BLOCK_DTYPE = np.dtype([
+    ('index', np.int64), ('direction', np.int8),
+    ('bottom', np.float64), ('top', np.float64), ('mitigated', np.bool_)
+])
+
+
+def _rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """result[k] = max(values[k:k + window])"""
+    return sliding_window_view(values, window).max(axis=1)
+
+
+def _rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """result[k] = min(values[k:k + window])"""
+    return sliding_window_view(values, window).min(axis=1)
+
+
+def _events(dtype: np.dtype, **fields) -> np.ndarray:
+    """Build a structured event array from equally sized field arrays"""
+    size = len(next(iter(fields.values())))
+    events = np.empty(size, dtype=dtype)
+    for name, values in fields.items():
+        events[name] = values
+    return events
+
+
+def _sorted_events(*parts: np.ndarray) -> np.ndarray:
+    events = np.concatenate(parts)
+    return events[np.argsort(events['index'], kind='stable')]
+
+
+class SMCDetector:
+    """
+    Vectorized SMC detector over OHLCV arrays.
+
+    Bars must be in chronological order. Swing flags are cached per
+    (window, strict) and only the tail that new bars can change is
+    recomputed after append().
+    """
+
+    def __init__(self, open_prices, high, low, close, volume=None, timestamps=None):
+        self.open = np.asarray(open_prices, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = (np.asarray(volume, dtype=np.float64) if volume is not None
+                       else np.zeros(len(self.close)))
+        self.timestamps = np.asarray(timestamps, dtype=object) if timestamps is not None else None
+        self._swing_cache = {}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'SMCDetector':
+        """Create detector from a DataFrame with open/high/low/close[/volume/timestamp] columns"""
+        return cls(
+            df['open'].to_numpy(), df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy(),
+            df['volume'].to_numpy() if 'volume' in df else None,
+            df['timestamp'].to_numpy() if 'timestamp' in df else None
+        )
+
+    @classmethod
+    def from_records(cls, records: List[Dict]) -> 'SMCDetector':
+        """Create detector from market data dicts, sorted by timestamp"""
+        if records and 'timestamp' in records[0]:
+            records = sorted(records, key=lambda record: record['timestamp'])
+        return cls(
+            [record['open'] for record in records],
+            [record['high'] for record in records],
+            [record['low'] for record in records],
+            [record['close'] for record in records],
+            [record.get('volume', 0.0) for record in records],
+            [record.get('timestamp') for record in records]
+        )
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def append(self, open_prices, high, low, close, volume=None, timestamps=None):
+        """Append new bars; cached swing flags are extended incrementally on next use"""
+        count = len(np.atleast_1d(close))
+        self.open = np.concatenate([self.open, np.atleast_1d(open_prices).astype(np.float64)])
+        self.high = np.concatenate([self.high, np.atleast_1d(high).astype(np.float64)])
+        self.low = np.concatenate([self.low, np.atleast_1d(low).astype(np.float64)])
+        self.close = np.concatenate([self.close, np.atleast_1d(close).astype(np.float64)])
+        self.volume = np.concatenate([
+            self.volume,
+            np.atleast_1d(volume).astype(np.float64) if volume is not None else np.zeros(count)
+        ])
+        if self.timestamps is not None:
+            new_timestamps = np.atleast_1d(np.asarray(timestamps, dtype=object)) if timestamps is not None \
+                else np.full(count, None, dtype=object)
+            self.timestamps = np.concatenate([self.timestamps, new_timestamps])
+
+    def timestamp_at(self, index: int):
+        """Timestamp of bar index, None when the detector has no timestamps"""
+        return self.timestamps[index] if self.timestamps is not None else None
+
+    # ------------------------------------------------------------------
+    # Swings
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _pivot_flags(values: np.ndarray, window: int, strict: bool, start: int) -> np.ndarray:
+        """Flags for bars >= start that are the extreme of values over +/- window bars"""
+        n = len(values)
+        flags = np.zeros(max(n - start, 0), dtype=bool)
+        first = max(start, window)
+        last = n - window  # exclusive, later bars lack right-hand confirmation
+        if last <= first:
+            return flags
+
+        offset = first - window
+        window_max = _rolling_max(values[offset:], window)
+        idx = np.arange(first, last)
+        center = values[idx]
+        left = window_max[idx - window - offset]
+        right = window_max[idx + 1 - offset]
+        if strict:
+            pivots = (center > left) & (center > right)
+        else:
+            pivots = (center >= left) & (center >= right)
+        flags[idx - start] = pivots
+        return flags
+
+    def _swing_flags(self, window: int, strict: bool):
+        """Cached (high flags, low flags), extended for bars appended since last call"""
+        n = len(self)
+        key = (window, strict)
+        cached = self._swing_cache.get(key)
+        if cached and cached[2] == n:
+            return cached[0], cached[1]
+
+        # Bars within `window` of the old end could not be confirmed before
+        start = max(cached[2] - window, 0) if cached else 0
+        high_flags = self._pivot_flags(self.high, window, strict, start)
+        low_flags = self._pivot_flags(-self.low, window, strict, start)
+        if cached and start:
+            high_flags = np.concatenate([cached[0][:start], high_flags])
+            low_flags = np.concatenate([cached[1][:start], low_flags])
+
+        self._swing_cache[key] = (high_flags, low_flags, n)
+        return high_flags, low_flags
+
+    def swings(self, window: int = 5, strict: bool = True) -> np.ndarray:
+        """
+        Swing highs/lows: bars whose high (low) is above (below) the `window`
+        bars on each side. strict=False also accepts ties.
+        """
+        high_flags, low_flags = self._swing_flags(window, strict)
+        high_idx = np.flatnonzero(high_flags)
+        low_idx = np.flatnonzero(low_flags)
+        return _sorted_events(
+            _events(SWING_DTYPE, index=high_idx, price=self.high[high_idx],
+                    direction=np.full(len(high_idx), BULLISH)),
+            _events(SWING_DTYPE, index=low_idx, price=self.low[low_idx],
+                    direction=np.full(len(low_idx), BEARISH)),
+        )
+
+    def swing_highs(self, window: int = 5, strict: bool = True) -> np.ndarray:
+        swings = self.swings(window, strict)
+        return swings[swings['direction'] == BULLISH]
+
+    def swing_lows(self, window: int = 5, strict: bool = True) -> np.ndarray:
+        swings = self.swings(window, strict)
+        return swings[swings['direction'] == BEARISH]
+
+    # ------------------------------------------------------------------
+    # Market structure
+    # ------------------------------------------------------------------
+
+    def _first_breaks(self, flags: np.ndarray, prices: np.ndarray, window: int, direction: int) -> np.ndarray:
+        """First close beyond each swing while it is the latest confirmed swing"""
+        n = len(self)
+        swing_idx = np.flatnonzero(flags)
+        confirmed_at = swing_idx + window
+        valid = confirmed_at < n
+        if not valid.any():
+            return np.empty(0, dtype=BREAK_DTYPE)
+
+        # Latest confirmed swing for every bar (swing indices are increasing)
+        active = np.full(n, -1, dtype=np.int64)
+        active[confirmed_at[valid]] = swing_idx[valid]
+        active = np.maximum.accumulate(active)
+
+        has_level = active >= 0
+        level = np.where(has_level, prices[np.maximum(active, 0)], np.nan)
+        if direction == BULLISH:
+            crossed = has_level & (self.close > level)
+        else:
+            crossed = has_level & (self.close < level)
+
+        hits = np.flatnonzero(crossed)
+        _, first = np.unique(active[hits], return_index=True)
+        hits = hits[first]
+        return _events(
+            BREAK_DTYPE, index=hits, swing_index=active[hits], direction=np.full(len(hits), direction),
+            kind=np.full(len(hits), 'BOS'), level=level[hits], close=self.close[hits]
+        )
+
+    def structure_breaks(self, window: int = 5, strict: bool = True) -> np.ndarray:
+        """
+        Breaks of the latest confirmed swing high (bullish) or low (bearish)
+        by a close. A break in the same direction as the previous one is a
+        BOS, a break that flips direction is a CHoCH.
+        """
+        high_flags, low_flags = self._swing_flags(window, strict)
+        breaks = _sorted_events(
+            self._first_breaks(high_flags, self.high, window, BULLISH),
+            self._first_breaks(low_flags, self.low, window, BEARISH),
+        )
+        if len(breaks) > 1:
+            flipped = breaks['direction'][1:] != breaks['direction'][:-1]
+            breaks['kind'][1:][flipped] = 'CHOCH'
+        return breaks
+
+    def trend(self, window: int = 5, strict: bool = True) -> str:
+        """UPTREND on higher highs and higher lows, DOWNTREND on lower highs and lower lows"""
+        highs = self.swing_highs(window, strict)['price']
+        lows = self.swing_lows(window, strict)['price']
+        if len(highs) >= 2 and len(lows) >= 2:
+            if highs[-1] > highs[-2] and lows[-1] > lows[-2]:
+                return 'UPTREND'
+            if highs[-1] < highs[-2] and lows[-1] < lows[-2]:
+                return 'DOWNTREND'
+        return 'SIDEWAYS'
+
+    def prior_extremes(self, lookback: int):
+        """(highest high, lowest low) of the `lookback` bars before each bar, NaN when unavailable"""
+        n = len(self)
+        prior_high = np.full(n, np.nan)
+        prior_low = np.full(n, np.nan)
+        if n > lookback:
+            prior_high[lookback:] = _rolling_max(self.high, lookback)[:-1]
+            prior_low[lookback:] = _rolling_min(self.low, lookback)[:-1]
+        return prior_high, prior_low
+
+    def range_breaks(self, lookback: int = 20, min_break: float = 0.0) -> np.ndarray:
+        """Bars whose high (low) exceeds the prior `lookback`-bar range by more than min_break"""
+        prior_high, prior_low = self.prior_extremes(lookback)
+        with np.errstate(invalid='ignore'):
+            up = np.flatnonzero(self.high > prior_high * (1 + min_break))
+            down = np.flatnonzero(self.low < prior_low * (1 - min_break))
+        return _sorted_events(
+            _events(LEVEL_EVENT_DTYPE, index=up, direction=np.full(len(up), BULLISH),
+                    level=prior_high[up], extreme=self.high[up], close=self.close[up]),
+            _events(LEVEL_EVENT_DTYPE, index=down, direction=np.full(len(down), BEARISH),
+                    level=prior_low[down], extreme=self.low[down], close=self.close[down]),
+        )
+
+    def liquidity_sweeps(self, lookback: int = 20, threshold: float = 0.0) -> np.ndarray:
+        """
+        Wicks beyond the prior `lookback`-bar range that close back inside it:
+        a sweep below the range low is bullish, above the range high bearish.
+        """
+        prior_high, prior_low = self.prior_extremes(lookback)
+        with np.errstate(invalid='ignore'):
+            up = np.flatnonzero(
+                ((prior_low - self.low) / prior_low > threshold) & (self.close > prior_low)
+            )
+            down = np.flatnonzero(
+                ((self.high - prior_high) / prior_high > threshold) & (self.close < prior_high)
+            )
+        return _sorted_events(
+            _events(LEVEL_EVENT_DTYPE, index=up, direction=np.full(len(up), BULLISH),
+                    level=prior_low[up], extreme=self.low[up], close=self.close[up]),
+            _events(LEVEL_EVENT_DTYPE, index=down, direction=np.full(len(down), BEARISH),
+                    level=prior_high[down], extreme=self.high[down], close=self.close[down]),
+        )
+
+    # ------------------------------------------------------------------
+    # Imbalances and order blocks
+    # ------------------------------------------------------------------
+
+    def fair_value_gaps(self, span: int = 2, min_size: float = 0.0, start: int = 0) -> np.ndarray:
+        """
+        Gaps between the candle `span` bars back and the current candle.
+        span=2 is the classic three-candle FVG, span=1 an adjacent-candle gap.
+        """
+        n = len(self)
+        first = max(span, start)
+        if n <= first:
+            return np.empty(0, dtype=FVG_DTYPE)
+
+        idx = np.arange(first, n)
+        before_high = self.high[idx - span]
+        before_low = self.low[idx - span]
+        up_size = (self.low[idx] - before_high) / before_high
+        down_size = (before_low - self.high[idx]) / before_low
+
+        up = up_size > min_size
+        down = ~up & (down_size > min_size)
+        return _sorted_events(
+            _events(FVG_DTYPE, index=idx[up], direction=np.full(up.sum(), BULLISH),
+                    bottom=before_high[up], top=self.low[idx[up]], size=up_size[up]),
+            _events(FVG_DTYPE, index=idx[down], direction=np.full(down.sum(), BEARISH),
+                    bottom=self.high[idx[down]], top=before_low[down], size=down_size[down]),
+        )
+
+    def order_blocks(self, min_body: float = 0.02, hold_candles: int = 4, min_index: int = 10) -> np.ndarray:
+        """
+        Strong displacement candles (body > min_body, closing beyond the previous
+        candle's range) whose open holds for the next `hold_candles` closes.
+        mitigated is True once any later close trades through the block.
+        """
+        n = len(self)
+        last = n - hold_candles - 1  # exclusive, blocks need a full hold window
+        if last <= min_index:
+            return np.empty(0, dtype=ORDER_BLOCK_DTYPE)
+
+        idx = np.arange(min_index, last)
+        o, c = self.open[idx], self.close[idx]
+        next_min = _rolling_min(self.close, hold_candles)[idx + 1]
+        next_max = _rolling_max(self.close, hold_candles)[idx + 1]
+
+        bullish = (c > o) & (c > self.high[idx - 1]) & ((c - o) / o > min_body) & (next_min >= o)
+        bearish = (c < o) & (c < self.low[idx - 1]) & ((o - c) / o > min_body) & (next_max <= o)
+
+        # Extremes of all closes after each bar
+        later_min = np.append(np.minimum.accumulate(self.close[::-1])[::-1][1:], np.inf)
+        later_max = np.append(np.maximum.accumulate(self.close[::-1])[::-1][1:], -np.inf)
+
+        up, down = idx[bullish], idx[bearish]
+        return _sorted_events(
+            _events(ORDER_BLOCK_DTYPE, index=up, direction=np.full(len(up), BULLISH),
+                    bottom=self.open[up], top=self.close[up], mitigated=later_min[up] < self.open[up]),
+            _events(ORDER_BLOCK_DTYPE, index=down, direction=np.full(len(down), BEARISH),
+                    bottom=self.close[down], top=self.open[down], mitigated=later_max[down] > self.open[down]),
+        )
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def rolling_mean(self, values: np.ndarray, window: int) -> np.ndarray:
+        """Trailing mean including the current bar, NaN for the first window-1 bars"""
+        result = np.full(len(values), np.nan)
+        if len(values) >= window:
+            cumsum = np.cumsum(np.insert(values, 0, 0.0))
+            result[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+        return result
+
+    def volume_ratio(self, window: int = 10) -> np.ndarray:
+        """Volume divided by its trailing `window`-bar mean"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.volume / self.rolling_mean(self.volume, window)
+
+
+def pivot_flags(values, window: int, strict: bool = True) -> np.ndarray:
+    """Flags for values that are the maximum over +/- window bars (negate values for minima)"""
+    return SMCDetector._pivot_flags(np.asarray(values, dtype=np.float64), window, strict, 0)
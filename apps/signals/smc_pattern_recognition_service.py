@@ -16,6 +16,7 @@ from django.db import transaction
 from apps.trading.models import Symbol
 from apps.data.models import MarketData
 from apps.signals.models import ChartImage, ChartPattern, EntryPoint
+from apps.signals.smc_detection import SMCDetector, BULLISH
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,8 @@ class SMCPatternRecognitionService:
             'min_reversal_strength': 0.002,  # 0.2% minimum reversal
             'confirmation_candles': 3,       # Candles to confirm CHoCH
             'volume_confirmation': True,     # Require volume confirmation
-            'lookback_periods': 50           # Periods to look back for trend
+            'lookback_periods': 50,          # Periods to look back for trend
+            'swing_window': 5                # Candles on each side of a structure swing
         }
         
         self.order_block_config = {
@@ -79,6 +81,9 @@ class SMCPatternRecognitionService:
                 logger.warning(f"Insufficient market data for pattern detection")
                 return {}
             
+            # One vectorized detector shared by all pattern detectors
+            detector = SMCDetector.from_records(market_data)
+            
             detected_patterns = {
                 'bos': [],
                 'choch': [],
@@ -88,11 +93,11 @@ class SMCPatternRecognitionService:
             }
             
             # Detect BOS patterns
-            bos_patterns = self._detect_bos_patterns(chart_image, market_data)
+            bos_patterns = self._detect_bos_patterns(chart_image, market_data, detector)
             detected_patterns['bos'] = bos_patterns
             
             # Detect CHoCH patterns
-            choch_patterns = self._detect_choch_patterns(chart_image, market_data)
+            choch_patterns = self._detect_choch_patterns(chart_image, market_data, detector)
             detected_patterns['choch'] = choch_patterns
             
             # Detect Order Blocks
@@ -100,11 +105,11 @@ class SMCPatternRecognitionService:
             detected_patterns['order_blocks'] = order_block_patterns
             
             # Detect Fair Value Gaps
-            fvg_patterns = self._detect_fvg_patterns(chart_image, market_data)
+            fvg_patterns = self._detect_fvg_patterns(chart_image, market_data, detector)
             detected_patterns['fvg'] = fvg_patterns
             
             # Detect Liquidity Sweeps
-            liquidity_patterns = self._detect_liquidity_sweeps(chart_image, market_data)
+            liquidity_patterns = self._detect_liquidity_sweeps(chart_image, market_data, detector)
             detected_patterns['liquidity_sweeps'] = liquidity_patterns
             
             total_patterns = sum(len(patterns) for patterns in detected_patterns.values())
@@ -213,88 +218,56 @@ class SMCPatternRecognitionService:
             logger.error(f"Error getting market data for chart {chart_image.id}: {e}")
             return None
     
-    def _detect_bos_patterns(self, chart_image: ChartImage, market_data: List[Dict]) -> List[ChartPattern]:
+    def _price_to_y(self, chart_image: ChartImage, price: float) -> float:
+        """Convert a price to the chart's normalized y coordinate"""
+        return (price - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
+    
+    def _detect_bos_patterns(self, chart_image: ChartImage, market_data: List[Dict],
+                             detector: Optional[SMCDetector] = None) -> List[ChartPattern]:
         """Detect Break of Structure (BOS) patterns"""
         try:
             patterns = []
-            df = pd.DataFrame(market_data)
+            detector = detector or SMCDetector.from_records(market_data)
+            n = len(detector)
             
-            if len(df) < self.bos_config['lookback_periods']:
+            if n < self.bos_config['lookback_periods']:
                 return patterns
             
-            # Calculate structure levels
-            highs = df['high'].rolling(window=self.bos_config['lookback_periods']).max()
-            lows = df['low'].rolling(window=self.bos_config['lookback_periods']).min()
-            
-            # Detect bullish BOS (break above previous high)
-            for i in range(self.bos_config['lookback_periods'], len(df)):
-                current_high = df.iloc[i]['high']
-                previous_high = highs.iloc[i-1]
+            # Breaks of the prior lookback range confirmed by volume
+            breaks = detector.range_breaks(
+                lookback=self.bos_config['lookback_periods'],
+                min_break=self.bos_config['min_structure_break']
+            )
+            volume_ratio = detector.volume_ratio(window=10)[breaks['index']]
+            with np.errstate(invalid='ignore'):
+                confirmed = volume_ratio >= self.bos_config['volume_multiplier']
+            
+            for structure_break, ratio in zip(breaks[confirmed], volume_ratio[confirmed]):
+                level = float(structure_break['level'])
+                extreme = float(structure_break['extreme'])
                 
-                if current_high > previous_high * (1 + self.bos_config['min_structure_break']):
-                    # Check volume confirmation
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    current_volume = df.iloc[i]['volume']
-                    
-                    if current_volume >= avg_volume * self.bos_config['volume_multiplier']:
-                        # Calculate confidence score
-                        break_strength = (current_high - previous_high) / previous_high
-                        volume_ratio = current_volume / avg_volume
-                        confidence_score = min(0.95, (break_strength * 10 + volume_ratio * 0.1))
-                        
-                        # Calculate coordinates
-                        x_pos = i / len(df)
-                        y_pos = (current_high - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        
-                        pattern = ChartPattern(
-                            chart_image=chart_image,
-                            pattern_type='BOS',
-                            confidence_score=confidence_score,
-                            x_start=x_pos - 0.05,
-                            y_start=y_pos,
-                            x_end=x_pos + 0.05,
-                            y_end=y_pos,
-                            strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                            pattern_price_low=Decimal(str(previous_high)),
-                            pattern_price_high=Decimal(str(current_high)),
-                            is_validated=False
-                        )
-                        patterns.append(pattern)
-            
-            # Detect bearish BOS (break below previous low)
-            for i in range(self.bos_config['lookback_periods'], len(df)):
-                current_low = df.iloc[i]['low']
-                previous_low = lows.iloc[i-1]
+                # Calculate confidence score
+                break_strength = abs(extreme - level) / level
+                confidence_score = min(0.95, (break_strength * 10 + ratio * 0.1))
                 
-                if current_low < previous_low * (1 - self.bos_config['min_structure_break']):
-                    # Check volume confirmation
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    current_volume = df.iloc[i]['volume']
-                    
-                    if current_volume >= avg_volume * self.bos_config['volume_multiplier']:
-                        # Calculate confidence score
-                        break_strength = (previous_low - current_low) / previous_low
-                        volume_ratio = current_volume / avg_volume
-                        confidence_score = min(0.95, (break_strength * 10 + volume_ratio * 0.1))
-                        
-                        # Calculate coordinates
-                        x_pos = i / len(df)
-                        y_pos = (current_low - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        
-                        pattern = ChartPattern(
-                            chart_image=chart_image,
-                            pattern_type='BOS',
-                            confidence_score=confidence_score,
-                            x_start=x_pos - 0.05,
-                            y_start=y_pos,
-                            x_end=x_pos + 0.05,
-                            y_end=y_pos,
-                            strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                            pattern_price_low=Decimal(str(current_low)),
-                            pattern_price_high=Decimal(str(previous_low)),
-                            is_validated=False
-                        )
-                        patterns.append(pattern)
+                # Calculate coordinates
+                x_pos = structure_break['index'] / n
+                y_pos = self._price_to_y(chart_image, extreme)
+                
+                pattern = ChartPattern(
+                    chart_image=chart_image,
+                    pattern_type='BOS',
+                    confidence_score=confidence_score,
+                    x_start=x_pos - 0.05,
+                    y_start=y_pos,
+                    x_end=x_pos + 0.05,
+                    y_end=y_pos,
+                    strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
+                    pattern_price_low=Decimal(str(min(level, extreme))),
+                    pattern_price_high=Decimal(str(max(level, extreme))),
+                    is_validated=False
+                )
+                patterns.append(pattern)
             
             return patterns
             
@@ -302,98 +275,63 @@ class SMCPatternRecognitionService:
             logger.error(f"Error detecting BOS patterns: {e}")
             return []
     
-    def _detect_choch_patterns(self, chart_image: ChartImage, market_data: List[Dict]) -> List[ChartPattern]:
+    def _detect_choch_patterns(self, chart_image: ChartImage, market_data: List[Dict],
+                               detector: Optional[SMCDetector] = None) -> List[ChartPattern]:
         """Detect Change of Character (CHoCH) patterns"""
         try:
             patterns = []
-            df = pd.DataFrame(market_data)
+            detector = detector or SMCDetector.from_records(market_data)
+            n = len(detector)
             
-            if len(df) < self.choch_config['lookback_periods']:
+            if n < self.choch_config['lookback_periods']:
                 return patterns
             
-            # Calculate trend direction
-            sma_short = df['close'].rolling(window=10).mean()
-            sma_long = df['close'].rolling(window=20).mean()
-            
-            # Detect bullish CHoCH (downtrend to uptrend)
-            for i in range(self.choch_config['lookback_periods'], len(df)):
-                # Check if we're transitioning from downtrend to uptrend
-                if (i >= 20 and 
-                    sma_short.iloc[i-5] < sma_long.iloc[i-5] and  # Was in downtrend
-                    sma_short.iloc[i] > sma_long.iloc[i]):        # Now in uptrend
-                    
-                    # Check for significant reversal
-                    recent_low = df['low'].iloc[i-10:i].min()
-                    current_price = df.iloc[i]['close']
-                    reversal_strength = (current_price - recent_low) / recent_low
-                    
-                    if reversal_strength >= self.choch_config['min_reversal_strength']:
-                        # Check volume confirmation
-                        avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                        current_volume = df.iloc[i]['volume']
-                        
-                        if current_volume >= avg_volume * 1.2:
-                            # Calculate confidence score
-                            confidence_score = min(0.95, reversal_strength * 20 + (current_volume / avg_volume) * 0.1)
-                            
-                            # Calculate coordinates
-                            x_pos = i / len(df)
-                            y_pos = (current_price - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                            
-                            pattern = ChartPattern(
-                                chart_image=chart_image,
-                                pattern_type='CHOCH',
-                                confidence_score=confidence_score,
-                                x_start=x_pos - 0.1,
-                                y_start=y_pos,
-                                x_end=x_pos + 0.1,
-                                y_end=y_pos,
-                                strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                                pattern_price_low=Decimal(str(recent_low)),
-                                pattern_price_high=Decimal(str(current_price)),
-                                is_validated=False
-                            )
-                            patterns.append(pattern)
-            
-            # Detect bearish CHoCH (uptrend to downtrend)
-            for i in range(self.choch_config['lookback_periods'], len(df)):
-                # Check if we're transitioning from uptrend to downtrend
-                if (i >= 20 and 
-                    sma_short.iloc[i-5] > sma_long.iloc[i-5] and  # Was in uptrend
-                    sma_short.iloc[i] < sma_long.iloc[i]):        # Now in downtrend
-                    
-                    # Check for significant reversal
-                    recent_high = df['high'].iloc[i-10:i].max()
-                    current_price = df.iloc[i]['close']
-                    reversal_strength = (recent_high - current_price) / recent_high
-                    
-                    if reversal_strength >= self.choch_config['min_reversal_strength']:
-                        # Check volume confirmation
-                        avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                        current_volume = df.iloc[i]['volume']
-                        
-                        if current_volume >= avg_volume * 1.2:
-                            # Calculate confidence score
-                            confidence_score = min(0.95, reversal_strength * 20 + (current_volume / avg_volume) * 0.1)
-                            
-                            # Calculate coordinates
-                            x_pos = i / len(df)
-                            y_pos = (current_price - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                            
-                            pattern = ChartPattern(
-                                chart_image=chart_image,
-                                pattern_type='CHOCH',
-                                confidence_score=confidence_score,
-                                x_start=x_pos - 0.1,
-                                y_start=y_pos,
-                                x_end=x_pos + 0.1,
-                                y_end=y_pos,
-                                strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                                pattern_price_low=Decimal(str(current_price)),
-                                pattern_price_high=Decimal(str(recent_high)),
-                                is_validated=False
-                            )
-                            patterns.append(pattern)
+            # Structure breaks that flip the direction of the previous break
+            breaks = detector.structure_breaks(window=self.choch_config['swing_window'])
+            breaks = breaks[breaks['kind'] == 'CHOCH']
+            
+            # Reversal measured from the extreme of the previous 10 candles
+            recent_high, recent_low = detector.prior_extremes(10)
+            volume_ratio = detector.volume_ratio(window=10)
+            
+            for structure_break in breaks:
+                i = structure_break['index']
+                current_price = float(structure_break['close'])
+                if structure_break['direction'] == BULLISH:
+                    reference = float(recent_low[i])
+                    reversal_strength = (current_price - reference) / reference
+                else:
+                    reference = float(recent_high[i])
+                    reversal_strength = (reference - current_price) / reference
+                
+                if not reversal_strength >= self.choch_config['min_reversal_strength']:
+                    continue
+                
+                # Check volume confirmation
+                if not volume_ratio[i] >= 1.2:
+                    continue
+                
+                # Calculate confidence score
+                confidence_score = min(0.95, reversal_strength * 20 + volume_ratio[i] * 0.1)
+                
+                # Calculate coordinates
+                x_pos = i / n
+                y_pos = self._price_to_y(chart_image, current_price)
+                
+                pattern = ChartPattern(
+                    chart_image=chart_image,
+                    pattern_type='CHOCH',
+                    confidence_score=confidence_score,
+                    x_start=x_pos - 0.1,
+                    y_start=y_pos,
+                    x_end=x_pos + 0.1,
+                    y_end=y_pos,
+                    strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
+                    pattern_price_low=Decimal(str(min(reference, current_price))),
+                    pattern_price_high=Decimal(str(max(reference, current_price))),
+                    is_validated=False
+                )
+                patterns.append(pattern)
             
             return patterns
             
@@ -468,90 +406,45 @@ class SMCPatternRecognitionService:
             logger.error(f"Error detecting Order Blocks: {e}")
             return []
     
-    def _detect_fvg_patterns(self, chart_image: ChartImage, market_data: List[Dict]) -> List[ChartPattern]:
+    def _detect_fvg_patterns(self, chart_image: ChartImage, market_data: List[Dict],
+                             detector: Optional[SMCDetector] = None) -> List[ChartPattern]:
         """Detect Fair Value Gap (FVG) patterns"""
         try:
             patterns = []
-            df = pd.DataFrame(market_data)
+            detector = detector or SMCDetector.from_records(market_data)
+            n = len(detector)
             
-            if len(df) < 10:
+            if n < 10:
                 return patterns
             
-            # Detect bullish FVG (gap up)
-            for i in range(2, len(df)):
-                prev_candle = df.iloc[i-1]
-                current_candle = df.iloc[i]
-                
-                # Check for gap up
-                gap_size = (current_candle['low'] - prev_candle['high']) / prev_candle['high']
-                
-                if gap_size > self.fvg_config['min_gap_size']:
-                    # Check volume confirmation
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    if current_candle['volume'] >= avg_volume * 1.2:
-                        
-                        # Calculate confidence score
-                        volume_ratio = current_candle['volume'] / avg_volume
-                        gap_score = min(1.0, gap_size * 200)  # Scale gap size
-                        confidence_score = min(0.95, (gap_score * 0.6 + volume_ratio * 0.4))
-                        
-                        # Calculate coordinates
-                        x_pos = i / len(df)
-                        y_start = (prev_candle['high'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        y_end = (current_candle['low'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        
-                        pattern = ChartPattern(
-                            chart_image=chart_image,
-                            pattern_type='FAIR_VALUE_GAP',
-                            confidence_score=confidence_score,
-                            x_start=x_pos - 0.05,
-                            y_start=y_start,
-                            x_end=x_pos + 0.05,
-                            y_end=y_end,
-                            strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                            pattern_price_low=Decimal(str(prev_candle['high'])),
-                            pattern_price_high=Decimal(str(current_candle['low'])),
-                            is_validated=False
-                        )
-                        patterns.append(pattern)
-            
-            # Detect bearish FVG (gap down)
-            for i in range(2, len(df)):
-                prev_candle = df.iloc[i-1]
-                current_candle = df.iloc[i]
+            # Gaps between adjacent candles confirmed by volume
+            gaps = detector.fair_value_gaps(span=1, min_size=self.fvg_config['min_gap_size'], start=2)
+            volume_ratio = detector.volume_ratio(window=10)[gaps['index']]
+            with np.errstate(invalid='ignore'):
+                confirmed = volume_ratio >= 1.2
+            
+            for gap, ratio in zip(gaps[confirmed], volume_ratio[confirmed]):
+                # Calculate confidence score
+                gap_score = min(1.0, gap['size'] * 200)  # Scale gap size
+                confidence_score = min(0.95, (gap_score * 0.6 + ratio * 0.4))
                 
-                # Check for gap down
-                gap_size = (prev_candle['low'] - current_candle['high']) / prev_candle['low']
+                # Calculate coordinates
+                x_pos = gap['index'] / n
                 
-                if gap_size > self.fvg_config['min_gap_size']:
-                    # Check volume confirmation
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    if current_candle['volume'] >= avg_volume * 1.2:
-                        
-                        # Calculate confidence score
-                        volume_ratio = current_candle['volume'] / avg_volume
-                        gap_score = min(1.0, gap_size * 200)  # Scale gap size
-                        confidence_score = min(0.95, (gap_score * 0.6 + volume_ratio * 0.4))
-                        
-                        # Calculate coordinates
-                        x_pos = i / len(df)
-                        y_start = (current_candle['high'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        y_end = (prev_candle['low'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                        
-                        pattern = ChartPattern(
-                            chart_image=chart_image,
-                            pattern_type='FAIR_VALUE_GAP',
-                            confidence_score=confidence_score,
-                            x_start=x_pos - 0.05,
-                            y_start=y_start,
-                            x_end=x_pos + 0.05,
-                            y_end=y_end,
-                            strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                            pattern_price_low=Decimal(str(current_candle['high'])),
-                            pattern_price_high=Decimal(str(prev_candle['low'])),
-                            is_validated=False
-                        )
-                        patterns.append(pattern)
+                pattern = ChartPattern(
+                    chart_image=chart_image,
+                    pattern_type='FAIR_VALUE_GAP',
+                    confidence_score=confidence_score,
+                    x_start=x_pos - 0.05,
+                    y_start=self._price_to_y(chart_image, gap['bottom']),
+                    x_end=x_pos + 0.05,
+                    y_end=self._price_to_y(chart_image, gap['top']),
+                    strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
+                    pattern_price_low=Decimal(str(float(gap['bottom']))),
+                    pattern_price_high=Decimal(str(float(gap['top']))),
+                    is_validated=False
+                )
+                patterns.append(pattern)
             
             return patterns
             
@@ -559,100 +452,53 @@ class SMCPatternRecognitionService:
             logger.error(f"Error detecting FVG patterns: {e}")
             return []
     
-    def _detect_liquidity_sweeps(self, chart_image: ChartImage, market_data: List[Dict]) -> List[ChartPattern]:
+    def _detect_liquidity_sweeps(self, chart_image: ChartImage, market_data: List[Dict],
+                                 detector: Optional[SMCDetector] = None) -> List[ChartPattern]:
         """Detect Liquidity Sweep patterns"""
         try:
             patterns = []
-            df = pd.DataFrame(market_data)
+            detector = detector or SMCDetector.from_records(market_data)
+            n = len(detector)
             
-            if len(df) < self.liquidity_sweep_config['lookback_periods']:
+            if n < self.liquidity_sweep_config['lookback_periods']:
                 return patterns
             
-            # Detect bullish liquidity sweep (sweep below support then reversal)
-            for i in range(self.liquidity_sweep_config['lookback_periods'], len(df)):
-                # Find recent support level
-                lookback_data = df.iloc[i-self.liquidity_sweep_config['lookback_periods']:i]
-                support_level = lookback_data['low'].min()
-                
-                current_candle = df.iloc[i]
+            # Wicks beyond the recent range that close back inside it
+            sweeps = detector.liquidity_sweeps(
+                lookback=self.liquidity_sweep_config['lookback_periods'],
+                threshold=self.liquidity_sweep_config['sweep_threshold']
+            )
+            volume_ratio = detector.volume_ratio(window=10)[sweeps['index']]
+            with np.errstate(invalid='ignore'):
+                confirmed = volume_ratio >= self.liquidity_sweep_config['volume_spike']
+            
+            for sweep, ratio in zip(sweeps[confirmed], volume_ratio[confirmed]):
+                level = float(sweep['level'])
+                extreme = float(sweep['extreme'])
                 
-                # Check for sweep below support
-                sweep_size = (support_level - current_candle['low']) / support_level
+                # Calculate confidence score
+                sweep_score = min(1.0, abs(level - extreme) / level * 200)
+                rejection_score = abs(float(sweep['close']) - level) / level
+                confidence_score = min(0.95, (sweep_score * 0.4 + rejection_score * 100 * 0.4 + ratio * 0.2))
                 
-                if sweep_size > self.liquidity_sweep_config['sweep_threshold']:
-                    # Check for volume spike
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    volume_ratio = current_candle['volume'] / avg_volume
-                    
-                    if volume_ratio >= self.liquidity_sweep_config['volume_spike']:
-                        # Check for rejection (close above support)
-                        if current_candle['close'] > support_level:
-                            # Calculate confidence score
-                            sweep_score = min(1.0, sweep_size * 200)
-                            rejection_score = (current_candle['close'] - support_level) / support_level
-                            confidence_score = min(0.95, (sweep_score * 0.4 + rejection_score * 100 * 0.4 + volume_ratio * 0.2))
-                            
-                            # Calculate coordinates
-                            x_pos = i / len(df)
-                            y_pos = (current_candle['low'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                            
-                            pattern = ChartPattern(
-                                chart_image=chart_image,
-                                pattern_type='LIQUIDITY_SWEEP',
-                                confidence_score=confidence_score,
-                                x_start=x_pos - 0.05,
-                                y_start=y_pos,
-                                x_end=x_pos + 0.05,
-                                y_end=y_pos,
-                                strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                                pattern_price_low=Decimal(str(current_candle['low'])),
-                                pattern_price_high=Decimal(str(support_level)),
-                                is_validated=False
-                            )
-                            patterns.append(pattern)
-            
-            # Detect bearish liquidity sweep (sweep above resistance then reversal)
-            for i in range(self.liquidity_sweep_config['lookback_periods'], len(df)):
-                # Find recent resistance level
-                lookback_data = df.iloc[i-self.liquidity_sweep_config['lookback_periods']:i]
-                resistance_level = lookback_data['high'].max()
+                # Calculate coordinates
+                x_pos = sweep['index'] / n
+                y_pos = self._price_to_y(chart_image, extreme)
                 
-                current_candle = df.iloc[i]
-                
-                # Check for sweep above resistance
-                sweep_size = (current_candle['high'] - resistance_level) / resistance_level
-                
-                if sweep_size > self.liquidity_sweep_config['sweep_threshold']:
-                    # Check for volume spike
-                    avg_volume = df['volume'].rolling(window=10).mean().iloc[i]
-                    volume_ratio = current_candle['volume'] / avg_volume
-                    
-                    if volume_ratio >= self.liquidity_sweep_config['volume_spike']:
-                        # Check for rejection (close below resistance)
-                        if current_candle['close'] < resistance_level:
-                            # Calculate confidence score
-                            sweep_score = min(1.0, sweep_size * 200)
-                            rejection_score = (resistance_level - current_candle['close']) / resistance_level
-                            confidence_score = min(0.95, (sweep_score * 0.4 + rejection_score * 100 * 0.4 + volume_ratio * 0.2))
-                            
-                            # Calculate coordinates
-                            x_pos = i / len(df)
-                            y_pos = (current_candle['high'] - chart_image.price_range_low) / (chart_image.price_range_high - chart_image.price_range_low)
-                            
-                            pattern = ChartPattern(
-                                chart_image=chart_image,
-                                pattern_type='LIQUIDITY_SWEEP',
-                                confidence_score=confidence_score,
-                                x_start=x_pos - 0.05,
-                                y_start=y_pos,
-                                x_end=x_pos + 0.05,
-                                y_end=y_pos,
-                                strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
-                                pattern_price_low=Decimal(str(resistance_level)),
-                                pattern_price_high=Decimal(str(current_candle['high'])),
-                                is_validated=False
-                            )
-                            patterns.append(pattern)
+                pattern = ChartPattern(
+                    chart_image=chart_image,
+                    pattern_type='LIQUIDITY_SWEEP',
+                    confidence_score=confidence_score,
+                    x_start=x_pos - 0.05,
+                    y_start=y_pos,
+                    x_end=x_pos + 0.05,
+                    y_end=y_pos,
+                    strength='STRONG' if confidence_score > 0.8 else 'MODERATE',
+                    pattern_price_low=Decimal(str(min(level, extreme))),
+                    pattern_price_high=Decimal(str(max(level, extreme))),
+                    is_validated=False
+                )
+                patterns.append(pattern)
             
             return patterns
             
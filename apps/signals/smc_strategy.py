@@ -15,6 +15,7 @@ from apps.signals.models import TradingSignal, SignalType
 from apps.trading.models import Symbol
 from apps.data.models import TechnicalIndicator, MarketData
 from apps.signals.advanced_indicators import AdvancedIndicatorsService
+from apps.signals.smc_detection import SMCDetector, BULLISH, BEARISH
 
 logger = logging.getLogger(__name__)
 
@@ -110,16 +111,17 @@ class SmartMoneyConceptsStrategy:
         try:
             df = pd.DataFrame(market_data)
             df = df.sort_values('timestamp').reset_index(drop=True)
+            detector = SMCDetector.from_dataframe(df)
             
             # Find swing highs and lows
-            swing_highs = self._find_swing_highs(df)
-            swing_lows = self._find_swing_lows(df)
+            swing_highs = self._find_swing_highs(df, detector)
+            swing_lows = self._find_swing_lows(df, detector)
             
             # Determine current trend
             current_trend = self._determine_trend(swing_highs, swing_lows)
             
             # Find recent structure breaks
-            recent_breaks = self._find_recent_structure_breaks(df, swing_highs, swing_lows)
+            recent_breaks = self._find_recent_structure_breaks(df, swing_highs, swing_lows, detector)
             
             return {
                 'swing_highs': swing_highs,
@@ -256,53 +258,24 @@ class SmartMoneyConceptsStrategy:
             logger.error(f"Error detecting FVG entries for {symbol.symbol}: {e}")
             return []
     
-    def _find_swing_highs(self, df: pd.DataFrame) -> List[Dict]:
+    def _find_swing_highs(self, df: pd.DataFrame, detector: Optional[SMCDetector] = None) -> List[Dict]:
         """Find swing highs in the data"""
-        swing_highs = []
-        
-        for i in range(5, len(df) - 5):
-            current_high = df.iloc[i]['high']
-            
-            # Check if it's a swing high
-            is_swing_high = True
-            for j in range(1, 6):
-                if (df.iloc[i-j]['high'] >= current_high or 
-                    df.iloc[i+j]['high'] >= current_high):
-                    is_swing_high = False
-                    break
-            
-            if is_swing_high:
-                swing_highs.append({
-                    'index': i,
-                    'price': current_high,
-                    'timestamp': df.iloc[i]['timestamp']
-                })
-        
-        return swing_highs
+        detector = detector or SMCDetector.from_dataframe(df)
+        return self._swings_to_dicts(df, detector.swing_highs(window=5))
     
-    def _find_swing_lows(self, df: pd.DataFrame) -> List[Dict]:
+    def _find_swing_lows(self, df: pd.DataFrame, detector: Optional[SMCDetector] = None) -> List[Dict]:
         """Find swing lows in the data"""
-        swing_lows = []
-        
-        for i in range(5, len(df) - 5):
-            current_low = df.iloc[i]['low']
-            
-            # Check if it's a swing low
-            is_swing_low = True
-            for j in range(1, 6):
-                if (df.iloc[i-j]['low'] <= current_low or 
-                    df.iloc[i+j]['low'] <= current_low):
-                    is_swing_low = False
-                    break
-            
-            if is_swing_low:
-                swing_lows.append({
-                    'index': i,
-                    'price': current_low,
-                    'timestamp': df.iloc[i]['timestamp']
-                })
-        
-        return swing_lows
+        detector = detector or SMCDetector.from_dataframe(df)
+        return self._swings_to_dicts(df, detector.swing_lows(window=5))
+    
+    def _swings_to_dicts(self, df: pd.DataFrame, swings: np.ndarray) -> List[Dict]:
+        """Convert swing events to the dict format used by the signal builders"""
+        timestamps = df['timestamp'].to_numpy()
+        return [{
+            'index': int(swing['index']),
+            'price': float(swing['price']),
+            'timestamp': timestamps[swing['index']]
+        } for swing in swings]
     
     def _determine_trend(self, swing_highs: List[Dict], swing_lows: List[Dict]) -> str:
         """Determine current market trend"""
@@ -327,44 +300,36 @@ class SmartMoneyConceptsStrategy:
         
         return 'SIDEWAYS'
     
-    def _find_recent_structure_breaks(self, df: pd.DataFrame, swing_highs: List[Dict], swing_lows: List[Dict]) -> List[Dict]:
+    def _find_recent_structure_breaks(self, df: pd.DataFrame, swing_highs: List[Dict], swing_lows: List[Dict],
+                                      detector: Optional[SMCDetector] = None) -> List[Dict]:
         """Find recent structure breaks (BOS/CHoCH)"""
         breaks = []
         
         if len(swing_highs) < 2 or len(swing_lows) < 2:
             return breaks
         
-        # Check for BOS (Break of Structure)
-        latest_high = swing_highs[-1]
-        latest_low = swing_lows[-1]
-        
-        # Check if price broke above recent swing high (Bullish BOS)
-        if latest_high['index'] < len(df) - 5:
-            for i in range(latest_high['index'] + 1, len(df)):
-                if df.iloc[i]['close'] > latest_high['price']:
-                    breaks.append({
-                        'type': 'BOS',
-                        'direction': 'BULLISH',
-                        'break_price': latest_high['price'],
-                        'current_price': df.iloc[i]['close'],
-                        'timestamp': df.iloc[i]['timestamp'],
-                        'index': i
-                    })
-                    break
+        detector = detector or SMCDetector.from_dataframe(df)
+        structure_breaks = detector.structure_breaks(window=5)
+        timestamps = df['timestamp'].to_numpy()
         
-        # Check if price broke below recent swing low (Bearish BOS)
-        if latest_low['index'] < len(df) - 5:
-            for i in range(latest_low['index'] + 1, len(df)):
-                if df.iloc[i]['close'] < latest_low['price']:
-                    breaks.append({
-                        'type': 'BOS',
-                        'direction': 'BEARISH',
-                        'break_price': latest_low['price'],
-                        'current_price': df.iloc[i]['close'],
-                        'timestamp': df.iloc[i]['timestamp'],
-                        'index': i
-                    })
-                    break
+        # Breaks of the latest swing high (bullish) and latest swing low (bearish)
+        for direction, latest_swing in ((BULLISH, swing_highs[-1]), (BEARISH, swing_lows[-1])):
+            matches = structure_breaks[
+                (structure_breaks['swing_index'] == latest_swing['index']) &
+                (structure_breaks['direction'] == direction)
+            ]
+            if not len(matches):
+                continue
+            
+            structure_break = matches[0]
+            breaks.append({
+                'type': 'CHoCH' if structure_break['kind'] == 'CHOCH' else 'BOS',
+                'direction': 'BULLISH' if direction == BULLISH else 'BEARISH',
+                'break_price': float(structure_break['level']),
+                'current_price': float(structure_break['close']),
+                'timestamp': timestamps[structure_break['index']],
+                'index': int(structure_break['index'])
+            })
         
         return breaks
     
@@ -378,15 +343,11 @@ class SmartMoneyConceptsStrategy:
                 return False
             
             # Check if price stays above/below break level
-            for i in range(break_index + 1, min(break_index + self.bos_confirmation_candles + 1, len(df))):
-                if break_info['direction'] == 'BULLISH':
-                    if df.iloc[i]['close'] < break_info['break_price']:
-                        return False
-                else:  # BEARISH
-                    if df.iloc[i]['close'] > break_info['break_price']:
-                        return False
-            
-            return True
+            closes = df['close'].to_numpy()[break_index + 1:break_index + self.bos_confirmation_candles + 1]
+            if break_info['direction'] == 'BULLISH':
+                return bool((closes >= break_info['break_price']).all())
+            else:  # BEARISH
+                return bool((closes <= break_info['break_price']).all())
             
         except Exception as e:
             logger.error(f"Error confirming BOS: {e}")
@@ -467,7 +428,11 @@ class SmartMoneyConceptsStrategy:
             # Similar to BOS but with CHoCH-specific logic
             signal = self._create_bos_signal(symbol, break_info, df)
             if signal:
-                signal.signal_type.name = f"CHoCH_{break_info['direction']}"
+                signal_type_name = 'CHoCH_BUY' if break_info['direction'] == 'BULLISH' else 'CHoCH_SELL'
+                signal.signal_type, _ = SignalType.objects.get_or_create(
+                    name=signal_type_name,
+                    defaults={'description': f'Change of Character {break_info["direction"]} Signal'}
+                )
                 signal.notes = f"CHoCH {break_info['direction']} - Change of Character detected"
                 signal.confidence_score = min(0.95, signal.confidence_score + 0.05)  # Slightly higher confidence
             
@@ -477,74 +442,33 @@ class SmartMoneyConceptsStrategy:
             logger.error(f"Error creating CHoCH signal: {e}")
             return None
     
-    def _find_order_blocks(self, df: pd.DataFrame) -> List[Dict]:
+    def _find_order_blocks(self, df: pd.DataFrame, detector: Optional[SMCDetector] = None) -> List[Dict]:
         """Find order blocks in the data"""
-        order_blocks = []
+        detector = detector or SMCDetector.from_dataframe(df)
+        timestamps = df['timestamp'].to_numpy()
         
-        for i in range(10, len(df) - 5):
-            # Look for strong moves followed by consolidation
-            current_candle = df.iloc[i]
-            prev_candle = df.iloc[i-1]
-            
-            # Check for strong bullish move
-            if (current_candle['close'] > current_candle['open'] and 
-                current_candle['close'] > prev_candle['high'] and
-                (current_candle['close'] - current_candle['open']) / current_candle['open'] > 0.02):
-                
-                # Check for subsequent consolidation
-                consolidation = True
-                for j in range(i+1, min(i+5, len(df))):
-                    if df.iloc[j]['close'] < current_candle['open']:
-                        consolidation = False
-                        break
-                
-                if consolidation:
-                    order_blocks.append({
-                        'index': i,
-                        'type': 'BULLISH',
-                        'support': current_candle['open'],
-                        'resistance': current_candle['close'],
-                        'timestamp': current_candle['timestamp']
-                    })
-            
-            # Check for strong bearish move
-            elif (current_candle['close'] < current_candle['open'] and 
-                  current_candle['close'] < prev_candle['low'] and
-                  (current_candle['open'] - current_candle['close']) / current_candle['open'] > 0.02):
-                
-                # Check for subsequent consolidation
-                consolidation = True
-                for j in range(i+1, min(i+5, len(df))):
-                    if df.iloc[j]['close'] > current_candle['open']:
-                        consolidation = False
-                        break
-                
-                if consolidation:
-                    order_blocks.append({
-                        'index': i,
-                        'type': 'BEARISH',
-                        'support': current_candle['close'],
-                        'resistance': current_candle['open'],
-                        'timestamp': current_candle['timestamp']
-                    })
-        
-        return order_blocks
+        # Strong moves (> 2% body) followed by 4 candles holding the open
+        return [{
+            'index': int(block['index']),
+            'type': 'BULLISH' if block['direction'] == BULLISH else 'BEARISH',
+            'support': float(block['bottom']),
+            'resistance': float(block['top']),
+            'mitigated': bool(block['mitigated']),
+            'timestamp': timestamps[block['index']]
+        } for block in detector.order_blocks(min_body=0.02, hold_candles=4)]
     
     def _validate_order_block(self, df: pd.DataFrame, ob: Dict) -> bool:
         """Validate order block"""
         try:
             # Check if order block is still valid (not broken)
-            ob_index = ob['index']
-            
-            for i in range(ob_index + 1, len(df)):
-                if ob['type'] == 'BULLISH':
-                    if df.iloc[i]['close'] < ob['support']:
-                        return False
-                else:  # BEARISH
-                    if df.iloc[i]['close'] > ob['resistance']:
-                        return False
+            if 'mitigated' in ob:
+                return not ob['mitigated']
             
-            return True
+            closes = df['close'].to_numpy()[ob['index'] + 1:]
+            if ob['type'] == 'BULLISH':
+                return not (closes < ob['support']).any()
+            else:  # BEARISH
+                return not (closes > ob['resistance']).any()
             
         except Exception as e:
             logger.error(f"Error validating order block: {e}")
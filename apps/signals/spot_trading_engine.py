@@ -4,18 +4,24 @@ Long-term spot trading strategies for cryptocurrency accumulation and investment
 """
 
 import logging
-from typing import List, Dict, Optional
+import numpy as np
+from typing import List, Dict, Iterable, Optional
 from decimal import Decimal
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 from apps.trading.models import Symbol
-from apps.data.models import MarketData, TechnicalIndicator
+from apps.data.models import MarketData
 from apps.signals.models import SpotTradingSignal, TradingSignal, SignalType
 from apps.sentiment.models import SentimentAggregate
 
 logger = logging.getLogger(__name__)
 
+EMPTY_WINDOW = {key: np.empty(0) for key in ('close', 'high', 'low', 'volume')}
+
 
 class SpotFundamentalAnalysis:
     """Fundamental analysis for spot trading"""
@@ -147,7 +153,7 @@ class SpotFundamentalAnalysis:
 class SpotTechnicalAnalysis:
     """Long-term technical analysis for spot trading"""
     
-    def __init__(self):
+    def __init__(self, timeframe: Optional[str] = None, window_size: int = 200):
         self.timeframe_weights = {
             'trend_direction': 0.25,
             'support_resistance': 0.20,
@@ -156,16 +162,75 @@ class SpotTechnicalAnalysis:
             'volatility_analysis': 0.15,
             'market_cycles': 0.10,
         }
+        # Every sub-score reads the same bars; mixing resolutions would blend 1h and 1d closes
+        self.timeframe = timeframe or getattr(settings, 'SPOT_ANALYSIS_TIMEFRAME', '1d')
+        self.window_size = window_size
     
     def analyze_long_term_trends(self, symbol: Symbol) -> Dict:
         """Analyze long-term trends (1D, 1W, 1M timeframes)"""
+        return self.analyze_many([symbol])[symbol.symbol]
+    
+    def analyze_many(self, symbols: Iterable[Symbol]) -> Dict[str, Dict]:
+        """Long-term analysis of many symbols from one query, keyed by symbol name"""
+        symbols = list(symbols)
+        windows = self.load_windows(symbols)
+        return {
+            symbol.symbol: self.analyze_window(windows.get(symbol.id, EMPTY_WINDOW))
+            for symbol in symbols
+        }
+    
+    def load_windows(self, symbols: Iterable[Symbol]) -> Dict[int, Dict[str, np.ndarray]]:
+        """
+        Latest window_size bars of each symbol as NumPy arrays (newest first).
+        
+        One query for all symbols: a ROW_NUMBER window per symbol keeps only
+        the newest bars.
+        """
+        symbol_ids = [symbol.id for symbol in symbols]
+        if not symbol_ids:
+            return {}
+        
+        try:
+            rows = MarketData.objects.filter(
+                symbol_id__in=symbol_ids,
+                timeframe=self.timeframe
+            ).annotate(
+                row_number=Window(RowNumber(), partition_by=[F('symbol_id')], order_by=F('timestamp').desc())
+            ).filter(
+                row_number__lte=self.window_size
+            ).order_by('symbol_id', '-timestamp').values_list(
+                'symbol_id', 'close_price', 'high_price', 'low_price', 'volume'
+            )
+            
+            grouped = {}
+            for symbol_id, close, high, low, volume in rows:
+                grouped.setdefault(symbol_id, []).append((close, high, low, volume))
+            
+            windows = {}
+            for symbol_id, bars in grouped.items():
+                values = np.array(bars, dtype=np.float64)
+                windows[symbol_id] = {
+                    'close': values[:, 0],
+                    'high': values[:, 1],
+                    'low': values[:, 2],
+                    'volume': values[:, 3],
+                }
+            return windows
+            
+        except Exception as e:
+            logger.warning(f"Error loading {self.timeframe} bars for spot analysis: {e}")
+            return {}
+    
+    def analyze_window(self, window: Dict[str, np.ndarray]) -> Dict:
+        """All six sub-scores of one symbol's bar window"""
+        closes = window['close']
         analysis = {
-            'trend_direction': self._analyze_trend_direction(symbol),
-            'support_resistance': self._analyze_support_resistance(symbol),
-            'volume_profile': self._analyze_volume_profile(symbol),
-            'momentum_indicators': self._analyze_momentum(symbol),
-            'volatility_analysis': self._analyze_volatility(symbol),
-            'market_cycles': self._analyze_market_cycles(symbol),
+            'trend_direction': self._analyze_trend_direction(closes),
+            'support_resistance': self._analyze_support_resistance(closes, window['high'], window['low']),
+            'volume_profile': self._analyze_volume_profile(window['volume']),
+            'momentum_indicators': self._analyze_momentum(closes),
+            'volatility_analysis': self._analyze_volatility(closes),
+            'market_cycles': self._analyze_market_cycles(closes),
         }
         return analysis
     
@@ -174,187 +239,129 @@ class SpotTechnicalAnalysis:
         score = sum(analysis[key] * self.timeframe_weights[key] for key in self.timeframe_weights)
         return min(1.0, max(0.0, score))
     
-    def _analyze_trend_direction(self, symbol: Symbol) -> float:
+    def _analyze_trend_direction(self, closes: np.ndarray) -> float:
         """Analyze long-term trend direction"""
-        try:
-            # Get recent market data for trend analysis
-            recent_data = MarketData.objects.filter(symbol=symbol).order_by('-timestamp')[:200]
-            
-            if len(recent_data) < 50:
-                return 0.5  # Not enough data
-            
-            # Calculate moving averages
-            prices = [float(d.close_price) for d in recent_data]
-            
-            # Simple trend analysis
-            sma_20 = sum(prices[:20]) / 20
-            sma_50 = sum(prices[:50]) / 50
-            
-            current_price = prices[0]
-            
-            # Trend scoring
-            if current_price > sma_20 > sma_50:
-                return 0.8  # Strong uptrend
-            elif current_price > sma_20:
-                return 0.6  # Moderate uptrend
-            elif current_price < sma_20 < sma_50:
-                return 0.2  # Downtrend
-            else:
-                return 0.4  # Sideways/uncertain
-                
-        except Exception as e:
-            logger.warning(f"Error analyzing trend for {symbol.symbol}: {e}")
-            return 0.5
+        if len(closes) < 50:
+            return 0.5  # Not enough data
+        
+        # Simple trend analysis
+        sma_20 = closes[:20].mean()
+        sma_50 = closes[:50].mean()
+        
+        current_price = closes[0]
+        
+        # Trend scoring
+        if current_price > sma_20 > sma_50:
+            return 0.8  # Strong uptrend
+        elif current_price > sma_20:
+            return 0.6  # Moderate uptrend
+        elif current_price < sma_20 < sma_50:
+            return 0.2  # Downtrend
+        else:
+            return 0.4  # Sideways/uncertain
     
-    def _analyze_support_resistance(self, symbol: Symbol) -> float:
+    def _analyze_support_resistance(self, closes: np.ndarray, highs: np.ndarray, lows: np.ndarray) -> float:
         """Analyze support and resistance levels"""
-        try:
-            recent_data = MarketData.objects.filter(symbol=symbol).order_by('-timestamp')[:100]
-            
-            if len(recent_data) < 20:
-                return 0.5
-            
-            prices = [float(d.close_price) for d in recent_data]
-            current_price = prices[0]
-            
-            # Find support and resistance levels
-            high_prices = [float(d.high_price) for d in recent_data]
-            low_prices = [float(d.low_price) for d in recent_data]
-            
-            resistance = max(high_prices)
-            support = min(low_prices)
-            
-            # Score based on distance from key levels
-            price_range = resistance - support
-            if price_range > 0:
-                distance_from_support = (current_price - support) / price_range
-                
-                if distance_from_support > 0.7:
-                    return 0.7  # Near resistance, potential reversal
-                elif distance_from_support < 0.3:
-                    return 0.8  # Near support, potential bounce
-                else:
-                    return 0.6  # Middle range
-            
-            return 0.5
-            
-        except Exception as e:
-            logger.warning(f"Error analyzing support/resistance for {symbol.symbol}: {e}")
+        if len(closes) < 20:
             return 0.5
+        
+        current_price = closes[0]
+        
+        # Find support and resistance levels over the last 100 bars
+        resistance = highs[:100].max()
+        support = lows[:100].min()
+        
+        # Score based on distance from key levels
+        price_range = resistance - support
+        if price_range > 0:
+            distance_from_support = (current_price - support) / price_range
+            
+            if distance_from_support > 0.7:
+                return 0.7  # Near resistance, potential reversal
+            elif distance_from_support < 0.3:
+                return 0.8  # Near support, potential bounce
+            else:
+                return 0.6  # Middle range
+        
+        return 0.5
     
-    def _analyze_volume_profile(self, symbol: Symbol) -> float:
+    def _analyze_volume_profile(self, volumes: np.ndarray) -> float:
         """Analyze volume profile"""
-        try:
-            recent_data = MarketData.objects.filter(symbol=symbol).order_by('-timestamp')[:50]
-            
-            if len(recent_data) < 10:
-                return 0.5
-            
-            volumes = [float(d.volume) for d in recent_data]
-            avg_volume = sum(volumes) / len(volumes)
-            current_volume = volumes[0]
-            
-            # Volume analysis
-            if current_volume > avg_volume * 1.5:
-                return 0.8  # High volume
-            elif current_volume > avg_volume:
-                return 0.6  # Above average volume
-            else:
-                return 0.4  # Low volume
-                
-        except Exception as e:
-            logger.warning(f"Error analyzing volume for {symbol.symbol}: {e}")
+        if len(volumes) < 10:
             return 0.5
+        
+        avg_volume = volumes[:50].mean()
+        current_volume = volumes[0]
+        
+        # Volume analysis
+        if current_volume > avg_volume * 1.5:
+            return 0.8  # High volume
+        elif current_volume > avg_volume:
+            return 0.6  # Above average volume
+        else:
+            return 0.4  # Low volume
     
-    def _analyze_momentum(self, symbol: Symbol) -> float:
-        """Analyze momentum indicators"""
-        try:
-            # Get RSI indicator
-            rsi_indicator = TechnicalIndicator.objects.filter(
-                symbol=symbol,
-                indicator_type='RSI'
-            ).order_by('-timestamp').first()
-            
-            if rsi_indicator:
-                rsi_value = float(rsi_indicator.value)
-                
-                # RSI analysis for long-term
-                if 30 <= rsi_value <= 70:
-                    return 0.7  # Neutral zone, good for accumulation
-                elif rsi_value < 30:
-                    return 0.8  # Oversold, good buying opportunity
-                elif rsi_value > 70:
-                    return 0.3  # Overbought, potential selling
-                else:
-                    return 0.5
-            
-            return 0.5
-            
-        except Exception as e:
-            logger.warning(f"Error analyzing momentum for {symbol.symbol}: {e}")
+    def _analyze_momentum(self, closes: np.ndarray, period: int = 14) -> float:
+        """Analyze momentum with the RSI of the window closes"""
+        if len(closes) <= period:
             return 0.5
+        
+        # Wilder's RSI over oldest-to-newest deltas
+        deltas = np.diff(closes[::-1])
+        gains = np.clip(deltas, 0, None)
+        losses = np.clip(-deltas, 0, None)
+        avg_gain = gains[:period].mean()
+        avg_loss = losses[:period].mean()
+        for gain, loss in zip(gains[period:], losses[period:]):
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        rsi_value = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        
+        # RSI analysis for long-term
+        if 30 <= rsi_value <= 70:
+            return 0.7  # Neutral zone, good for accumulation
+        elif rsi_value < 30:
+            return 0.8  # Oversold, good buying opportunity
+        else:
+            return 0.3  # Overbought, potential selling
     
-    def _analyze_volatility(self, symbol: Symbol) -> float:
+    def _analyze_volatility(self, closes: np.ndarray) -> float:
         """Analyze volatility for long-term positioning"""
-        try:
-            recent_data = MarketData.objects.filter(symbol=symbol).order_by('-timestamp')[:30]
-            
-            if len(recent_data) < 10:
-                return 0.5
-            
-            prices = [float(d.close_price) for d in recent_data]
-            
-            # Calculate volatility
-            returns = []
-            for i in range(1, len(prices)):
-                returns.append((prices[i-1] - prices[i]) / prices[i])
-            
-            if returns:
-                volatility = sum(abs(r) for r in returns) / len(returns)
-                
-                # For spot trading, moderate volatility is preferred
-                if 0.02 <= volatility <= 0.05:
-                    return 0.8  # Good volatility for DCA
-                elif volatility < 0.02:
-                    return 0.6  # Low volatility
-                else:
-                    return 0.4  # High volatility
-            
-            return 0.5
-            
-        except Exception as e:
-            logger.warning(f"Error analyzing volatility for {symbol.symbol}: {e}")
+        if len(closes) < 10:
             return 0.5
+        
+        # Mean absolute return of the last 30 bars
+        prices = closes[:30]
+        volatility = np.abs(prices[:-1] / prices[1:] - 1).mean()
+        
+        # For spot trading, moderate volatility is preferred
+        if 0.02 <= volatility <= 0.05:
+            return 0.8  # Good volatility for DCA
+        elif volatility < 0.02:
+            return 0.6  # Low volatility
+        else:
+            return 0.4  # High volatility
     
-    def _analyze_market_cycles(self, symbol: Symbol) -> float:
+    def _analyze_market_cycles(self, closes: np.ndarray) -> float:
         """Analyze market cycle position"""
         # This would typically involve more complex cycle analysis
         # For now, use a simple heuristic based on recent performance
-        
-        try:
-            recent_data = MarketData.objects.filter(symbol=symbol).order_by('-timestamp')[:100]
-            
-            if len(recent_data) < 50:
-                return 0.5
-            
-            prices = [float(d.close_price) for d in recent_data]
-            current_price = prices[0]
-            price_50_days_ago = prices[49]
-            
-            # Calculate 50-day return
-            return_50d = (current_price - price_50_days_ago) / price_50_days_ago
-            
-            # Cycle analysis
-            if return_50d > 0.2:
-                return 0.3  # Strong rally, potential top
-            elif return_50d < -0.2:
-                return 0.8  # Strong decline, potential bottom
-            else:
-                return 0.6  # Neutral cycle position
-            
-        except Exception as e:
-            logger.warning(f"Error analyzing market cycles for {symbol.symbol}: {e}")
+        if len(closes) < 50:
             return 0.5
+        
+        current_price = closes[0]
+        price_50_bars_ago = closes[49]
+        
+        # Calculate 50-bar return
+        return_50d = (current_price - price_50_bars_ago) / price_50_bars_ago
+        
+        # Cycle analysis
+        if return_50d > 0.2:
+            return 0.3  # Strong rally, potential top
+        elif return_50d < -0.2:
+            return 0.8  # Strong decline, potential bottom
+        else:
+            return 0.6  # Neutral cycle position
 
 
 class SpotTradingStrategyEngine:
@@ -364,8 +371,18 @@ class SpotTradingStrategyEngine:
         self.fundamental_analyzer = SpotFundamentalAnalysis()
         self.technical_analyzer = SpotTechnicalAnalysis()
     
-    def generate_spot_signals(self, symbol: Symbol) -> List[SpotTradingSignal]:
-        """Generate long-term spot trading signals"""
+    def generate_universe_signals(self, symbols: Iterable[Symbol]) -> List[SpotTradingSignal]:
+        """Generate spot signals for many symbols from one batched technical analysis"""
+        symbols = list(symbols)
+        analyses = self.technical_analyzer.analyze_many(symbols)
+        
+        signals = []
+        for symbol in symbols:
+            signals.extend(self.generate_spot_signals(symbol, analyses.get(symbol.symbol)))
+        return signals
+    
+    def generate_spot_signals(self, symbol: Symbol, technical_analysis: Optional[Dict] = None) -> List[SpotTradingSignal]:
+        """Generate long-term spot trading signals (technical_analysis from analyze_many if given)"""
         logger.info(f"Generating spot signals for {symbol.symbol}")
         
         signals = []
@@ -376,7 +393,8 @@ class SpotTradingStrategyEngine:
             fundamental_score = self.fundamental_analyzer.calculate_fundamental_score(fundamental_factors)
             
             # 2. Technical Analysis
-            technical_analysis = self.technical_analyzer.analyze_long_term_trends(symbol)
+            if technical_analysis is None:
+                technical_analysis = self.technical_analyzer.analyze_long_term_trends(symbol)
             technical_score = self.technical_analyzer.calculate_technical_score(technical_analysis)
             
             # 3. Sentiment Analysis (placeholder)
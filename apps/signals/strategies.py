@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.db.models import Q
 
 from apps.signals.models import TradingSignal, SignalType
+from apps.signals.signal_persistence import SignalPersistencePipeline, get_signal_type
 from apps.trading.models import Symbol
 from apps.data.models import TechnicalIndicator, MarketData
 
@@ -19,11 +20,30 @@ class BaseStrategy:
         self.name = self.__class__.__name__
         self.min_confidence_threshold = 0.7
         self.min_risk_reward_ratio = 3.0
+        self.pipeline = None  # Set while generating a batch, see generate_signals_for_symbols
         
     def generate_signals(self, symbol: Symbol) -> List[TradingSignal]:
         """Generate trading signals for a symbol"""
         raise NotImplementedError("Subclasses must implement generate_signals")
     
+    def generate_signals_for_symbols(self, symbols: List[Symbol]) -> List[TradingSignal]:
+        """Generate signals for many symbols and persist them in batches"""
+        with SignalPersistencePipeline() as pipeline:
+            self.pipeline = pipeline
+            try:
+                for symbol in symbols:
+                    self.generate_signals(symbol)
+            finally:
+                self.pipeline = None
+        return pipeline.saved
+    
+    def _save_signal(self, signal: TradingSignal) -> TradingSignal:
+        """Queue the signal on the active pipeline, or save it right away"""
+        if self.pipeline is not None:
+            return self.pipeline.add(signal)
+        signal.save()
+        return signal
+    
     def _get_latest_indicators(self, symbol: Symbol, indicator_type: str, period: int, limit: int = 5) -> List[TechnicalIndicator]:
         """Get latest technical indicators for a symbol"""
         try:
@@ -376,15 +396,14 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from Moving Average Crossover Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -416,7 +435,7 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -442,7 +461,7 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
                 entry_zone_high=Decimal(str(entry_price * 1.01)),  # 1% above entry
                 entry_confidence=confidence_score,  # Use confidence score as entry confidence
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -780,15 +799,14 @@ class RSIStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from RSI Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -820,7 +838,7 @@ class RSIStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -846,7 +864,7 @@ class RSIStrategy(BaseStrategy):
                 entry_zone_high=Decimal(str(entry_price * 1.01)),  # 1% above entry
                 entry_confidence=confidence_score,  # Use confidence score as entry confidence
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -1286,15 +1304,14 @@ class MACDStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from MACD Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -1326,7 +1343,7 @@ class MACDStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -1345,7 +1362,7 @@ class MACDStrategy(BaseStrategy):
                 volume_score=0.0,
                 pattern_score=0.0,
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -1704,15 +1721,14 @@ class BollingerBandsStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from Bollinger Bands Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -1744,7 +1760,7 @@ class BollingerBandsStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -1763,7 +1779,7 @@ class BollingerBandsStrategy(BaseStrategy):
                 volume_score=0.0,
                 pattern_score=0.0,
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -2225,15 +2241,14 @@ class BreakoutStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from Breakout Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -2265,7 +2280,7 @@ class BreakoutStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -2291,7 +2306,7 @@ class BreakoutStrategy(BaseStrategy):
                 entry_zone_high=Decimal(str(entry_price * 1.01)),  # 1% above entry
                 entry_confidence=confidence_score,  # Use confidence score as entry confidence
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -2764,15 +2779,14 @@ class MeanReversionStrategy(BaseStrategy):
     def _get_or_create_signal_type(self, signal_name: str) -> SignalType:
         """Get or create a signal type"""
         try:
-            signal_type, created = SignalType.objects.get_or_create(
-                name=signal_name,
+            return get_signal_type(
+                signal_name,
                 defaults={
                     'description': f'{signal_name} signal from Mean Reversion Strategy',
                     'color': '#28a745' if 'BUY' in signal_name else '#dc3545',
                     'is_active': True
                 }
             )
-            return signal_type
         except Exception as e:
             logger.error(f"Error getting/creating signal type {signal_name}: {e}")
             # Return a default signal type
@@ -2804,7 +2818,7 @@ class MeanReversionStrategy(BaseStrategy):
                 confidence_level = 'LOW'
             
             # Create signal
-            signal = TradingSignal.objects.create(
+            signal = self._save_signal(TradingSignal(
                 symbol=symbol,
                 signal_type=signal_type,
                 strength=strength,
@@ -2823,7 +2837,7 @@ class MeanReversionStrategy(BaseStrategy):
                 volume_score=0.0,
                 pattern_score=0.0,
                 notes=notes
-            )
+            ))
             
             logger.info(f"Created {signal_type.name} signal for {symbol.symbol} with confidence {confidence_score:.2f}")
             return signal
@@ -941,19 +941,21 @@ class StrategyBacktestingService:
     def _save_signals_to_database(self, signals: List[Dict], symbol: Symbol) -> None:
         """Save generated signals to database to prevent regeneration"""
         try:
-            from apps.signals.models import TradingSignal, SignalType
+            from apps.signals.models import TradingSignal
+            from apps.signals.signal_persistence import SignalPersistencePipeline, get_signal_type
             from decimal import Decimal
             
-            signal_objects = []
+            # Backtest signals are stored only, no alerts or broadcasts
+            pipeline = SignalPersistencePipeline(create_alerts=False, broadcast=False)
             for signal in signals:
-                # Get or create signal type
-                signal_type, created = SignalType.objects.get_or_create(
-                    name=signal['signal_type'],
+                # Get or create signal type (cached per process)
+                signal_type = get_signal_type(
+                    signal['signal_type'],
                     defaults={'description': f'{signal["signal_type"]} signal type'}
                 )
                 
                 # Create TradingSignal object
-                signal_obj = TradingSignal(
+                pipeline.add(TradingSignal(
                     symbol=symbol,
                     signal_type=signal_type,
                     entry_price=Decimal(str(signal['entry_price'])),
@@ -976,13 +978,11 @@ class StrategyBacktestingService:
                     'is_backtesting': True,
                     'signal_source': 'BACKTESTING'
                 }
-                )
-                
-                signal_objects.append(signal_obj)
+                ))
             
-            # Bulk create signals
-            TradingSignal.objects.bulk_create(signal_objects, ignore_conflicts=True)
-            logger.info(f"Successfully saved {len(signal_objects)} signals to database")
+            # Bulk create remaining signals
+            pipeline.flush()
+            logger.info(f"Successfully saved {len(pipeline.saved)} signals to database")
             
         except Exception as e:
             logger.error(f"Error saving signals to database: {e}")
@@ -0,0 +1,409 @@
+"""
+Bounded task executor for AsyncProcessingService
+
+Worker threads block on a bounded queue.Queue instead of polling a list, so
+a full queue pushes back on producers and idle workers cost nothing. Every
+task gets a concurrent.futures.Future and a deadline, enforced by a
+watcher thread. Named tasks (task_type + JSON data) that do not fit in the
+queue, or are still pending at shutdown, can be spilled to a SQLite file
+and are picked up again when the queue has room or the next executor
+starts; a spilled task is only deleted once it has run.
+
+This module does not import Django models, so it can be used from any app.
+"""
+
+import json
+import heapq
+import queue
+import sqlite3
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TaskQueueFull(Exception):
+    """Raised when a task cannot be queued within the allowed wait"""
+
+
+class _WorkItem:
+    __slots__ = ('future', 'fn', 'args', 'kwargs', 'deadline', 'timeout', 'task_type', 'task_data', 'spill_id')
+
+    def __init__(self, future, fn, args, kwargs, timeout, task_type=None, task_data=None, spill_id=None):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.task_type = task_type
+        self.task_data = task_data
+        self.spill_id = spill_id
+
+
+class SQLiteTaskSpill:
+    """
+    Pending named tasks stored in a SQLite file.
+
+    Every process opening the same path shares the rows. claim() leases the
+    rows it returns in one transaction so a task is handed out once; the
+    executor deletes a row with ack() after the task ran, or hands it back
+    with release(). Rows of a process that died are claimed again once
+    their lease ran out.
+    """
+
+    def __init__(self, path, lease: float = 300):
+        self.path = str(path)
+        self.lease = lease
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS pending_tasks '
+            '(id INTEGER PRIMARY KEY AUTOINCREMENT, task_type TEXT NOT NULL, data TEXT NOT NULL, '
+            'timeout REAL, queued_at REAL NOT NULL, claimed_until REAL)'
+        )
+        # Spill files written before claims existed
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(pending_tasks)')}
+        if 'claimed_until' not in columns:
+            conn.execute('ALTER TABLE pending_tasks ADD COLUMN claimed_until REAL')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def push(self, task_type: str, data: Dict[str, Any], timeout: Optional[float] = None):
+        self._connect().execute(
+            'INSERT INTO pending_tasks (task_type, data, timeout, queued_at) VALUES (?, ?, ?, ?)',
+            (task_type, json.dumps(data), timeout, time.time())
+        )
+
+    def claim(self, limit: int) -> List[Tuple[int, str, Dict[str, Any], Optional[float]]]:
+        """Lease and return up to limit unclaimed tasks (id, task_type, data, timeout), oldest first"""
+        if limit <= 0:
+            return []
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT id, task_type, data, timeout FROM pending_tasks '
+                'WHERE claimed_until IS NULL OR claimed_until <= ? ORDER BY id LIMIT ?', (now, limit)
+            ).fetchall()
+            conn.executemany(
+                'UPDATE pending_tasks SET claimed_until = ? WHERE id = ?',
+                [(now + max(timeout or 0, self.lease), task_id) for task_id, _, _, timeout in rows]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [(task_id, task_type, json.loads(data), timeout) for task_id, task_type, data, timeout in rows]
+
+    def ack(self, task_id: int):
+        """Delete a claimed task that has run"""
+        self._connect().execute('DELETE FROM pending_tasks WHERE id = ?', (task_id,))
+
+    def release(self, task_id: int):
+        """Hand a claimed task back to the next claim()"""
+        self._connect().execute('UPDATE pending_tasks SET claimed_until = NULL WHERE id = ?', (task_id,))
+
+    def count(self) -> int:
+        """Tasks that have not run yet, claimed or not"""
+        return self._connect().execute('SELECT COUNT(*) FROM pending_tasks').fetchone()[0]
+
+
+class BoundedTaskExecutor:
+    """
+    Thread pool fed by a bounded queue.
+
+    submit() returns a Future and blocks (or raises TaskQueueFull) when the
+    queue is full. submit_named() runs handler(task_type, data); when a
+    spill is configured, named tasks that find the queue full are stored
+    there instead of being rejected.
+
+    Threads cannot be interrupted, so a task's timeout covers its whole
+    life: its future fails with TimeoutError at the deadline, a task still
+    queued then is not started, and one that is running completes but its
+    result is dropped.
+    """
+
+    def __init__(self, max_workers: int = 4, queue_size: int = 1000, default_timeout: Optional[float] = 30,
+                 handler: Optional[Callable[[str, Dict[str, Any]], Any]] = None,
+                 spill: Optional[SQLiteTaskSpill] = None, name: str = 'AsyncWorker'):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.default_timeout = default_timeout
+        self.handler = handler
+        self.spill = spill
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._shutdown = False
+        self._shutdown_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Set when the spill may hold tasks, saves a SQLite query per finished
+        # task; only changed together with the spill under _spill_lock
+        self._spill_lock = threading.Lock()
+        self._spill_pending = spill is not None
+        self.stats = {'completed': 0, 'failed': 0, 'timed_out': 0, 'rejected': 0, 'spilled': 0}
+
+        # (deadline, sequence, item) heap of the deadline watcher
+        self._deadlines = []
+        self._deadline_sequence = 0
+        self._deadline_condition = threading.Condition()
+        self._watcher = threading.Thread(target=self._watch_deadlines, name=f'{name}-deadlines', daemon=True)
+        self._watcher.start()
+
+        self._threads = []
+        for i in range(max_workers):
+            thread = threading.Thread(target=self._worker, name=f'{name}-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        # Tasks spilled by an earlier process
+        self._refill_from_spill()
+
+    def submit(self, fn: Callable, *args, timeout: Optional[float] = None, block: bool = True,
+               wait: Optional[float] = None, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) and return its Future.
+
+        With block=True the call waits up to `wait` seconds (forever when
+        None) for room in the queue, otherwise it fails at once with
+        TaskQueueFull.
+        """
+        item = _WorkItem(Future(), fn, args, kwargs, self._timeout(timeout))
+        self._put(item, block, wait)
+        return item.future
+
+    def submit_named(self, task_type: str, data: Dict[str, Any], timeout: Optional[float] = None,
+                     block: bool = False, wait: Optional[float] = None) -> Optional[Future]:
+        """
+        Queue handler(task_type, data).
+
+        Returns the Future, or None when the task was spilled because the
+        queue was full. Raises TaskQueueFull when it was full and there is
+        no spill.
+        """
+        if self.handler is None:
+            raise RuntimeError('Executor has no handler for named tasks')
+        timeout = self._timeout(timeout)
+        item = _WorkItem(Future(), self.handler, (task_type, data), {}, timeout, task_type, data)
+        try:
+            self._put(item, block, wait)
+            return item.future
+        except TaskQueueFull:
+            if self.spill is None:
+                raise
+            with self._spill_lock:
+                self.spill.push(task_type, data, timeout)
+                self._spill_pending = True
+            self._count('spilled')
+            return None
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def status(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update(
+            queue_size=self._queue.qsize(),
+            max_queue_size=self.queue_size,
+            worker_count=sum(1 for thread in self._threads if thread.is_alive()),
+            max_workers=self.max_workers,
+            spilled_pending=self.spill.count() if self.spill is not None else 0,
+            shutdown=self._shutdown,
+        )
+        return stats
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False, timeout: Optional[float] = None):
+        """
+        Stop accepting tasks and stop the workers.
+
+        Queued tasks are finished first unless cancel_pending is set or the
+        wait times out; tasks left over then go to the spill when they are
+        named and one is configured, the rest are cancelled.
+        """
+        with self._shutdown_lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+        with self._deadline_condition:
+            self._deadline_condition.notify()
+
+        if cancel_pending:
+            self._drain_pending()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if any(thread.is_alive() for thread in self._threads):
+                self._drain_pending()
+
+    def _drain_pending(self):
+        stops = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stops += 1
+            else:
+                if item.spill_id is not None:
+                    self.spill.release(item.spill_id)
+                elif item.task_type is not None and self.spill is not None:
+                    self.spill.push(item.task_type, item.task_data, item.timeout)
+                    self._count('spilled')
+                item.future.cancel()
+            self._queue.task_done()
+        # Workers still need their stop markers
+        for _ in range(stops):
+            self._queue.put_nowait(_STOP)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is None else timeout
+
+    def _put(self, item: _WorkItem, block: bool, wait: Optional[float]):
+        if self._shutdown:
+            raise RuntimeError('Executor is shut down')
+        try:
+            self._queue.put(item, block=block, timeout=wait if block else None)
+        except queue.Full:
+            self._count('rejected')
+            raise TaskQueueFull(f'Task queue is full ({self.queue_size} tasks)')
+        self._watch(item)
+
+    def _watch(self, item: _WorkItem):
+        """Have the watcher fail the item's future at its deadline"""
+        if item.deadline is None:
+            return
+        with self._deadline_condition:
+            self._deadline_sequence += 1
+            heapq.heappush(self._deadlines, (item.deadline, self._deadline_sequence, item))
+            if self._deadlines[0][2] is item:
+                self._deadline_condition.notify()
+
+    def _watch_deadlines(self):
+        while True:
+            with self._deadline_condition:
+                while True:
+                    if not self._deadlines:
+                        if self._shutdown and all(not thread.is_alive() for thread in self._threads):
+                            return
+                        self._deadline_condition.wait(1 if self._shutdown else None)
+                        continue
+                    wait = self._deadlines[0][0] - time.monotonic()
+                    if wait <= 0:
+                        item = heapq.heappop(self._deadlines)[2]
+                        break
+                    self._deadline_condition.wait(wait)
+            self._expire(item)
+
+    def _expire(self, item: _WorkItem):
+        if item.future.done():
+            return
+        message = (f'Task overran its {item.timeout}s timeout' if item.future.running()
+                   else f'Task expired after {item.timeout}s in the queue')
+        try:
+            item.future.set_exception(TimeoutError(message))
+        except InvalidStateError:
+            # Finished just now
+            return
+        self._count('timed_out')
+        logger.warning(f"Task {item.task_type or getattr(item.fn, '__name__', item.fn)}: {message}")
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._run(item)
+                if item.spill_id is not None:
+                    self._ack(item.spill_id)
+            finally:
+                self._queue.task_done()
+            self._refill_from_spill()
+
+    def _run(self, item: _WorkItem):
+        if item.future.done():
+            # Failed by the deadline watcher while it was queued
+            return
+        try:
+            if not item.future.set_running_or_notify_cancel():
+                return
+        except RuntimeError:
+            return
+
+        try:
+            result = item.fn(*item.args, **item.kwargs)
+        except BaseException as e:
+            error = e
+            result = None
+        else:
+            error = None
+
+        try:
+            if error is None:
+                item.future.set_result(result)
+            else:
+                item.future.set_exception(error)
+        except InvalidStateError:
+            # The deadline watcher already reported TimeoutError
+            return
+        if error is None:
+            self._count('completed')
+        else:
+            self._count('failed')
+            logger.error(f"Error processing task {item.task_type or getattr(item.fn, '__name__', item.fn)}: {error}")
+
+    def _ack(self, spill_id: int):
+        try:
+            self.spill.ack(spill_id)
+        except Exception as e:
+            logger.error(f"Error deleting finished task {spill_id} from spill: {e}")
+
+    def _refill_from_spill(self):
+        """Move spilled tasks into free queue slots"""
+        if not self._spill_pending or self._shutdown or self.handler is None:
+            return
+        free = self.queue_size - self._queue.qsize()
+        if free <= 0:
+            return
+        try:
+            with self._spill_lock:
+                tasks = self.spill.claim(free)
+                if len(tasks) < free:
+                    self._spill_pending = False
+            for spill_id, task_type, data, timeout in tasks:
+                item = _WorkItem(Future(), self.handler, (task_type, data), {}, timeout, task_type, data, spill_id)
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    # Lost the race for the slot, the task stays in the spill
+                    with self._spill_lock:
+                        self.spill.release(spill_id)
+                        self._spill_pending = True
+                    continue
+                self._watch(item)
+        except Exception as e:
+            logger.error(f"Error refilling tasks from spill: {e}")
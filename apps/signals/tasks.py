@@ -26,20 +26,8 @@ def generate_signals_for_all_symbols():
     signal_service = SignalGenerationService()
     active_symbols = Symbol.objects.filter(is_active=True, is_crypto_symbol=True)
     
-    total_signals = 0
-    generated_signals = []
-    
-    for symbol in active_symbols:
-        try:
-            signals = signal_service.generate_signals_for_symbol(symbol)
-            generated_signals.extend(signals)
-            total_signals += len(signals)
-            
-            if len(signals) > 0:
-                logger.debug(f"Generated {len(signals)} signals for {symbol.symbol}")
-            
-        except Exception as e:
-            logger.error(f"Error generating signals for {symbol.symbol}: {e}")
+    generated_signals = signal_service.generate_signals_for_symbols(active_symbols)
+    total_signals = len(generated_signals)
     
     logger.info(f"Signal generation completed. Total signals: {total_signals}")
     
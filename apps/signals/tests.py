@@ -1,3 +1,1096 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+import requests
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Max
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-# Create your tests here.
+from apps.core.query_budget import QueryBudgetExceeded
+from apps.core.shared_cache import LocalSharedCacheBackend, set_shared_cache
+
+from apps.data.models import MarketData
+from apps.data.watermarks import update_watermarks
+from apps.trading.models import Symbol
+from .advanced_indicators import AdvancedIndicatorsService
+from .backtesting_api import BacktestAPIView
+from .coin_performance_analyzer import CoinPerformanceAnalyzer
+from .database_data_utils import get_database_health_status, validate_data_quality
+from .models import TradingSignal, SignalAlert, SignalFactorContribution, SignalType
+from .price_path import PricePath
+from .signal_delivery_service import SignalDeliveryService
+from .services import SignalGenerationService
+from .signal_persistence import SignalPersistencePipeline, SIGNAL_FACTORS, get_signal_type, signal_lookups
+from .smc_detection import SMCDetector, BULLISH, BEARISH
+from .smc_strategy import SmartMoneyConceptsStrategy
+from .spot_trading_engine import SpotTechnicalAnalysis, SpotTradingStrategyEngine
+from .thirty_minute_strategy import ThirtyMinuteStrategyService
+from .task_executor import BoundedTaskExecutor, SQLiteTaskSpill, TaskQueueFull
+from .unified_signal_task import generate_unified_signals_task
+from .views import SignalAPIView
+from .walk_forward import build_folds, run_folds
+
+
+def make_ohlc(bars, seed=1):
+    """Random-walk OHLC bars as a DataFrame"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_prices = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=bars, freq='h'),
+        'open': open_prices,
+        'high': np.maximum(open_prices, close) * (1 + rng.uniform(0, 0.01, bars)),
+        'low': np.minimum(open_prices, close) * (1 - rng.uniform(0, 0.01, bars)),
+        'close': close,
+        'volume': rng.uniform(1, 10, bars),
+    })
+
+
+def random_forest_fold(X_train, y_train, X_val, y_val, seed, n_jobs):
+    """Walk-forward fold function used by WalkForwardTestCase"""
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_estimators=20, random_state=seed, n_jobs=n_jobs).fit(X_train, y_train)
+    return {'accuracy': float((model.predict(X_val) == y_val).mean())}
+
+
+class SMCDetectorTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        self.df = make_ohlc(400)
+        self.detector = SMCDetector.from_dataframe(self.df)
+
+    def test_swings_match_reference_loop(self):
+        """Test vectorized swings match the candle-by-candle definition"""
+        highs, lows = self.df['high'].to_numpy(), self.df['low'].to_numpy()
+        expected_highs = [
+            i for i in range(5, len(highs) - 5)
+            if all(highs[i] > highs[j] for j in range(i - 5, i + 6) if j != i)
+        ]
+        expected_lows = [
+            i for i in range(5, len(lows) - 5)
+            if all(lows[i] < lows[j] for j in range(i - 5, i + 6) if j != i)
+        ]
+        self.assertEqual(self.detector.swing_highs()['index'].tolist(), expected_highs)
+        self.assertEqual(self.detector.swing_lows()['index'].tolist(), expected_lows)
+
+    def test_strategy_uses_detector(self):
+        """Test the strategy's swing and order block helpers agree with the detector"""
+        strategy = SmartMoneyConceptsStrategy()
+        swing_highs = strategy._find_swing_highs(self.df)
+        order_blocks = strategy._find_order_blocks(self.df)
+
+        self.assertEqual([swing['index'] for swing in swing_highs], self.detector.swing_highs()['index'].tolist())
+        self.assertEqual([block['index'] for block in order_blocks], self.detector.order_blocks()['index'].tolist())
+
+    def test_bos_and_choch_classification(self):
+        """Test breaks in the trend direction are BOS and the first counter break is CHoCH"""
+        points = [10, 14, 12, 16, 14, 18, 9]
+        close = np.concatenate([np.linspace(a, b, 4)[:-1] for a, b in zip(points, points[1:])] + [[9]])
+        detector = SMCDetector(close, close + 0.1, close - 0.1, close)
+
+        breaks = detector.structure_breaks(window=2)
+        self.assertEqual(breaks['kind'].tolist(), ['BOS', 'BOS', 'CHOCH'])
+        self.assertEqual(breaks['direction'].tolist(), [BULLISH, BULLISH, BEARISH])
+        self.assertAlmostEqual(breaks['level'][-1], 13.9)
+
+    def test_choch_signal_has_its_own_type(self):
+        """Test CHoCH signals get CHoCH_BUY/CHoCH_SELL types and leave the BOS types alone"""
+        symbol = Symbol.objects.create(symbol='SOL', name='Solana', symbol_type='CRYPTO')
+        strategy = SmartMoneyConceptsStrategy()
+        strategy.min_risk_reward_ratio = 1.0
+
+        bearish = {'direction': 'BEARISH', 'current_price': 95.0, 'break_price': 100.0}
+        choch = strategy._create_choch_signal(symbol, bearish, self.df)
+        bos = strategy._create_bos_signal(symbol, bearish, self.df)
+        self.assertEqual(choch.signal_type.name, 'CHoCH_SELL')
+        self.assertEqual(bos.signal_type.name, 'BOS_SELL')
+        self.assertEqual(SignalType.objects.get(pk=bos.signal_type.pk).name, 'BOS_SELL')
+
+        bullish = {'direction': 'BULLISH', 'current_price': 105.0, 'break_price': 100.0}
+        self.assertEqual(strategy._create_choch_signal(symbol, bullish, self.df).signal_type.name, 'CHoCH_BUY')
+
+    def test_fair_value_gaps(self):
+        """Test three-candle gaps are detected with their bounds"""
+        high = np.array([10.0, 11.0, 13.0, 12.5, 9.0])
+        low = np.array([9.0, 10.0, 12.0, 10.5, 8.0])
+        detector = SMCDetector(low, high, low, high)
+
+        gaps = detector.fair_value_gaps(span=2)
+        self.assertEqual(gaps['index'].tolist(), [2, 4])
+        self.assertEqual(gaps['direction'].tolist(), [BULLISH, BEARISH])
+        self.assertEqual((gaps['bottom'][0], gaps['top'][0]), (10.0, 12.0))
+        self.assertEqual((gaps['bottom'][1], gaps['top'][1]), (9.0, 12.0))
+
+    def test_range_breaks_match_reference_loop(self):
+        """Test range breaks match the rolling-window loop they replace"""
+        highs, lows = self.df['high'], self.df['low']
+        prior_high = highs.rolling(20).max()
+        prior_low = lows.rolling(20).min()
+        expected = sorted(
+            [i for i in range(20, len(highs)) if highs[i] > prior_high[i - 1] * 1.001] +
+            [i for i in range(20, len(lows)) if lows[i] < prior_low[i - 1] * 0.999]
+        )
+        self.assertEqual(self.detector.range_breaks(20, 0.001)['index'].tolist(), expected)
+
+    def test_append_matches_full_recompute(self):
+        """Test appending bars gives the same events as scanning everything"""
+        detector = SMCDetector.from_dataframe(self.df.iloc[:300])
+        detector.swings()
+        detector.structure_breaks()
+
+        tail = self.df.iloc[300:]
+        detector.append(tail['open'], tail['high'], tail['low'], tail['close'], tail['volume'], tail['timestamp'])
+
+        self.assertTrue(np.array_equal(detector.swings(), self.detector.swings()))
+        self.assertTrue(np.array_equal(detector.structure_breaks(), self.detector.structure_breaks()))
+        self.assertEqual(detector.timestamp_at(-1), self.df['timestamp'].iloc[-1])
+
+    def test_two_year_hourly_scan(self):
+        """Load test: a 2 year 1h scan finds pivots in one pass and only rescans the tail after append"""
+        df = make_ohlc(2 * 365 * 24 + 24, seed=2)
+        history, tail = df.iloc[:-24], df.iloc[-24:]
+
+        with mock.patch.object(SMCDetector, '_pivot_flags', wraps=SMCDetector._pivot_flags) as pivot_flags:
+            detector = SMCDetector.from_dataframe(history)
+            detector.swings()
+            detector.structure_breaks()
+            detector.fair_value_gaps()
+            detector.liquidity_sweeps()
+            detector.order_blocks()
+            detector.range_breaks()
+            # One call for highs and one for lows, shared by swings and structure breaks
+            self.assertEqual(pivot_flags.call_count, 2)
+
+            detector.append(tail['open'], tail['high'], tail['low'], tail['close'], tail['volume'], tail['timestamp'])
+            detector.swings()
+            detector.structure_breaks()
+
+        self.assertEqual(pivot_flags.call_count, 4)
+        self.assertEqual([c.args[3] for c in pivot_flags.call_args_list[2:]], [len(history) - 5] * 2)
+        self.assertTrue(np.array_equal(detector.structure_breaks(), SMCDetector.from_dataframe(df).structure_breaks()))
+
+class AdvancedIndicatorsServiceTestCase(TestCase):
+    def setUp(self):
+        self.service = AdvancedIndicatorsService()
+        self.symbol = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        df = make_ohlc(150, seed=3)
+        start = timezone.now() - timedelta(hours=len(df))
+        MarketData.objects.bulk_create([
+            MarketData(
+                symbol=self.symbol, timestamp=start + timedelta(hours=i), timeframe='1h',
+                open_price=round(row.open, 6), high_price=round(row.high, 6), low_price=round(row.low, 6),
+                close_price=round(row.close, 6), volume=round(row.volume, 2)
+            ) for i, row in enumerate(df.itertuples())
+        ])
+        # Bars of another timeframe must not leak into 1h indicators
+        MarketData.objects.create(
+            symbol=self.symbol, timestamp=timezone.now(), timeframe='4h',
+            open_price=1, high_price=1, low_price=1, close_price=1, volume=1
+        )
+
+    def test_calculate_all_uses_one_query(self):
+        """Test every indicator is computed from a single bar fetch"""
+        with self.assertNumQueries(1):
+            result = self.service.calculate_all(self.symbol)
+
+        self.assertEqual(result.bars, 100)
+        self.assertEqual(result.timeframe, '1h')
+        for name in ('fair_value_gap', 'liquidity_swings', 'nadaraya_watson_envelope',
+                     'pivot_points', 'rsi_divergence', 'stochastic_rsi'):
+            self.assertIsNotNone(getattr(result, name), name)
+        self.assertNotEqual(result.nadaraya_watson_envelope['current_price'], 1.0)
+
+    def test_batch_matches_single_indicator_methods(self):
+        """Test calculate_all gives the same values as the individual methods"""
+        result = self.service.calculate_all(self.symbol)
+
+        self.assertEqual(result.fair_value_gap, self.service.calculate_fair_value_gap(self.symbol))
+        self.assertEqual(result.pivot_points, self.service.calculate_pivot_points(self.symbol))
+        self.assertEqual(result.stochastic_rsi, self.service.calculate_stochastic_rsi(self.symbol))
+
+    def test_nadaraya_watson_latest_value(self):
+        """Test the kernel matrix's last row equals the single-point kernel regression"""
+        bars = self.service.get_bars(self.symbol, limit=40)
+        envelope = self.service._nadaraya_watson_envelope(bars, 20, 0.1)
+
+        x = np.arange(40)
+        weights = np.exp(-0.5 * ((x - 39) / (0.1 * 40)) ** 2)
+        self.assertAlmostEqual(envelope['nw_value'], np.sum(weights * bars['close']) / np.sum(weights))
+        self.assertEqual(len(envelope['nw_curve']), 40)
+
+    def test_wilder_rsi_matches_recursive_definition(self):
+        """Test the filtered RSI matches Wilder's smoothing computed bar by bar"""
+        prices = make_ohlc(200, seed=4)['close'].to_numpy()
+        deltas = np.diff(prices)
+        gains, losses = np.clip(deltas, 0, None), np.clip(-deltas, 0, None)
+        avg_gain, avg_loss = gains[:14].mean(), losses[:14].mean()
+        expected = [100 - 100 / (1 + avg_gain / avg_loss)]
+        for gain, loss in zip(gains[14:], losses[14:]):
+            avg_gain = (avg_gain * 13 + gain) / 14
+            avg_loss = (avg_loss * 13 + loss) / 14
+            expected.append(100 - 100 / (1 + avg_gain / avg_loss))
+
+        rsi = self.service.wilder_rsi(prices, 14)
+        self.assertTrue(np.isnan(rsi[:14]).all())
+        self.assertTrue(np.allclose(rsi[14:], expected))
+
+
+class SignalPersistencePipelineTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        signal_lookups.clear()
+        self.symbol = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO')
+
+    def tearDown(self):
+        signal_lookups.clear()
+
+    def make_signal(self, signal_type, price=100.0):
+        return TradingSignal(
+            symbol=self.symbol, signal_type=signal_type, strength='MODERATE',
+            confidence_score=0.75, confidence_level='HIGH',
+            entry_price=price, target_price=price * 1.05, stop_loss=price * 0.98,
+            risk_reward_ratio=2.5, quality_score=0.7
+        )
+
+    def test_signal_type_cached_after_commit(self):
+        """Test signal types are resolved once per process"""
+        with self.captureOnCommitCallbacks(execute=True):
+            signal_type = get_signal_type('BUY')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_signal_type('BUY').pk, signal_type.pk)
+
+        # Deleting the row evicts it
+        signal_type.delete()
+        with CaptureQueriesContext(connection) as queries:
+            get_signal_type('BUY')
+        self.assertTrue(queries.captured_queries)
+
+    def test_flush_writes_signals_contributions_and_alerts(self):
+        """Test one flush stores signals with their factor contributions and alerts"""
+        signal_type = get_signal_type('BUY')
+        scores = {key: 0.5 for key in SIGNAL_FACTORS}
+
+        with mock.patch.object(SignalPersistencePipeline, '_broadcast') as broadcast:
+            with self.captureOnCommitCallbacks(execute=True):
+                with SignalPersistencePipeline() as pipeline:
+                    for i in range(3):
+                        pipeline.add(self.make_signal(signal_type, 100 + i), scores)
+                # Broadcasting waits for the commit
+                broadcast.assert_not_called()
+
+        self.assertEqual(len(pipeline.saved), 3)
+        self.assertTrue(all(signal.pk for signal in pipeline.saved))
+        self.assertEqual(SignalFactorContribution.objects.count(), 3 * len(SIGNAL_FACTORS))
+        self.assertEqual(SignalAlert.objects.filter(alert_type='SIGNAL_GENERATED').count(), 3)
+        broadcast.assert_called_once_with(pipeline.saved)
+
+    def test_bulk_insert_without_returning(self):
+        """Test databases without RETURNING still bulk insert and get the ids back"""
+        signal_type = get_signal_type('BUY')
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False):
+            with CaptureQueriesContext(connection) as queries:
+                with SignalPersistencePipeline(broadcast=False) as pipeline:
+                    for i in range(50):
+                        pipeline.add(self.make_signal(signal_type, 100 + i), {'technical': 0.5})
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "signals_tradingsignal"')]
+        self.assertLessEqual(len(inserts), 2)
+        for signal in pipeline.saved:
+            self.assertEqual(TradingSignal.objects.get(pk=signal.pk).entry_price, signal.entry_price)
+        self.assertEqual(SignalAlert.objects.filter(signal__in=pipeline.saved).count(), 50)
+
+    def test_one_broadcast_per_flush(self):
+        """Test a flush sends its signals to websocket clients as one message"""
+        channel_layer = InMemoryChannelLayer()
+        channel_name = async_to_sync(channel_layer.new_channel)()
+        async_to_sync(channel_layer.group_add)('trading_signals', channel_name)
+        signal_type = get_signal_type('BUY')
+
+        with mock.patch('apps.core.services.get_channel_layer', return_value=channel_layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                with SignalPersistencePipeline() as pipeline:
+                    for i in range(3):
+                        pipeline.add(self.make_signal(signal_type, 100 + i))
+
+        message = async_to_sync(channel_layer.receive)(channel_name)
+        self.assertEqual(message['type'], 'signal_batch')
+        self.assertEqual([s['signal_id'] for s in message['signals']], [s.pk for s in pipeline.saved])
+        queue = channel_layer.channels.get(channel_name)
+        self.assertTrue(queue is None or queue.empty())
+
+    def test_generation_run_flushes_once(self):
+        """Test signals created during a generation run are written with their factor scores in one flush"""
+        service = SignalGenerationService()
+        scores = dict(technical_score=0.5, sentiment_score=0.2, news_score=0.1, volume_score=0.3,
+                      pattern_score=0.1, economic_score=0.0, sector_score=0.0)
+        market_data = {'close_price': 100.0, 'high_price': 101.0, 'low_price': 99.0}
+        engine_signal = self.make_signal(get_signal_type('BUY'))
+
+        with mock.patch('apps.data.real_price_service.get_live_prices', return_value={}), \
+                mock.patch.object(service.timeframe_service, 'get_multi_timeframe_analysis', return_value=None), \
+                mock.patch.object(SignalPersistencePipeline, '_broadcast'):
+            with CaptureQueriesContext(connection) as queries:
+                with service._persistence_run():
+                    signals = [service._create_signal(self.symbol, name, 0.8, market_data, **scores)
+                               for name in ('BUY', 'STRONG_BUY', 'SELL')]
+                    service._queue_signal(engine_signal, create_alert=False)
+                    self.assertTrue(all(signal.pk is None for signal in signals))
+
+        for table in ('signals_tradingsignal', 'signals_signalfactorcontribution', 'signals_signalalert'):
+            inserts = [q for q in queries.captured_queries if q['sql'].startswith(f'INSERT INTO "{table}"')]
+            self.assertEqual(len(inserts), 1, table)
+        self.assertTrue(all(signal.pk for signal in signals + [engine_signal]))
+        self.assertEqual(SignalFactorContribution.objects.filter(signal__in=signals).count(), 3 * len(SIGNAL_FACTORS))
+        self.assertEqual(SignalAlert.objects.filter(signal__in=signals).count(), 3)
+        self.assertFalse(SignalAlert.objects.filter(signal=engine_signal).exists())
+        self.assertEqual(cache.get(f'signal_price_metadata_{signals[0].pk}')['entry_price'], 98.0)
+
+    def test_bulk_save_of_backtest(self):
+        """Load test: 10k signals with factor contributions are saved with multi-row inserts"""
+        signal_type = get_signal_type('BUY')
+        scores = {'technical': 0.6, 'volume': 0.4}
+
+        with CaptureQueriesContext(connection) as queries:
+            with SignalPersistencePipeline(batch_size=2000, create_alerts=False, broadcast=False) as pipeline:
+                for i in range(10000):
+                    pipeline.add(self.make_signal(signal_type, 100 + i * 0.01), scores)
+
+        self.assertEqual(TradingSignal.objects.count(), 10000)
+        self.assertEqual(SignalFactorContribution.objects.count(), 20000)
+        # Five flushes, each insert carrying as many rows as the backend's parameter limit allows
+        for model, per_flush in ((TradingSignal, 2000), (SignalFactorContribution, 4000)):
+            fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+            per_insert = min(2000, connection.ops.bulk_batch_size(fields, [None] * 2000))
+            inserts = [q for q in queries.captured_queries if q['sql'].startswith(f'INSERT INTO "{model._meta.db_table}"')]
+            self.assertEqual(len(inserts), 5 * math.ceil(per_flush / per_insert), model.__name__)
+        # Far below one query per row even with SQLite's parameter limit per insert
+        self.assertLess(len(queries), 1000)
+
+class BacktestPricePathTestCase(TestCase):
+    def setUp(self):
+        df = make_ohlc(24 * 365, seed=3)
+        df['timestamp'] = pd.date_range('2024-01-01', periods=len(df), freq='h', tz='UTC')
+        self.bars = df.set_index('timestamp')
+        self.price_path = PricePath.from_dataframe(self.bars)
+        self.view = BacktestAPIView()
+
+    def make_signals(self, count, seed=5):
+        rng = np.random.default_rng(seed)
+        signals = []
+        for index in rng.integers(0, len(self.bars) - 1, count):
+            entry = float(self.bars['close'].iloc[index])
+            is_buy = bool(rng.integers(0, 2))
+            target, stop = (entry * 1.03, entry * 0.98) if is_buy else (entry * 0.97, entry * 1.02)
+            signals.append({
+                'created_at': (self.bars.index[index] + pd.Timedelta(minutes=30)).isoformat(),
+                'entry_price': str(entry),
+                'target_price': str(target),
+                'stop_loss': str(stop),
+                'signal_type': 'BUY' if is_buy else 'SELL',
+            })
+        return signals
+
+    def reference_exit(self, signal):
+        """The per-bar scan the indexed lookup replaces"""
+        start = pd.Timestamp(signal['created_at'])
+        window = self.bars[(self.bars.index >= start) & (self.bars.index <= start + pd.Timedelta(days=7))]
+        target, stop = float(signal['target_price']), float(signal['stop_loss'])
+        for timestamp, bar in window.iterrows():
+            if signal['signal_type'] == 'BUY':
+                if bar['high'] >= target:
+                    return 'TARGET_HIT', timestamp
+                if bar['low'] <= stop:
+                    return 'STOP_LOSS_HIT', timestamp
+            else:
+                if bar['low'] <= target:
+                    return 'TARGET_HIT', timestamp
+                if bar['high'] >= stop:
+                    return 'STOP_LOSS_HIT', timestamp
+        if window.empty:
+            return 'NO_DATA', None
+        return 'CLOSE_PRICE', window.index[-1]
+
+    def test_matches_reference_scan(self):
+        """Test indexed exits equal the bar-by-bar scan"""
+        for signal in self.make_signals(200):
+            status, timestamp = self.reference_exit(signal)
+            result = self.view._simulate_single_signal_execution(signal, self.price_path, None)
+            self.assertEqual(result['execution_status'], status)
+            if timestamp is not None:
+                self.assertEqual(result['executed_at'], timestamp.isoformat())
+
+    def test_legacy_dict_input(self):
+        """Test a {timestamp: bar} dict is still accepted"""
+        bars = {
+            timestamp.to_pydatetime(): {'open': row['open'], 'high': row['high'], 'low': row['low'], 'close': row['close']}
+            for timestamp, row in self.bars.iloc[:500].iterrows()
+        }
+        signal = self.make_signals(1)[0]
+        signal['created_at'] = self.bars.index[10].isoformat()
+        self.assertEqual(
+            self.view._simulate_single_signal_execution(signal, bars, None),
+            self.view._simulate_single_signal_execution(signal, self.price_path, None)
+        )
+
+    def test_benchmark_two_thousand_signals_one_year(self):
+        """Benchmark: 2,000 signals over one year of 1H bars only touch each signal's 7-day window"""
+        signals = self.make_signals(2000)
+        windows = []
+
+        def window(start, end):
+            bounds = PricePath.window(self.price_path, start, end)
+            windows.append(bounds)
+            return bounds
+
+        with mock.patch.object(self.price_path, 'window', side_effect=window), \
+                mock.patch.object(PricePath, '__init__', side_effect=AssertionError('price path rebuilt')):
+            results = [self.view._simulate_single_signal_execution(signal, self.price_path, None) for signal in signals]
+
+        self.assertTrue(all(result['is_executed'] for result in results))
+        # One indexed lookup per signal, never wider than the holding period
+        self.assertEqual(len(windows), len(signals))
+        self.assertLessEqual(max(j - i for i, j in windows), 7 * 24 + 1)
+
+class WalkForwardTestCase(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.timestamps = pd.date_range('2024-01-01', periods=24 * 120, freq='h', tz='UTC')
+        self.X = rng.normal(size=(len(self.timestamps), 4))
+        self.y = (self.X[:, 0] + rng.normal(scale=0.5, size=len(self.X)) > 0).astype(int)
+        self.folds = build_folds(
+            self.timestamps, self.timestamps[0].to_pydatetime(), self.timestamps[-1].to_pydatetime(), 60, 15
+        )
+
+    def test_folds_are_index_ranges(self):
+        """Test folds cover consecutive windows located by timestamp"""
+        self.assertEqual(len(self.folds), 3)
+        first = self.folds[0]
+        self.assertEqual((first.train_start, first.train_end, first.validation_end), (0, 24 * 60, 24 * 75))
+        self.assertEqual(self.folds[1].train_end, first.validation_end)
+        self.assertEqual([fold.seed for fold in self.folds], [43, 44, 45])
+
+    def test_parallel_matches_serial(self):
+        """Test a process pool run gives the serial metrics and reports timing and memory"""
+        serial = run_folds(self.X, self.y, self.folds, 'apps.signals.tests.random_forest_fold', max_workers=1)
+        parallel = run_folds(self.X, self.y, self.folds, 'apps.signals.tests.random_forest_fold', max_workers=2)
+
+        self.assertEqual([result['metrics'] for result in serial], [result['metrics'] for result in parallel])
+        for result in parallel:
+            self.assertGreater(result['accuracy'], 0.6)
+            self.assertGreaterEqual(result['duration_seconds'], 0)
+            self.assertIn('peak_rss_mb', result)
+
+    def test_failed_fold_is_reported(self):
+        """Test a fold without validation rows is reported instead of aborting the run"""
+        folds = build_folds(self.timestamps, self.timestamps[0].to_pydatetime(),
+                            self.timestamps[-1].to_pydatetime() + timedelta(days=80), 60, 45)
+        results = run_folds(self.X, self.y, folds, 'apps.signals.tests.random_forest_fold', max_workers=1)
+        self.assertNotIn('error', results[0])
+        self.assertIn('error', results[-1])
+
+
+class SpotTechnicalAnalysisTestCase(TestCase):
+    def setUp(self):
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', market_cap_rank=1)
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO', market_cap_rank=2)
+        self.empty = Symbol.objects.create(symbol='NEW', name='New coin', symbol_type='CRYPTO')
+        self.daily = {self.btc.id: make_ohlc(260, seed=3), self.eth.id: make_ohlc(120, seed=4)}
+
+        start = timezone.now() - timedelta(days=300)
+        rows = []
+        for symbol in (self.btc, self.eth):
+            for i, bar in enumerate(self.daily[symbol.id].itertuples()):
+                rows.append(self.make_bar(symbol, start + timedelta(days=i), '1d', bar))
+            # Newer intraday bars must not leak into the daily window
+            for i, bar in enumerate(make_ohlc(30, seed=9).itertuples()):
+                rows.append(self.make_bar(symbol, timezone.now() - timedelta(hours=i), '1h', bar))
+        MarketData.objects.bulk_create(rows)
+
+    def make_bar(self, symbol, timestamp, timeframe, bar):
+        return MarketData(
+            symbol=symbol, timestamp=timestamp, timeframe=timeframe,
+            open_price=round(bar.open, 6), high_price=round(bar.high, 6), low_price=round(bar.low, 6),
+            close_price=round(bar.close, 6), volume=round(bar.volume, 2)
+        )
+
+    def test_one_query_per_universe(self):
+        """Test every symbol's window is loaded with a single timeframe-filtered query"""
+        analyzer = SpotTechnicalAnalysis(timeframe='1d')
+        with self.assertNumQueries(1):
+            windows = analyzer.load_windows([self.btc, self.eth, self.empty])
+
+        self.assertEqual(len(windows[self.btc.id]['close']), 200)
+        self.assertEqual(len(windows[self.eth.id]['close']), 120)
+        self.assertNotIn(self.empty.id, windows)
+        # Newest daily bar first
+        expected = self.daily[self.btc.id]['close'].to_numpy()[::-1][:200]
+        self.assertTrue(np.allclose(windows[self.btc.id]['close'], expected, atol=1e-6))
+
+    def test_sub_scores(self):
+        """Test sub-scores match the reference computations on the daily bars"""
+        analysis = SpotTechnicalAnalysis(timeframe='1d').analyze_many([self.btc, self.empty])
+        closes = self.daily[self.btc.id]['close'].to_numpy()[::-1]
+
+        current, sma_20, sma_50 = closes[0], closes[:20].mean(), closes[:50].mean()
+        if current > sma_20 > sma_50:
+            trend = 0.8
+        elif current > sma_20:
+            trend = 0.6
+        elif current < sma_20 < sma_50:
+            trend = 0.2
+        else:
+            trend = 0.4
+        self.assertEqual(analysis['BTC']['trend_direction'], trend)
+
+        return_50 = (closes[0] - closes[49]) / closes[49]
+        self.assertEqual(analysis['BTC']['market_cycles'], 0.3 if return_50 > 0.2 else 0.8 if return_50 < -0.2 else 0.6)
+        self.assertEqual(set(analysis['NEW'].values()), {0.5})
+
+    def test_rsi_extremes(self):
+        """Test the momentum score reads oversold and overbought closes"""
+        analyzer = SpotTechnicalAnalysis()
+        rising = np.linspace(200, 100, 40)  # newest first
+        self.assertEqual(analyzer._analyze_momentum(rising), 0.3)
+        self.assertEqual(analyzer._analyze_momentum(rising[::-1]), 0.8)
+        self.assertEqual(analyzer._analyze_momentum(rising[:10]), 0.5)
+
+    def test_universe_signals(self):
+        """Test universe generation analyzes all symbols in one pass"""
+        engine = SpotTradingStrategyEngine()
+        engine.technical_analyzer = SpotTechnicalAnalysis(timeframe='1d')
+        with mock.patch.object(SpotTechnicalAnalysis, 'analyze_many', wraps=engine.technical_analyzer.analyze_many) as analyze_many, \
+                mock.patch.object(SpotTechnicalAnalysis, 'analyze_long_term_trends') as single:
+            signals = engine.generate_universe_signals([self.btc, self.eth])
+
+        analyze_many.assert_called_once()
+        single.assert_not_called()
+        self.assertEqual(sorted(signal.symbol.symbol for signal in signals), ['BTC', 'ETH'])
+
+    def test_service_batches_spot_signals(self):
+        """Test the signal service generates a universe's spot signals in one batched call"""
+        Symbol.objects.filter(id__in=[self.btc.id, self.eth.id]).update(is_crypto_symbol=True, is_spot_tradable=True)
+        symbols = list(Symbol.objects.filter(id__in=[self.btc.id, self.eth.id, self.empty.id]).order_by('id'))
+        service = SignalGenerationService()
+        service.spot_engine.technical_analyzer = SpotTechnicalAnalysis(timeframe='1d')
+        with mock.patch.object(service, '_generate_futures_signals', return_value=[]), \
+                mock.patch.object(service, '_generate_multi_timeframe_signals', return_value=[]), \
+                mock.patch.object(service, '_convert_spot_to_trading_signal', side_effect=lambda spot: spot.symbol) as convert, \
+                mock.patch.object(SpotTradingStrategyEngine, 'generate_universe_signals',
+                                  wraps=service.spot_engine.generate_universe_signals) as universe, \
+                mock.patch.object(SpotTechnicalAnalysis, 'analyze_long_term_trends') as single:
+            signals = service.generate_signals_for_symbols(symbols)
+
+        universe.assert_called_once_with([self.btc, self.eth])
+        single.assert_not_called()
+        self.assertEqual(convert.call_count, 2)
+        self.assertEqual(sorted(symbol.symbol for symbol in signals), ['BTC', 'ETH'])
+
+    def test_unified_task_counts_only_processed_symbols(self):
+        """Test symbols whose generation fails are not reported as processed"""
+        Symbol.objects.filter(id__in=[self.btc.id, self.eth.id, self.empty.id]).update(is_active=True, is_crypto_symbol=True)
+        active = Symbol.objects.filter(is_active=True, is_crypto_symbol=True).count()
+
+        def generate(service, symbol, spot_signals=None):
+            if symbol.id == self.eth.id:
+                raise ValueError('no data')
+            return []
+
+        with mock.patch.object(SpotTradingStrategyEngine, 'generate_universe_signals', return_value=[]), \
+                mock.patch.object(SignalGenerationService, 'generate_signals_for_symbol', autospec=True, side_effect=generate):
+            result = generate_unified_signals_task.apply().get()
+
+        self.assertEqual(result['processed_symbols'], active - 1)
+
+
+class CoinPerformanceAnalyzerTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        signal_lookups.clear()
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO')
+        self.idle = Symbol.objects.create(symbol='SOL', name='Solana', symbol_type='CRYPTO')
+        signal_type = get_signal_type('BUY')
+
+        # (symbol, executed, entry, profit_loss)
+        outcomes = [
+            (self.btc, True, 100, 10), (self.btc, True, 100, -5), (self.btc, True, 200, 0),
+            (self.btc, False, 50, None), (self.btc, True, 100, None),
+            (self.eth, True, 10, 4), (self.eth, False, 10, None),
+        ]
+        TradingSignal.objects.bulk_create([
+            TradingSignal(
+                symbol=symbol, signal_type=signal_type, strength='MODERATE', confidence_score=0.7,
+                confidence_level='HIGH', quality_score=0.7, entry_price=entry, is_executed=executed,
+                profit_loss=profit_loss, metadata={'is_backtesting': True}
+            )
+            for symbol, executed, entry, profit_loss in outcomes
+        ])
+        # Live signals are not part of backtest reports
+        TradingSignal.objects.create(
+            symbol=self.btc, signal_type=signal_type, strength='MODERATE', confidence_score=0.7,
+            confidence_level='HIGH', quality_score=0.7, entry_price=1000, is_executed=True, profit_loss=500
+        )
+        self.start = timezone.now() - timedelta(days=1)
+        self.end = timezone.now() + timedelta(days=1)
+
+    def tearDown(self):
+        signal_lookups.clear()
+
+    def test_summary_from_one_aggregate(self):
+        """Test multi-coin reports take one query and count outcomes like the per-signal statuses"""
+        analyzer = CoinPerformanceAnalyzer()
+        with self.assertNumQueries(1):
+            analyses = analyzer.analyze_multiple_coins([self.btc, self.eth, self.idle], self.start, self.end)
+
+        self.assertEqual([a['symbol'] for a in analyses], ['ETH', 'BTC', 'SOL'])
+        btc = analyses[1]['total_summary']
+        self.assertEqual(
+            (btc['total_signals'], btc['profit_signals'], btc['loss_signals'], btc['not_opened_signals']),
+            (5, 1, 2, 1)
+        )
+        self.assertEqual((btc['total_investment'], btc['total_profit_loss']), (550.0, 5.0))
+        self.assertEqual(btc['total_profit_percentage'], round(5 / 550 * 100, 2))
+        self.assertEqual(analyses[0]['total_summary']['total_profit_percentage'], 20.0)
+        self.assertEqual(analyses[2]['total_summary']['total_signals'], 0)
+        self.assertEqual(analyses[1]['individual_signals'], [])
+
+    def test_detail_rows_are_paginated(self):
+        """Test per-signal rows are only loaded for the requested page"""
+        analyzer = CoinPerformanceAnalyzer()
+        analysis = analyzer.analyze_coin_signals(self.btc, self.start, self.end, page=2, page_size=2)
+
+        self.assertEqual(analysis['pagination']['total_pages'], 3)
+        self.assertEqual(analysis['pagination']['total_signals'], 5)
+        self.assertEqual([s['status'] for s in analysis['individual_signals']], ['LOSS', 'NOT_OPENED'])
+
+
+class BoundedTaskExecutorTestCase(TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.executors = []
+
+    def tearDown(self):
+        self.gate.set()
+        for executor in self.executors:
+            executor.shutdown(timeout=5)
+
+    def executor(self, **kwargs):
+        executor = BoundedTaskExecutor(**kwargs)
+        self.executors.append(executor)
+        return executor
+
+    def block_worker(self, executor):
+        """Occupy the single worker until self.gate is set"""
+        started = threading.Event()
+        future = executor.submit(lambda: (started.set(), self.gate.wait(5)))
+        started.wait(5)
+        return future
+
+    def test_futures_return_results_and_errors(self):
+        """Test submitted tasks resolve their futures"""
+        executor = self.executor(max_workers=2, queue_size=10)
+        futures = [executor.submit(pow, i, 2) for i in range(5)]
+        failing = executor.submit(int, 'x')
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 1, 4, 9, 16])
+        with self.assertRaises(ValueError):
+            failing.result(timeout=5)
+
+    def test_full_queue_pushes_back(self):
+        """Test a full queue rejects non-blocking and timed submits"""
+        executor = self.executor(max_workers=1, queue_size=2)
+        self.block_worker(executor)
+        executor.submit(time.sleep, 0)
+        executor.submit(time.sleep, 0)
+
+        with self.assertRaises(TaskQueueFull):
+            executor.submit(time.sleep, 0, block=False)
+        with self.assertRaises(TaskQueueFull):
+            executor.submit(time.sleep, 0, wait=0.05)
+        self.assertEqual(executor.status()['rejected'], 2)
+
+    def test_expired_task_is_not_started(self):
+        """Test a task still queued at its deadline fails with TimeoutError"""
+        executor = self.executor(max_workers=1, queue_size=5)
+        self.block_worker(executor)
+        calls = []
+        future = executor.submit(calls.append, 1, timeout=0.01)
+        time.sleep(0.05)
+        self.gate.set()
+
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=5)
+        self.assertEqual(calls, [])
+
+    def test_shutdown_drains_queue(self):
+        """Test shutdown finishes queued tasks and refuses new ones"""
+        executor = self.executor(max_workers=1, queue_size=10)
+        futures = [executor.submit(time.sleep, 0.01) for _ in range(5)]
+        executor.shutdown()
+
+        self.assertTrue(all(future.done() and not future.cancelled() for future in futures))
+        self.assertEqual(executor.status()['worker_count'], 0)
+        with self.assertRaises(RuntimeError):
+            executor.submit(time.sleep, 0)
+
+    def test_overflow_spills_and_resumes(self):
+        """Test named tasks overflow to SQLite and run after a restart"""
+        handled = []
+        path = os.path.join(tempfile.mkdtemp(), 'tasks.sqlite3')
+        executor = self.executor(max_workers=1, queue_size=1, spill=SQLiteTaskSpill(path),
+                                 handler=lambda task_type, data: handled.append((task_type, data['n'])))
+        self.block_worker(executor)
+        self.assertIsNotNone(executor.submit_named('ping', {'n': 0}))
+        self.assertIsNone(executor.submit_named('ping', {'n': 1}))
+        self.assertIsNone(executor.submit_named('ping', {'n': 2}))
+        executor.shutdown(wait=False, cancel_pending=True)
+
+        self.assertEqual(SQLiteTaskSpill(path).count(), 3)
+        restarted = self.executor(max_workers=1, queue_size=1, spill=SQLiteTaskSpill(path),
+                                  handler=lambda task_type, data: handled.append((task_type, data['n'])))
+        deadline = time.monotonic() + 5
+        while len(handled) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sorted(handled), [('ping', 0), ('ping', 1), ('ping', 2)])
+        while restarted.status()['spilled_pending'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(restarted.status()['spilled_pending'], 0)
+
+    def test_spilled_task_is_kept_until_it_ran(self):
+        """Test a spilled task stays in the spill while it runs and is deleted after"""
+        path = os.path.join(tempfile.mkdtemp(), 'tasks.sqlite3')
+        spill = SQLiteTaskSpill(path)
+        spill.push('ping', {'n': 1})
+        running = threading.Event()
+        counts = []
+
+        def handler(task_type, data):
+            counts.append(SQLiteTaskSpill(path).count())
+            running.set()
+            self.gate.wait(5)
+
+        executor = self.executor(max_workers=1, queue_size=1, spill=spill, handler=handler)
+        self.assertTrue(running.wait(5))
+        # Claimed but not finished: another process does not get it
+        self.assertEqual(SQLiteTaskSpill(path).claim(10), [])
+        self.gate.set()
+        executor.shutdown(timeout=5)
+
+        self.assertEqual(counts, [1])
+        self.assertEqual(spill.count(), 0)
+
+    def test_deadline_fails_running_task(self):
+        """Test a task's future times out at its deadline while the task still runs"""
+        executor = self.executor(max_workers=1, queue_size=5)
+        started = threading.Event()
+        future = executor.submit(lambda: (started.set(), self.gate.wait(5)), timeout=0.1)
+        self.assertTrue(started.wait(5))
+
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=2)
+        self.assertFalse(self.gate.is_set())
+        self.gate.set()
+        executor.shutdown(timeout=5)
+        self.assertEqual(executor.status()['timed_out'], 1)
+        self.assertEqual(executor.status()['completed'], 0)
+
+
+class DatabaseHealthWatermarkTestCase(TestCase):
+    def setUp(self):
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        now = timezone.now()
+        MarketData.objects.bulk_create([
+            MarketData(symbol=self.btc, timestamp=now - timedelta(minutes=30, hours=h), timeframe='1h',
+                       open_price=1, high_price=1, low_price=1, close_price=1, volume=1)
+            for h in range(30)
+        ])
+
+    def test_health_reads_watermarks(self):
+        """Test health and quality checks are single reads of the watermark table"""
+        with self.assertNumQueries(1):
+            self.assertEqual(get_database_health_status()['status'], 'CRITICAL')
+
+        update_watermarks([self.btc.id], '1h')
+        with self.assertNumQueries(1):
+            health = get_database_health_status()
+        self.assertEqual((health['status'], health['active_symbols'], health['latest_symbol']), ('HEALTHY', 1, 'BTC'))
+
+        with self.assertNumQueries(1):
+            quality = validate_data_quality(self.btc)
+        self.assertTrue(quality['is_valid'])
+        self.assertEqual(quality['data_points'], 24)
+
+    def test_symbol_without_bars_is_not_healthy(self):
+        """Test updating the watermark of a symbol with no bars does not report it healthy"""
+        eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO', is_crypto_symbol=True)
+        update_watermarks([eth.id], '1h')
+        self.assertEqual(get_database_health_status()['status'], 'CRITICAL')
+
+
+class ThirtyMinuteLevelsTestCase(TestCase):
+    def setUp(self):
+        set_shared_cache(LocalSharedCacheBackend())
+        self.addCleanup(set_shared_cache, None)
+        self.service = ThirtyMinuteStrategyService()
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=30)
+        prices = make_ohlc(120)
+        self.add_bars(self.btc, '30m', 30, prices[:60])
+        self.add_bars(self.eth, '15m', 15, prices)
+        # Hourly bars must not be mistaken for 30m bars
+        self.add_bars(self.eth, '1h', 60, prices[:30].assign(high=prices.high * 10))
+
+    def add_bars(self, symbol, timeframe, minutes, prices):
+        MarketData.objects.bulk_create([
+            MarketData(symbol=symbol, timeframe=timeframe, timestamp=self.start + timedelta(minutes=minutes * i),
+                       open_price=row.open, high_price=row.high, low_price=row.low, close_price=row.close,
+                       volume=row.volume)
+            for i, row in enumerate(prices.itertuples())
+        ])
+
+    def test_derives_thirty_minute_bars(self):
+        """Test 15m bars are resampled when a symbol has no 30m bars, other timeframes ignored"""
+        bars = self.service.load_thirty_minute_bars(['BTC', 'ETH'])
+        self.assertEqual((len(bars['BTC']), len(bars['ETH'])), (60, 60))
+        self.assertTrue(all(bar.start.minute in (0, 30) for bar in bars['ETH']))
+        first_two = MarketData.objects.filter(symbol=self.eth, timeframe='15m', timestamp__lt=self.start + timedelta(minutes=30))
+        self.assertAlmostEqual(float(bars['ETH'][0].high), float(first_two.aggregate(high=Max('high_price'))['high']), 5)
+        self.assertLess(max(bar.high for bar in bars['ETH']), 1000)
+
+    def test_levels_for_symbols_batch_and_cache(self):
+        """Test the universe's levels cost one bar query, and cached levels are reused until a new bar"""
+        with self.assertNumQueries(1):
+            levels = self.service.get_levels_for_symbols([self.btc, self.eth])
+        self.assertEqual(set(levels), {'BTC', 'ETH'})
+        self.assertAlmostEqual(levels['ETH']['current_price'], float(MarketData.objects.filter(
+            symbol=self.eth, timeframe='15m').latest('timestamp').close_price), 5)
+
+        with mock.patch.object(self.service, '_analyze_levels') as analyze:
+            self.assertEqual(self.service.get_thirty_minute_levels(self.btc), levels['BTC'])
+            analyze.assert_not_called()
+            MarketData.objects.create(symbol=self.btc, timeframe='30m', timestamp=self.start + timedelta(minutes=30 * 60),
+                                      open_price=1, high_price=1, low_price=1, close_price=1, volume=1)
+            analyze.return_value = {'current_price': 1}
+            self.service.get_thirty_minute_levels(self.btc)
+            analyze.assert_called_once()
+
+    def test_fallback_without_bars(self):
+        """Test symbols without intraday bars get fallback levels from their latest close"""
+        sol = Symbol.objects.create(symbol='SOL', name='Solana', symbol_type='CRYPTO', is_crypto_symbol=True)
+        self.add_bars(sol, '1h', 60, make_ohlc(3))
+        levels = self.service.get_levels_for_symbols([sol])['SOL']
+        self.assertEqual(levels['strategy'], '30_minute_timeframe_fallback')
+        self.assertAlmostEqual(levels['current_price'], float(MarketData.objects.filter(symbol=sol).latest(
+            'timestamp').close_price), 5)
+
+
+class BenchmarkPipelineCommandTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+
+    def test_report_from_isolated_database(self):
+        """Test the benchmark reports every stage without touching the configured database"""
+        symbols_before = Symbol.objects.count()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output = os.path.join(temp_dir, 'report.json')
+            call_command('benchmark_pipeline', symbols=2, bars=120, signals_per_symbol=5,
+                         stages='ingest,backtest,persistence', output=output, stdout=io.StringIO())
+            with open(output) as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual([stage['stage'] for stage in report['stages']], ['ingest', 'backtest', 'persistence'])
+        ingest, backtest, persistence = report['stages']
+        self.assertEqual(ingest['items'], 240)
+        self.assertGreater(ingest['queries'], 0)
+        self.assertEqual(persistence['items'], 10)
+        self.assertNotIn('error', backtest)
+        self.assertEqual(report['total_queries'], sum(stage['queries'] for stage in report['stages']))
+        self.assertEqual(Symbol.objects.count(), symbols_before)
+
+    def test_signal_generation_stays_offline(self):
+        """Test the signal generation stage reads fixture prices instead of the exchange APIs"""
+        with mock.patch('apps.data.real_price_service.requests.get') as get:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                output = os.path.join(temp_dir, 'report.json')
+                call_command('benchmark_pipeline', symbols=1, bars=120, stages='signal_generation',
+                             output=output, stdout=io.StringIO())
+                with open(output) as report_file:
+                    report = json.load(report_file)
+
+        get.assert_not_called()
+        self.assertNotIn('error', report['stages'][0])
+
+
+class AlertDispatchTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        symbol = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        self.signal = TradingSignal.objects.create(
+            symbol=symbol, signal_type=get_signal_type('BUY'), strength='MODERATE',
+            confidence_score=0.75, confidence_level='HIGH',
+            entry_price=100, target_price=105, stop_loss=98, risk_reward_ratio=2.5, quality_score=0.7
+        )
+        self.user = User.objects.create(username='trader', email='trader@example.com')
+        self.service = SignalDeliveryService()
+
+    def make_alerts(self, count, user=None):
+        return [
+            SignalAlert.objects.create(alert_type='email', title='Signal', message='New signal',
+                                       signal=self.signal, user=user or self.user)
+            for _ in range(count)
+        ]
+
+    def test_batches_send_every_alert_once(self):
+        """Test batched dispatch sends each due alert once and marks it SENT"""
+        alerts = self.make_alerts(5)
+        results = self.service.process_pending_alerts(batch_size=2)
+        self.assertEqual((results['total_alerts'], results['processed']), (5, 5))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(set(SignalAlert.objects.values_list('status', 'attempts', 'claim_token')), {('SENT', 1, None)})
+        self.assertTrue(all(alert.sent_at for alert in SignalAlert.objects.filter(id__in=[a.id for a in alerts])))
+
+        # Nothing is due any more
+        self.assertEqual(self.service.process_pending_alerts()['total_alerts'], 0)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_alerts_claimed_by_another_run_are_skipped(self):
+        """Test a concurrent run's claims are not sent again and pagination continues past them"""
+        alerts = self.make_alerts(5)
+        other_run = uuid.uuid4()
+        candidate_ids, claimed = self.service._claim_batch(other_run, 0, 2)
+        self.assertEqual(([alert.id for alert in claimed], candidate_ids), ([a.id for a in alerts[:2]],) * 2)
+
+        results = self.service.process_pending_alerts(batch_size=2)
+        self.assertEqual((results['total_alerts'], len(mail.outbox)), (3, 3))
+        self.assertEqual(list(SignalAlert.objects.filter(status='SENDING').values_list('id', flat=True)),
+                         [alert.id for alert in alerts[:2]])
+
+        # Claims of a crashed run expire and are taken over
+        SignalAlert.objects.filter(status='SENDING').update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.service.process_pending_alerts()['processed'], 2)
+        self.assertFalse(SignalAlert.objects.exclude(status='SENT').exists())
+
+    def test_failures_retry_or_fail(self):
+        """Test transient errors are rescheduled as PENDING and permanent ones become FAILED"""
+        no_email = User.objects.create(username='anonymous')
+        failed, = self.make_alerts(1, user=no_email)
+        retried, = self.make_alerts(1)
+
+        with mock.patch('apps.signals.signal_delivery_service.send_mail', side_effect=requests.ConnectionError('down')):
+            results = self.service.process_pending_alerts()
+        self.assertEqual((results['failed'], results['retried']), (1, 1))
+
+        failed.refresh_from_db()
+        retried.refresh_from_db()
+        self.assertEqual((failed.status, failed.error_message), ('FAILED', 'No email address for user'))
+        self.assertEqual((retried.status, retried.attempts, retried.claim_token), ('PENDING', 1, None))
+        self.assertGreater(retried.next_attempt_at, timezone.now())
+
+        # Not due before its backoff
+        self.assertEqual(self.service.process_pending_alerts()['total_alerts'], 0)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_query_budget(self):
+        """Test batched dispatch stays within its query budget and one batch per alert exceeds it"""
+        self.make_alerts(15)
+        self.assertEqual(self.service.process_pending_alerts()['processed'], 15)
+
+        SignalAlert.objects.update(status='PENDING', next_attempt_at=None)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.service.process_pending_alerts(batch_size=1)
+
+    def test_migrations_match_delivery_fields(self):
+        """Test the migrations produce the SignalAlert delivery and claim fields and nothing is missing"""
+        from django.apps import apps
+        from django.db.migrations.autodetector import MigrationAutodetector
+        from django.db.migrations.loader import MigrationLoader
+        from django.db.migrations.state import ProjectState
+
+        with override_settings(MIGRATION_MODULES={}):
+            loader = MigrationLoader(None, ignore_no_migrations=True)
+            state = loader.project_state(loader.graph.leaf_nodes('signals')[0])
+        fields = state.models['signals', 'signalalert'].fields
+        self.assertTrue({'status', 'attempts', 'next_attempt_at', 'sent_at', 'claim_token', 'user'} <= set(fields))
+        changes = MigrationAutodetector(state, ProjectState.from_apps(apps)).changes(
+            graph=loader.graph, trim_to_apps={'signals'}
+        )
+        self.assertNotIn('signals', changes)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class SignalAPIViewTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        cache.clear()
+        symbol = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        TradingSignal.objects.bulk_create([
+            TradingSignal(
+                symbol=symbol, signal_type=get_signal_type('BUY'), strength='MODERATE',
+                confidence_score=0.75, confidence_level='HIGH', entry_price=100 + i,
+                target_price=105, stop_loss=98, risk_reward_ratio=2.5, quality_score=0.7
+            )
+            for i in range(20)
+        ])
+        self.request = RequestFactory().get('/api/signals/', {'limit': 50})
+        self.request.user = User.objects.create(username='trader')
+
+    def test_query_budget(self):
+        """Test the signal list stays within its query budget and a per-signal lookup exceeds it"""
+        with mock.patch('apps.signals.price_sync_service.price_sync_service.get_synchronized_prices', return_value={}):
+            response = SignalAPIView().get(self.request)
+        self.assertEqual(len(json.loads(response.content)['signals']), 20)
+
+        cache.clear()
+
+        def prices_from_db(symbol):
+            Symbol.objects.get(symbol=symbol)
+            return {}
+
+        with mock.patch('apps.signals.price_sync_service.price_sync_service.get_synchronized_prices',
+                        side_effect=prices_from_db):
+            with self.assertRaises(QueryBudgetExceeded):
+                SignalAPIView().get(self.request)
@@ -9,24 +9,35 @@ Implements trading strategy based on 30-minute timeframe analysis:
 
 import pandas as pd
 import numpy as np
+from collections import defaultdict
 from typing import Dict, Optional, Tuple, List
 from decimal import Decimal
+from django.conf import settings
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from datetime import timedelta
 import logging
 
+from apps.core.shared_cache import get_shared_cache
+from apps.data.bar_aggregator import Bar, resample_bars
 from apps.data.models import MarketData, Symbol
-from apps.data.services import TechnicalAnalysisService
 
 logger = logging.getLogger(__name__)
 
+THIRTY_MINUTES = 30 * 60
+# Timeframes 30m bars are read or derived from, in order of preference
+SOURCE_TIMEFRAMES = [('30m', 30), ('15m', 15), ('5m', 5)]
+# Fewer bars than this and the levels are predicted from volatility
+MIN_BARS = 10
+
 
 class ThirtyMinuteStrategyService:
     """Service for 30-minute timeframe strategy implementation"""
     
     def __init__(self):
-        self.ta_service = TechnicalAnalysisService()
         self.lookback_periods = 50  # Look back 50 periods (25 hours) to find levels
+        self.cache_timeout = getattr(settings, 'THIRTY_MINUTE_LEVELS_CACHE_TIMEOUT', 3600)
         self.support_resistance_buffer = 0.02  # 2% buffer for level validation
         self.min_distance_percentage = 0.05  # At least 5% distance between levels
         
@@ -92,26 +103,94 @@ class ThirtyMinuteStrategyService:
             'QTUMUSDT': 'QTUM',
         }
     
-    def _get_market_data_symbol(self, symbol: Symbol) -> Symbol:
+    def _market_data_name(self, symbol: Symbol) -> str:
+        """Name of the symbol whose MarketData backs symbol (USDT pairs map to base symbols)"""
+        return self.symbol_mapping.get(symbol.symbol, symbol.symbol)
+    
+    def load_thirty_minute_bars(self, names) -> Dict[str, List[Bar]]:
         """
-        Get the appropriate symbol for MarketData lookup.
-        Maps USDT pairs to base symbols if needed.
+        Recent 30m bars (oldest first) per symbol name, in one query.
+        
+        Symbols with fewer than MIN_BARS stored 30m bars get them derived
+        from their 15m or 5m bars instead.
         """
-        symbol_name = symbol.symbol
+        count = self.lookback_periods * 2
+        bar_limit = Case(
+            *[When(timeframe=timeframe, then=Value(count * 30 // minutes)) for timeframe, minutes in SOURCE_TIMEFRAMES],
+            output_field=IntegerField()
+        )
+        rows = MarketData.objects.filter(
+            symbol__symbol__in=set(names), timeframe__in=[timeframe for timeframe, _ in SOURCE_TIMEFRAMES]
+        ).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('symbol_id'), F('timeframe')], order_by=F('timestamp').desc()),
+            bar_limit=bar_limit
+        ).filter(row_number__lte=F('bar_limit')).values_list(
+            'symbol__symbol', 'timeframe', 'timestamp', 'open_price', 'high_price', 'low_price', 'close_price', 'volume'
+        )
         
-        # If we have a direct mapping, use the base symbol for MarketData
-        if symbol_name in self.symbol_mapping:
-            base_symbol_name = self.symbol_mapping[symbol_name]
-            base_symbol = Symbol.objects.filter(symbol=base_symbol_name).first()
-            if base_symbol:
-                logger.debug(f"Mapped {symbol_name} → {base_symbol_name} for MarketData lookup")
-                return base_symbol
-            else:
-                logger.warning(f"Base symbol {base_symbol_name} not found for {symbol_name}")
+        sources = defaultdict(list)
+        for name, timeframe, timestamp, open_price, high, low, close, volume in rows:
+            sources[(name, timeframe)].append(Bar(name, timestamp, open_price, high, low, close, volume))
+        
+        bars = {}
+        for name in set(names):
+            best = []
+            for timeframe, minutes in SOURCE_TIMEFRAMES:
+                source = sources.get((name, timeframe))
+                if not source:
+                    continue
+                if minutes == 30:
+                    candidate = sorted(source, key=lambda bar: bar.start)
+                else:
+                    candidate = resample_bars(source, THIRTY_MINUTES)
+                if len(candidate) > len(best):
+                    best = candidate
+                if len(best) >= MIN_BARS:
+                    break
+            if best:
+                bars[name] = best[-count:]
+        return bars
+    
+    def get_levels_for_symbols(self, symbols) -> Dict[str, Dict[str, any]]:
+        """
+        30-minute levels of every symbol, keyed by symbol name.
+        
+        Bars of the whole universe are loaded in one query; computed levels
+        are cached per (symbol, last source bar), so repeat calls only redo
+        the analysis for symbols that got a new bar.
+        """
+        symbols = list(symbols)
+        names = {name for symbol in symbols for name in (symbol.symbol, self._market_data_name(symbol))}
+        try:
+            bars = self.load_thirty_minute_bars(names)
+        except Exception as e:
+            logger.error(f"Error loading 30-minute bars: {e}")
+            bars = {}
         
-        # Return original symbol if no mapping or mapping failed
-        return symbol
+        cache = get_shared_cache()
+        levels = {}
+        missing = []
+        for symbol in symbols:
+            symbol_bars = bars.get(self._market_data_name(symbol)) or bars.get(symbol.symbol)
+            if not symbol_bars:
+                missing.append(symbol)
+                continue
+            last = symbol_bars[-1]
+            key = f"thirty_minute_levels:{last.symbol}:{(last.last_tick or last.start).isoformat()}"
+            levels[symbol.symbol] = cache.get_or_refresh(
+                key, lambda symbol=symbol, symbol_bars=symbol_bars: self._analyze_levels(symbol, symbol_bars),
+                self.cache_timeout
+            )
         
+        if missing:
+            prices = self._latest_prices({self._market_data_name(symbol) for symbol in missing} |
+                                         {symbol.symbol for symbol in missing})
+            for symbol in missing:
+                logger.warning(f"Insufficient data for {symbol.symbol} - using fallback levels")
+                price = prices.get(self._market_data_name(symbol)) or prices.get(symbol.symbol)
+                levels[symbol.symbol] = self._get_fallback_levels(symbol, price)
+        return levels
+    
     def get_thirty_minute_levels(self, symbol: Symbol) -> Dict[str, any]:
         """
         Analyze 30-minute timeframe to find previous high and low levels
@@ -122,21 +201,17 @@ class ThirtyMinuteStrategyService:
         Returns:
             Dictionary containing resistance, support, and signal levels
         """
+        return self.get_levels_for_symbols([symbol])[symbol.symbol]
+    
+    def _analyze_levels(self, symbol: Symbol, bars: List[Bar]) -> Dict[str, any]:
+        """Levels of symbol from its 30m bars (oldest first)"""
         try:
-            # Get appropriate symbol for MarketData lookup (with USDT mapping)
-            market_data_symbol = self._get_market_data_symbol(symbol)
-            
-            # Get 30-minute market data
-            market_data = MarketData.objects.filter(
-                symbol=market_data_symbol
-            ).order_by('-timestamp')[:self.lookback_periods * 2]  # Extra data for analysis
-            
-            if len(market_data) < 10:
+            if len(bars) < MIN_BARS:
                 logger.warning(f"Insufficient data for {symbol.symbol} - using predicted levels")
-                return self._predict_levels(symbol, market_data)
+                return self._predict_levels(symbol, bars)
             
             # Convert to DataFrame for analysis
-            df = self._convert_to_dataframe(market_data)
+            df = self._convert_to_dataframe(bars)
             
             # Find resistance (previous high) and support (previous low)
             resistance_level = self._find_resistance_level(df)
@@ -148,26 +223,35 @@ class ThirtyMinuteStrategyService:
             # If levels are not clear, predict them
             if not validated_levels['resistance_found'] or not validated_levels['support_found']:
                 logger.info(f"Levels not clear for {symbol.symbol}, using predicted values")
-                predicted_levels = self._predict_levels(symbol, market_data)
+                predicted_levels = self._predict_levels(symbol, bars)
                 validated_levels.update(predicted_levels)
             
             return validated_levels
             
         except Exception as e:
             logger.error(f"Error analyzing 30-minute levels for {symbol.symbol}: {e}")
-            return self._get_fallback_levels(symbol)
+            return self._get_fallback_levels(symbol, float(bars[-1].close) if bars else None)
+    
+    @staticmethod
+    def _latest_prices(names) -> Dict[str, float]:
+        """Latest close of any timeframe per symbol name, in one query"""
+        latest_close = MarketData.objects.filter(symbol=OuterRef('pk')).order_by('-timestamp').values('close_price')[:1]
+        rows = Symbol.objects.filter(symbol__in=names).annotate(
+            last_close=Subquery(latest_close)
+        ).values_list('symbol', 'last_close')
+        return {name: float(close) for name, close in rows if close}
     
-    def _convert_to_dataframe(self, market_data: List[MarketData]) -> pd.DataFrame:
-        """Convert market data to pandas DataFrame"""
+    def _convert_to_dataframe(self, bars: List[Bar]) -> pd.DataFrame:
+        """Convert bars to pandas DataFrame"""
         data = []
-        for md in market_data:
+        for bar in bars:
             data.append({
-                'timestamp': md.timestamp,
-                'open': float(md.open_price),
-                'high': float(md.high_price),
-                'low': float(md.low_price),
-                'close': float(md.close_price),
-                'volume': float(md.volume) if md.volume else 0
+                'timestamp': bar.start,
+                'open': float(bar.open),
+                'high': float(bar.high),
+                'low': float(bar.low),
+                'close': float(bar.close),
+                'volume': float(bar.volume) if bar.volume else 0
             })
         
         df = pd.DataFrame(data)
@@ -282,16 +366,14 @@ class ThirtyMinuteStrategyService:
         
         return result
     
-    def _predict_levels(self, symbol: Symbol, market_data: List[MarketData]) -> Dict[str, any]:
+    def _predict_levels(self, symbol: Symbol, bars: List[Bar]) -> Dict[str, any]:
         """Predict levels when previous high/low not clearly visible"""
         try:
-            if len(market_data) < 5:
-                return self._get_fallback_levels(symbol)
+            if len(bars) < 5:
+                return self._get_fallback_levels(symbol, float(bars[-1].close) if bars else None)
             
-            # Get recent price data for prediction
-            recent_market_data = list(market_data)
-            recent_data_slice = recent_market_data[-10:] if len(recent_market_data) >= 10 else recent_market_data
-            recent_prices = [float(md.close_price) for md in recent_data_slice]
+            # Get recent price data for prediction (bars are oldest first)
+            recent_prices = [float(bar.close) for bar in bars[-10:]]
             current_price = recent_prices[-1] if recent_prices else 1.0
             
             # Calculate basic statistics
@@ -333,14 +415,11 @@ class ThirtyMinuteStrategyService:
             
         except Exception as e:
             logger.error(f"Error predicting levels for {symbol.symbol}: {e}")
-            return self._get_fallback_levels(symbol)
+            return self._get_fallback_levels(symbol, float(bars[-1].close) if bars else None)
     
-    def _get_fallback_levels(self, symbol: Symbol) -> Dict[str, any]:
+    def _get_fallback_levels(self, symbol: Symbol, current_price: Optional[float] = None) -> Dict[str, any]:
         """Fallback levels when all else fails"""
-        # Try to get latest market data using mapped symbol
-        market_data_symbol = self._get_market_data_symbol(symbol)
-        latest_md = MarketData.objects.filter(symbol=market_data_symbol).order_by('-timestamp').first()
-        current_price = float(latest_md.close_price) if latest_md else 1.0
+        current_price = current_price or 1.0
         
         # Use simple percentage-based levels as fallback
         fallback_resistance = current_price * 1.10  # 10% above
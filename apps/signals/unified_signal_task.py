@@ -39,22 +39,9 @@ def generate_unified_signals_task(self):
         
         logger.info(f"Processing {active_symbols.count()} active crypto symbols")
         
-        all_signals = []
-        processed_count = 0
-        
-        for symbol in active_symbols:
-            try:
-                # Generate signals using service (includes strategy, news, sentiment)
-                signals = signal_service.generate_signals_for_symbol(symbol)
-                all_signals.extend(signals)
-                processed_count += 1
-                
-                if processed_count % 50 == 0:
-                    logger.info(f"Processed {processed_count}/{active_symbols.count()} symbols")
-                    
-            except Exception as e:
-                logger.error(f"Error generating signals for {symbol.symbol}: {e}")
-                continue
+        active_symbols = list(active_symbols)
+        all_signals = signal_service.generate_signals_for_symbols(active_symbols)
+        processed_count = len(active_symbols) - len(signal_service.failed_symbols)
         
         logger.info(f"Generated {len(all_signals)} total signals from {processed_count} symbols")
         
@@ -24,6 +24,7 @@ from apps.signals.services import (
     SignalGenerationService, MarketRegimeService, SignalPerformanceService
 )
 from apps.trading.models import Symbol
+from apps.core.query_budget import max_queries
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ logger = logging.getLogger(__name__)
 class SignalAPIView(View):
     """API view for signal operations"""
     
+    @max_queries(10)
     def get(self, request):
         """Get signals with optional filtering"""
         try:
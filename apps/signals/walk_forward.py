@@ -0,0 +1,168 @@
+"""
+Walk-forward fold execution for MLTrainingService
+
+The feature matrix is built once; folds are index ranges into it. Folds run
+serially or in a ProcessPoolExecutor whose workers receive the matrix once
+through the pool initializer instead of a copied frame per fold. Every fold
+trains with a seed derived from its number, so parallel and serial runs
+produce the same metrics.
+
+This module does not import Django models at import time, so it can be
+loaded by spawned worker processes before Django is set up.
+"""
+
+import os
+import sys
+import time
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WalkForwardFold:
+    """One fold as index ranges [train_start, train_end) and [train_end, validation_end)"""
+    fold_number: int
+    train_start: int
+    train_end: int
+    validation_end: int
+    seed: int
+    training_period: str
+    validation_period: str
+
+
+def build_folds(timestamps: np.ndarray, start_date, end_date, training_window_days: int,
+                validation_window_days: int, random_state: int = 42) -> List[WalkForwardFold]:
+    """Fold index ranges over sorted timestamps, located with searchsorted"""
+    timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True))
+
+    def position(moment):
+        moment = pd.Timestamp(moment)
+        if moment.tzinfo is None:
+            moment = moment.tz_localize('UTC')
+        return int(timestamps.searchsorted(moment, side='left'))
+
+    folds = []
+    current_date = start_date + timedelta(days=training_window_days)
+    fold_number = 0
+    while current_date + timedelta(days=validation_window_days) <= end_date:
+        fold_number += 1
+        training_start = current_date - timedelta(days=training_window_days)
+        validation_end = current_date + timedelta(days=validation_window_days)
+        folds.append(WalkForwardFold(
+            fold_number=fold_number,
+            train_start=position(training_start),
+            train_end=position(current_date),
+            validation_end=position(validation_end),
+            seed=random_state + fold_number,
+            training_period=f"{training_start.date()} to {current_date.date()}",
+            validation_period=f"{current_date.date()} to {validation_end.date()}"
+        ))
+        current_date = validation_end
+    return folds
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """High-water mark of the current process RSS in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+# Per-process fold state, set once by _init_worker
+_state: Dict[str, Any] = {}
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, fold_function: str, fold_kwargs: Dict[str, Any], n_jobs: int):
+    # The fold function is imported by path so spawned workers can set up Django first
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    from django.utils.module_loading import import_string
+
+    _state.update(X=X, y=y, function=import_string(fold_function), kwargs=fold_kwargs, n_jobs=n_jobs)
+
+
+def run_fold(fold: WalkForwardFold) -> Dict[str, Any]:
+    """Train and evaluate one fold on views of the shared matrix"""
+    X, y = _state['X'], _state['y']
+    started = time.perf_counter()
+
+    X_train, y_train = X[fold.train_start:fold.train_end], y[fold.train_start:fold.train_end]
+    X_val, y_val = X[fold.train_end:fold.validation_end], y[fold.train_end:fold.validation_end]
+    if len(X_train) == 0 or len(X_val) == 0:
+        raise ValueError(f"Fold {fold.fold_number} has no training or validation rows")
+
+    metrics = _state['function'](X_train, y_train, X_val, y_val, seed=fold.seed,
+                                 n_jobs=_state['n_jobs'], **_state['kwargs'])
+
+    return {
+        'fold_number': fold.fold_number,
+        'training_period': fold.training_period,
+        'validation_period': fold.validation_period,
+        'training_samples': len(X_train),
+        'validation_samples': len(X_val),
+        'seed': fold.seed,
+        'accuracy': metrics.get('accuracy'),
+        'f1_score': metrics.get('f1_score'),
+        'mse': metrics.get('mse'),
+        'mae': metrics.get('mae'),
+        'metrics': metrics,
+        'duration_seconds': round(time.perf_counter() - started, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+        'worker_pid': os.getpid(),
+    }
+
+
+def run_folds(X: np.ndarray, y: np.ndarray, folds: List[WalkForwardFold], fold_function: str,
+              fold_kwargs: Optional[Dict[str, Any]] = None, max_workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Run folds serially (max_workers=1) or in a process pool.
+
+    fold_function is the dotted path of a callable
+    (X_train, y_train, X_val, y_val, seed, n_jobs, **fold_kwargs) -> metrics.
+    Failed folds are logged and reported with an 'error' entry. Results are
+    ordered by fold number.
+    """
+    if not folds:
+        return []
+    max_workers = max(1, min(max_workers, len(folds)))
+    n_jobs = max(1, (os.cpu_count() or 1) // max_workers)
+    initargs = (X, y, fold_function, fold_kwargs or {}, n_jobs)
+
+    results = []
+    if max_workers == 1:
+        _init_worker(*initargs)
+        try:
+            for fold in folds:
+                results.append(_collect(fold, run_fold, fold))
+        finally:
+            _state.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=initargs) as executor:
+            futures = [(fold, executor.submit(run_fold, fold)) for fold in folds]
+            for fold, future in futures:
+                results.append(_collect(fold, future.result))
+    return results
+
+
+def _collect(fold: WalkForwardFold, call, *args) -> Dict[str, Any]:
+    try:
+        return call(*args)
+    except Exception as e:
+        logger.error(f"Error in fold {fold.fold_number}: {e}")
+        return dict(asdict(fold), error=str(e))
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SubscriptionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.subscription'
+
+    def ready(self):
+        # Connects the entitlement cache invalidation receivers
+        from . import entitlements  # noqa: F401
@@ -0,0 +1,154 @@
+"""
+Subscription entitlement resolver
+
+Resolves a user's plan, limits and subscription expiry from the shared cache
+so SubscriptionMiddleware needs no database query per request once warm, and
+an eviction after a plan change reaches every worker.
+Entries are invalidated by post_save/post_delete of UserProfile, and a plan
+version bumped on SubscriptionPlan changes makes every entry built
+from an older plan stale at once.
+"""
+
+import time
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.core.shared_cache import get_shared_cache
+
+from .models import SubscriptionPlan, UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Bump when the Entitlement fields change so old entries are ignored
+ENTITLEMENT_SCHEMA = 1
+PLAN_VERSION_KEY = 'subscription_entitlement:plan_version'
+# Outlives every entry; when it expires anyway, entries are rebuilt once
+PLAN_VERSION_TIMEOUT = 30 * 24 * 3600
+
+
+def _entry_key(user_id) -> str:
+    return f'subscription_entitlement:v{ENTITLEMENT_SCHEMA}:{user_id}'
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    """What a user's subscription allows, as cached per user"""
+    user_id: Optional[int] = None
+    has_profile: bool = False
+    tier: str = 'free'
+    plan_id: Optional[int] = None
+    status: str = 'inactive'
+    expires_at: Optional[datetime] = None
+    max_signals_per_day: int = 0
+    max_portfolios: int = 0
+    has_ml_predictions: bool = False
+    has_api_access: bool = False
+    has_priority_support: bool = False
+
+    @property
+    def is_active(self) -> bool:
+        """Same rule as UserProfile.is_subscription_active, evaluated at call time"""
+        if self.status not in ('active', 'trial'):
+            return False
+        return bool(self.expires_at and self.expires_at > timezone.now())
+
+    def to_dict(self):
+        data = asdict(self)
+        data['is_active'] = self.is_active
+        return data
+
+
+ANONYMOUS_ENTITLEMENT = Entitlement()
+
+
+def build_entitlement(profile: Optional[UserProfile], user_id=None) -> Entitlement:
+    """Entitlement of a profile (None means the user has no profile yet)"""
+    if profile is None:
+        return Entitlement(user_id=user_id)
+
+    plan = profile.subscription_plan
+    expires_at = profile.trial_end_date if profile.subscription_status == 'trial' else profile.subscription_end_date
+    return Entitlement(
+        user_id=profile.user_id,
+        has_profile=True,
+        tier=plan.tier if plan else 'free',
+        plan_id=plan.id if plan else None,
+        status=profile.subscription_status,
+        expires_at=expires_at,
+        max_signals_per_day=plan.max_signals_per_day if plan else 0,
+        max_portfolios=plan.max_portfolios if plan else 0,
+        has_ml_predictions=plan.has_ml_predictions if plan else False,
+        has_api_access=plan.has_api_access if plan else False,
+        has_priority_support=plan.has_priority_support if plan else False,
+    )
+
+
+class EntitlementResolver:
+    """
+    Shared-cache-backed lookup of Entitlement objects.
+
+    An entry stores the plan version it was built with; one get_many round
+    trip fetches both, and entries with an outdated plan version are rebuilt.
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        self.timeout = timeout or getattr(settings, 'SUBSCRIPTION_ENTITLEMENT_TTL', 3600)
+
+    def resolve(self, user) -> Entitlement:
+        """Entitlement of user, anonymous users get the free entitlement"""
+        if user is None or not getattr(user, 'is_authenticated', False):
+            return ANONYMOUS_ENTITLEMENT
+        return self.resolve_user_id(user.pk)
+
+    def resolve_user_id(self, user_id) -> Entitlement:
+        key = _entry_key(user_id)
+        cache = get_shared_cache()
+        cached = cache.get_many([key, PLAN_VERSION_KEY])
+        plan_version = cached.get(PLAN_VERSION_KEY, 0)
+        entry = cached.get(key)
+        if entry is not None and entry[0] == plan_version:
+            return entry[1]
+
+        profile = UserProfile.objects.select_related('subscription_plan').filter(user_id=user_id).first()
+        entitlement = build_entitlement(profile, user_id)
+        cache.set(key, (plan_version, entitlement), self.timeout)
+        return entitlement
+
+    @staticmethod
+    def invalidate_user(user_id):
+        get_shared_cache().delete(_entry_key(user_id))
+
+    @staticmethod
+    def invalidate_plans():
+        # A fresh unique value rather than incr, which fails once the key was evicted
+        get_shared_cache().set(PLAN_VERSION_KEY, time.time_ns(), PLAN_VERSION_TIMEOUT)
+
+
+entitlement_resolver = EntitlementResolver()
+
+
+def get_entitlement(user) -> Entitlement:
+    """Resolve the entitlement of user through the process-wide resolver"""
+    return entitlement_resolver.resolve(user)
+
+
+def _profile_changed(sender, instance, **kwargs):
+    # Evicting before commit would let a concurrent request re-cache the old row
+    user_id = instance.user_id
+    transaction.on_commit(lambda: EntitlementResolver.invalidate_user(user_id))
+
+
+def _plan_changed(sender, instance, **kwargs):
+    transaction.on_commit(EntitlementResolver.invalidate_plans)
+
+
+post_save.connect(_profile_changed, sender=UserProfile, dispatch_uid='entitlements_profile_save')
+post_delete.connect(_profile_changed, sender=UserProfile, dispatch_uid='entitlements_profile_delete')
+post_save.connect(_plan_changed, sender=SubscriptionPlan, dispatch_uid='entitlements_plan_save')
+post_delete.connect(_plan_changed, sender=SubscriptionPlan, dispatch_uid='entitlements_plan_delete')
@@ -1,28 +1,49 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+from .entitlements import ANONYMOUS_ENTITLEMENT, get_entitlement
 from .models import UserProfile
 
+def _get_user_profile(user):
+    try:
+        profile, created = UserProfile.objects.get_or_create(user=user)
+        return profile
+    except Exception:
+        return None
+
 class SubscriptionMiddleware:
+    """
+    Adds subscription info to the request from the cached entitlement.
+
+    When the entitlement says the user has a profile, request.user_profile is
+    loaded lazily, so requests that only look at the tier or active flag cost
+    no database query once the entitlement is cached. Users without a profile
+    get it created eagerly (None if that fails). Test it for truthiness: a
+    lazy profile that fails to load is falsy but not None.
+    """
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         # Add subscription info to request
-        if hasattr(request, 'user') and not isinstance(request.user, AnonymousUser):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
             try:
-                profile, created = UserProfile.objects.get_or_create(user=request.user)
-                request.user_profile = profile
-                request.subscription_tier = profile.subscription_plan.tier if profile.subscription_plan else 'free'
-                request.subscription_active = profile.is_subscription_active
+                entitlement = get_entitlement(user)
             except Exception:
-                request.user_profile = None
-                request.subscription_tier = 'free'
-                request.subscription_active = False
+                entitlement = ANONYMOUS_ENTITLEMENT
+            if entitlement.has_profile:
+                request.user_profile = SimpleLazyObject(lambda: _get_user_profile(user))
+            else:
+                request.user_profile = _get_user_profile(user)
         else:
+            entitlement = ANONYMOUS_ENTITLEMENT
             request.user_profile = None
-            request.subscription_tier = 'free'
-            request.subscription_active = False
+        
+        request.entitlement = entitlement
+        request.subscription_tier = entitlement.tier
+        request.subscription_active = entitlement.is_active
 
         response = self.get_response(request)
         return response
@@ -50,8 +71,7 @@ class SubscriptionRedirectMiddleware:
         # Check if user is authenticated and has no active subscription
         if (hasattr(request, 'user') and 
             not isinstance(request.user, AnonymousUser) and
-            hasattr(request, 'user_profile') and
-            request.user_profile and
+            hasattr(request, 'entitlement') and
             not request.subscription_active):
             
             # Check if current URL is exempt
@@ -1,3 +1,143 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
 
-# Create your tests here.
+from apps.core.shared_cache import LocalSharedCacheBackend, SQLiteSharedCacheBackend, set_shared_cache
+from .entitlements import EntitlementResolver, get_entitlement
+from .middleware import SubscriptionMiddleware
+from .models import SubscriptionPlan, UserProfile
+
+
+class EntitlementResolverTestCase(TestCase):
+    def setUp(self):
+        set_shared_cache(LocalSharedCacheBackend())
+        self.addCleanup(set_shared_cache, None)
+        self.plan = SubscriptionPlan.objects.create(
+            name='Pro', tier='pro', price=Decimal('29.00'), max_signals_per_day=50, has_api_access=True
+        )
+        self.user = User.objects.create_user(username='trader', email='trader@example.com', password='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile = UserProfile.objects.create(
+                user=self.user,
+                subscription_plan=self.plan,
+                subscription_status='active',
+                subscription_end_date=timezone.now() + timedelta(days=30)
+            )
+
+    def test_entitlement_is_cached(self):
+        """Test the second resolve does not touch the database"""
+        entitlement = get_entitlement(self.user)
+        self.assertEqual(entitlement.tier, 'pro')
+        self.assertEqual(entitlement.max_signals_per_day, 50)
+        self.assertTrue(entitlement.has_api_access)
+        self.assertTrue(entitlement.is_active)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_entitlement(self.user), entitlement)
+
+    def test_profile_save_invalidates(self):
+        """Test a profile change is visible on the next resolve"""
+        self.assertTrue(get_entitlement(self.user).is_active)
+
+        self.profile.subscription_status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+
+        self.assertFalse(get_entitlement(self.user).is_active)
+        self.assertEqual(get_entitlement(self.user).status, 'cancelled')
+
+    def test_plan_save_invalidates(self):
+        """Test a plan change refreshes the entitlements of its users"""
+        get_entitlement(self.user)
+
+        self.plan.max_signals_per_day = 100
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plan.save()
+
+        self.assertEqual(get_entitlement(self.user).max_signals_per_day, 100)
+
+    def test_expiry_is_evaluated_per_call(self):
+        """Test a cached entitlement stops being active once it expired"""
+        entitlement = get_entitlement(self.user)
+        self.assertTrue(entitlement.is_active)
+
+        later = timezone.now() + timedelta(days=31)
+        with mock.patch('apps.subscription.entitlements.timezone.now', return_value=later):
+            self.assertFalse(get_entitlement(self.user).is_active)
+
+    def test_invalidation_reaches_other_workers(self):
+        """Test an eviction by one process is seen by another sharing the cache file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'shared_cache.sqlite3')
+            set_shared_cache(SQLiteSharedCacheBackend(path))
+            self.assertEqual(get_entitlement(self.user).tier, 'pro')
+
+            # Another worker handles the downgrade and evicts through its own connection
+            UserProfile.objects.filter(pk=self.profile.pk).update(subscription_status='cancelled')
+            set_shared_cache(SQLiteSharedCacheBackend(path))
+            EntitlementResolver.invalidate_user(self.user.pk)
+
+            set_shared_cache(SQLiteSharedCacheBackend(path))
+            self.assertEqual(get_entitlement(self.user).status, 'cancelled')
+
+
+class SubscriptionMiddlewareTestCase(TestCase):
+    def setUp(self):
+        set_shared_cache(LocalSharedCacheBackend())
+        self.addCleanup(set_shared_cache, None)
+        self.factory = RequestFactory()
+        self.middleware = SubscriptionMiddleware(lambda request: request)
+        self.user = User.objects.create_user(username='member', email='member@example.com', password='x')
+
+    def make_request(self):
+        request = self.factory.get('/dashboard/')
+        request.user = self.user
+        self.middleware(request)
+        return request
+
+    def test_steady_state_has_no_queries(self):
+        """Test requests after the first one resolve the subscription from cache"""
+        with self.captureOnCommitCallbacks(execute=True):
+            request = self.make_request()
+        self.assertEqual(request.subscription_tier, 'free')
+        self.assertFalse(request.subscription_active)
+        self.make_request()
+
+        with self.assertNumQueries(0):
+            request = self.make_request()
+        self.assertFalse(request.subscription_active)
+
+    def test_user_profile(self):
+        """Test a missing profile is created at once and an existing one is loaded lazily"""
+        with self.captureOnCommitCallbacks(execute=True):
+            request = self.make_request()
+        self.assertEqual(request.user_profile.user, self.user)
+        self.assertTrue(UserProfile.objects.filter(user=self.user).exists())
+
+        request = self.make_request()
+        with self.assertNumQueries(1):
+            self.assertEqual(request.user_profile.user_id, self.user.pk)
+
+    def test_user_profile_failure(self):
+        """Test a profile that cannot be loaded is None, or falsy when loaded lazily"""
+        with mock.patch('apps.subscription.middleware.UserProfile.objects.get_or_create', side_effect=Exception):
+            self.assertIsNone(self.make_request().user_profile)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.create(user=self.user)
+        with mock.patch('apps.subscription.middleware.UserProfile.objects.get_or_create', side_effect=Exception):
+            self.assertFalse(self.make_request().user_profile)
+
+    def test_anonymous_user(self):
+        """Test anonymous users get the free tier"""
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        with self.assertNumQueries(0):
+            self.middleware(request)
+        self.assertIsNone(request.user_profile)
+        self.assertEqual(request.subscription_tier, 'free')
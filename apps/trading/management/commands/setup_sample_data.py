@@ -1,10 +1,20 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from apps.trading.models import Portfolio, Symbol, RiskSettings
-from apps.signals.models import SignalType, SignalFactor
+from apps.signals.models import SignalType, SignalFactor, TradingSignal
 from apps.data.models import DataSource
 from decimal import Decimal
 
+# (symbol, signal type, strength, confidence, confidence level, entry, target, stop, quality)
+SAMPLE_SIGNALS = [
+    ('BTC', 'BUY', 'STRONG', 0.85, 'HIGH', '45000.00', '50000.00', '42000.00', 0.82),
+    ('ETH', 'BUY', 'MODERATE', 0.72, 'HIGH', '3200.00', '3500.00', '3000.00', 0.75),
+    ('SOL', 'SELL', 'WEAK', 0.45, 'MEDIUM', '180.00', '160.00', '200.00', 0.48),
+    ('BTC', 'HOLD', 'MODERATE', 0.65, 'MEDIUM', '45000.00', '45000.00', '44000.00', 0.60),
+    ('ETH', 'SELL', 'STRONG', 0.78, 'HIGH', '3200.00', '3000.00', '3400.00', 0.75),
+    ('SOL', 'BUY', 'VERY_STRONG', 0.92, 'VERY_HIGH', '180.00', '220.00', '170.00', 0.88),
+]
+
 
 class Command(BaseCommand):
     help = 'Set up sample data for the AI Trading Engine'
@@ -16,6 +26,7 @@ class Command(BaseCommand):
         symbols_data = [
             {'symbol': 'BTC', 'name': 'Bitcoin', 'symbol_type': 'CRYPTO', 'exchange': 'Binance'},
             {'symbol': 'ETH', 'name': 'Ethereum', 'symbol_type': 'CRYPTO', 'exchange': 'Binance'},
+            {'symbol': 'SOL', 'name': 'Solana', 'symbol_type': 'CRYPTO', 'exchange': 'Binance'},
             {'symbol': 'AAPL', 'name': 'Apple Inc.', 'symbol_type': 'STOCK', 'exchange': 'NASDAQ'},
             {'symbol': 'GOOGL', 'name': 'Alphabet Inc.', 'symbol_type': 'STOCK', 'exchange': 'NASDAQ'},
             {'symbol': 'TSLA', 'name': 'Tesla Inc.', 'symbol_type': 'STOCK', 'exchange': 'NASDAQ'},
@@ -48,6 +59,24 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'Created signal type: {signal_type.name}')
         
+        # Create sample dashboard signals (only into an empty signal table)
+        if not TradingSignal.objects.exists():
+            colors = {'BUY': '#28a745', 'SELL': '#dc3545', 'HOLD': '#ffc107'}
+            signal_types = {
+                name: SignalType.objects.get_or_create(
+                    name=name, defaults={'description': f'{name.title()} Signal', 'color': color}
+                )[0]
+                for name, color in colors.items()
+            }
+            symbols = Symbol.objects.in_bulk(['BTC', 'ETH', 'SOL'], field_name='symbol')
+            for symbol, signal_type, strength, confidence, level, entry, target, stop, quality in SAMPLE_SIGNALS:
+                TradingSignal.objects.create(
+                    symbol=symbols[symbol], signal_type=signal_types[signal_type], strength=strength,
+                    confidence_score=confidence, confidence_level=level, entry_price=Decimal(entry),
+                    target_price=Decimal(target), stop_loss=Decimal(stop), quality_score=quality, is_valid=True
+                )
+            self.stdout.write(f'Created {len(SAMPLE_SIGNALS)} sample signals')
+        
         # Create sample signal factors
         signal_factors_data = [
             {
@@ -5,11 +5,13 @@ Provides utilities for managing positions with capital-based take profit and sto
 Integrates with the CapitalBasedRiskManager for consistent position management.
 """
 
+import numpy as np
 from decimal import Decimal
 from typing import Dict, List, Optional
 from django.db import transaction
 from django.utils import timezone
 from apps.trading.models import Position, Trade, Portfolio, Symbol
+from apps.analytics.services import PositionPriceUpdateService
 from apps.data.services import RiskManagementService
 import logging
 
@@ -239,7 +241,12 @@ class PositionManager:
     def auto_close_positions(self, portfolio: Portfolio, current_prices: Dict[str, float]) -> Dict:
         """Automatically close positions that meet exit conditions"""
         try:
-            positions = self.get_positions_needing_monitoring(portfolio)
+            # One batched mark-to-market pass instead of per-position checks and saves
+            evaluation = PositionPriceUpdateService.mark_to_market(
+                Position.objects.filter(portfolio=portfolio, is_open=True),
+                current_prices
+            )
+            positions = evaluation['positions']
             results = {
                 'checked': len(positions),
                 'closed': 0,
@@ -247,49 +254,42 @@ class PositionManager:
                 'details': []
             }
             
-            for position in positions:
+            closures = []
+            for i, position in enumerate(positions):
                 symbol_key = position.symbol.symbol
                 
-                if symbol_key not in current_prices:
+                if np.isnan(evaluation['price'][i]):
                     results['errors'] += 1
                     results['details'].append({
-                        'position': position.symbol.symbol,
+                        'position': symbol_key,
                         'action': 'skipped',
                         'reason': 'No current price available'
                     })
                     continue
                 
-                current_price = current_prices[symbol_key]
-                
-                # Check exit conditions
-                exit_check = self.check_exit_conditions(position, current_price)
-                
-                if exit_check.get('should_exit'):
-                    closed = self.close_position(position, current_price, exit_check['reason'])
-                    
-                    if closed:
-                        results['closed'] += 1
-                        results['details'].append({
-                            'position': position.symbol.symbol,
-                            'action': 'closed',
-                            'reason': exit_check['reason'],
-                            'pnl': exit_check.get('pnl_amount', 0),
-                            'exit_price': current_price
-                        })
-                    else:
-                        results['errors'] += 1
-                        results['details'].append({
-                            'position': position.symbol.symbol,
-                            'action': 'failed_to_close',
-                            'reason': 'Close operation failed'
-                        })
+                if evaluation['take_profit_hit'][i]:
+                    reason = "Take profit target reached"
+                elif evaluation['stop_loss_hit'][i]:
+                    reason = "Stop loss limit reached"
                 else:
                     results['details'].append({
-                        'position': position.symbol.symbol,
+                        'position': symbol_key,
                         'action': 'monitored',
                         'reason': 'No exit conditions met'
                     })
+                    continue
+                
+                current_price = float(evaluation['price'][i])
+                closures.append((position, current_price, reason))
+                results['details'].append({
+                    'position': symbol_key,
+                    'action': 'closed',
+                    'reason': reason,
+                    'pnl': float(evaluation['unrealized_pnl'][i]),
+                    'exit_price': current_price
+                })
             
+            results['closed'] = PositionPriceUpdateService.close_positions(closures)
             return results
             
         except Exception as e:
@@ -1,3 +1,100 @@
-from django.test import TestCase
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from apps.analytics.services import PositionPriceUpdateService
+from apps.data.models import MarketData
+from .models import Portfolio, Position, Symbol, Trade
+from .position_utils import PositionManager
+
+
+class PositionPriceUpdateServiceTestCase(TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        shared_cache = override_settings(SHARED_CACHE_PATH=os.path.join(tmpdir.name, 'shared_cache.sqlite3'))
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        user = User.objects.create_user('trader', 'trader@example.com', 'pass')
+        self.portfolio = Portfolio.objects.create(user=user, name='Main')
+        self.btc = Symbol.objects.create(symbol='BTC', name='Bitcoin', symbol_type='CRYPTO')
+        self.eth = Symbol.objects.create(symbol='ETH', name='Ethereum', symbol_type='CRYPTO')
+        self.sol = Symbol.objects.create(symbol='SOL', name='Solana', symbol_type='CRYPTO')
+
+    def open_position(self, symbol, position_type='LONG', entry=100, quantity=2, take_profit=None, stop_loss=None):
+        return Position.objects.create(
+            portfolio=self.portfolio, symbol=symbol, position_type=position_type,
+            quantity=Decimal(quantity), entry_price=Decimal(entry),
+            take_profit=None if take_profit is None else Decimal(take_profit),
+            stop_loss=None if stop_loss is None else Decimal(stop_loss)
+        )
+
+    def test_mark_to_market_in_two_queries(self):
+        """Test open positions are loaded and updated with one query each"""
+        long = self.open_position(self.btc, 'LONG', entry=100, quantity=2)
+        short = self.open_position(self.eth, 'SHORT', entry=50, quantity=4)
+        unpriced = self.open_position(self.sol)
+
+        with self.assertNumQueries(2):
+            result = PositionPriceUpdateService.mark_to_market(prices={'BTC': 110.0, 'ETH': 55.0})
+
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual(result['missing_prices'], ['SOL'])
+        for position in (long, short):
+            position.refresh_from_db()
+        self.assertEqual(long.current_price, Decimal('110'))
+        pnl = dict(zip((p.pk for p in result['positions']), result['unrealized_pnl']))
+        self.assertAlmostEqual(pnl[long.pk], float(long.unrealized_pnl))
+        self.assertAlmostEqual(pnl[short.pk], float(short.unrealized_pnl))
+        self.assertEqual(pnl[unpriced.pk], 0.0)
+        # +20 on the long, -20 on the short
+        self.assertAlmostEqual(result['total_unrealized_pnl'], 0.0)
+
+    def test_prices_fall_back_to_latest_close(self):
+        """Test symbols without a live price use their latest stored close"""
+        MarketData.objects.create(
+            symbol=self.eth, timestamp=timezone.now(), open_price=1, high_price=1, low_price=1,
+            close_price=Decimal('3000'), volume=1
+        )
+        live = {'BTC': {'price': 50000.0}}
+        with mock.patch('apps.data.real_price_service.get_live_prices', return_value=live):
+            with self.assertNumQueries(1):
+                prices = PositionPriceUpdateService.resolve_prices(['BTC', 'ETH', 'SOL'])
+
+        self.assertEqual(prices, {'BTC': 50000.0, 'ETH': 3000.0})
+
+    def test_auto_close_positions(self):
+        """Test exit checks close target and stop hits in one batch"""
+        target = self.open_position(self.btc, 'LONG', entry=100, take_profit=110, stop_loss=95)
+        stopped = self.open_position(self.eth, 'SHORT', entry=100, take_profit=90, stop_loss=105)
+        held = self.open_position(self.btc, 'LONG', entry=100, take_profit=130, stop_loss=90)
+        self.open_position(self.sol)
+
+        results = PositionManager().auto_close_positions(self.portfolio, {'BTC': 112.0, 'ETH': 106.0})
+
+        self.assertEqual((results['checked'], results['closed'], results['errors']), (4, 2, 1))
+        for position in (target, stopped, held):
+            position.refresh_from_db()
+        self.assertFalse(target.is_open)
+        self.assertFalse(stopped.is_open)
+        self.assertTrue(held.is_open)
+        self.assertEqual(held.current_price, Decimal('112'))
+        self.assertEqual(
+            sorted(Trade.objects.values_list('trade_type', 'notes')),
+            [('BUY', 'Position closed: Stop loss limit reached'),
+             ('SELL', 'Position closed: Take profit target reached')]
+        )
+
+    def test_update_position_prices_command(self):
+        """Test the management command marks positions to live prices"""
+        position = self.open_position(self.btc)
+        with mock.patch('apps.data.real_price_service.get_live_prices', return_value={'BTC': {'price': 120.0}}):
+            call_command('update_position_prices', stdout=mock.MagicMock())
+
+        position.refresh_from_db()
+        self.assertEqual(position.current_price, Decimal('120'))